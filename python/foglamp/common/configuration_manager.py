@@ -127,6 +127,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
     _storage = None
     _registered_interests = None
     _cacheManager = None
+    _version = 0
 
     def __init__(self, storage=None):
         ConfigurationManagerSingleton.__init__(self)
@@ -139,6 +140,17 @@ class ConfigurationManager(ConfigurationManagerSingleton):
         if self._cacheManager is None:
             self._cacheManager = ConfigurationCache()
 
+    @property
+    def version(self):
+        """ Number of the changes of the categories made by this process, the REST clients polling the categories
+        revalidate their copy with it, see foglamp.common.web.middleware.versioned
+        """
+        return self._version
+
+    def changed(self):
+        """ Records a change of the categories written to the storage without the configuration manager """
+        self._version += 1
+
     async def _run_callbacks(self, category_name):
         callbacks = self._registered_interests.get(category_name)
         if callbacks is not None:
@@ -297,6 +309,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
                                               value=new_category_val).payload()
             result = await self._storage.insert_into_tbl("configuration", payload)
             response = result['response']
+            self.changed()
             self._cacheManager.update(category_name, new_category_val)
         except KeyError:
             raise ValueError(result['message'])
@@ -406,6 +419,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
                 .FORMAT("return", ("ts", "YYYY-MM-DD HH24:MI:SS.MS")) \
                 .WHERE(["key", "=", category_name]).payload()
             await self._storage.update_tbl("configuration", payload)
+            self.changed()
             audit = AuditLogger(self._storage)
             audit_details = {'category': category_name, 'item': item_name, 'oldValue': old_value, 'newValue': new_value_val}
             await audit.information('CONCH', audit_details)
@@ -421,6 +435,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
                 WHERE(["key", "=", category_name]).payload()
             result = await self._storage.update_tbl("configuration", payload)
             response = result['response']
+            self.changed()
             # Re-read category from DB
             new_category_val_db = await self._read_category_val(category_name)
             if category_name in self._cacheManager.cache:
@@ -716,6 +731,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
             payload = PayloadBuilder().INSERT(parent=category_name, child=child).payload()
             result = await self._storage.insert_into_tbl("category_children", payload)
             response = result['response']
+            self.changed()
         except KeyError:
             raise ValueError(result['message'])
         except StorageServerError as ex:
@@ -816,6 +832,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
         try:
             payload = PayloadBuilder().WHERE(["parent", "=", category_name]).AND_WHERE(["child", "=", child_category]).payload()
             result = await self._storage.delete_from_tbl("category_children", payload)
+            self.changed()
 
             if result['response'] == 'deleted':
                 child_dict = await self._read_all_child_category_names(category_name)
@@ -853,6 +870,7 @@ class ConfigurationManager(ConfigurationManagerSingleton):
             payload = PayloadBuilder().WHERE(["parent", "=", category_name]).payload()
             result = await self._storage.delete_from_tbl("category_children", payload)
             response = result["response"]
+            self.changed()
             # TODO: Shall we write audit trail code entry here? log_code?
 
         except KeyError:
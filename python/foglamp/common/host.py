@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Facts about the host and its processes, read from /proc instead of running ps, free or hostname
+
+The network facts change rarely, they are cached for _HOST_FACTS_TTL_SECONDS or until the network interfaces or
+routes change.
+"""
+
+import array
+import fcntl
+import ipaddress
+import os
+import socket
+import struct
+import subprocess
+import time
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_PROC_DIR = '/proc'
+
+_HOST_FACTS_TTL_SECONDS = 60
+"""How long the host name and the addresses are reused, a new DHCP lease is seen after this time"""
+
+_SIOCGIFADDR = 0x8915
+"""ioctl returning the IPv4 address of a network interface"""
+
+_IPV6_SCOPE_GLOBAL = 0
+
+_host_facts = None
+_host_facts_time = 0
+_network_fingerprint = None
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _stat_fields(pid):
+    """Returns the fields of /proc/<pid>/stat following the command name, which can contain spaces"""
+    stat = _read('{}/{}/stat'.format(_PROC_DIR, pid)).decode(errors='replace')
+    return stat[stat.rindex(')') + 2:].split()
+
+
+def get_parent_pid(pid):
+    """Returns the parent pid of a process
+
+    Raises:
+        ProcessLookupError: The process does not exist
+    """
+    try:
+        # state ppid pgrp ...
+        return int(_stat_fields(pid)[1])
+    except FileNotFoundError:
+        raise ProcessLookupError(pid) from None
+
+
+def get_child_pids(pid):
+    """Returns the pids of the children of a process, an empty list if it has none or it does not exist"""
+    task_dir = '{}/{}/task'.format(_PROC_DIR, pid)
+    try:
+        threads = os.listdir(task_dir)
+    except FileNotFoundError:
+        return []
+
+    children = []
+    try:
+        # The children of every thread, available from Linux 3.5
+        for thread in threads:
+            children.extend(int(child) for child in _read('{}/{}/children'.format(task_dir, thread)).split())
+        return children
+    except FileNotFoundError:
+        pass
+
+    # The kernel does not provide the children, the parent of every process is read
+    children = []
+    for entry in os.listdir(_PROC_DIR):
+        if entry.isdigit():
+            try:
+                if get_parent_pid(entry) == pid:
+                    children.append(int(entry))
+            except (ProcessLookupError, ValueError):
+                pass
+    return children
+
+
+def get_processes(name=None):
+    """Returns the running processes as a list of (pid, ppid, command line) tuples
+
+    Args:
+        name: when not None, only the processes having name in their command line are returned
+    """
+    processes = []
+    for entry in sorted((entry for entry in os.listdir(_PROC_DIR) if entry.isdigit()), key=int):
+        try:
+            cmdline = _read('{}/{}/cmdline'.format(_PROC_DIR, entry)).rstrip(b'\0').replace(b'\0', b' ').decode(
+                errors='replace')
+            ppid = get_parent_pid(entry)
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            # Terminated while reading
+            continue
+        if not cmdline:
+            # Kernel threads
+            continue
+        if name is None or name in cmdline:
+            processes.append((int(entry), ppid, cmdline))
+    return processes
+
+
+def get_memory_info():
+    """Returns the memory sizes, in kB, of /proc/meminfo, e.g. {'MemTotal': 8049852, 'MemAvailable': 5930216, ...}"""
+    memory = dict()
+    for line in _read('{}/meminfo'.format(_PROC_DIR)).decode().splitlines():
+        key, _, value = line.partition(':')
+        fields = value.split()
+        if fields:
+            memory[key] = int(fields[0])
+    return memory
+
+
+def _ipv4_addresses():
+    addresses = []
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _, if_name in socket.if_nameindex():
+            request = array.array('B', struct.pack('256s', if_name.encode()[:15]))
+            try:
+                fcntl.ioctl(sock.fileno(), _SIOCGIFADDR, request)
+            except OSError:
+                # No IPv4 address
+                continue
+            address = socket.inet_ntoa(request.tobytes()[20:24])
+            if not ipaddress.ip_address(address).is_loopback:
+                addresses.append(address)
+    return addresses
+
+
+def _ipv6_addresses():
+    addresses = []
+    try:
+        lines = _read('{}/net/if_inet6'.format(_PROC_DIR)).decode().splitlines()
+    except FileNotFoundError:
+        # IPv6 disabled
+        return addresses
+    for line in lines:
+        # address index prefix-length scope flags interface
+        fields = line.split()
+        if int(fields[3], 16) != _IPV6_SCOPE_GLOBAL:
+            continue
+        address = ipaddress.IPv6Address(bytes.fromhex(fields[0]))
+        if not address.is_loopback:
+            addresses.append(str(address))
+    return addresses
+
+
+def _get_ip_addresses():
+    """The addresses of all the network interfaces but loopback and IPv6 link local, as hostname -I does"""
+    try:
+        return _ipv4_addresses() + _ipv6_addresses()
+    except OSError:
+        # Not Linux
+        result = subprocess.run(['hostname', '-I'], stdout=subprocess.PIPE)
+        return result.stdout.decode('utf-8').replace("\n", "").strip().split(" ")
+
+
+def _get_network_fingerprint():
+    """The network interfaces, routes and IPv6 addresses, which change with the addresses of the host,
+    None if they can not be read"""
+    try:
+        fingerprint = [socket.if_nameindex()]
+        for name in ('route', 'if_inet6'):
+            try:
+                fingerprint.append(_read('{}/net/{}'.format(_PROC_DIR, name)))
+            except FileNotFoundError:
+                fingerprint.append(None)
+        return fingerprint
+    except OSError:
+        return None
+
+
+def get_host_facts():
+    """Returns the cached (host name, list of IP addresses) of the host, read again when the network changes"""
+    global _host_facts, _host_facts_time, _network_fingerprint
+
+    now = time.monotonic()
+    fingerprint = _get_network_fingerprint()
+    if _host_facts is None or now - _host_facts_time >= _HOST_FACTS_TTL_SECONDS or \
+            fingerprint != _network_fingerprint:
+        _host_facts = (socket.gethostname(), _get_ip_addresses())
+        _host_facts_time = now
+        _network_fingerprint = fingerprint
+    return _host_facts
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Metrics of a FogLAMP process: counters, gauges and histograms of fixed buckets, rendered in the Prometheus text
+format by GET /foglamp/metrics of the core and GET /foglamp/service/metrics of every management app
+
+A metric is registered once, when the module updating it is imported, and its values are updated in place: an update
+costs a dict lookup and an addition. A gauge of a size, e.g. of a queue, is computed by a function called only when
+the metrics are rendered and the event loop lag is measured from the first time the metrics are requested, so that
+nothing more is done while nobody scrapes them.
+"""
+
+import asyncio
+import bisect
+import functools
+import math
+import time
+from collections import OrderedDict
+
+from aiohttp import web
+
+from foglamp.common import logger
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+__all__ = ('Histogram', 'Counter', 'Gauge', 'HistogramMetric', 'Registry', 'REGISTRY', 'LATENCY_BUCKETS',
+           'get_metrics', 'timed')
+
+_logger = logger.setup(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+"""Upper bounds of the buckets of a latency, in seconds, the last bucket has no upper bound"""
+
+_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_LOOP_LAG_PROBE_SECONDS = 1
+"""Interval of the probe of the event loop lag"""
+
+
+class Histogram(object):
+    """Counts of durations, in seconds, by bucket"""
+
+    __slots__ = ['bounds', 'counts', 'count', 'sum', 'max']
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        seconds = max(0.0, seconds)
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for idx, count in enumerate(other.counts):
+            self.counts[idx] += count
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket holding the percentile, max for the last bucket, None if empty"""
+        if self.count == 0:
+            return None
+        rank = self.count * percent / 100
+        cumulative = 0
+        for idx, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return min(self.bounds[idx], self.max) if idx < len(self.bounds) else self.max
+        return self.max
+
+    def cumulative_counts(self):
+        """Returns [(upper bound, count)], the count of a bucket includes the smaller ones"""
+        buckets = []
+        cumulative = 0
+        for bound, count in zip(tuple(self.bounds) + ("+Inf",), self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return buckets
+
+    def toDict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "max": round(self.max, 3),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": [{"le": bound, "count": count} for bound, count in self.cumulative_counts()]
+        }
+
+
+class _CounterValue(object):
+    __slots__ = ['value']
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class _GaugeValue(object):
+    __slots__ = ['value', 'function']
+
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        """Called for the value when the metrics are rendered"""
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+
+class _Metric(object):
+    """A metric of a name, with a value for every tuple of values of its labels"""
+
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._children = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Returns the value of the label values, created the first time they are used"""
+        try:
+            return self._children[values]
+        except KeyError:
+            if len(values) != len(self.label_names):
+                raise ValueError("{} expects the labels {}".format(self.name, self.label_names))
+            child = self._children[values] = self._new_child()
+            return child
+
+    def _samples(self):
+        """Yields (suffix, labels, value) of every sample of the metric"""
+        raise NotImplementedError
+
+    def render(self):
+        lines = ['# HELP {} {}'.format(self.name, _escape(self.documentation, False)),
+                 '# TYPE {} {}'.format(self.name, self.kind)]
+        for suffix, labels, value in self._samples():
+            lines.append('{}{}{} {}'.format(self.name, suffix, _format_labels(labels), _format_value(value)))
+        return lines
+
+
+class Counter(_Metric):
+    """A count that only grows, e.g. of the requests answered"""
+
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield '', zip(self.label_names, values), child.value
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. a size or a number of tasks running"""
+
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            value = child.value
+            if child.function is not None:
+                try:
+                    value = child.function()
+                except Exception as ex:
+                    _logger.warning("Value of the metric %s not computed: %s", self.name, str(ex))
+                    continue
+            yield '', zip(self.label_names, values), value
+
+
+class HistogramMetric(_Metric):
+    """Counts of durations, in seconds, by bucket, e.g. of the latencies of the requests"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), bounds=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.bounds = bounds
+
+    def _new_child(self):
+        return Histogram(self.bounds)
+
+    def add(self, seconds):
+        self.labels().add(seconds)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            labels = list(zip(self.label_names, values))
+            for bound, count in child.cumulative_counts():
+                yield '_bucket', labels + [('le', bound)], count
+            yield '_sum', labels, child.sum
+            yield '_count', labels, child.count
+
+
+class Registry(object):
+    """The metrics of the process by name, in the order they were registered"""
+
+    def __init__(self):
+        self._metrics = OrderedDict()
+
+    def _register(self, cls, name, *args):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, *args)
+        elif not isinstance(metric, cls):
+            raise ValueError("{} is already registered as a {}".format(name, metric.kind))
+        return metric
+
+    def counter(self, name, documentation, label_names=()):
+        """Returns the counter of name, registered the first time"""
+        return self._register(Counter, name, documentation, label_names)
+
+    def gauge(self, name, documentation, label_names=()):
+        """Returns the gauge of name, registered the first time"""
+        return self._register(Gauge, name, documentation, label_names)
+
+    def histogram(self, name, documentation, label_names=(), bounds=LATENCY_BUCKETS):
+        """Returns the histogram of name, registered the first time"""
+        return self._register(HistogramMetric, name, documentation, label_names, bounds)
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def render(self):
+        """Returns the metrics in the Prometheus text format"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+_LOOP_LAG = REGISTRY.histogram('foglamp_event_loop_lag_seconds',
+                               'Delay of the callbacks of the event loop, measured since the first scrape')
+
+_loop_lag_task = None
+
+
+async def _probe_loop_lag(loop):
+    while True:
+        expected = loop.time() + _LOOP_LAG_PROBE_SECONDS
+        await asyncio.sleep(_LOOP_LAG_PROBE_SECONDS)
+        _LOOP_LAG.add(loop.time() - expected)
+
+
+def _start_loop_lag_probe():
+    global _loop_lag_task
+    if _loop_lag_task is None or _loop_lag_task.done():
+        loop = asyncio.get_event_loop()
+        _loop_lag_task = asyncio.ensure_future(_probe_loop_lag(loop), loop=loop)
+
+
+async def get_metrics(request):
+    """ Returns the metrics of the process in the Prometheus text format
+
+    :Example:
+        curl -X GET http://localhost:8081/foglamp/metrics
+    """
+    _start_loop_lag_probe()
+    return web.Response(body=REGISTRY.render().encode(), headers={'Content-Type': _CONTENT_TYPE})
+
+
+def timed(histogram, errors=None):
+    """Decorator of a coroutine recording its durations in histogram and counting its exceptions in errors
+
+    Args:
+        histogram: a Histogram, e.g. a child of a HistogramMetric, see _Metric.labels
+        errors: a count, e.g. a child of a Counter, None for the exceptions not counted
+    """
+    def decorator(coro):
+        @functools.wraps(coro)
+        async def wrapper(*args, **kwargs):
+            start = time.monotonic()
+            try:
+                return await coro(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc()
+                raise
+            finally:
+                histogram.add(time.monotonic() - start)
+        return wrapper
+    return decorator
+
+
+def _escape(text, quote=True):
+    text = str(text).replace('\\', '\\\\').replace('\n', '\\n')
+    return text.replace('"', '\\"') if quote else text
+
+
+def _format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, _escape(_format_value(value) if name == 'le' else value))
+                          for name, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        if math.isnan(value):
+            return 'NaN'
+    return repr(value) if isinstance(value, float) else str(value)
@@ -4,9 +4,18 @@
 # See: http://foglamp.readthedocs.io/
 # FOGLAMP_END
 
-"""Common Plugin Discovery Class"""
+"""Common Plugin Discovery Class
+
+The configurations of the plugins are cached by plugin, keyed on the modification times of their directory and
+module, or of their shared library, and fetched again when they change. Only the directories are listed again when
+the plugins installed are requested, the C plugins found for the first time are queried in parallel. The FogLAMP tree is
+walked for the C plugins of every type at once, and only again when a directory they were looked up in has changed.
+"""
 
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 from foglamp.common import logger
 from foglamp.services.core.api import utils
 
@@ -18,6 +27,27 @@ __version__ = "${VERSION}"
 
 _logger = logger.setup(__name__)
 
+_MAX_C_PLUGIN_INFO_WORKERS = 8
+"""Number of the get_plugin_info processes run at once"""
+
+_C_PLUGIN_TYPES = ["north", "south"]
+"""Plugin types the C plugins are looked up for in one walk"""
+
+_plugin_configs = dict()
+"""(key, config) of every (plugin type, directory) of a Python plugin, see PluginDiscovery._python_plugin_key"""
+
+_c_plugin_configs = dict()
+"""(key, config) of every (plugin type, name) of a C plugin, see PluginDiscovery._c_plugin_key"""
+
+_c_plugin_libs = dict()
+"""Path of the shared library of every C plugin name"""
+
+_c_plugin_names = dict()
+"""Names of the C plugins of every plugin type"""
+
+_c_plugin_dirs = dict()
+"""Modification time of every directory the C plugins were looked up in, see PluginDiscovery._find_c_plugin_libs"""
+
 
 class PluginDiscovery(object):
     def __init__(self):
@@ -45,11 +75,37 @@ class PluginDiscovery(object):
         directories = cls.get_plugin_folders(plugin_type)
         configs = []
         for d in directories:
-            plugin_config = cls.get_plugin_config(d, plugin_type)
+            key = cls._python_plugin_key(d, plugin_type)
+            cached = _plugin_configs.get((plugin_type, d))
+            if key is not None and cached is not None and cached[0] == key:
+                plugin_config = cached[1]
+            else:
+                if cached is not None:
+                    # Changed, its module is imported again
+                    cls._forget_module(d, plugin_type)
+                plugin_config = cls.get_plugin_config(d, plugin_type)
+                if key is not None:
+                    _plugin_configs[(plugin_type, d)] = (key, plugin_config)
             if plugin_config is not None:
                 configs.append(plugin_config)
         return configs
 
+    @classmethod
+    def _python_plugin_key(cls, plugin_dir, plugin_type):
+        """ The modification times of the directory and the module of a plugin, None if they are not found """
+        dir_name = utils._FOGLAMP_ROOT + "/python/foglamp/plugins/" + plugin_type + "/" + plugin_dir
+        try:
+            dir_stat = os.stat(dir_name)
+            module_stat = os.stat(dir_name + "/" + plugin_dir + ".py")
+        except OSError:
+            return None
+        return dir_stat.st_mtime_ns, module_stat.st_mtime_ns, module_stat.st_size
+
+    @classmethod
+    def _forget_module(cls, plugin_dir, plugin_type):
+        plugin_module_path = "foglamp.plugins.south" if plugin_type == 'south' else "foglamp.plugins.north"
+        sys.modules.pop("{path}.{dir}.{file}".format(path=plugin_module_path, dir=plugin_dir, file=plugin_dir), None)
+
     @classmethod
     def get_plugin_folders(cls, plugin_type):
         directories = []
@@ -64,22 +120,69 @@ class PluginDiscovery(object):
 
     @classmethod
     def fetch_c_plugins_installed(cls, plugin_type):
-        libs = utils.find_c_plugin_libs(plugin_type)
-        configs = []
+        libs = cls._find_c_plugin_libs(plugin_type)
+        keys = {l: cls._c_plugin_key(l) for l in libs}
+        configs = {}
+        changed = []
         for l in libs:
+            cached = _c_plugin_configs.get((plugin_type, l))
+            if keys[l] is not None and cached is not None and cached[0] == keys[l]:
+                configs[l] = cached[1]
+            elif l not in changed:
+                changed.append(l)
+
+        # Every get_plugin_info runs a process, they run at once
+        if len(changed) > 1:
+            with ThreadPoolExecutor(max_workers=min(len(changed), _MAX_C_PLUGIN_INFO_WORKERS)) as executor:
+                jdocs = list(executor.map(utils.get_plugin_info, changed))
+        else:
+            jdocs = [utils.get_plugin_info(l) for l in changed]
+
+        for l, jdoc in zip(changed, jdocs):
+            plugin_config = None
             try:
-                jdoc = utils.get_plugin_info(l)
                 if bool(jdoc):
                     plugin_config = {'name': l,
                                      'type': plugin_type,
                                      'description': jdoc['config']['plugin']['description'],
                                      'version': jdoc['version']
                                      }
-                    configs.append(plugin_config)
             except Exception as ex:
                 _logger.exception(ex)
+            if keys[l] is not None:
+                _c_plugin_configs[(plugin_type, l)] = (keys[l], plugin_config)
+            configs[l] = plugin_config
 
-        return configs
+        return [configs[l] for l in libs if configs[l] is not None]
+
+    @classmethod
+    def _find_c_plugin_libs(cls, plugin_type):
+        """ The names of the C plugins of a type, walked for again only when one of their directories has changed """
+        if plugin_type not in _c_plugin_names or \
+                any(utils._mtime(d) != mtime for d, mtime in _c_plugin_dirs.items()):
+            plugin_types = _C_PLUGIN_TYPES if plugin_type in _C_PLUGIN_TYPES else _C_PLUGIN_TYPES + [plugin_type]
+            libraries, directories = utils.find_c_plugins(plugin_types)
+            _c_plugin_names.clear()
+            _c_plugin_libs.clear()
+            _c_plugin_dirs.clear()
+            _c_plugin_dirs.update(directories)
+            for t in plugin_types:
+                _c_plugin_names[t] = [name for name, path in libraries[t]]
+                for name, path in libraries[t]:
+                    _c_plugin_libs.setdefault(name, path)
+        return list(_c_plugin_names[plugin_type])
+
+    @classmethod
+    def _c_plugin_key(cls, name):
+        """ The modification time of the shared library of a C plugin, None if it is not found """
+        path = _c_plugin_libs.get(name)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return path, stat.st_mtime_ns, stat.st_size
 
     @classmethod
     def get_plugin_config(cls, plugin_dir, plugin_type):
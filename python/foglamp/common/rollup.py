@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Rollups of the readings: the min, max, sum and count of every datapoint of an asset by minute and hour
+
+The rollups are written in the asset_rollups table by the asset rollup task, see foglamp.tasks.rollup, and read by
+the asset browser for the periods they cover. The readings newer than the last rollup of a datapoint are read raw,
+as are the series by second, whose windows are short.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+TABLE = 'asset_rollups'
+
+PERIODS = OrderedDict([('seconds', 1), ('minutes', 60), ('hours', 3600)])
+"""Length in seconds of the buckets by name of the group of the asset browser"""
+
+ROLLED_UP_PERIODS = (PERIODS['minutes'], PERIODS['hours'])
+"""Periods rolled up by the asset rollup task"""
+
+BUCKET_FORMATS = {1: 'YYYY-MM-DD HH24:MI:SS', 60: 'YYYY-MM-DD HH24:MI', 3600: 'YYYY-MM-DD HH24'}
+"""Storage format of the timestamp of a bucket by period"""
+
+_BUCKET_STRPTIME_FORMATS = {1: '%Y-%m-%d %H:%M:%S', 60: '%Y-%m-%d %H:%M', 3600: '%Y-%m-%d %H'}
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+"""Format of bucket_ts and of the user_ts bounds given to the storage, in local time as the readings"""
+
+
+def floor_time(dt, period):
+    """Returns the start of the bucket of period seconds, a divisor of an hour, holding dt"""
+    return dt.replace(microsecond=0) - timedelta(seconds=(dt.minute * 60 + dt.second) % period)
+
+
+def ceil_time(dt, period):
+    """Returns the start of the first bucket of period seconds starting at or after dt"""
+    start = floor_time(dt, period)
+    return start if start == dt else start + timedelta(seconds=period)
+
+
+def parse_bucket(bucket, period):
+    """Returns the start time of a bucket formatted by the storage with BUCKET_FORMATS[period]"""
+    return datetime.strptime(bucket, _BUCKET_STRPTIME_FORMATS[period])
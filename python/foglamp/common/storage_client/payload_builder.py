@@ -119,27 +119,33 @@ class PayloadBuilder(object):
                     with_clause[clause] = clause_value
                     qp_list[i] = with_clause
             if isinstance(item, dict):
-                if 'json' in qp_list[i] and qp_list[i]['json']['column'] == col:
+                if 'json' in qp_list[i] and (qp_list[i]['json']['column'] == col or
+                                             [qp_list[i]['json']['column'], qp_list[i]['json']['properties']] == col):
                     qp_list[i][clause] = clause_value
                 elif 'column' in qp_list[i] and qp_list[i]['column'] == col:
                     qp_list[i][clause] = clause_value
 
+    @classmethod
+    def is_aggregate_of(cls, item, col, opr):
+        """col is either a column or a [column, properties] list matching a single json property"""
+        if item['operation'] != opr:
+            return False
+        if 'json' in item:
+            if isinstance(col, list):
+                return [item['json']['column'], item['json']['properties']] == col
+            return item['json']['column'] == col
+        return item['column'] == col
+
     @classmethod
     def add_clause_to_aggregate(cls, clause, qp_list, col, opr, clause_value):
         if isinstance(qp_list, dict):
-            if 'json' in qp_list:
-                if qp_list['json']['column'] == col and qp_list['operation'] == opr:
-                    qp_list[clause] = clause_value
-            elif qp_list['column'] == col and qp_list['operation'] == opr:
+            if cls.is_aggregate_of(qp_list, col, opr):
                 qp_list[clause] = clause_value
 
         if isinstance(qp_list, list):
             for i, item in enumerate(qp_list):
                 if isinstance(item, dict):
-                    if 'json' in qp_list[i]:
-                        if qp_list[i]['json']['column'] == col and qp_list[i]['operation'] == opr:
-                            qp_list[i][clause] = clause_value
-                    elif qp_list[i]['column'] == col and qp_list[i]['operation'] == opr:
+                    if cls.is_aggregate_of(qp_list[i], col, opr):
                         qp_list[i][clause] = clause_value
 
     @classmethod
@@ -202,6 +208,8 @@ class PayloadBuilder(object):
         :param args: each arg is a tuple. The len of tuple depends upon main_key. If main_key is "return" i.e. SELECT,
                      then each tuple will contain (col, alias). If main_key is "aggregate", then each tuple will contain
                      (col, operation, alias) because col can be repeated in aggregate with different "operations".
+                     col can be a [col, properties] list to tell apart the columns or aggregates of different json
+                     properties.
         :return:
         :example:
         PayloadBuilder().SELECT(("name", "id")).ALIAS('return', ('name', 'my_name'), ('id', 'my_id')).payload() returns
@@ -18,12 +18,24 @@ import json
 from abc import ABC, abstractmethod
 
 from foglamp.common import logger
+from foglamp.common import metrics
 from foglamp.common.service_record import ServiceRecord
 from foglamp.common.storage_client.exceptions import *
 from foglamp.common.storage_client.utils import Utils
 
 _LOGGER = logger.setup(__name__)
 
+_DURATION = metrics.REGISTRY.histogram('foglamp_storage_request_duration_seconds',
+                                       'Time to answer the requests to the storage service by operation',
+                                       ('operation',))
+
+_ERRORS = metrics.REGISTRY.counter('foglamp_storage_request_errors_total',
+                                   'Requests to the storage service failed by operation', ('operation',))
+
+
+def _timed(operation):
+    return metrics.timed(_DURATION.labels(operation), _ERRORS.labels(operation))
+
 
 class AbstractStorage(ABC):
     """ abstract class for storage client """
@@ -121,6 +133,7 @@ class StorageClientAsync(AbstractStorage):
 
     # FIXME: As per JIRA-615 strict=false at python side (interim solution)
     # fix is required at storage layer (error message with escape sequence using a single quote)
+    @_timed('insert')
     async def insert_into_tbl(self, tbl_name, data):
         """ insert json payload into given table
 
@@ -160,6 +173,7 @@ class StorageClientAsync(AbstractStorage):
 
         return jdoc
 
+    @_timed('update')
     async def update_tbl(self, tbl_name, data):
         """ update json payload for specified condition into given table
 
@@ -204,6 +218,7 @@ class StorageClientAsync(AbstractStorage):
 
         return jdoc
 
+    @_timed('delete')
     async def delete_from_tbl(self, tbl_name, condition=None):
         """ Delete for specified condition from given table
 
@@ -241,6 +256,7 @@ class StorageClientAsync(AbstractStorage):
 
         return jdoc
 
+    @_timed('query_tbl')
     async def query_tbl(self, tbl_name, query=None):
         """ Simple SELECT query for the specified table with optional query params
 
@@ -272,6 +288,7 @@ class StorageClientAsync(AbstractStorage):
 
         return jdoc
 
+    @_timed('query_tbl_with_payload')
     async def query_tbl_with_payload(self, tbl_name, query_payload):
         """ Complex SELECT query for the specified table with a payload
 
@@ -320,6 +337,7 @@ class ReadingsStorageClientAsync(StorageClientAsync):
         super().__init__(core_management_host=core_mgt_host, core_management_port=core_mgt_port, svc=svc)
         self.__class__._base_url = self.base_url
 
+    @_timed('readings_append')
     async def append(self, readings):
         """
         :param readings:
@@ -365,6 +383,7 @@ class ReadingsStorageClientAsync(StorageClientAsync):
 
         return jdoc
 
+    @_timed('readings_fetch')
     async def fetch(self, reading_id, count):
         """
 
@@ -400,6 +419,7 @@ class ReadingsStorageClientAsync(StorageClientAsync):
 
         return jdoc
 
+    @_timed('readings_query')
     async def query(self, query_payload):
         """
 
@@ -436,6 +456,7 @@ class ReadingsStorageClientAsync(StorageClientAsync):
 
         return jdoc
 
+    @_timed('readings_purge')
     async def purge(self, age=None, sent_id=0, size=None, flag=None):
         """ Purge readings based on the age of the readings
 
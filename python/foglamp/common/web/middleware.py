@@ -4,15 +4,22 @@
 # See: http://foglamp.readthedocs.io/
 # FOGLAMP_END
 
+from collections import OrderedDict
 from functools import wraps
+import asyncio
+import hashlib
 import json
+import math
+import time
 import traceback
+import uuid
 
 from aiohttp import web
 import jwt
 
 from foglamp.services.core.user_model import User
 from foglamp.common import logger
+from foglamp.common import metrics
 
 __author__ = "Praveen Garg"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -21,6 +28,56 @@ __version__ = "${VERSION}"
 
 _logger = logger.setup(__name__)
 
+_COMPRESSION_MIN_BYTES = 1024
+"""Size of the smallest response body compressed, smaller ones gain less than the cost of compressing them"""
+
+_ETAG_PREFIX = uuid.uuid4().hex[:8]
+"""Makes the ETags of the versions of a previous run of the process never match"""
+
+_ETAG_MAX_BYTES = 64 * 1024
+"""Size of the largest response body hashed to its ETag, the larger ones have an ETag only if their handler is
+versioned"""
+
+_HEAVY_PATHS = frozenset(['/foglamp/statistics/history', '/foglamp/audit', '/foglamp/syslog'])
+"""Paths of the requests reading many rows, admitted apart from the management requests so that they never starve
+them, with the paths of the readings, see _HEAVY_PATH_PREFIX"""
+
+_HEAVY_PATH_PREFIX = '/foglamp/asset'
+"""Prefix of the paths of the readings routes, all of them are heavy but the exports"""
+
+_EXPORT_PATH_SUFFIX = '/export'
+"""Suffix of the paths of the readings exports, streamed for as long as the transfer lasts they are admitted apart
+from the heavy requests"""
+
+_MAX_CONCURRENT_REQUESTS = {'export': 2, 'heavy': 4, 'light': 32}
+"""Number of the requests of a route class handled at once, the others wait for one of them to complete, see
+set_admission_limits"""
+
+_QUEUE_TIMEOUT_SECONDS = 10
+"""Time a request waits to be handled before it is answered 503 Service Unavailable"""
+
+_RATE_LIMITS = {'export': (0.1, 6), 'heavy': (2, 20), 'light': (20, 100)}
+"""Requests per second and burst of requests of a route class allowed to a client, the others are answered
+429 Too Many Requests, None for no limit, see set_admission_limits"""
+
+_BURST_SECONDS = {'export': 60, 'heavy': 10, 'light': 5}
+"""Seconds of requests at the rate limit of a route class a client is allowed at once"""
+
+_MAX_CLIENTS = 1000
+"""Number of the token buckets kept, the one of the least recently seen client is removed above it"""
+
+_admission_semaphores = dict()
+"""Semaphore of the requests handled by route class"""
+
+_token_buckets = OrderedDict()
+"""(tokens, time) of every (client, route class), the client is the remote address, least recently seen first"""
+
+_REQUESTS = metrics.REGISTRY.counter('foglamp_http_requests_total', 'REST requests answered by route and status',
+                                     ('route', 'method', 'status'))
+
+_REQUEST_DURATION = metrics.REGISTRY.histogram('foglamp_http_request_duration_seconds',
+                                               'Time to answer the REST requests by route', ('route', 'method'))
+
 
 async def error_middleware(app, handler):
     async def middleware_handler(request):
@@ -38,6 +95,118 @@ async def error_middleware(app, handler):
     return middleware_handler
 
 
+async def metrics_middleware(app, handler):
+    """ Counts the requests by route and status and records the time to answer them, see metrics.REGISTRY """
+    async def middleware(request):
+        start = time.monotonic()
+        status = 500
+        try:
+            response = await handler(request)
+            status = response.status
+            return response
+        except web.HTTPException as ex:
+            status = ex.status
+            raise
+        finally:
+            route = _route_of(request)
+            _REQUESTS.labels(route, request.method, str(status)).inc()
+            _REQUEST_DURATION.labels(route, request.method).add(time.monotonic() - start)
+    return middleware
+
+
+def _route_of(request):
+    """ The path template of the route of a request, e.g. /foglamp/schedule/{schedule_id}, so that the metrics of
+    the requests of a route are not split by the values of its path """
+    resource = request.match_info.route.resource
+    if resource is None:
+        return 'unmatched'
+    info = resource.get_info()
+    return info.get('formatter') or info.get('path') or 'unmatched'
+
+
+async def admission_middleware(app, handler):
+    """ Admits the requests under the rate limit of their client and the concurrency limit of their route class,
+    export, heavy or light, see _route_class
+
+    Raises:
+        HTTPTooManyRequests: the client exceeds the rate limit
+        HTTPServiceUnavailable: the request waited _QUEUE_TIMEOUT_SECONDS to be handled
+    """
+    async def middleware(request):
+        route_class = _route_class(request.path)
+        # Not the Authorization header, it is not validated yet and a new value would be a new bucket
+        wait = _take_token(request.remote, route_class)
+        if wait > 0:
+            raise web.HTTPTooManyRequests(headers={'Retry-After': str(math.ceil(wait))})
+
+        semaphore = _admission_semaphores.get(route_class)
+        if semaphore is None:
+            semaphore = _admission_semaphores[route_class] = asyncio.Semaphore(_MAX_CONCURRENT_REQUESTS[route_class])
+        try:
+            await asyncio.wait_for(semaphore.acquire(), _QUEUE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            _logger.warning("%s request for %s not admitted, %d %s requests are in progress", request.method,
+                            request.path, _MAX_CONCURRENT_REQUESTS[route_class], route_class)
+            raise web.HTTPServiceUnavailable(headers={'Retry-After': str(_QUEUE_TIMEOUT_SECONDS)})
+        try:
+            return await handler(request)
+        finally:
+            semaphore.release()
+    return middleware
+
+
+def _take_token(client, route_class):
+    """ Takes a token of the bucket of a client, returns 0 or the seconds until it has one if it has none """
+    if _RATE_LIMITS[route_class] is None:
+        return 0
+    rate, burst = _RATE_LIMITS[route_class]
+    now = time.monotonic()
+    key = (client, route_class)
+    tokens, last = _token_buckets.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - last) * rate)
+    wait = 0
+    if tokens < 1:
+        wait = (1 - tokens) / rate
+    else:
+        tokens -= 1
+    _token_buckets[key] = (tokens, now)
+    _token_buckets.move_to_end(key)
+    if len(_token_buckets) > _MAX_CLIENTS:
+        _token_buckets.popitem(last=False)
+    return wait
+
+
+def _route_class(path):
+    """ export for the paths of the readings exports, heavy for the paths of the other requests reading many rows,
+    light for the others """
+    if path.startswith(_HEAVY_PATH_PREFIX + '/') and path.endswith(_EXPORT_PATH_SUFFIX):
+        return 'export'
+    if path in _HEAVY_PATHS or path == _HEAVY_PATH_PREFIX or path.startswith(_HEAVY_PATH_PREFIX + '/'):
+        return 'heavy'
+    return 'light'
+
+
+def set_admission_limits(max_requests, rates_per_minute):
+    """ Sets the limits of the admission of the requests, see Server.rest_api_config
+
+    Args:
+        max_requests: number of the requests handled at once by route class
+        rates_per_minute: requests per minute allowed to a client by route class, 0 for no limit, a client behind a
+            NAT shares its limits with every other client behind it
+    """
+    for route_class, maximum in max_requests.items():
+        _MAX_CONCURRENT_REQUESTS[route_class] = max(1, maximum)
+    for route_class, rate_per_minute in rates_per_minute.items():
+        if rate_per_minute <= 0:
+            _RATE_LIMITS[route_class] = None
+        else:
+            rate = rate_per_minute / 60
+            _RATE_LIMITS[route_class] = (rate, max(1, rate * _BURST_SECONDS[route_class]))
+    # The requests in progress release the semaphores they acquired
+    _admission_semaphores.clear()
+    _token_buckets.clear()
+
+
 async def optional_auth_middleware(app, handler):
     async def middleware(request):
         _logger.info("Received %s request for %s", request.method, request.path)
@@ -90,6 +259,82 @@ async def auth_middleware(app, handler):
     return middleware
 
 
+async def compression_middleware(app, handler):
+    """ Compresses the response bodies of at least _COMPRESSION_MIN_BYTES with gzip or deflate, as negotiated with
+    the Accept-Encoding header of the request """
+    async def middleware(request):
+        response = await handler(request)
+        if isinstance(response, web.Response) and isinstance(response.body, bytes) \
+                and len(response.body) >= _COMPRESSION_MIN_BYTES and 'Content-Encoding' not in response.headers:
+            response.headers.add('Vary', 'Accept-Encoding')
+            response.enable_compression()
+        return response
+    return middleware
+
+
+async def etag_middleware(app, handler):
+    """ Answers the conditional GET requests with 304 Not Modified when the response has the ETag of the request
+    If-None-Match header
+
+    The ETag of a response without one, i.e. not returned by a versioned handler, is the hash of its body if it has
+    at most _ETAG_MAX_BYTES, the response is not sent again but it is computed.
+    """
+    async def middleware(request):
+        response = await handler(request)
+        if request.method != 'GET' or response.status != 200 or not isinstance(response, web.Response):
+            return response
+        etag = response.headers.get('ETag')
+        if etag is None:
+            if not isinstance(response.body, bytes) or len(response.body) > _ETAG_MAX_BYTES:
+                return response
+            etag = 'W/"{}"'.format(hashlib.sha1(response.body).hexdigest())
+            response.headers['ETag'] = etag
+        if _etag_matches(request, etag):
+            raise web.HTTPNotModified(headers={'ETag': etag})
+        return response
+    return middleware
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, a compressed response has the ETag of the uncompressed one
+    return '*' in tags or _opaque_tag(etag) in [_opaque_tag(tag) for tag in tags]
+
+
+def _opaque_tag(etag):
+    return etag[2:] if etag.startswith('W/') else etag
+
+
+def versioned(get_version):
+    """Decorator of the GET handlers of data whose version is known without reading the storage, e.g. the
+    configuration categories changed through the core, or read cheaper than the data, e.g. the newest row of a table
+
+    The ETag of the response is the version returned by get_version(), or awaited from it if it is a coroutine
+    function, a request having it in its If-None-Match header is answered with 304 Not Modified without calling the
+    handler.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        async def wrapped(*args, **kwargs):
+            request = args[-1]
+            version = get_version()
+            if asyncio.iscoroutine(version):
+                version = await version
+            etag = 'W/"{}-{}"'.format(_ETAG_PREFIX, version)
+            if _etag_matches(request, etag):
+                raise web.HTTPNotModified(headers={'ETag': etag})
+            response = await fn(*args, **kwargs)
+            response.headers['ETag'] = etag
+            return response
+
+        return wrapped
+
+    return wrapper
+
+
 def has_permission(permission):
     """Decorator that restrict access only for authorized users with correct permissions (role_name)
 
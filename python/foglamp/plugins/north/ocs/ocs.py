@@ -369,6 +369,7 @@ def plugin_init(data):
     _config['OMFRetrySleepTime'] = int(data['OMFRetrySleepTime']['value'])
     _config['OMFHttpTimeout'] = int(data['OMFHttpTimeout']['value'])
     _config['StaticData'] = ast.literal_eval(data['StaticData']['value'])
+    _config['notBlockingErrors'] = ast.literal_eval(data['notBlockingErrors']['value'])
 
     _config['formatNumber'] = data['formatNumber']['value']
     _config['formatInteger'] = data['formatInteger']['value']
@@ -286,6 +286,35 @@ def _performance_log(_function):
     return wrapper
 
 
+def _omf_timestamp(timestamp):
+    """ Converts a timestamp normalized by the Sending Process to the format OMF/the PI Server expects
+    Examples:
+        2018-05-28 16:56:55.166347+00 ==> 2018-05-28T16:56:55.166Z
+        2018-05-28 13:42:28.84+00     ==> 2018-05-28T13:42:28.840Z
+        2018-05-28 16:56:55+00        ==> 2018-05-28T16:56:55.000Z
+    """
+    date_time = timestamp[:-3]
+    if len(date_time) == 19:
+        date_time += "."
+    date_time = date_time.ljust(23, "0")
+    return date_time[0:10] + "T" + date_time[11:23] + "Z"
+
+
+def omf_timestamps(timestamps):
+    """ Converts the timestamps of a whole block of data to the format OMF/the PI Server expects in one pass.
+    The conversion is done directly slicing the strings, without using python date library for performance reason,
+    when all the timestamps have the complete format generated by the Sending Process :
+        2018-05-28 16:56:55.000000+00
+    Args:
+        timestamps: list of timestamps normalized by the Sending Process
+    Returns:
+        list of the timestamps in the OMF format, in the same order
+    """
+    if len(timestamps) > 0 and len(timestamps[0]) == 29 and len(set(map(len, timestamps))) == 1:
+        return [ts[0:10] + "T" + ts[11:23] + "Z" for ts in timestamps]
+    return [_omf_timestamp(ts) for ts in timestamps]
+
+
 def plugin_info():
     return {
         'name': "PI Server North",
@@ -891,25 +920,28 @@ class PIServerNorthPlugin(object):
 
         idx = 0
 
+        try:
+            # Converts the timestamps of the whole block in one pass
+            omf_times = omf_timestamps([row['user_ts'] for row in raw_data])
+        except Exception:
+            # Malformed rows are identified and skipped by the row by row handling
+            omf_times = None
+
         try:
 
-            for row in raw_data:
+            for row_idx, row in enumerate(raw_data):
 
                 # Identification of the object/sensor
                 measurement_id = self._generate_omf_measurement(row['asset_code'])
 
                 try:
                     # The expression **row['reading'] - joins the 2 dictionaries
-                    #
-                    # The code formats the date to the format OMF/the PI Server expects directly
-                    # without using python date library for performance reason and
-                    # because it is expected to receive the date in a precise/fixed format :
-                    #   2018-05-28 16:56:55.000000+00
                     data_to_send[idx] = {
                             "containerid": measurement_id,
                             "values": [
                                 {
-                                    "Time": row['user_ts'][0:10] + "T" + row['user_ts'][11:23] + "Z",
+                                    "Time": omf_times[row_idx] if omf_times is not None
+                                    else _omf_timestamp(row['user_ts']),
                                     **row['reading']
                                 }
                             ]
@@ -9,6 +9,8 @@ __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
 __license__ = "Apache 2.0"
 __version__ = "${VERSION}"
 
+from foglamp.common import metrics
+
 
 def setup(app, obj, is_core=False):
     """ Common method to setup the microservice management api.
@@ -21,6 +23,7 @@ def setup(app, obj, is_core=False):
     app.router.add_route('GET', '/foglamp/service/ping', obj.ping)
     app.router.add_route('POST', '/foglamp/service/shutdown', obj.shutdown)
     app.router.add_route('POST', '/foglamp/change', obj.change)
+    app.router.add_route('GET', '/foglamp/service/metrics', metrics.get_metrics)
 
     if is_core:
         # Configuration
@@ -5,13 +5,16 @@
 # FOGLAMP_END
 
 import copy
+import time
 from datetime import datetime
 from enum import IntEnum
 from aiohttp import web
 
 from foglamp.common.storage_client.payload_builder import PayloadBuilder
 from foglamp.services.core import connect
+from foglamp.services.core.api import pagination
 from foglamp.common.audit_logger import AuditLogger
+from foglamp.common.web.middleware import versioned
 from foglamp.common import logger
 
 __author__ = "Amarendra K. Sinha, Ashish Jabble, Massimiliano Pinto"
@@ -22,6 +25,12 @@ __version__ = "${VERSION}"
 __DEFAULT_LIMIT = 20
 __DEFAULT_OFFSET = 0
 
+_TOTAL_COUNT_CACHE_SECONDS = 30
+"""How long the total count of the entries of a source and severity is reused, new entries are counted after it"""
+
+_total_count_cache = dict()
+"""(source, severity) -> (total count, time counted)"""
+
 _help = """
     -------------------------------------------------------------------------------
     | GET POST        | /foglamp/audit                                            |
@@ -124,9 +133,25 @@ async def create_audit_entry(request):
         raise web.HTTPInternalServerError(reason=str(ex))
 
 
+async def _get_version():
+    """ The ETag version of the audit trail, the id of its newest entry, see versioned
+
+    It changes every _TOTAL_COUNT_CACHE_SECONDS too, when the total counts are counted again.
+    """
+    payload = PayloadBuilder().AGGREGATE(["max", "id"]).ALIAS("aggregate", ("id", "max", "max_id")).payload()
+    result = await connect.get_storage_async().query_tbl_with_payload('log', payload)
+    rows = result['rows']
+    newest = rows[0]['max_id'] if len(rows) > 0 else None
+    return '{}.{}'.format(newest, int(time.monotonic() // _TOTAL_COUNT_CACHE_SECONDS))
+
+
+@versioned(_get_version)
 async def get_audit_entries(request):
     """ Returns a list of audit trail entries sorted with most recent first and total count
-        (including the criteria search if applied)
+        (including the criteria search if applied), the total count is refreshed every _TOTAL_COUNT_CACHE_SECONDS
+
+        The entries following a page are returned with the next token of the page as cursor, unless it is the
+        last page or a skip is supplied
 
     :Example:
 
@@ -138,6 +163,8 @@ async def get_audit_entries(request):
 
         curl -X GET http://localhost:8081/foglamp/audit?skip=2
 
+        curl -X GET http://localhost:8081/foglamp/audit?limit=5&cursor=<next>
+
         curl -X GET http://localhost:8081/foglamp/audit?source=PURGE
 
         curl -X GET http://localhost:8081/foglamp/audit?severity=FAILURE
@@ -183,6 +210,8 @@ async def get_audit_entries(request):
         except KeyError as ex:
             raise web.HTTPBadRequest(reason="{} is not a valid severity".format(ex))
 
+    cursor = pagination.get_cursor(request)
+
     try:
         # HACK: This way when we can more future we do not get an exponential
         # explosion of if statements
@@ -197,23 +226,11 @@ async def get_audit_entries(request):
             payload.AND_WHERE(['level', '=', severity])
 
         _and_where_payload = payload.chain_payload()
-        # SELECT *, count(*) OVER() FROM log - No support yet from storage layer
-        # TODO: FOGL-740, FOGL-663 once ^^ resolved we should replace below storage call for getting total rows
-        _and_where_copy = copy.deepcopy(_and_where_payload)
-        total_count_payload = PayloadBuilder(_and_where_copy).AGGREGATE(["count", "*"])\
-            .ALIAS("aggregate", ("*", "count", "count")).payload()
-
-        # SELECT count (*) FROM log <_and_where_payload>
         storage_client = connect.get_storage_async()
-        result = await storage_client.query_tbl_with_payload('log', total_count_payload)
-        total_count = result['rows'][0]['count']
-
-        payload = PayloadBuilder(_and_where_payload)
-        payload.ORDER_BY(['ts', 'desc'])
-        payload.LIMIT(limit)
+        total_count = await _get_total_count(storage_client, _and_where_payload, source, severity)
 
-        if offset > 0:
-            payload.OFFSET(offset)
+        # Rows newer first, from the cursor or the offset
+        payload = PayloadBuilder(pagination.add_to_payload(_and_where_payload, cursor, "ts", limit, offset))
 
         # SELECT * FROM log <payload.payload()>
         results = await storage_client.query_tbl_with_payload('log', payload.payload())
@@ -231,7 +248,32 @@ async def get_audit_entries(request):
     except Exception as ex:
         raise web.HTTPException(reason=str(ex))
 
-    return web.json_response({'audit': res, 'totalCount': total_count})
+    response = {'audit': res, 'totalCount': total_count}
+    if not offset:
+        token = pagination.next_cursor(res, "timestamp", limit, cursor)
+        if token is not None:
+            response['next'] = token
+    return web.json_response(response)
+
+
+async def _get_total_count(storage_client, _and_where_payload, source, severity):
+    """ Returns the count of the entries of the source and severity, counted at most
+    _TOTAL_COUNT_CACHE_SECONDS ago so that paging a large log does not count it for every page """
+    cached = _total_count_cache.get((source, severity))
+    if cached is not None and time.monotonic() - cached[1] < _TOTAL_COUNT_CACHE_SECONDS:
+        return cached[0]
+
+    # SELECT *, count(*) OVER() FROM log - No support yet from storage layer
+    # TODO: FOGL-740, FOGL-663 once ^^ resolved we should replace below storage call for getting total rows
+    _and_where_copy = copy.deepcopy(_and_where_payload)
+    total_count_payload = PayloadBuilder(_and_where_copy).AGGREGATE(["count", "*"])\
+        .ALIAS("aggregate", ("*", "count", "count")).payload()
+
+    # SELECT count (*) FROM log <_and_where_payload>
+    result = await storage_client.query_tbl_with_payload('log', total_count_payload)
+    total_count = result['rows'][0]['count']
+    _total_count_cache[(source, severity)] = (total_count, time.monotonic())
+    return total_count
 
 
 async def get_audit_log_codes(request):
@@ -15,6 +15,8 @@ Supports a number of REST API:
     - Return a set of asset readings for the given asset
   http://<address>/foglamp/asset/{asset_code}/summary
     - Return a set of the summary of all sensors values for the given asset
+  http://<address>/foglamp/asset/{asset_code}/export
+    - Stream all the readings, or some sensors values, of the given asset as NDJSON or CSV
   http://<address>/foglamp/asset/{asset_code}/{reading}
     - Return a set of sensor readings for the specified asset and sensor
   http://<address>/foglamp/asset/{asset_code}/{reading}/summary
@@ -27,19 +29,38 @@ Supports a number of REST API:
   All but the /foglamp/asset API call take a set of optional query parameters
     limit=x     Return the first x rows only
     skip=x      skip first n entries and used with limit to implemented paged interfaces
+    cursor=x    Return the page following the one that returned the next token x, the readings of an asset
+                and of a sensor return the next token in the Next-Cursor response header
     seconds=x   Limit the data return to be less than x seconds old
     minutes=x   Limit the data returned to be less than x minutes old
     hours=x     Limit the data returned to be less than x hours old
+    points=x    Downsample the readings of a sensor and the series of a sensor to at most x rows,
+                see foglamp.services.core.api.downsampling
 
   Note: seconds, minutes and hours can not be combined in a URL. If they are then only seconds
   will have an effect.
   Note: if datetime units are supplied then limit will not respect i.e mutually exclusive
+
+  The summary and the series by minute and hour of a sensor are computed from the rollups of the asset rollup task,
+  see foglamp.common.rollup, for the periods they cover and from the readings for the periods not rolled up yet.
 """
 
+import copy
+import csv
+import io
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
 from aiohttp import web
 
+from foglamp.common import logger
+from foglamp.common import rollup
 from foglamp.common.storage_client.payload_builder import PayloadBuilder
 from foglamp.services.core import connect
+from foglamp.services.core.api import downsampling
+from foglamp.services.core.api import pagination
 
 
 __author__ = "Mark Riddoch, Ashish Jabble"
@@ -52,25 +73,44 @@ __DEFAULT_LIMIT = 20
 __DEFAULT_OFFSET = 0
 __TIMESTAMP_FMT = 'YYYY-MM-DD HH24:MI:SS.MS'
 
+_ASSET_KEYS_CACHE_SECONDS = 60
+"""How long the reading keys of an asset are reused, a new key is summarised after this time"""
+
+_asset_keys_cache = dict()
+"""asset code -> (reading keys, time read)"""
+
+_ASSET_COUNTS_CACHE_SECONDS = 5
+"""How long the readings counts of the assets are reused"""
+
+_asset_counts_cache = dict()
+"""'rows' -> (rows of the counts, time counted)"""
+
+_EXPORT_BATCH_SIZE = 1000
+"""Number of readings read from the storage at once by an export"""
+
+_EXPORT_CONTENT_TYPES = OrderedDict([('ndjson', 'application/x-ndjson'), ('csv', 'text/csv')])
+
+_logger = logger.setup(__name__)
+
 
 def setup(app):
     """ Add the routes for the API endpoints supported by the data browser """
     app.router.add_route('GET', '/foglamp/asset', asset_counts)
     app.router.add_route('GET', '/foglamp/asset/{asset_code}', asset)
     app.router.add_route('GET', '/foglamp/asset/{asset_code}/summary', asset_all_readings_summary)
+    app.router.add_route('GET', '/foglamp/asset/{asset_code}/export', asset_export)
     app.router.add_route('GET', '/foglamp/asset/{asset_code}/{reading}', asset_reading)
     app.router.add_route('GET', '/foglamp/asset/{asset_code}/{reading}/summary', asset_summary)
     app.router.add_route('GET', '/foglamp/asset/{asset_code}/{reading}/series', asset_averages)
 
 
-def prepare_limit_skip_payload(request, _dict):
-    """ limit skip clause validation
+def get_limit_skip(request):
+    """ limit skip validation
 
     Args:
         request: request query params
-        _dict: main payload dict
     Returns:
-        chain payload dict
+        limit, offset
     """
     limit = __DEFAULT_LIMIT
     if 'limit' in request.query and request.query['limit'] != '':
@@ -90,6 +130,19 @@ def prepare_limit_skip_payload(request, _dict):
         except ValueError:
             raise web.HTTPBadRequest(reason="Skip/Offset must be a positive integer")
 
+    return limit, offset
+
+
+def prepare_limit_skip_payload(request, _dict):
+    """ limit skip clause validation
+
+    Args:
+        request: request query params
+        _dict: main payload dict
+    Returns:
+        chain payload dict
+    """
+    limit, offset = get_limit_skip(request)
     payload = PayloadBuilder(_dict).LIMIT(limit)
     if offset:
         payload = PayloadBuilder(_dict).SKIP(offset)
@@ -97,16 +150,17 @@ def prepare_limit_skip_payload(request, _dict):
     return payload.chain_payload()
 
 
-async def asset_counts(request):
-    """ Browse all the assets for which we have recorded readings and
-    return a readings count.
-
-    Returns:
-           json result on basis of SELECT asset_code, count(*) FROM readings GROUP BY asset_code;
+async def get_asset_counts():
+    """ Returns the rows of SELECT asset_code, count(*) FROM readings GROUP BY asset_code;
+    counted at most _ASSET_COUNTS_CACHE_SECONDS ago, the counts are shared with the south services
 
-    :Example:
-            curl -sX GET http://localhost:8081/foglamp/asset
+    Raises:
+        HTTPBadRequest: with the message of the storage if the count fails
     """
+    cached = _asset_counts_cache.get('rows')
+    if cached is not None and time.monotonic() - cached[1] < _ASSET_COUNTS_CACHE_SECONDS:
+        return cached[0]
+
     payload = PayloadBuilder().AGGREGATE(["count", "*"]).ALIAS("aggregate", ("*", "count", "count")) \
         .GROUP_BY("asset_code").payload()
 
@@ -114,12 +168,26 @@ async def asset_counts(request):
     try:
         _readings = connect.get_readings_async()
         results = await _readings.query(payload)
-        response = results['rows']
-        asset_json = [{"count": r['count'], "assetCode": r['asset_code']} for r in response]
+        rows = results['rows']
     except KeyError:
         raise web.HTTPBadRequest(reason=results['message'])
-    else:
-        return web.json_response(asset_json)
+    _asset_counts_cache['rows'] = (rows, time.monotonic())
+    return rows
+
+
+async def asset_counts(request):
+    """ Browse all the assets for which we have recorded readings and
+    return a readings count.
+
+    Returns:
+           json result on basis of SELECT asset_code, count(*) FROM readings GROUP BY asset_code;
+
+    :Example:
+            curl -sX GET http://localhost:8081/foglamp/asset
+    """
+    response = await get_asset_counts()
+    asset_json = [{"count": r['count'], "assetCode": r['asset_code']} for r in response]
+    return web.json_response(asset_json)
 
 
 async def asset(request):
@@ -129,34 +197,20 @@ async def asset(request):
     the query parameter ?limit=xx&skip=xx and it will not respect when datetime units is supplied
 
     Returns:
-          json result on basis of SELECT TO_CHAR(user_ts, '__TIMESTAMP_FMT') as "timestamp", (reading)::jsonFROM readings WHERE asset_code = 'asset_code' ORDER BY user_ts DESC LIMIT 20 OFFSET 0;
+          json result on basis of SELECT TO_CHAR(user_ts, '__TIMESTAMP_FMT') as "timestamp", (reading)::jsonFROM readings WHERE asset_code = 'asset_code' ORDER BY user_ts DESC, id DESC LIMIT 20 OFFSET 0;
 
     :Example:
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity?limit=1
             curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity?limit=1&skip=1"
+            curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity?limit=1&cursor=<Next-Cursor>"
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity?seconds=60
     """
     asset_code = request.match_info.get('asset_code', '')
     _select = PayloadBuilder().SELECT(("reading", "user_ts")).ALIAS("return", ("user_ts", "timestamp")). \
         FORMAT("return", ("user_ts", __TIMESTAMP_FMT)).chain_payload()
     _where = PayloadBuilder(_select).WHERE(["asset_code", "=", asset_code]).chain_payload()
-    if 'seconds' in request.query or 'minutes' in request.query or 'hours' in request.query:
-        _and_where = where_clause(request, _where)
-    else:
-        # Add the order by and limit, offset clause
-        _and_where = prepare_limit_skip_payload(request, _where)
-
-    payload = PayloadBuilder(_and_where).ORDER_BY(["user_ts", "desc"]).payload()
-    results = {}
-    try:
-        _readings = connect.get_readings_async()
-        results = await _readings.query(payload)
-        response = results['rows']
-    except KeyError:
-        raise web.HTTPBadRequest(reason=results['message'])
-    else:
-        return web.json_response(response)
+    return await _readings_page(request, _where)
 
 
 async def asset_reading(request):
@@ -180,14 +234,16 @@ async def asset_reading(request):
     Only one of hour, minutes or seconds should be supplied
 
     Returns:
-           json result on basis of SELECT TO_CHAR(user_ts, '__TIMESTAMP_FMT') as "timestamp", reading->>'reading' FROM readings WHERE asset_code = 'asset_code' ORDER BY user_ts DESC LIMIT 20 OFFSET 0;
+           json result on basis of SELECT TO_CHAR(user_ts, '__TIMESTAMP_FMT') as "timestamp", reading->>'reading' FROM readings WHERE asset_code = 'asset_code' ORDER BY user_ts DESC, id DESC LIMIT 20 OFFSET 0;
 
     :Example:
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/temperature
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/temperature?limit=1
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/temperature?skip=10
             curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity/temperature?limit=1&skip=10"
+            curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity/temperature?cursor=<Next-Cursor>"
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/temperature?minutes=60
+            curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity/temperature?hours=24&points=500"
     """
     asset_code = request.match_info.get('asset_code', '')
     reading = request.match_info.get('reading', '')
@@ -196,13 +252,27 @@ async def asset_reading(request):
         .ALIAS("return", ("user_ts", "timestamp"), ("reading", reading)) \
         .FORMAT("return", ("user_ts", __TIMESTAMP_FMT)).chain_payload()
     _where = PayloadBuilder(_select).WHERE(["asset_code", "=", asset_code]).chain_payload()
+    return await _readings_page(request, _where, points_key=reading)
+
+
+async def _readings_page(request, _where, points_key=None):
+    """ Returns the readings of the where clause, newest first, of the time window or of the page requested
+
+    The page is the one of the cursor request param or the limit, skip request params. The next token of a page
+    requested without a skip is returned in the Next-Cursor response header, unless it is the last page.
+    The readings are downsampled on the values of points_key to the points request param, if any.
+    """
+    points = None if points_key is None else downsampling.get_points(request)
+    cursor = None
     if 'seconds' in request.query or 'minutes' in request.query or 'hours' in request.query:
         _and_where = where_clause(request, _where)
+        payload = PayloadBuilder(_and_where).ORDER_BY(["user_ts", "desc"]).payload()
+        limit = offset = None
     else:
-        # Add the order by and limit, offset clause
-        _and_where = prepare_limit_skip_payload(request, _where)
-
-    payload = PayloadBuilder(_and_where).ORDER_BY(["user_ts", "desc"]).payload()
+        # Add the order by and limit, offset or cursor clause
+        limit, offset = get_limit_skip(request)
+        cursor = pagination.get_cursor(request)
+        payload = PayloadBuilder(pagination.add_to_payload(_where, cursor, "user_ts", limit, offset)).payload()
 
     results = {}
     try:
@@ -212,7 +282,150 @@ async def asset_reading(request):
     except KeyError:
         raise web.HTTPBadRequest(reason=results['message'])
     else:
-        return web.json_response(response)
+        headers = None
+        if limit is not None and not offset:
+            token = pagination.next_cursor(response, "timestamp", limit, cursor)
+            if token is not None:
+                headers = {'Next-Cursor': token}
+        if points is not None:
+            response = downsampling.lttb(response, points, points_key)
+        return web.json_response(response, headers=headers)
+
+
+async def asset_export(request):
+    """ Export the readings of an asset, newest first, streamed to the client as they are read from the storage
+
+    The readings are read by batches of _EXPORT_BATCH_SIZE with a cursor, see pagination, and written with
+    chunked transfer encoding so that the memory used does not depend on the number of readings exported.
+
+    The query parameters are
+      format=ndjson|csv     a JSON object by line, the default, or comma separated values with a header line
+      datapoints=x,y        export only these datapoints of the readings, a CSV export defaults to the
+                            datapoints of the latest reading
+      start=ts, end=ts      export the readings from start, included, to end, excluded, as YYYY-MM-DD HH:MM:SS[.fff]
+      seconds, minutes or hours  export the readings less than x seconds, minutes or hours old
+      limit=x               export at most x readings, the last line is then the next token of the following ones,
+                            {"next": "<token>"} for ndjson or # next=<token> for csv, unless there are no more.
+                            An export interrupted by an error ends with the next token too
+      cursor=x              export the readings following the ones of the next token x
+
+    :Example:
+            curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/export
+            curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity/export?format=csv&datapoints=temperature"
+            curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity/export?hours=24&limit=100000"
+            curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity/export?limit=100000&cursor=<next>"
+    """
+    asset_code = request.match_info.get('asset_code', '')
+
+    export_format = request.query.get('format', '') or 'ndjson'
+    if export_format not in _EXPORT_CONTENT_TYPES:
+        raise web.HTTPBadRequest(reason="Format must be one of {}".format(', '.join(_EXPORT_CONTENT_TYPES)))
+
+    limit = None
+    if 'limit' in request.query and request.query['limit'] != '':
+        limit, _ = get_limit_skip(request)
+    cursor = pagination.get_cursor(request)
+
+    time_range = []
+    for param, condition in (('start', '>='), ('end', '<')):
+        if param in request.query and request.query[param] != '':
+            try:
+                datetime.strptime(request.query[param], '%Y-%m-%d %H:%M:%S.%f' if '.' in request.query[param]
+                                  else '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                raise web.HTTPBadRequest(reason="{} must be a timestamp YYYY-MM-DD HH:MM:SS[.fff]".format(
+                    param.capitalize()))
+            time_range.append(["user_ts", condition, request.query[param]])
+
+    _readings = connect.get_readings_async()
+    datapoints = [datapoint for datapoint in request.query.get('datapoints', '').split(',') if datapoint]
+    if not datapoints and export_format == 'csv':
+        datapoints = await _get_asset_keys(_readings, asset_code)
+
+    if datapoints:
+        columns = [["reading", datapoint] for datapoint in datapoints]
+        aliases = [(column, column[1]) for column in columns]
+        _select = PayloadBuilder().SELECT(tuple(["user_ts"] + columns)) \
+            .ALIAS("return", ("user_ts", "timestamp"), *aliases) \
+            .FORMAT("return", ("user_ts", __TIMESTAMP_FMT)).chain_payload()
+    else:
+        _select = PayloadBuilder().SELECT(("reading", "user_ts")).ALIAS("return", ("user_ts", "timestamp")) \
+            .FORMAT("return", ("user_ts", __TIMESTAMP_FMT)).chain_payload()
+    _where = PayloadBuilder(_select).WHERE(["asset_code", "=", asset_code]).chain_payload()
+    for condition in time_range:
+        _where = PayloadBuilder(_where).AND_WHERE(condition).chain_payload()
+    _where = where_clause(request, _where)
+
+    async def read_batch(batch_cursor, exported):
+        batch_size = _EXPORT_BATCH_SIZE if limit is None else min(_EXPORT_BATCH_SIZE, limit - exported)
+        payload = PayloadBuilder(pagination.add_to_payload(copy.deepcopy(_where), batch_cursor, "user_ts",
+                                                           batch_size)).payload()
+        results = await _readings.query(payload)
+        if 'rows' not in results:
+            raise web.HTTPBadRequest(reason=results.get('message'))
+        return results['rows'], pagination.following(results['rows'], "timestamp", batch_size, batch_cursor)
+
+    async def write_next(next_cursor):
+        token = pagination.encode(next_cursor)
+        if export_format == 'csv':
+            await response.write('# next={}\n'.format(token).encode())
+        else:
+            await response.write((json.dumps({"next": token}) + '\n').encode())
+
+    rows, next_cursor = await read_batch(cursor, 0)
+
+    response = web.StreamResponse()
+    response.content_type = _EXPORT_CONTENT_TYPES[export_format]
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    if export_format == 'csv':
+        await response.write(_csv_lines([["timestamp"] + datapoints]))
+    exported = 0
+    while True:
+        if export_format == 'csv':
+            await response.write(_csv_lines([[row["timestamp"]] + [row.get(datapoint) for datapoint in datapoints]
+                                             for row in rows]))
+        else:
+            await response.write(''.join(json.dumps(row) + '\n' for row in rows).encode())
+        exported += len(rows)
+        if next_cursor is None:
+            break
+        if limit is not None and exported >= limit:
+            await write_next(next_cursor)
+            break
+        try:
+            rows, next_cursor = await read_batch(next_cursor, exported)
+        except Exception as ex:
+            # The status is sent, the next token tells the client the export is incomplete and where to resume it
+            _logger.error("Export of %s interrupted after %d readings: %s", asset_code, exported, str(ex))
+            await write_next(next_cursor)
+            break
+
+    await response.write_eof()
+    return response
+
+
+def _csv_lines(rows):
+    lines = io.StringIO()
+    csv.writer(lines, lineterminator='\n').writerows(rows)
+    return lines.getvalue().encode()
+
+
+async def _get_asset_keys(_readings, asset_code):
+    """Returns the keys of the latest reading of an asset, an empty list if it has no readings"""
+    cached = _asset_keys_cache.get(asset_code)
+    if cached is not None and time.monotonic() - cached[1] < _ASSET_KEYS_CACHE_SECONDS:
+        return cached[0]
+
+    payload = PayloadBuilder().SELECT("reading").WHERE(["asset_code", "=", asset_code]) \
+        .ORDER_BY(["user_ts", "desc"]).LIMIT(1).payload()
+    results = await _readings.query(payload)
+    if not results['rows']:
+        return []
+    reading_keys = list(results['rows'][0]['reading'].keys())
+    _asset_keys_cache[asset_code] = (reading_keys, time.monotonic())
+    return reading_keys
 
 
 async def asset_all_readings_summary(request):
@@ -223,6 +436,9 @@ async def asset_all_readings_summary(request):
     Only one of hour, minutes or seconds should be supplied, if more than one time unit
     then the smallest unit will be picked
 
+    The sensors summarised are the keys of the latest reading of the asset, read again after
+    _ASSET_KEYS_CACHE_SECONDS, and all of them are summarised by a single storage query
+
     The number of records return is default to a small number (20), this may be changed by supplying
     the query parameter ?limit=xx&skip=xx and it will not respect when datetime units is supplied
 
@@ -232,18 +448,13 @@ async def asset_all_readings_summary(request):
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/summary?limit=10
     """
     try:
-        # Get readings from asset_code
+        # Find keys in readings
         asset_code = request.match_info.get('asset_code', '')
-        payload = PayloadBuilder().SELECT("reading").WHERE(["asset_code", "=", asset_code]).payload()
         _readings = connect.get_readings_async()
-        results = await _readings.query(payload)
-        if not results['rows']:
+        reading_keys = await _get_asset_keys(_readings, asset_code)
+        if not reading_keys:
             raise web.HTTPNotFound(reason="{} asset_code not found".format(asset_code))
 
-        # TODO: FOGL-1768 when support available from storage layer then avoid multiple calls
-        # Find keys in readings
-        reading_keys = list(results['rows'][0]['reading'].keys())
-        response = []
         _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]).chain_payload()
         if 'seconds' in request.query or 'minutes' in request.query or 'hours' in request.query:
             _and_where = where_clause(request, _where)
@@ -251,16 +462,18 @@ async def asset_all_readings_summary(request):
             # Add limit, offset clause
             _and_where = prepare_limit_skip_payload(request, _where)
 
-        for reading in reading_keys:
-            _aggregate = PayloadBuilder(_and_where).AGGREGATE(["min", ["reading", reading]],
-                                                              ["max", ["reading", reading]],
-                                                              ["avg", ["reading", reading]]) \
-                .ALIAS('aggregate', ('reading', 'min', 'min'),
-                       ('reading', 'max', 'max'),
-                       ('reading', 'avg', 'average')).chain_payload()
-            payload = PayloadBuilder(_aggregate).payload()
-            results = await _readings.query(payload)
-            response.append({reading: results['rows'][0]})
+        # The min, max and average of all the keys in a single query, aliased by the index of the key
+        aggregates = []
+        aliases = []
+        for idx, reading in enumerate(reading_keys):
+            for operation, alias in (('min', 'min'), ('max', 'max'), ('avg', 'average')):
+                aggregates.append([operation, ["reading", reading]])
+                aliases.append((["reading", reading], operation, "{}_{}".format(alias, idx)))
+        payload = PayloadBuilder(_and_where).AGGREGATE(tuple(aggregates)).ALIAS('aggregate', *aliases).payload()
+        results = await _readings.query(payload)
+        row = results['rows'][0]
+        response = [{reading: {alias: row["{}_{}".format(alias, idx)] for alias in ('min', 'max', 'average')}}
+                    for idx, reading in enumerate(reading_keys)]
     except (KeyError, IndexError) as ex:
         raise web.HTTPNotFound(reason=ex)
     except (TypeError, ValueError) as ex:
@@ -296,6 +509,21 @@ async def asset_summary(request):
     """
     asset_code = request.match_info.get('asset_code', '')
     reading = request.match_info.get('reading', '')
+    window = get_time_window(request)
+    period = rollup.PERIODS['hours']
+    rolled_up_end = await _get_rolled_up_end(asset_code, reading, period)
+    if rolled_up_end is not None:
+        # The hours rolled up still in the readings, the older rollups summarise readings purged since
+        oldest = await _get_oldest_reading(asset_code)
+        if oldest is not None:
+            starts = [oldest, await _get_rolled_up_start(asset_code, reading, period)]
+            if window:
+                starts.append(datetime.now() - timedelta(seconds=window))
+            rollup_start = rollup.ceil_time(max(start for start in starts if start is not None), period)
+            if rollup_start < rolled_up_end:
+                return web.json_response({reading: await _summary_with_rollups(asset_code, reading, window,
+                                                                               rollup_start, rolled_up_end)})
+
     _aggregate = PayloadBuilder().AGGREGATE(["min", ["reading", reading]], ["max", ["reading", reading]],
                                             ["avg", ["reading", reading]]) \
         .ALIAS('aggregate', ('reading', 'min', 'min'), ('reading', 'max', 'max'),
@@ -316,6 +544,55 @@ async def asset_summary(request):
         return web.json_response({reading: response})
 
 
+async def _summary_with_rollups(asset_code, reading, window, rollup_start, rolled_up_end):
+    """ The summary of a sensor from its hourly rollups since rollup_start and from the readings of the window not
+    rolled up: the ones older than rollup_start and the ones since rolled_up_end
+    """
+    period = rollup.PERIODS['hours']
+    _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]).AND_WHERE(["datapoint", "=", reading]) \
+        .AND_WHERE(["period", "=", period]) \
+        .AND_WHERE(["bucket_ts", ">=", rollup_start.strftime(rollup.TIMESTAMP_FORMAT)]).chain_payload()
+    payload = PayloadBuilder(_where).AGGREGATE(["min", "min_value"], ["max", "max_value"], ["sum", "sum_value"],
+                                               ["sum", "count"]) \
+        .ALIAS('aggregate', ('min_value', 'min', 'min'), ('max_value', 'max', 'max'), ('sum_value', 'sum', 'sum'),
+               ('count', 'sum', 'count')).payload()
+    storage_client = connect.get_storage_async()
+    results = await storage_client.query_tbl_with_payload(rollup.TABLE, payload)
+    summaries = [results['rows'][0]]
+
+    # The readings not rolled up, since rolled_up_end and before the first hour summarised from the rollups
+    _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]) \
+        .AND_WHERE(["user_ts", ">=", rolled_up_end.strftime(rollup.TIMESTAMP_FORMAT)]).chain_payload()
+    raw_wheres = [_where]
+    _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]) \
+        .AND_WHERE(["user_ts", "<", rollup_start.strftime(rollup.TIMESTAMP_FORMAT)]).chain_payload()
+    if window:
+        _where = PayloadBuilder(_where).AND_WHERE(["user_ts", "newer", window]).chain_payload()
+    raw_wheres.append(_where)
+    _readings = connect.get_readings_async()
+    for _where in raw_wheres:
+        payload = PayloadBuilder(_where).AGGREGATE(["min", ["reading", reading]], ["max", ["reading", reading]],
+                                                   ["avg", ["reading", reading]], ["count", ["reading", reading]]) \
+            .ALIAS('aggregate', (['reading', reading], 'min', 'min'), (['reading', reading], 'max', 'max'),
+                   (['reading', reading], 'avg', 'average'), (['reading', reading], 'count', 'count')).payload()
+        results = await _readings.query(payload)
+        try:
+            row = results['rows'][0]
+        except KeyError:
+            raise web.HTTPBadRequest(reason=results['message'])
+        average = row['average']
+        row['sum'] = float(average) * float(row['count']) if average is not None else None
+        summaries.append(row)
+
+    summaries = [s for s in summaries if s['count'] is not None and float(s['count'])]
+    if not summaries:
+        return {'min': None, 'max': None, 'average': None}
+    count = sum(float(s['count']) for s in summaries)
+    return {'min': min(float(s['min']) for s in summaries),
+            'max': max(float(s['max']) for s in summaries),
+            'average': sum(float(s['sum']) for s in summaries) / count}
+
+
 async def asset_averages(request):
     """ Browse all the assets for which we have recorded readings and
     return a series of averages per second, minute or hour.
@@ -358,22 +635,26 @@ async def asset_averages(request):
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/temperature/series?group=seconds
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/temperature/series?group=minutes
             curl -sX GET http://localhost:8081/foglamp/asset/fogbench_humidity/temperature/series?group=hours
+            curl -sX GET "http://localhost:8081/foglamp/asset/fogbench_humidity/temperature/series?hours=24&points=500"
     """
     asset_code = request.match_info.get('asset_code', '')
     reading = request.match_info.get('reading', '')
+    points = downsampling.get_points(request)
 
-    ts_restraint = 'YYYY-MM-DD HH24:MI:SS'
+    _group = 'seconds'
     if 'group' in request.query and request.query['group'] != '':
         _group = request.query['group']
-        if _group in ('seconds', 'minutes', 'hours'):
-            if _group == 'seconds':
-                ts_restraint = 'YYYY-MM-DD HH24:MI:SS'
-            elif _group == 'minutes':
-                ts_restraint = 'YYYY-MM-DD HH24:MI'
-            elif _group == 'hours':
-                ts_restraint = 'YYYY-MM-DD HH24'
-        else:
+        if _group not in rollup.PERIODS:
             raise web.HTTPBadRequest(reason="{} is not a valid group".format(_group))
+    period = rollup.PERIODS[_group]
+    ts_restraint = rollup.BUCKET_FORMATS[period]
+
+    rolled_up_end = None
+    if period in rollup.ROLLED_UP_PERIODS:
+        rolled_up_end = await _get_rolled_up_end(asset_code, reading, period)
+    if rolled_up_end is not None:
+        response = await _averages_with_rollups(request, asset_code, reading, period, rolled_up_end)
+        return web.json_response(response if points is None else downsampling.merge_buckets(response, points))
 
     _aggregate = PayloadBuilder().AGGREGATE(["min", ["reading", reading]], ["max", ["reading", reading]],
                                             ["avg", ["reading", reading]]) \
@@ -399,10 +680,109 @@ async def asset_averages(request):
     except KeyError:
         raise web.HTTPBadRequest(reason=results['message'])
     else:
-        return web.json_response(response)
+        return web.json_response(response if points is None else downsampling.merge_buckets(response, points))
 
 
-def where_clause(request, where):
+async def _averages_with_rollups(request, asset_code, reading, period, rolled_up_end):
+    """ The series of a sensor from its rollups of period seconds and from the readings not rolled up: the ones since
+    rolled_up_end and the ones older than the first rollup, which are grouped by period as the rollups
+    """
+    ts_restraint = rollup.BUCKET_FORMATS[period]
+    window = get_time_window(request)
+    limit, offset = get_limit_skip(request)
+
+    _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]) \
+        .AND_WHERE(["user_ts", ">=", rolled_up_end.strftime(rollup.TIMESTAMP_FORMAT)]).chain_payload()
+    response = await _averages_of_readings(request, reading, ts_restraint, _where)
+
+    _select = PayloadBuilder().SELECT(("bucket_ts", "min_value", "max_value", "sum_value", "count")) \
+        .ALIAS("return", ("bucket_ts", "timestamp")).FORMAT("return", ("bucket_ts", ts_restraint)) \
+        .WHERE(["asset_code", "=", asset_code]).AND_WHERE(["datapoint", "=", reading]) \
+        .AND_WHERE(["period", "=", period]).chain_payload()
+    if window:
+        _select = where_clause(request, _select, column="bucket_ts")
+    else:
+        # The rows of the readings come first, the rollups complete the page
+        _select = PayloadBuilder(_select).LIMIT(max(0, limit + offset - len(response))).chain_payload()
+    payload = PayloadBuilder(_select).ORDER_BY(["bucket_ts", "desc"]).payload()
+    storage_client = connect.get_storage_async()
+    results = await storage_client.query_tbl_with_payload(rollup.TABLE, payload)
+    response.extend({'min': r['min_value'], 'max': r['max_value'],
+                     'average': float(r['sum_value']) / float(r['count']), 'timestamp': r['timestamp']}
+                    for r in results['rows'])
+
+    # The readings older than the first rollup, kept longer than the rollups of the seconds or not rolled up yet,
+    # when the window or the page reaches them
+    if window or len(response) < limit + offset:
+        rolled_up_start = await _get_rolled_up_start(asset_code, reading, period)
+        if rolled_up_start is not None and (not window or datetime.now() - timedelta(seconds=window) < rolled_up_start):
+            _where = PayloadBuilder().WHERE(["asset_code", "=", asset_code]) \
+                .AND_WHERE(["user_ts", "<", rolled_up_start.strftime(rollup.TIMESTAMP_FORMAT)]).chain_payload()
+            if not window:
+                _where = PayloadBuilder(_where).LIMIT(limit + offset - len(response)).chain_payload()
+            response.extend(await _averages_of_readings(request, reading, ts_restraint, _where))
+    return response if window else response[offset:offset + limit]
+
+
+async def _averages_of_readings(request, reading, ts_restraint, where):
+    """ The min, max and average of a sensor of the readings of where by bucket of ts_restraint, newest first """
+    _aggregate = PayloadBuilder(where).AGGREGATE(["min", ["reading", reading]], ["max", ["reading", reading]],
+                                                 ["avg", ["reading", reading]]) \
+        .ALIAS('aggregate', ('reading', 'min', 'min'), ('reading', 'max', 'max'),
+               ('reading', 'avg', 'average')).chain_payload()
+    _where = where_clause(request, _aggregate)
+    _group = PayloadBuilder(_where).GROUP_BY("user_ts").ALIAS("group", ("user_ts", "timestamp")) \
+        .FORMAT("group", ("user_ts", ts_restraint)).chain_payload()
+    payload = PayloadBuilder(_group).ORDER_BY(["user_ts", "desc"]).payload()
+    results = {}
+    try:
+        _readings = connect.get_readings_async()
+        results = await _readings.query(payload)
+        return results['rows']
+    except KeyError:
+        raise web.HTTPBadRequest(reason=results['message'])
+
+
+async def _get_oldest_reading(asset_code):
+    """ Returns the user_ts, to the second, of the oldest reading of an asset, None if it has none """
+    payload = PayloadBuilder().SELECT("user_ts").ALIAS("return", ("user_ts", "timestamp")) \
+        .FORMAT("return", ("user_ts", rollup.BUCKET_FORMATS[1])).WHERE(["asset_code", "=", asset_code]) \
+        .ORDER_BY(["user_ts", "asc"]).LIMIT(1).payload()
+    _readings = connect.get_readings_async()
+    results = await _readings.query(payload)
+    if not results['rows']:
+        return None
+    return rollup.parse_bucket(results['rows'][0]['timestamp'], 1)
+
+
+async def _get_rolled_up_start(asset_code, reading, period):
+    """ Returns the start of the first rollup of period seconds of a sensor, None if it has none """
+    payload = PayloadBuilder().SELECT("bucket_ts").ALIAS("return", ("bucket_ts", "bucket_ts")) \
+        .FORMAT("return", ("bucket_ts", rollup.BUCKET_FORMATS[1])).WHERE(["asset_code", "=", asset_code]) \
+        .AND_WHERE(["datapoint", "=", reading]).AND_WHERE(["period", "=", period]) \
+        .ORDER_BY(["bucket_ts", "asc"]).LIMIT(1).payload()
+    storage_client = connect.get_storage_async()
+    results = await storage_client.query_tbl_with_payload(rollup.TABLE, payload)
+    if not results['rows']:
+        return None
+    return rollup.parse_bucket(results['rows'][0]['bucket_ts'], 1)
+
+
+async def _get_rolled_up_end(asset_code, reading, period):
+    """ Returns the end of the last rollup of period seconds of a sensor, None if it has none """
+    payload = PayloadBuilder().SELECT("bucket_ts").ALIAS("return", ("bucket_ts", "bucket_ts")) \
+        .FORMAT("return", ("bucket_ts", rollup.BUCKET_FORMATS[1])).WHERE(["asset_code", "=", asset_code]) \
+        .AND_WHERE(["datapoint", "=", reading]).AND_WHERE(["period", "=", period]) \
+        .ORDER_BY(["bucket_ts", "desc"]).LIMIT(1).payload()
+    storage_client = connect.get_storage_async()
+    results = await storage_client.query_tbl_with_payload(rollup.TABLE, payload)
+    if not results['rows']:
+        return None
+    return rollup.parse_bucket(results['rows'][0]['bucket_ts'], 1) + timedelta(seconds=period)
+
+
+def get_time_window(request):
+    """ Returns the seconds of the seconds, minutes or hours request param, 0 if none is supplied """
     val = 0
     try:
         if 'seconds' in request.query and request.query['seconds'] != '':
@@ -416,10 +796,15 @@ def where_clause(request, where):
             raise ValueError
     except ValueError:
         raise web.HTTPBadRequest(reason="Time must be a positive integer")
+    return val
+
+
+def where_clause(request, where, column='user_ts'):
+    val = get_time_window(request)
 
     # if no time units then NO AND_WHERE condition applied
     if val == 0:
         return where
 
-    payload = PayloadBuilder(where).AND_WHERE(['user_ts', 'newer', val]).chain_payload()
+    payload = PayloadBuilder(where).AND_WHERE([column, 'newer', val]).chain_payload()
     return payload
@@ -6,17 +6,15 @@
 
 import asyncio
 import time
-import json
 import logging
-import socket
-import subprocess
 
 from aiohttp import web
 
 from foglamp.common import logger
+from foglamp.common import host
 from foglamp.services.core import server
-from foglamp.services.core.api.statistics import get_statistics
 from foglamp.services.core import connect
+from foglamp.common.storage_client.payload_builder import PayloadBuilder
 from foglamp.common.configuration_manager import ConfigurationManager
 from foglamp.services.core.service_registry.service_registry import ServiceRegistry
 from foglamp.common.service_record import ServiceRecord
@@ -30,6 +28,13 @@ __start_time = time.time()
 
 _logger = logger.setup(__name__, level=logging.INFO)
 
+_PING_SNAPSHOT_SECONDS = 5
+"""Interval between refreshes of the ping snapshot when the rest_api category has none"""
+
+_ping_snapshot = dict()
+"""The allowPing setting, statistics, health and host facts returned by ping, a load balancer or a UI calling ping
+every few seconds does not make it read the storage or the network interfaces"""
+
 _help = """
     -------------------------------------------------------------------------------
     | GET             | /foglamp/ping                                             |
@@ -45,7 +50,7 @@ async def ping(request):
        request:
 
     Returns:
-           basic health information json payload
+           basic health information json payload, from the snapshot refreshed by refresh_ping_snapshot
 
     :Example:
            curl -X GET http://localhost:8081/foglamp/ping
@@ -55,24 +60,73 @@ async def ping(request):
         auth_token = request.token
     except AttributeError:
         if request.is_auth_optional is False:
-            cfg_mgr = ConfigurationManager(connect.get_storage_async())
-            category_item = await cfg_mgr.get_category_item('rest_api', 'allowPing')
-            allow_ping = True if category_item['value'].lower() == 'true' else False
-            if allow_ping is False:
+            if 'allowPing' not in _ping_snapshot:
+                await _refresh_allow_ping()
+            if _ping_snapshot['allowPing'] is False:
                 _logger.warning("Permission denied for Ping when Auth is mandatory.")
                 raise web.HTTPForbidden
 
     since_started = time.time() - __start_time
 
-    stats_request = request.clone(rel_url='foglamp/statistics')
-    data_read, data_sent, data_purged = await get_stats(stats_request)
+    if 'health' not in _ping_snapshot:
+        # Not refreshed yet
+        await _refresh_statistics_and_health()
+
+    return web.json_response({'uptime': since_started,
+                              'dataRead': _ping_snapshot['dataRead'],
+                              'dataSent': _ping_snapshot['dataSent'],
+                              'dataPurged': _ping_snapshot['dataPurged'],
+                              'authenticationOptional': request.is_auth_optional,
+                              'serviceName': server.Server._service_name,
+                              'hostName': _ping_snapshot['hostName'],
+                              'ipAddresses': _ping_snapshot['ipAddresses'],
+                              'health': _ping_snapshot['health']
+                              })
+
+
+async def refresh_ping_snapshot():
+    """ Refreshes the snapshot returned by ping
+
+    Returns:
+        the interval in seconds to the next refresh, the pingSnapshotInterval of the rest_api category
+    """
+    cfg_mgr = ConfigurationManager(connect.get_storage_async())
+    config = await cfg_mgr.get_category_all_items('rest_api')
+    interval = _PING_SNAPSHOT_SECONDS
+    if config is not None:
+        _ping_snapshot['allowPing'] = config['allowPing']['value'].lower() == 'true'
+        try:
+            interval = max(1, int(config['pingSnapshotInterval']['value']))
+        except (KeyError, ValueError):
+            pass
+    await _refresh_statistics_and_health()
+    return interval
+
+
+async def refresh_ping_snapshot_periodically():
+    """ Refreshes the snapshot returned by ping until cancelled, every pingSnapshotInterval seconds """
+    while True:
+        interval = _PING_SNAPSHOT_SECONDS
+        try:
+            interval = await refresh_ping_snapshot()
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            _logger.exception("Ping snapshot not refreshed: %s", str(ex))
+        await asyncio.sleep(interval)
+
+
+async def _refresh_allow_ping():
+    cfg_mgr = ConfigurationManager(connect.get_storage_async())
+    category_item = await cfg_mgr.get_category_item('rest_api', 'allowPing')
+    _ping_snapshot['allowPing'] = True if category_item['value'].lower() == 'true' else False
+
 
-    host_name = socket.gethostname()
-    # all addresses for the host
-    all_ip_addresses_cmd_res = subprocess.run(['hostname', '-I'], stdout=subprocess.PIPE)
-    ip_addresses = all_ip_addresses_cmd_res.stdout.decode('utf-8').replace("\n", "").strip().split(" ")
+async def _refresh_statistics_and_health():
+    data_read, data_sent, data_purged = await get_stats()
 
-    svc_name = server.Server._service_name
+    # all addresses for the host, cached by host until the network changes
+    host_name, ip_addresses = host.get_host_facts()
 
     def services_health_litmus_test():
         all_svc_status = [ServiceRecord.Status(int(service_record._status)).name.upper()
@@ -83,43 +137,31 @@ async def ping(request):
             return 'amber'
         return 'green'
 
-    status_color = services_health_litmus_test()
+    _ping_snapshot.update({'dataRead': data_read,
+                           'dataSent': data_sent,
+                           'dataPurged': data_purged,
+                           'hostName': host_name,
+                           'ipAddresses': ip_addresses,
+                           'health': services_health_litmus_test()})
 
-    return web.json_response({'uptime': since_started,
-                              'dataRead': data_read,
-                              'dataSent': data_sent,
-                              'dataPurged': data_purged,
-                              'authenticationOptional': request.is_auth_optional,
-                              'serviceName': svc_name,
-                              'hostName': host_name,
-                              'ipAddresses': ip_addresses,
-                              'health': status_color
-                              })
 
-
-async def get_stats(req):
+async def get_stats():
     """
-    :param req: a clone of 'foglamp/statistics' endpoint request
     :return:  data_read, data_sent, data_purged
     """
 
-    res = await get_statistics(req)
-    stats = json.loads(res.body.decode())
+    payload = PayloadBuilder().SELECT(("key", "value")).payload()
+    storage_client = connect.get_storage_async()
+    result = await storage_client.query_tbl_with_payload('statistics', payload)
+    stats = {s['key']: s['value'] for s in result['rows']}
 
     def filter_stat(k):
 
         """
         there is no statistics about 'Readings Sent' at the start of FogLAMP
-        so the specific exception is caught and 0 is returned to avoid the error 'index out of range'
-        calling the API ping.
+        so 0 is returned to avoid the error calling the API ping.
         """
-        try:
-            v = [s['value'] for s in stats if s['key'] == k]
-            value = int(v[0])
-        except IndexError:
-            value = 0
-
-        return value
+        return int(stats.get(k, 0))
 
     data_read = filter_stat('READINGS')
     data_sent = filter_stat('Readings Sent')
@@ -4,10 +4,12 @@
 # See: http://foglamp.readthedocs.io/
 # FOGLAMP_END
 
+import time
 from aiohttp import web
 import urllib.parse
 from foglamp.services.core import connect
 from foglamp.common.configuration_manager import ConfigurationManager
+from foglamp.common.web.middleware import versioned
 from foglamp.common.storage_client.payload_builder import PayloadBuilder
 from foglamp.common.audit_logger import AuditLogger
 
@@ -28,11 +30,22 @@ _help = """
     --------------------------------------------------------------------------------
 """
 
+_VERSION_MAX_AGE_SECONDS = 60
+"""Age of the version of the categories after which the clients read them again, the tasks creating their category
+do not go through the core"""
+
 #################################
 #  Configuration Manager
 #################################
 
 
+def _get_version():
+    """ The ETag version of the categories, see versioned """
+    version = ConfigurationManager(connect.get_storage_async()).version
+    return '{}.{}'.format(version, int(time.monotonic() // _VERSION_MAX_AGE_SECONDS))
+
+
+@versioned(_get_version)
 async def get_categories(request):
     """
     Args:
@@ -64,6 +77,7 @@ async def get_categories(request):
     return web.json_response({'categories': categories_json})
 
 
+@versioned(_get_version)
 async def get_category(request):
     """
     Args:
@@ -147,6 +161,7 @@ async def create_category(request):
     return web.json_response(result)
 
 
+@versioned(_get_version)
 async def get_category_item(request):
     """
     Args:
@@ -276,6 +291,7 @@ async def add_configuration_item(request):
         payload = PayloadBuilder().SET(value=merge_cat_val).WHERE(["key", "=", category_name]).payload()
         result = await storage_client.update_tbl("configuration", payload)
         response = result['response']
+        cf_mgr.changed()
 
         # logged audit new config item for category
         audit = AuditLogger(storage_client)
@@ -332,6 +348,7 @@ async def delete_configuration_item_value(request):
     return web.json_response(result)
 
 
+@versioned(_get_version)
 async def get_child_category(request):
     """
     Args:
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Downsampling of the series returned to be plotted, requested with the points request param
+
+A series of values is downsampled with Largest Triangle Three Buckets, which keeps the rows of the peaks and troughs
+a plot of all the rows would show. A series of min, max and averages is downsampled by merging the rows of equal
+buckets, which keeps the envelope of the series.
+
+The x of a row is its rank in the series, the readings and the statistics are sampled at a near regular interval.
+"""
+
+from itertools import groupby
+
+from aiohttp import web
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def get_points(request):
+    """ Returns the number of points of the points request param, None if none is supplied
+
+    Raises:
+        HTTPBadRequest: if points is not a positive integer
+    """
+    if 'points' not in request.query or request.query['points'] == '':
+        return None
+    try:
+        points = int(request.query['points'])
+        if points < 1:
+            raise ValueError
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Points must be a positive integer")
+    return points
+
+
+def _values(rows, key):
+    """ The float values of key in rows, the previous value for a row without a numeric one """
+    values = []
+    previous = 0.0
+    for row in rows:
+        try:
+            previous = float(row[key])
+        except (KeyError, TypeError, ValueError):
+            pass
+        values.append(previous)
+    return values
+
+
+def lttb(rows, points, key):
+    """ Returns points rows of the series of the values of key in rows, all of them if they are not more
+
+    The first and the last rows are kept, every other row kept is the one of its bucket making the largest triangle
+    with the row kept before it and the average of the next bucket.
+    """
+    size = len(rows)
+    if points >= size:
+        return rows
+    if points < 3:
+        return [rows[0], rows[-1]][:points]
+
+    values = _values(rows, key)
+    sampled = [rows[0]]
+    every = (size - 2) / (points - 2)
+    a = 0
+    for i in range(points - 2):
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, size)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        selected = start = int(i * every) + 1
+        max_area = -1
+        for j in range(start, next_start):
+            area = abs((a - avg_x) * (values[j] - values[a]) - (a - j) * (avg_y - values[a]))
+            if area > max_area:
+                max_area = area
+                selected = j
+        sampled.append(rows[selected])
+        a = selected
+    sampled.append(rows[-1])
+    return sampled
+
+
+def lttb_by_key(rows, group_key, key, points):
+    """ Returns the rows of every value of group_key, e.g. of every statistic, downsampled with lttb """
+    sampled = []
+    rows = sorted(rows, key=lambda row: row[group_key])
+    for _, group in groupby(rows, key=lambda row: row[group_key]):
+        sampled.extend(lttb(list(group), points, key))
+    return sampled
+
+
+def merge_buckets(rows, points):
+    """ Returns points rows of a series of min, max, average and timestamp, all of them if they are not more
+
+    The rows of a bucket are merged in a row of the lowest min, the highest max, the average of the averages and the
+    timestamp of the last row of the bucket, the oldest of a series newest first.
+    """
+    size = len(rows)
+    if points >= size:
+        return rows
+
+    merged = []
+    for i in range(points):
+        bucket = rows[size * i // points:size * (i + 1) // points]
+        averages = [row['average'] for row in bucket if row['average'] is not None]
+        merged.append({'min': _lowest(row['min'] for row in bucket),
+                       'max': _highest(row['max'] for row in bucket),
+                       'average': sum(float(average) for average in averages) / len(averages) if averages else None,
+                       'timestamp': bucket[-1]['timestamp']})
+    return merged
+
+
+def _lowest(values):
+    values = [value for value in values if value is not None]
+    return min(values, key=float) if values else None
+
+
+def _highest(values):
+    values = [value for value in values if value is not None]
+    return max(values, key=float) if values else None
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Keyset (cursor) pagination of the rows listed newest first
+
+A page is requested with the opaque cursor returned as the next token of the previous page, instead of a skip
+that makes the storage scan and discard all the rows of the previous pages.
+
+The storage conditions can not be grouped, (ts < x OR (ts = x AND id < y)) can not be expressed. The cursor
+therefore keeps the timestamp of the last row of a page, as formatted by the storage, and the number of rows of that
+timestamp already returned. The next page holds the rows older than the end of that timestamp, sorted by timestamp
+and id descending, skipping the ones already returned.
+"""
+
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+from foglamp.common.storage_client.payload_builder import PayloadBuilder
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+"""Format of the timestamps formatted by the storage with YYYY-MM-DD HH24:MI:SS.MS, with up to 6 decimals"""
+
+Cursor = namedtuple('Cursor', ['timestamp', 'seen'])
+"""Timestamp of the last row returned and number of rows of that timestamp returned"""
+
+
+def encode(cursor):
+    """ Returns the next token of a Cursor """
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode()
+
+
+def _decode(token):
+    timestamp, seen = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+    datetime.strptime(timestamp, _TIMESTAMP_FORMAT)
+    if not isinstance(seen, int) or seen < 1:
+        raise ValueError
+    return Cursor(timestamp, seen)
+
+
+def get_cursor(request):
+    """ Returns the Cursor of the cursor request param, None if none is supplied
+
+    Raises:
+        HTTPBadRequest: if the cursor is not one returned as a next token or a skip is also supplied
+    """
+    if 'cursor' not in request.query or request.query['cursor'] == '':
+        return None
+    if 'skip' in request.query and request.query['skip'] != '':
+        raise web.HTTPBadRequest(reason="Skip and cursor can not be combined")
+    try:
+        return _decode(request.query['cursor'])
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise web.HTTPBadRequest(reason="Cursor is not valid")
+
+
+def conditions(cursor, column):
+    """ Returns the where condition of the rows of column older than the end of the timestamp of the cursor,
+    at the precision it is formatted with """
+    decimals = len(cursor.timestamp.rpartition('.')[2])
+    end = datetime.strptime(cursor.timestamp, _TIMESTAMP_FORMAT) + timedelta(microseconds=10 ** (6 - decimals))
+    return [column, '<', end.strftime(_TIMESTAMP_FORMAT)[:decimals - 6 or None]]
+
+
+def sort(column, id_column='id'):
+    """ Returns the order by of the pages, the id orders the rows of a same timestamp """
+    return [column, 'desc'], [id_column, 'desc']
+
+
+def following(rows, key, limit, cursor=None):
+    """ Returns the Cursor of the page following rows, None if it is the last one
+
+    Args:
+        rows: rows of the page, newest first
+        key: key of the timestamp, formatted with YYYY-MM-DD HH24:MI:SS.MS, in the rows
+        limit: maximum number of rows of the page
+        cursor: Cursor of the page, None for the first one
+    """
+    if limit == 0 or len(rows) < limit or rows[-1][key] is None:
+        return None
+    timestamp = rows[-1][key]
+    seen = sum(1 for row in rows if row[key] == timestamp)
+    if cursor is not None and cursor.timestamp == timestamp:
+        seen += cursor.seen
+    return Cursor(timestamp, seen)
+
+
+def next_cursor(rows, key, limit, cursor=None):
+    """ Returns the next token of a page, None if it is the last one, see following """
+    following_cursor = following(rows, key, limit, cursor)
+    return None if following_cursor is None else encode(following_cursor)
+
+
+def add_to_payload(payload, cursor, column, limit, offset=0):
+    """ Adds the where, order by, limit and skip of a page to a chain payload, the offset of a page requested
+    without a cursor """
+    builder = PayloadBuilder(payload)
+    if cursor is not None:
+        builder.AND_WHERE(conditions(cursor, column))
+        offset = cursor.seen
+    builder.ORDER_BY(sort(column)).LIMIT(limit)
+    if offset:
+        builder.OFFSET(offset)
+    return builder.chain_payload()
@@ -9,9 +9,11 @@ import uuid
 from aiohttp import web
 from foglamp.services.core import server
 from foglamp.services.core.scheduler.entities import Schedule, StartUpSchedule, TimedSchedule, IntervalSchedule, \
-    ManualSchedule, Task
+    ManualSchedule, CronSchedule, Task
+from foglamp.services.core.scheduler.cron import CronExpression
 from foglamp.services.core.scheduler.exceptions import *
 from foglamp.services.core import connect
+from foglamp.services.core.api import pagination
 from foglamp.common.storage_client.payload_builder import PayloadBuilder
 
 __author__ = "Amarendra K. Sinha"
@@ -37,6 +39,8 @@ _help = """
 
     | GET             | /foglamp/task                                             |
     | GET             | /foglamp/task/latest                                      |
+    | GET             | /foglamp/task/deferred                                    |
+    | GET             | /foglamp/task/timing                                      |
     | GET             | /foglamp/task/{task_id}                                   |
     | GET             | /foglamp/task/state                                       |
     | PUT             | /foglamp/task/{task_id}/cancel                            |
@@ -129,6 +133,9 @@ def _extract_args(data, curr_value):
                                                                                                     'schedule_repeat'] else 0
         _schedule['schedule_repeat'] = int(s_repeat)
 
+        _schedule['schedule_cron'] = data.get('cron') if 'cron' in data else curr_value[
+            'schedule_cron'] if curr_value else None
+
         _schedule['schedule_name'] = data.get('name') if 'name' in data else curr_value[
             'schedule_name'] if curr_value else None
 
@@ -198,6 +205,16 @@ async def _check_schedule_post_parameters(data, curr_value=None):
         elif not isinstance(_schedule.get('schedule_repeat'), int):
             _errors.append('Repeat must be an integer.')
 
+    # Raise error if cron expression is missing or wrong for schedule_type = CRON
+    if _schedule.get('schedule_type') == Schedule.Type.CRON:
+        if not _schedule.get('schedule_cron'):
+            _errors.append('Cron expression cannot be empty for CRON schedule.')
+        else:
+            try:
+                CronExpression(_schedule.get('schedule_cron'))
+            except ValueError as ex:
+                _errors.append('Cron expression error: {}'.format(str(ex)))
+
     # Raise error if day is non integer
     if _schedule.get('schedule_day') is not None and not isinstance(_schedule.get('schedule_day'), int):
         _errors.append('Day must either be None or must be an integer.')
@@ -259,6 +276,9 @@ async def _execute_add_update_schedule(data, curr_value=None):
         schedule = IntervalSchedule()
     elif _schedule.get('schedule_type') == Schedule.Type.MANUAL:
         schedule = ManualSchedule()
+    elif _schedule.get('schedule_type') == Schedule.Type.CRON:
+        schedule = CronSchedule()
+        schedule.cron = _schedule.get('schedule_cron')
 
     # Populate scheduler object
     schedule.schedule_id = _schedule.get('schedule_id')
@@ -301,6 +321,8 @@ async def get_schedules(request):
             'exclusive': sch.exclusive,
             'enabled': sch.enabled
         })
+        if isinstance(sch, CronSchedule):
+            schedules[-1]['cron'] = sch.cron
 
     return web.json_response({'schedules': schedules})
 
@@ -335,6 +357,8 @@ async def get_schedule(request):
             'exclusive': sch.exclusive,
             'enabled': sch.enabled
         }
+        if isinstance(sch, CronSchedule):
+            schedule['cron'] = sch.cron
 
         return web.json_response(schedule)
     except (ValueError, ScheduleNotFoundError) as ex:
@@ -525,6 +549,7 @@ async def post_schedule(request):
 
     :Example:
              curl -d '{"type": 3, "name": "sleep30test", "process_name": "sleep30", "repeat": "45"}'  -X POST  http://localhost:8081/foglamp/schedule
+             curl -d '{"type": 5, "name": "purge weekdays", "process_name": "purge", "cron": "*/30 6-18 * * mon-fri"}'  -X POST  http://localhost:8081/foglamp/schedule
     """
 
     try:
@@ -553,6 +578,8 @@ async def post_schedule(request):
             'exclusive': sch.exclusive,
             'enabled': sch.enabled
         }
+        if isinstance(sch, CronSchedule):
+            schedule['cron'] = sch.cron
 
         return web.json_response({'schedule': schedule})
     except (ScheduleNotFoundError, ScheduleProcessNameNotFoundError) as ex:
@@ -592,6 +619,7 @@ async def update_schedule(request):
         curr_value['schedule_day'] = sch.day
         curr_value['schedule_exclusive'] = sch.exclusive
         curr_value['schedule_enabled'] = sch.enabled
+        curr_value['schedule_cron'] = sch.cron if isinstance(sch, CronSchedule) else None
 
         go_no_go = await _check_schedule_post_parameters(data, curr_value)
         if len(go_no_go) != 0:
@@ -612,6 +640,8 @@ async def update_schedule(request):
             'exclusive': sch.exclusive,
             'enabled': sch.enabled
         }
+        if isinstance(sch, CronSchedule):
+            schedule['cron'] = sch.cron
 
         return web.json_response({'schedule': schedule})
     except (ScheduleNotFoundError, ScheduleProcessNameNotFoundError) as ex:
@@ -707,13 +737,15 @@ async def get_task(request):
 async def get_tasks(request):
     """
     Returns:
-            the list of tasks
+            the list of tasks, newest first, and the next token to use as cursor unless it is the last page
 
     :Example:
              curl -X GET  http://localhost:8081/foglamp/task
 
              curl -X GET  http://localhost:8081/foglamp/task?limit=2
 
+             curl -X GET  http://localhost:8081/foglamp/task?limit=2&cursor=<next>
+
              curl -X GET  http://localhost:8081/foglamp/task?name=xxx
 
              curl -X GET  http://localhost:8081/foglamp/task?state=xxx
@@ -749,9 +781,14 @@ async def get_tasks(request):
         elif state:
             where_clause = ["state", "=", state]
 
-        tasks = await server.Server.scheduler.get_tasks(where=where_clause, limit=limit)
+        # Tasks newer first, the ones following the cursor if any
+        cursor = pagination.get_cursor(request)
+        and_where = None if cursor is None else pagination.conditions(cursor, "start_time")
+        offset = 0 if cursor is None else cursor.seen
+        tasks = await server.Server.scheduler.get_tasks(where=where_clause, and_where=and_where, limit=limit,
+                                                        offset=offset, sort=pagination.sort("start_time"))
 
-        if len(tasks) == 0:
+        if len(tasks) == 0 and cursor is None:
             raise web.HTTPNotFound(reason="No Tasks found")
 
         new_tasks = []
@@ -767,7 +804,11 @@ async def get_tasks(request):
                  }
             )
 
-        return web.json_response({'tasks': new_tasks})
+        response = {'tasks': new_tasks}
+        token = pagination.next_cursor([{'startTime': task.start_time} for task in tasks], 'startTime', limit, cursor)
+        if token is not None:
+            response['next'] = token
+        return web.json_response(response)
     except (ValueError, TaskNotFoundError) as ex:
         raise web.HTTPNotFound(reason=str(ex))
 
@@ -847,6 +888,60 @@ async def cancel_task(request):
         raise web.HTTPNotFound(reason=str(ex))
 
 
+async def get_tasks_deferred(request):
+    """
+    Returns:
+            the list of the tasks due to start that the scheduler has not admitted yet, in the order they will be
+            admitted, with the reason
+
+    :Example:
+              curl -X GET  http://localhost:8081/foglamp/task/deferred
+    """
+    tasks = await server.Server.scheduler.get_deferred_tasks()
+
+    deferred_tasks = []
+    for task in tasks:
+        deferred_tasks.append(
+            {'scheduleId': str(task.schedule_id),
+             'scheduleName': task.schedule_name,
+             'name': task.process_name,
+             'priority': task.priority,
+             'dueTime': str(task.due_time),
+             'reason': task.reason
+             }
+        )
+
+    return web.json_response({'tasks': deferred_tasks})
+
+
+async def get_tasks_timing(request):
+    """
+    Returns:
+            the histograms, in seconds, of the start lateness, of the wait for admission and of the duration of the
+            tasks, with the count of their exit codes, by schedule and by process, since the scheduler started
+
+    :Example:
+              curl -X GET  http://localhost:8081/foglamp/task/timing
+    """
+    schedule_timings, process_timings = await server.Server.scheduler.get_task_timings()
+
+    schedules = []
+    for timing in schedule_timings:
+        schedule = {'scheduleId': str(timing.schedule_id),
+                    'scheduleName': timing.schedule_name,
+                    'name': timing.process_name}
+        schedule.update(timing.toDict())
+        schedules.append(schedule)
+
+    processes = []
+    for timing in process_timings:
+        process = {'name': timing.process_name}
+        process.update(timing.toDict())
+        processes.append(process)
+
+    return web.json_response({'schedules': schedules, 'processes': processes})
+
+
 async def get_task_state(request):
     """
     Returns:
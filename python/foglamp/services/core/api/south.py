@@ -11,6 +11,7 @@ from foglamp.common.storage_client.payload_builder import PayloadBuilder
 from foglamp.services.core.service_registry.service_registry import ServiceRegistry
 from foglamp.services.core.service_registry.exceptions import DoesNotExist
 from foglamp.services.core import connect
+from foglamp.services.core.api import browser
 from foglamp.common.configuration_manager import ConfigurationManager
 
 
@@ -37,6 +38,14 @@ async def _services_with_assets(storage_client, south_services):
         def get_svc(name):
             return next((svc for svc in services_from_registry if svc._name == name), None)
 
+        # The tracked assets of all the services and the readings count of all the assets, joined by service
+        tracked_assets = await _get_tracked_assets(storage_client)
+        asset_counts = {r['asset_code']: r['count'] for r in await browser.get_asset_counts()}
+
+        def get_assets_and_readings(svc_name):
+            return [{"count": asset_counts[asset], "asset": asset} for asset in tracked_assets.get(svc_name, [])
+                    if asset in asset_counts]
+
         for ss in services_from_registry:
             sr_list.append(
                 {
@@ -46,7 +55,7 @@ async def _services_with_assets(storage_client, south_services):
                     'service_port': ss._port,
                     'protocol': ss._protocol,
                     'status': ServiceRecord.Status(int(ss._status)).name.lower(),
-                    'assets': await _get_tracked_assets_and_readings(storage_client, ss._name)
+                    'assets': get_assets_and_readings(ss._name)
                 })
         for _s in south_services:
             south_svc = get_svc(_s)
@@ -59,7 +68,7 @@ async def _services_with_assets(storage_client, south_services):
                         'service_port': '',
                         'protocol': '',
                         'status': '',
-                        'assets': await _get_tracked_assets_and_readings(storage_client, _s)
+                        'assets': get_assets_and_readings(_s)
 
                     })
     except:
@@ -68,25 +77,16 @@ async def _services_with_assets(storage_client, south_services):
         return sr_list
 
 
-async def _get_tracked_assets_and_readings(storage_client, svc_name):
-    asset_json = []
-    payload = PayloadBuilder().SELECT("asset").WHERE(['service', '=', svc_name]).payload()
-    try:
-        result = await storage_client.query_tbl_with_payload('asset_tracker', payload)
-        asset_records = result['rows']
-
-        _readings_client = connect.get_readings_async()
-        for r in asset_records:
-            payload = PayloadBuilder().AGGREGATE(["count", "*"]).ALIAS("aggregate", ("*", "count", "count")) \
-                .GROUP_BY("asset_code").WHERE(['asset_code', '=', r["asset"]]).payload()
-            results = await _readings_client.query(payload)
-            if int(results['count']):
-                r = results['rows'][0]
-                asset_json.append({"count": r['count'], "asset": r['asset_code']})
-    except:
-        raise
-    else:
-        return asset_json
+async def _get_tracked_assets(storage_client):
+    """ Returns the assets tracked by every service, service name -> list of asset codes """
+    payload = PayloadBuilder().SELECT("asset", "service").payload()
+    result = await storage_client.query_tbl_with_payload('asset_tracker', payload)
+    tracked_assets = dict()
+    for r in result['rows']:
+        assets = tracked_assets.setdefault(r['service'], [])
+        if r['asset'] not in assets:
+            assets.append(r['asset'])
+    return tracked_assets
 
 
 async def get_south_services(request):
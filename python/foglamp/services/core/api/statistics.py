@@ -4,10 +4,13 @@
 # See: http://foglamp.readthedocs.io/
 # FOGLAMP_END
 import datetime
+import time
 from aiohttp import web
 
 from foglamp.common.storage_client.payload_builder import PayloadBuilder
+from foglamp.common.web.middleware import versioned
 from foglamp.services.core import connect
+from foglamp.services.core.api import downsampling
 from foglamp.services.core.scheduler.scheduler import Scheduler
 
 __author__ = "Amarendra K. Sinha, Ashish Jabble"
@@ -23,6 +26,10 @@ _help = """
     -------------------------------------------------------------------------------
 """
 
+_HISTORY_VERSION_MAX_AGE_SECONDS = 60
+"""Age of the version of the statistics history after which the clients read it again, the rows older than the time
+unit of a request drop out of it without a new row"""
+
 
 #################################
 #  Statistics
@@ -46,6 +53,17 @@ async def get_statistics(request):
     return web.json_response(result['rows'])
 
 
+async def _get_history_version():
+    """ The ETag version of the statistics history, the time of its newest row, see versioned """
+    payload = PayloadBuilder().AGGREGATE(["max", "history_ts"]) \
+        .ALIAS("aggregate", ("history_ts", "max", "max_history_ts")).payload()
+    result = await connect.get_storage_async().query_tbl_with_payload('statistics_history', payload)
+    rows = result['rows']
+    newest = rows[0]['max_history_ts'] if len(rows) > 0 else None
+    return '{}.{}'.format(newest, int(time.monotonic() // _HISTORY_VERSION_MAX_AGE_SECONDS))
+
+
+@versioned(_get_history_version)
 async def get_statistics_history(request):
     """
     Args:
@@ -57,7 +75,9 @@ async def get_statistics_history(request):
     :Example:
             curl -X GET http://localhost:8081/foglamp/statistics/history?limit=1
             curl -X GET http://localhost:8081/foglamp/statistics/history?key=READINGS
+            curl -X GET "http://localhost:8081/foglamp/statistics/history?days=7&points=500"
     """
+    points = downsampling.get_points(request)
     storage_client = connect.get_storage_async()
 
     # To find the interval in secs from stats collector schedule
@@ -120,8 +140,13 @@ async def get_statistics_history(request):
 
     stats_history_payload = PayloadBuilder(stats_history_chain_payload).payload()
     result_from_storage = await storage_client.query_tbl_with_payload('statistics_history', stats_history_payload)
+    rows = result_from_storage['rows']
+    if points is not None:
+        # At most points history of every key, newest first
+        rows = downsampling.lttb_by_key(rows, 'key', 'value', points)
+        rows.sort(key=lambda row: row['history_ts'], reverse=True)
     group_dict = []
-    for row in result_from_storage['rows']:
+    for row in rows:
         new_dict = {'history_ts': row['history_ts'], row['key']: row['value']}
         group_dict.append(new_dict)
 
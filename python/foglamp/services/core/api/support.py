@@ -4,11 +4,12 @@
 # See: http://foglamp.readthedocs.io/
 # FOGLAMP_END
 
+import asyncio
 import os
-import subprocess
 from pathlib import Path
 from aiohttp import web
 from foglamp.services.core.support import SupportBuilder
+from foglamp.services.core.syslog_index import SyslogIndex
 
 __author__ = "Ashish Jabble"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -22,13 +23,9 @@ _SYSLOG_FILE = '/var/log/syslog'
 __DEFAULT_LIMIT = 20
 __DEFAULT_OFFSET = 0
 __DEFAULT_LOG_SOURCE = 'FogLAMP'
-__GET_SYSLOG_CMD_TEMPLATE = "grep -a -E '({})\[' {} | head -n {} | tail -n {}"
-__GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE = "grep -a -E '({})\[' {} | grep -a -E -i 'error' | head -n {} | tail -n {}"
-__GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE = "grep -a -E '({})\[' {} | grep -a -E -i '(error|warning)' | head -n {} | tail -n {}"
 
-__GET_SYSLOG_TOTAL_MATCHED_LINES = "grep -a -E '({})\[' {} | wc -l"
-__GET_SYSLOG_ERROR_MATCHED_LINES = "grep -a -E '({})\[' {} | grep -a -E -i 'error' | wc -l"
-__GET_SYSLOG_WARNING_MATCHED_LINES = "grep -a -E '({})\[' {} | grep -a -E -i '(error|warning)' | wc -l"
+_syslog_index = None
+"""SyslogIndex of _SYSLOG_FILE, built by the first request"""
 
 _help = """
     -------------------------------------------------------------------------------
@@ -127,36 +124,33 @@ async def get_syslog_entries(request):
         source = request.query['source'] if 'source' in request.query and request.query['source'] != '' else __DEFAULT_LOG_SOURCE
         if source.lower() not in ['foglamp', 'storage']:
             raise ValueError
-        valid_source = {'foglamp': "FogLAMP|FogLAMP Storage", 'storage': 'FogLAMP Storage'}
     except ValueError:
         raise web.HTTPBadRequest(reason="{} is not a valid source".format(source))
 
+    level = None
+    if 'level' in request.query and request.query['level'] != '':
+        level = request.query['level'].lower()
+        if level not in ['error', 'warning']:
+            level = None
+
     try:
-        # Get filtered lines
-        template = __GET_SYSLOG_CMD_TEMPLATE
-        lines = __GET_SYSLOG_TOTAL_MATCHED_LINES
-        if 'level' in request.query and request.query['level'] != '':
-            level = request.query['level'].lower()
-            if level == 'error':
-                template = __GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE
-                lines = __GET_SYSLOG_ERROR_MATCHED_LINES
-            elif level == 'warning':
-                template = __GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE
-                lines = __GET_SYSLOG_WARNING_MATCHED_LINES
-
-        # Get total lines
-        cmd = lines.format(valid_source[source.lower()], _SYSLOG_FILE)
-        t = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE).stdout.readlines()
-        total_lines = int(t[0].decode())
-        cmd = template.format(valid_source[source.lower()], _SYSLOG_FILE, total_lines - offset, limit)
-        a = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE).stdout.readlines()
-        c = [b.decode() for b in a]  # Since "a" contains return value in bytes, convert it to string
+        # Indexing the lines written since the previous request and reading the page do not block the loop
+        loop = asyncio.get_event_loop()
+        c, total_lines = await loop.run_in_executor(None, _get_syslog_index().entries, source.lower(), level, offset,
+                                                    limit)
     except (OSError, Exception) as ex:
         raise web.HTTPException(reason=str(ex))
 
     return web.json_response({'logs': c, 'count': total_lines})
 
 
+def _get_syslog_index():
+    global _syslog_index
+    if _syslog_index is None or _syslog_index.path != _SYSLOG_FILE:
+        _syslog_index = SyslogIndex(_SYSLOG_FILE)
+    return _syslog_index
+
+
 def _get_support_dir():
     if _FOGLAMP_DATA:
         support_dir = os.path.expanduser(_FOGLAMP_DATA + '/tmp/support')
@@ -229,8 +229,10 @@ async def check_schedules(storage, schedule_name):
 async def revert_configuration(storage, key):
     payload = PayloadBuilder().WHERE(['key', '=', key]).payload()
     await storage.delete_from_tbl('configuration', payload)
+    ConfigurationManager(storage).changed()
 
 
 async def revert_parent_child_configuration(storage, key):
     payload = PayloadBuilder().WHERE(['parent', '=', "North"]).AND_WHERE(['child', '=', key]).payload()
     await storage.delete_from_tbl('category_children', payload)
+    ConfigurationManager(storage).changed()
@@ -42,17 +42,40 @@ def _find_c_util(name):
 
 
 def find_c_plugin_libs(direction):
-    libraries = []
+    libraries, directories = find_c_plugins([direction])
+    return [name for name, path in libraries[direction]]
+
+
+def find_c_plugins(directions):
+    """ Find the C plugins of every direction in one walk
+
+    Returns the (name, path) of every C-binary file of every direction, and the modification time of every directory
+    they were looked up in
+    """
+    libraries = {direction: [] for direction in directions}
+    directories = {}
     # FIXME: Duplicate binaries found only in case "make",
     # follow_links=False by default in os.walk() should ignore such symbolic links but right now its not working
     for root, dirs, files in os.walk(_FOGLAMP_ROOT, followlinks=False):
         for name in dirs:
             if 'plugins' in name:
-                p = os.path.join(root, name) + "/" + direction
-                for path, subdirs, f in os.walk(p):
-                    for fname in f:
-                        # C-binary file
-                        if fname.endswith('.so'):
-                            # Replace lib and .so from fname
-                            libraries.append(fname.replace("lib", "").replace(".so", ""))
-    return libraries
+                plugins_dir = os.path.join(root, name)
+                directories[plugins_dir] = _mtime(plugins_dir)
+                for direction in directions:
+                    p = plugins_dir + "/" + direction
+                    for path, subdirs, f in os.walk(p):
+                        directories[path] = _mtime(path)
+                        for fname in f:
+                            # C-binary file
+                            if fname.endswith('.so'):
+                                # Replace lib and .so from fname
+                                libraries[direction].append((fname.replace("lib", "").replace(".so", ""),
+                                                             os.path.join(path, fname)))
+    return libraries, directories
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
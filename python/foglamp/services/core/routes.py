@@ -22,6 +22,7 @@ from foglamp.services.core.api import asset_tracker
 from foglamp.services.core.api import south
 from foglamp.services.core.api import north
 from foglamp.services.core.api import filters
+from foglamp.common import metrics
 
 
 __author__ = "Ashish Jabble, Praveen Garg, Massimiliano Pinto"
@@ -34,6 +35,7 @@ def setup(app):
     app.router.add_route('GET', '/foglamp/ping', api_common.ping)
     app.router.add_route('PUT', '/foglamp/shutdown', api_common.shutdown)
     app.router.add_route('PUT', '/foglamp/restart', api_common.restart)
+    app.router.add_route('GET', '/foglamp/metrics', metrics.get_metrics)
 
     # user
     app.router.add_route('GET', '/foglamp/user', auth.get_user)
@@ -92,6 +94,8 @@ def setup(app):
     app.router.add_route('GET', '/foglamp/task', api_scheduler.get_tasks)
     app.router.add_route('GET', '/foglamp/task/state', api_scheduler.get_task_state)
     app.router.add_route('GET', '/foglamp/task/latest', api_scheduler.get_tasks_latest)
+    app.router.add_route('GET', '/foglamp/task/deferred', api_scheduler.get_tasks_deferred)
+    app.router.add_route('GET', '/foglamp/task/timing', api_scheduler.get_tasks_timing)
     app.router.add_route('GET', '/foglamp/task/{task_id}', api_scheduler.get_task)
     app.router.add_route('PUT', '/foglamp/task/{task_id}/cancel', api_scheduler.cancel_task)
 
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Cron expressions of the CRON schedules
+
+An expression has the five fields of crontab(5), in local time:
+
+    minute (0-59) hour (0-23) day-of-month (1-31) month (1-12 or jan-dec) day-of-week (0-7 or sun-sat, 0 and 7 are Sunday)
+
+A field is ``*`` or a comma separated list of values and ranges (``a-b``), each one optionally followed by a step
+(``/n``). As in cron, when both day-of-month and day-of-week are restricted a day matching either of them fires.
+The macros @yearly, @annually, @monthly, @weekly, @daily, @midnight and @hourly are accepted.
+
+Examples:
+    ``*/5 6-18 * * mon-fri``    every 5 minutes from 6:00 to 18:55, Monday to Friday
+    ``30 2 * * sat,sun``        at 2:30 on Saturday and Sunday
+"""
+
+import bisect
+import datetime
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *"
+}
+
+_MONTH_NAMES = {name: number for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+
+_DAY_NAMES = {name: number for number, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+_MAX_YEARS = 8
+"""An expression that can fire, fires within this number of years, 29 February included"""
+
+_ONE_DAY = datetime.timedelta(days=1)
+_ONE_HOUR = datetime.timedelta(hours=1)
+_ONE_MINUTE = datetime.timedelta(minutes=1)
+
+
+def _parse_field(field, name, low, high, names=None):
+    """Returns the sorted tuple of the values of a field
+
+    Raises:
+        ValueError: The field is not valid
+    """
+    def value(token):
+        if names is not None and token.lower() in names:
+            return names[token.lower()]
+        try:
+            number = int(token)
+        except ValueError:
+            raise ValueError("Invalid {} '{}'".format(name, token)) from None
+        if number < low or number > high:
+            raise ValueError("{} {} out of range {}-{}".format(name.capitalize(), number, low, high))
+        return number
+
+    values = set()
+    for part in field.split(","):
+        step = None
+        if "/" in part:
+            part, step_token = part.split("/", 1)
+            try:
+                step = int(step_token)
+            except ValueError:
+                step = 0
+            if step <= 0:
+                raise ValueError("Invalid step '{}' in {}".format(step_token, name))
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_token, end_token = part.split("-", 1)
+            start, end = value(start_token), value(end_token)
+            if start > end:
+                raise ValueError("Invalid range '{}' in {}".format(part, name))
+        else:
+            start = value(part)
+            # a/n is a-high/n
+            end = start if step is None else high
+
+        values.update(range(start, end + 1, step or 1))
+    return tuple(sorted(values))
+
+
+class CronExpression(object):
+    """A compiled cron expression
+
+    The values of every field are kept sorted, so the next fire time is found by
+    skipping to the next valid value of each field instead of testing every minute.
+    """
+
+    __slots__ = ['expression', '_minutes', '_hours', '_days', '_months', '_weekdays', '_days_or_weekdays']
+
+    def __init__(self, expression: str):
+        """
+        Raises:
+            ValueError: The expression is not valid or it never fires
+        """
+        if not isinstance(expression, str):
+            raise ValueError("The cron expression must be a string")
+        self.expression = " ".join(expression.split())
+
+        fields = _MACROS.get(self.expression.lower(), self.expression).split(" ")
+        if len(fields) != 5:
+            raise ValueError("A cron expression has 5 fields: minute hour day-of-month month day-of-week, "
+                             "{} found in '{}'".format(len(fields), self.expression))
+
+        self._minutes = _parse_field(fields[0], "minute", 0, 59)
+        self._hours = _parse_field(fields[1], "hour", 0, 23)
+        self._days = frozenset(_parse_field(fields[2], "day of month", 1, 31))
+        self._months = _parse_field(fields[3], "month", 1, 12, _MONTH_NAMES)
+        # Sunday is both 0 and 7
+        self._weekdays = frozenset(day % 7 for day in _parse_field(fields[4], "day of week", 0, 7, _DAY_NAMES))
+        # As in cron, a restricted field is one not starting with *
+        self._days_or_weekdays = not fields[2].startswith("*") and not fields[4].startswith("*")
+
+        if self.next_fire_time(datetime.datetime(2000, 1, 1)) is None:
+            raise ValueError("The cron expression '{}' never fires".format(self.expression))
+
+    def __eq__(self, other):
+        return isinstance(other, CronExpression) and self.expression == other.expression
+
+    def __hash__(self):
+        return hash(self.expression)
+
+    def __str__(self):
+        return self.expression
+
+    def __repr__(self):
+        return "CronExpression('{}')".format(self.expression)
+
+    def _day_matches(self, dt):
+        day_matches = dt.day in self._days
+        # isoweekday: Monday 1, Sunday 7
+        weekday_matches = dt.isoweekday() % 7 in self._weekdays
+        if self._days_or_weekdays:
+            return day_matches or weekday_matches
+        return day_matches and weekday_matches
+
+    def next_fire_time(self, after: datetime.datetime):
+        """Returns the first fire time later than after, None if there is none within _MAX_YEARS
+
+        Args:
+            after: naive local time
+        """
+        dt = after.replace(second=0, microsecond=0) + _ONE_MINUTE
+        max_year = dt.year + _MAX_YEARS
+
+        while dt.year <= max_year:
+            if dt.month not in self._months:
+                index = bisect.bisect_left(self._months, dt.month)
+                if index == len(self._months):
+                    dt = datetime.datetime(dt.year + 1, self._months[0], 1)
+                else:
+                    dt = datetime.datetime(dt.year, self._months[index], 1)
+                continue
+
+            if not self._day_matches(dt):
+                dt = datetime.datetime(dt.year, dt.month, dt.day) + _ONE_DAY
+                continue
+
+            if dt.hour not in self._hours:
+                index = bisect.bisect_left(self._hours, dt.hour)
+                if index == len(self._hours):
+                    dt = datetime.datetime(dt.year, dt.month, dt.day) + _ONE_DAY
+                    continue
+                dt = dt.replace(hour=self._hours[index], minute=0)
+
+            if dt.minute not in self._minutes:
+                index = bisect.bisect_left(self._minutes, dt.minute)
+                if index == len(self._minutes):
+                    dt = dt.replace(minute=0) + _ONE_HOUR
+                    continue
+                dt = dt.replace(minute=self._minutes[index])
+
+            return dt
+
+        return None
@@ -17,7 +17,8 @@ __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
 __license__ = "Apache 2.0"
 __version__ = "${VERSION}"
 
-__all__ = ('ScheduledProcess', 'Schedule', 'IntervalSchedule', 'TimedSchedule', 'ManualSchedule', 'StartUpSchedule', 'Task')
+__all__ = ('ScheduledProcess', 'Schedule', 'IntervalSchedule', 'TimedSchedule', 'ManualSchedule', 'StartUpSchedule', 'Task',
+           'CronSchedule', 'DeferredTask')
 
 
 class ScheduledProcess(object):
@@ -38,6 +39,7 @@ class Schedule(object):
         TIMED = 2
         INTERVAL = 3
         MANUAL = 4
+        CRON = 5
 
     """Schedule base class"""
     __slots__ = ['schedule_id', 'name', 'process_name', 'exclusive', 'enabled', 'repeat', 'schedule_type']
@@ -100,6 +102,20 @@ class StartUpSchedule(Schedule):
         super().__init__(self.Type.STARTUP)
 
 
+class CronSchedule(Schedule):
+    """A schedule that is run at the times matching a cron expression"""
+
+    def __init__(self):
+        super().__init__(self.Type.CRON)
+        self.cron = None  # type: str
+        """minute hour day-of-month month day-of-week, see foglamp.services.core.scheduler.cron"""
+
+    def toDict(self):
+        my_dict = super().toDict()
+        my_dict['cron'] = self.cron
+        return my_dict
+
+
 class Task(object):
     """A task represents an operating system process"""
 
@@ -128,3 +144,21 @@ class Task(object):
         self.start_time = None  # type: datetime.datetime
         self.end_time = None  # type: datetime.datetime
         self.exit_code = None  # type: int
+
+
+class DeferredTask(object):
+    """A task due to start that the scheduler has not admitted yet"""
+
+    __slots__ = ['schedule_id', 'schedule_name', 'process_name', 'priority', 'due_time', 'reason']
+
+    def __init__(self):
+        # Instance attributes
+        self.schedule_id = None  # type: uuid.UUID
+        self.schedule_name = None  # type: str
+        self.process_name = None  # type: str
+        self.priority = None  # type: str
+        """Priority class of the process"""
+        self.due_time = None  # type: datetime.datetime
+        """When the task was due to start"""
+        self.reason = None  # type: str
+        """Why the task has not started yet"""
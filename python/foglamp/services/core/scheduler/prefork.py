@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Pre-forked runner of the tasks written in Python
+
+Starting a task through its script costs a shell and a new Python interpreter that imports foglamp, aiohttp and the
+storage client again, seconds on the small gateways. The runner is a Python process, started by the Scheduler, that
+imports the modules of the tasks once and forks a child for every task; the child runs the module as
+``python3 -m <module>`` would. Every task is still an operating system process having its own pid and exit code,
+a task killed by a signal exits with the negative signal number and SIGTERM cancels it.
+
+The runner reads the requests, one JSON object per line, from stdin and writes the replies to the file descriptor
+passed with --reply-fd:
+
+    request     {"module": <module>, "args": [<argument>, ...]}
+    replies     {"pid": <pid>} or {"error": <message>}, in the same order of the requests
+                {"exit": <pid>, "code": <exit code>}, when a child terminates
+
+The runner terminates when its stdin is closed, the children still running are not affected.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import runpy
+import select
+import signal
+import sys
+import traceback
+
+from foglamp.common import logger
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_logger = logger.setup(__name__, level=20)
+
+_ORPHAN_POLL_SECONDS = 1
+"""How often the end of the children of a runner terminated unexpectedly is checked"""
+
+_EXIT_CODE_LOST = 1
+"""Exit code reported for the children of a runner terminated unexpectedly, their real exit code is lost"""
+
+
+class PreforkedProcess(object):
+    """A task forked by the runner
+
+    It offers the part of asyncio.subprocess.Process used by the Scheduler.
+    """
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
+        self._exit = asyncio.Future()
+
+    async def wait(self):
+        """Waits for the process to terminate and returns its exit code"""
+        # Shielded, cancelling a waiter must not cancel the other ones
+        return await asyncio.shield(self._exit)
+
+    def send_signal(self, sig):
+        if self.returncode is not None:
+            # The pid could be already reused
+            raise ProcessLookupError()
+        os.kill(self.pid, sig)
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def _set_exit(self, code):
+        if self.returncode is None:
+            self.returncode = code
+            self._exit.set_result(code)
+
+
+class PreforkRunner(object):
+    """Scheduler side of the runner, it starts the runner on the first request and after a failure"""
+
+    def __init__(self, modules, cwd=None):
+        """
+        Args:
+            modules: modules imported by the runner before forking the tasks
+            cwd: working directory of the runner and of its tasks
+        """
+        self._modules = list(modules)
+        self._cwd = cwd
+        self._process = None  # type: asyncio.subprocess.Process
+        self._reply_reader = None  # type: asyncio.StreamReader
+        self._reply_task = None  # type: asyncio.Task
+        self._pending = []
+        """Futures of the requests waiting for the pid, in the order of the requests"""
+        self._processes = dict()
+        """Dictionary of pid to PreforkedProcess"""
+
+    @property
+    def running(self):
+        return self._reply_task is not None and not self._reply_task.done()
+
+    async def start(self):
+        """Starts the runner
+
+        Raises:
+            EnvironmentError: If the runner could not start
+        """
+        loop = asyncio.get_event_loop()
+        reply_read_fd, reply_write_fd = os.pipe()
+        try:
+            self._process = await asyncio.create_subprocess_exec(
+                sys.executable, "-m", __name__, "--reply-fd", str(reply_write_fd), *self._modules,
+                stdin=asyncio.subprocess.PIPE, cwd=self._cwd, pass_fds=(reply_write_fd,))
+        except EnvironmentError:
+            os.close(reply_read_fd)
+            raise
+        finally:
+            os.close(reply_write_fd)
+
+        self._reply_reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(self._reply_reader),
+                                     os.fdopen(reply_read_fd, "rb", 0))
+        self._reply_task = asyncio.ensure_future(self._read_replies())
+        _logger.info("Task runner started: pid %s, modules %s", self._process.pid, self._modules)
+
+    async def run(self, module, args):
+        """Forks a task running module, as python3 -m module args would do
+
+        Returns:
+            PreforkedProcess
+
+        Raises:
+            EnvironmentError: If the task could not start
+        """
+        if not self.running:
+            await self.start()
+
+        future = asyncio.Future()
+        self._pending.append(future)
+        self._process.stdin.write((json.dumps({"module": module, "args": list(args)}) + "\n").encode())
+        try:
+            await self._process.stdin.drain()
+        except ConnectionError as ex:
+            raise EnvironmentError("Task runner unavailable: {}".format(ex)) from ex
+        return await future
+
+    async def stop(self):
+        """Stops the runner, the tasks still running are not affected"""
+        if self._process is None:
+            return
+        if self._process.returncode is None:
+            self._process.stdin.close()
+        await self._process.wait()
+        if self._reply_task is not None:
+            await self._reply_task
+        self._process = None
+
+    async def _read_replies(self):
+        while True:
+            line = await self._reply_reader.readline()
+            if not line:
+                break
+            reply = json.loads(line.decode())
+            if 'exit' in reply:
+                process = self._processes.pop(reply['exit'], None)
+                if process is not None:
+                    process._set_exit(reply['code'])
+            elif 'pid' in reply:
+                process = PreforkedProcess(reply['pid'])
+                self._processes[process.pid] = process
+                self._pending.pop(0).set_result(process)
+            else:
+                self._pending.pop(0).set_exception(EnvironmentError(reply['error']))
+
+        # The runner terminated
+        for future in self._pending:
+            future.set_exception(EnvironmentError("Task runner terminated"))
+        self._pending = []
+        if self._processes:
+            _logger.warning("Task runner terminated with running tasks, pids %s", list(self._processes.keys()))
+            for process in self._processes.values():
+                asyncio.ensure_future(self._wait_orphan(process))
+            self._processes = dict()
+
+    @staticmethod
+    async def _wait_orphan(process):
+        while True:
+            try:
+                os.kill(process.pid, 0)
+            except ProcessLookupError:
+                break
+            await asyncio.sleep(_ORPHAN_POLL_SECONDS)
+        process._set_exit(_EXIT_CODE_LOST)
+
+
+def _preload(module):
+    importlib.import_module(module)
+    if hasattr(sys.modules[module], '__path__'):
+        importlib.import_module(module + ".__main__")
+
+
+def _run_child(module, args, inherited_fds):
+    """Runs in the forked child, never returns"""
+    code = 1
+    try:
+        # A process group of its own, as the tasks started by the Scheduler
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for fd in inherited_fds:
+            os.close(fd)
+        null_fd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null_fd, 0)
+        os.close(null_fd)
+
+        # The module code has to run again as __main__, only its imports are reused
+        main_module = module + ".__main__" if hasattr(sys.modules.get(module), '__path__') else module
+        sys.modules.pop(main_module, None)
+
+        sys.argv = [module] + args
+        runpy.run_module(module, run_name="__main__", alter_sys=True)
+        code = 0
+    except SystemExit as ex:
+        if ex.code is None:
+            code = 0
+        elif isinstance(ex.code, int):
+            code = ex.code
+        else:
+            print(ex.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _serve(modules, reply_fd):
+    for module in modules:
+        try:
+            _preload(module)
+        except Exception:
+            # The task will fail in the same way and report it
+            traceback.print_exc()
+
+    wakeup_read_fd, wakeup_write_fd = os.pipe()
+    os.set_blocking(wakeup_read_fd, False)
+    os.set_blocking(wakeup_write_fd, False)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    signal.set_wakeup_fd(wakeup_write_fd)
+
+    request_fd = sys.stdin.fileno()
+    reply_file = os.fdopen(reply_fd, "w", buffering=1)
+    buffer = b""
+
+    def reply(message):
+        reply_file.write(json.dumps(message) + "\n")
+
+    while True:
+        try:
+            readable, _, _ = select.select([request_fd, wakeup_read_fd], [], [])
+        except InterruptedError:
+            continue
+
+        if wakeup_read_fd in readable:
+            try:
+                while os.read(wakeup_read_fd, 512):
+                    pass
+            except BlockingIOError:
+                pass
+            while True:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if pid == 0:
+                    break
+                code = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+                reply({"exit": pid, "code": code})
+
+        if request_fd in readable:
+            data = os.read(request_fd, 4096)
+            if not data:
+                # The Scheduler closed the requests
+                break
+            buffer += data
+            while b"\n" in buffer:
+                line, buffer = buffer.split(b"\n", 1)
+                try:
+                    request = json.loads(line.decode())
+                    module, args = request['module'], [str(arg) for arg in request['args']]
+                    pid = os.fork()
+                except Exception as ex:
+                    reply({"error": str(ex)})
+                    continue
+                if pid == 0:
+                    _run_child(module, args, (request_fd, reply_file.fileno(), wakeup_read_fd, wakeup_write_fd))
+                reply({"pid": pid})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FogLAMP pre-forked task runner")
+    parser.add_argument("--reply-fd", type=int, required=True)
+    parser.add_argument("modules", nargs="*")
+    arguments = parser.parse_args()
+    _serve(arguments.modules, arguments.reply_fd)
@@ -9,19 +9,26 @@
 import asyncio
 import collections
 import datetime
+import heapq
+import itertools
+import json
 import logging
 import math
 import time
 import uuid
 import os
-import subprocess
 import signal
 from typing import List
 from foglamp.common.configuration_manager import ConfigurationManager
 from foglamp.common import logger
+from foglamp.common import host
+from foglamp.common import metrics
 from foglamp.common.audit_logger import AuditLogger
 from foglamp.services.core.scheduler.entities import *
+from foglamp.services.core.scheduler.cron import CronExpression
 from foglamp.services.core.scheduler.exceptions import *
+from foglamp.services.core.scheduler.prefork import PreforkRunner
+from foglamp.services.core.scheduler.timing import BUCKET_BOUNDS, TaskTiming
 from foglamp.common.storage_client.exceptions import *
 from foglamp.common.storage_client.payload_builder import PayloadBuilder
 from foglamp.common.storage_client.storage_client import StorageClientAsync
@@ -37,6 +44,16 @@ __version__ = "${VERSION}"
 # FOGLAMP_ROOT env variable
 _FOGLAMP_ROOT = os.getenv("FOGLAMP_ROOT", default='/usr/local/foglamp')
 _SCRIPTS_DIR = os.path.expanduser(_FOGLAMP_ROOT + '/scripts')
+_PYTHON_DIR = os.path.expanduser(_FOGLAMP_ROOT + '/python')
+
+_TASKS_STARTED = metrics.REGISTRY.counter('foglamp_scheduler_tasks_started_total', 'Tasks started by process',
+                                          ('process',))
+
+_TASKS_RUNNING = metrics.REGISTRY.gauge('foglamp_scheduler_tasks_running', 'Tasks running')
+
+_TASK_DURATION = metrics.REGISTRY.histogram('foglamp_scheduler_task_duration_seconds',
+                                            'Time from the start to the end of the tasks by process', ('process',),
+                                            bounds=BUCKET_BOUNDS)
 
 
 class Scheduler(object):
@@ -61,8 +78,9 @@ class Scheduler(object):
     # TODO: Document the fields
     _ScheduleRow = collections.namedtuple('ScheduleRow', ['id', 'name', 'type', 'time', 'day',
                                                           'repeat', 'repeat_seconds', 'exclusive',
-                                                          'enabled', 'process_name'])
-    """Represents a row in the schedules table"""
+                                                          'enabled', 'process_name', 'cron'])
+    """Represents a row in the schedules table, cron is the CronExpression of CRON schedules"""
+    _ScheduleRow.__new__.__defaults__ = (None,)
 
     class _TaskProcess(object):
         """Tracks a running task with some flags"""
@@ -95,6 +113,19 @@ class Scheduler(object):
             self.start_now = False
             """True when a task is queued to start via :meth:`start_task`"""
 
+    class _DeferredStart(object):
+        """Tracks a schedule due to start that has not been admitted yet"""
+
+        __slots__ = ['start_time', 'due_time', 'reason']
+
+        def __init__(self):
+            self.start_time = None
+            """Start time of the entry of _schedule_queue, 0 when queued to start via :meth:`start_task`"""
+            self.due_time = None
+            """Epoch time when the schedule was found due to start"""
+            self.reason = None
+            """Why the task has not been admitted"""
+
     # Constant class attributes
     _DEFAULT_MAX_RUNNING_TASKS = 50
     """Maximum number of running tasks allowed at any given time"""
@@ -102,6 +133,14 @@ class Scheduler(object):
     """Maximum age of rows in the task table that have finished, in days"""
     _DELETE_TASKS_LIMIT = 500
     """The maximum number of rows to delete in the tasks table in a single transaction"""
+    _PURGE_TASKS_TIME_BUDGET_SECONDS = 10
+    """Time after which :meth:`purge_tasks` stops deleting chunks of rows, it resumes later"""
+    _PURGE_TASKS_RETRY_SECONDS = 300
+    """How soon :meth:`purge_tasks` runs again when it stopped because of the time budget"""
+    _TASK_ROWS_DELAY_SECONDS = 1
+    """Maximum time a write of the tasks table is buffered, see :meth:`_queue_task_row`"""
+    _TASK_ROWS_BATCH = 20
+    """Number of buffered writes of the tasks table sent concurrently, and that trigger an early write"""
 
     _HOUR_SECONDS = 3600
     _DAY_SECONDS = 3600 * 24
@@ -118,6 +157,33 @@ class Scheduler(object):
     _PURGE_TASKS_FREQUENCY_SECONDS = _DAY_SECONDS
     """How frequently to purge the tasks table"""
 
+    _PRIORITY_CLASSES = collections.OrderedDict([("high", 0), ("normal", 1), ("low", 2)])
+    """Priority classes of the scheduled processes, tasks of a higher class are admitted first.
+    Tasks of the high class are admitted regardless of the host load and of the storage latency"""
+    _DEFAULT_PRIORITY_CLASS = "normal"
+
+    _DEFAULT_PROCESS_ADMISSION = {
+        "stats collector": {"priority": "high"},
+        "asset rollup": {"priority": "low", "max_running": 1},
+        "purge": {"priority": "low", "max_running": 1},
+        "backup": {"priority": "low", "max_running": 1}
+    }
+    """Priority class and maximum number of running tasks of the scheduled processes"""
+
+    _ADMISSION_RETRY_SECONDS = 5
+    """How often the tasks deferred because of the host load or the storage latency are checked again"""
+
+    _STORAGE_PROBE_SECONDS = 5
+    """Maximum age of the measure of the storage latency"""
+
+    _PYTHON_TASK_MODULES = {
+        "tasks/purge": "foglamp.tasks.purge",
+        "tasks/statistics": "foglamp.tasks.statistics",
+        "tasks/rollup": "foglamp.tasks.rollup",
+        "tasks/north": "foglamp.tasks.north.sending_process"
+    }
+    """Python module run by the script of a task, for the tasks that can be forked by the task runner"""
+
     # Mostly constant class attributes
     _logger = None  # type: logging.Logger
 
@@ -159,8 +225,13 @@ class Scheduler(object):
         """Dictionary of schedules.id to _ScheduleRow"""
         self._schedule_executions = dict()
         """Dictionary of schedules.id to _ScheduleExecution"""
+        self._schedule_queue = []
+        """Min-heap of (start time, sequence number, schedules.id), see :meth:`_queue_schedule`"""
+        self._schedule_queue_sequence = itertools.count()
+        """Orders the entries of _schedule_queue having the same start time"""
         self._task_processes = dict()
         """Dictionary of tasks.id to _TaskProcess"""
+        _TASKS_RUNNING.set_function(lambda: len(self._task_processes))
         self._check_processes_pending = False
         """bool: True when request to run check_processes"""
         self._scheduler_loop_task = None  # type: asyncio.Task
@@ -175,6 +246,32 @@ class Scheduler(object):
         """Delete finished task rows when they become this old"""
         self._purge_tasks_task = None  # type: asyncio.Task
         """asynico task for :meth:`purge_tasks`, if scheduled to run"""
+        self._task_rows = collections.OrderedDict()
+        """Dictionary of tasks.id to [insert, values], the buffered writes of the tasks table"""
+        self._task_rows_task = None  # type: asyncio.Task
+        """asyncio task for :meth:`_write_task_rows`, if there are buffered writes"""
+        self._task_rows_event = None  # type: asyncio.Event
+        """Set to write the buffered writes of the tasks table without waiting"""
+        self._process_admission = dict()
+        """Dictionary of scheduled_processes.name to (priority, maximum number of running tasks or None)"""
+        self._max_load_average = None  # type: float
+        """Load average per CPU above which tasks are deferred, 0 to ignore the load"""
+        self._max_storage_latency = None  # type: float
+        """Storage latency in seconds above which tasks are deferred, 0 to ignore the latency"""
+        self._storage_latency = None  # type: float
+        """Last measure of the storage latency, in seconds"""
+        self._storage_latency_time = None  # type: float
+        """When the storage latency was measured"""
+        self._deferred_starts = collections.OrderedDict()
+        """Dictionary of schedules.id to _DeferredStart, in the order the schedules were due"""
+        self._prefork_processes = set()
+        """Names of the scheduled processes forked by the task runner instead of running their script"""
+        self._prefork_runner = None  # type: PreforkRunner
+        """Pre-forked task runner, None when no scheduled process uses it"""
+        self._schedule_timings = dict()
+        """Dictionary of schedules.id to TaskTiming"""
+        self._process_timings = dict()
+        """Dictionary of scheduled_processes.name to TaskTiming, the timings of all its schedules"""
 
     @property
     def max_completed_task_age(self) -> datetime.timedelta:
@@ -216,10 +313,40 @@ class Scheduler(object):
         else:
             self._check_processes_pending = True
 
+    def _queue_schedule(self, schedule_id, schedule_execution) -> None:
+        """Adds the next start of a schedule to the queue used by :meth:`_check_schedules`
+
+        The entries of a schedule are not removed when its next start changes, an entry is
+        discarded when it reaches the head of the queue and it doesn't match the
+        schedule execution anymore, see :meth:`_is_queue_entry_valid`.
+        """
+        if schedule_execution.start_now:
+            # Manual starts go to the head of the queue
+            start_time = 0
+        elif schedule_execution.next_start_time:
+            start_time = schedule_execution.next_start_time
+        else:
+            return
+        heapq.heappush(self._schedule_queue, (start_time, next(self._schedule_queue_sequence), schedule_id))
+
+    def _is_queue_entry_valid(self, start_time, schedule_id) -> bool:
+        schedule_execution = self._schedule_executions.get(schedule_id)
+        if schedule_execution is None:
+            return False
+        if schedule_execution.start_now:
+            return start_time == 0 or start_time == schedule_execution.next_start_time
+        return start_time == schedule_execution.next_start_time
+
     async def _wait_for_task_completion(self, task_process: _TaskProcess) -> None:
         exit_code = await task_process.process.wait()
         schedule = task_process.schedule
 
+        duration = time.time() - task_process.start_time
+        for timing in self._get_task_timings(schedule):
+            timing.duration.add(duration)
+            timing.exit_codes[exit_code] += 1
+        _TASK_DURATION.labels(schedule.process_name).add(duration)
+
         self._logger.info(
             "Process terminated: Schedule '%s' process '%s' task %s pid %s exit %s,"
             " %s running tasks\n%s",
@@ -244,7 +371,8 @@ class Scheduler(object):
             schedule_deleted = True
 
         if self._paused or schedule_deleted or (
-                        schedule.repeat is None and not schedule_execution.start_now):
+                        schedule.repeat is None and schedule.type != Schedule.Type.CRON and
+                        not schedule_execution.start_now):
             if schedule_execution.next_start_time:
                 schedule_execution.next_start_time = None
                 self._logger.info(
@@ -252,24 +380,19 @@ class Scheduler(object):
         elif schedule.exclusive:
             self._schedule_next_task(schedule)
 
+        # The schedule was skipped by _check_schedules while the task was running
+        self._queue_schedule(schedule.id, schedule_execution)
+
         if schedule.type != Schedule.Type.STARTUP:
             if exit_code < 0 and task_process.cancel_requested:
                 state = Task.State.CANCELED
             else:
                 state = Task.State.COMPLETE
             # Update the task's status
-            update_payload = PayloadBuilder() \
-                .SET(exit_code=exit_code,
-                     state=int(state),
-                     end_time=str(datetime.datetime.now())) \
-                .WHERE(['id', '=', str(task_process.task_id)]) \
-                .payload()
-            try:
-                self._logger.debug('Database command: %s', update_payload)
-                res = await self._storage_async.update_tbl("tasks", update_payload)
-            except Exception:
-                self._logger.exception('Update failed: %s', update_payload)
-                # Must keep going!
+            self._queue_task_row(task_process.task_id,
+                                 dict(exit_code=exit_code,
+                                      state=int(state),
+                                      end_time=str(datetime.datetime.now())))
 
         # Due to maximum running tasks reached, it is necessary to
         # look for schedules that are ready to run even if there
@@ -302,8 +425,22 @@ class Scheduler(object):
         task_process = self._TaskProcess()
         task_process.start_time = time.time()
 
+        process = None
+        module = self._get_prefork_module(schedule.process_name)
+        if module is not None:
+            try:
+                # The script is replaced by the module it runs, the arguments are the same
+                process = await self._prefork_runner.run(module, args_to_exec[1:])
+            except EnvironmentError:
+                self._logger.exception(
+                    "Unable to fork schedule '%s' process '%s' by the task runner, running its script",
+                    schedule.name, schedule.process_name)
+
         try:
-            process = await asyncio.create_subprocess_exec(*args_to_exec, cwd=_SCRIPTS_DIR)
+            if process is None:
+                # The task and the processes it starts have their own process group, see _terminate_task_process
+                process = await asyncio.create_subprocess_exec(*args_to_exec, cwd=_SCRIPTS_DIR,
+                                                               start_new_session=True)
         except EnvironmentError:
             self._logger.exception(
                 "Unable to start schedule '%s' process '%s'\n%s",
@@ -318,6 +455,7 @@ class Scheduler(object):
         # All tasks including STARTUP tasks go into both self._task_processes and self._schedule_executions
         self._task_processes[task_id] = task_process
         self._schedule_executions[schedule.id].task_processes[task_id] = task_process
+        _TASKS_STARTED.labels(schedule.process_name).inc()
 
         self._logger.info(
             "Process started: Schedule '%s' process '%s' task %s pid %s, %s running tasks\n%s",
@@ -326,50 +464,162 @@ class Scheduler(object):
 
         # Startup tasks are not tracked in the tasks table and do not have any future associated with them.
         if schedule.type != Schedule.Type.STARTUP:
-            # The task row needs to exist before the completion handler runs
-            insert_payload = PayloadBuilder() \
-                .INSERT(id=str(task_id),
-                        pid=(self._schedule_executions[schedule.id].
-                             task_processes[task_id].process.pid),
-                        process_name=schedule.process_name,
-                        state=int(Task.State.RUNNING),
-                        start_time=str(datetime.datetime.now())) \
-                .payload()
+            # The task row is inserted before the update done by the completion handler
+            self._queue_task_row(task_id,
+                                 dict(id=str(task_id),
+                                      pid=(self._schedule_executions[schedule.id].
+                                           task_processes[task_id].process.pid),
+                                      process_name=schedule.process_name,
+                                      state=int(Task.State.RUNNING),
+                                      start_time=str(datetime.datetime.now())),
+                                 insert=True)
+            self._task_processes[task_id].future = asyncio.ensure_future(self._wait_for_task_completion(task_process))
+
+    def _get_prefork_module(self, process_name):
+        """Returns the Python module to be forked by the task runner for the process, None to run its script"""
+        if self._prefork_runner is None or process_name not in self._prefork_processes:
+            return None
+        return self._PYTHON_TASK_MODULES.get(self._process_scripts[process_name][0])
+
+    def _setup_prefork_runner(self):
+        """Creates the task runner, it starts when the first task is forked"""
+        modules = set()
+        for process_name in self._prefork_processes:
             try:
-                self._logger.debug('Database command: %s', insert_payload)
-                res = await self._storage_async.insert_into_tbl("tasks", insert_payload)
+                modules.add(self._PYTHON_TASK_MODULES[self._process_scripts[process_name][0]])
+            except KeyError:
+                self._logger.warning(
+                    "Process '%s' can not be forked by the task runner, only Python tasks can", process_name)
+        if modules:
+            self._prefork_runner = PreforkRunner(sorted(modules), cwd=_PYTHON_DIR)
+
+    def _queue_task_row(self, task_id, values, insert=False):
+        """Buffers a write of the row of a task in the tasks table
+
+        The buffered writes are sent by :meth:`_write_task_rows`. Values written
+        before the row is inserted are merged into the insert, so a task that
+        terminates quickly costs a single request.
+        """
+        row = self._task_rows.get(task_id)
+        if row is None:
+            self._task_rows[task_id] = [insert, dict(values)]
+        else:
+            row[1].update(values)
+
+        if self._task_rows_task is None:
+            self._task_rows_event = asyncio.Event()
+            self._task_rows_task = asyncio.ensure_future(self._write_task_rows())
+        elif len(self._task_rows) >= self._TASK_ROWS_BATCH:
+            self._task_rows_event.set()
+
+    async def _write_task_rows(self):
+        """Sends the buffered writes of the tasks table until there are none"""
+        try:
+            while self._task_rows:
+                try:
+                    await asyncio.wait_for(self._task_rows_event.wait(), self._TASK_ROWS_DELAY_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._task_rows_event.clear()
+
+                rows = list(self._task_rows.items())
+                self._task_rows = collections.OrderedDict()
+                for index in range(0, len(rows), self._TASK_ROWS_BATCH):
+                    await asyncio.gather(*[self._write_task_row(task_id, insert, values)
+                                           for task_id, (insert, values) in rows[index:index + self._TASK_ROWS_BATCH]])
+        finally:
+            self._task_rows_task = None
+
+    async def _write_task_row(self, task_id, insert, values):
+        if insert:
+            payload = PayloadBuilder().INSERT(**values).payload()
+            try:
+                self._logger.debug('Database command: %s', payload)
+                await self._storage_async.insert_into_tbl("tasks", payload)
             except Exception:
-                self._logger.exception('Insert failed: %s', insert_payload)
-                # The process has started. Regardless of this error it must be waited on.
-            self._task_processes[task_id].future = asyncio.ensure_future(self._wait_for_task_completion(task_process))
+                self._logger.exception('Insert failed: %s', payload)
+                # Must keep going!
+        else:
+            payload = PayloadBuilder().SET(**values).WHERE(['id', '=', str(task_id)]).payload()
+            try:
+                self._logger.debug('Database command: %s', payload)
+                await self._storage_async.update_tbl("tasks", payload)
+            except Exception:
+                self._logger.exception('Update failed: %s', payload)
+                # Must keep going!
+
+    async def _flush_task_rows(self):
+        """Sends the buffered writes of the tasks table without waiting for the delay"""
+        task_rows_task = self._task_rows_task
+        if task_rows_task is not None:
+            self._task_rows_event.set()
+            await task_rows_task
 
     async def purge_tasks(self):
-        """Deletes rows from the tasks table"""
+        """Deletes the rows of the tasks not running, older than max_completed_task_age, from the tasks table
+
+        The rows are deleted, the oldest first, in chunks of about _DELETE_TASKS_LIMIT rows until
+        none is left or _PURGE_TASKS_TIME_BUDGET_SECONDS have elapsed. In the latter case the purge
+        runs again after _PURGE_TASKS_RETRY_SECONDS.
+
+        Returns:
+            The number of rows deleted
+        """
         if self._paused:
-            return
+            return 0
 
         if not self._ready:
             raise NotReadyError()
 
-        delete_payload = PayloadBuilder() \
-            .WHERE(["state", "!=", int(Task.State.RUNNING)]) \
-            .AND_WHERE(["start_time", "<", str(datetime.datetime.now() - self._max_completed_task_age)]) \
-            .LIMIT(self._DELETE_TASKS_LIMIT) \
-            .payload()
+        max_start_time = str(datetime.datetime.now() - self._max_completed_task_age)
+        purge_start = time.time()
+        rows_deleted = 0
+        completed = False
+
         try:
-            self._logger.debug('Database command: %s', delete_payload)
             while not self._paused:
+                # The start time of the last row of the chunk
+                query_payload = PayloadBuilder() \
+                    .SELECT("start_time") \
+                    .WHERE(["state", "!=", int(Task.State.RUNNING)]) \
+                    .AND_WHERE(["start_time", "<", max_start_time]) \
+                    .ORDER_BY(["start_time", "asc"]) \
+                    .OFFSET(self._DELETE_TASKS_LIMIT - 1) \
+                    .LIMIT(1) \
+                    .payload()
+                self._logger.debug('Database command: %s', query_payload)
+                res = await self._storage_async.query_tbl_with_payload("tasks", query_payload)
+                chunk_end = res['rows'][0]['start_time'] if res and res.get('rows') else None
+
+                # Without a full chunk, the remaining rows are deleted
+                delete_payload = PayloadBuilder() \
+                    .WHERE(["state", "!=", int(Task.State.RUNNING)]) \
+                    .AND_WHERE(["start_time", "<=", chunk_end] if chunk_end is not None
+                               else ["start_time", "<", max_start_time]) \
+                    .payload()
+                self._logger.debug('Database command: %s', delete_payload)
                 res = await self._storage_async.delete_from_tbl("tasks", delete_payload)
-                # TODO: Uncomment below when delete count becomes available in storage layer
-                # if res.get("count") < self._DELETE_TASKS_LIMIT:
-                break
+                chunk_rows_deleted = res.get('rows_affected', 0) if isinstance(res, dict) else 0
+                rows_deleted += chunk_rows_deleted
+
+                if chunk_end is None or chunk_rows_deleted == 0:
+                    completed = True
+                    break
+                if time.time() - purge_start >= self._PURGE_TASKS_TIME_BUDGET_SECONDS:
+                    break
         except Exception:
-            self._logger.exception('Delete failed: %s', delete_payload)
+            self._logger.exception('Purge of the tasks table failed, %s rows deleted', rows_deleted)
             raise
         finally:
             self._purge_tasks_task = None
 
+        self._logger.info("Deleted %s rows from the tasks table in %.3f seconds%s", rows_deleted,
+                          time.time() - purge_start, "" if completed else ", the purge will resume")
+
         self._last_task_purge_time = time.time()
+        if not completed:
+            self._last_task_purge_time -= self._PURGE_TASKS_FREQUENCY_SECONDS - self._PURGE_TASKS_RETRY_SECONDS
+        return rows_deleted
 
     def _check_purge_tasks(self):
         """Schedules :meth:`_purge_tasks` to run if sufficient time has elapsed
@@ -381,76 +631,222 @@ class Scheduler(object):
             self._purge_tasks_task = asyncio.ensure_future(self.purge_tasks())
 
     async def _check_schedules(self):
-        """Starts tasks according to schedules based on the current time"""
-        earliest_start_time = None
+        """Starts tasks according to schedules based on the current time
+
+        The schedules due to start, at the head of _schedule_queue, are moved
+        to _deferred_starts. Their tasks are started in order of priority class
+        when admitted by :meth:`_check_task_limits` and :meth:`_check_resources`,
+        the others remain deferred.
 
-        # Can not iterate over _schedule_executions - it can change mid-iteration
-        for schedule_id in list(self._schedule_executions.keys()):
-            if self._paused or len(self._task_processes) >= self._max_running_tasks:
+        Returns:
+            The earliest start time of the schedules not yet started or of the next
+            admission check, None if there are none
+        """
+        now = self.current_time if self.current_time else time.time()
+
+        if self._paused:
+            return None
+
+        while self._schedule_queue and self._schedule_queue[0][0] <= now:
+            start_time, _, schedule_id = heapq.heappop(self._schedule_queue)
+            if not self._is_queue_entry_valid(start_time, schedule_id):
+                continue
+            deferred_start = self._deferred_starts.get(schedule_id)
+            if deferred_start is not None and self._is_queue_entry_valid(deferred_start.start_time, schedule_id):
+                # Already waiting to start, the task doesn't start twice
+                continue
+            deferred_start = self._DeferredStart()
+            deferred_start.start_time = start_time
+            deferred_start.due_time = now
+            self._deferred_starts[schedule_id] = deferred_start
+
+        retry_admission = False
+
+        # sorted is stable, schedules of the same priority class start in the order they were due
+        for schedule_id, deferred_start in sorted(self._deferred_starts.items(),
+                                                  key=lambda item: self._get_schedule_priority(item[0])):
+            if self._paused:
                 return None
 
+            if self._deferred_starts.get(schedule_id) is not deferred_start:
+                # Changed while awaiting
+                continue
+
+            if not self._is_queue_entry_valid(deferred_start.start_time, schedule_id):
+                # The schedule has been changed
+                del self._deferred_starts[schedule_id]
+                continue
+
             schedule_execution = self._schedule_executions[schedule_id]
 
             try:
                 schedule = self._schedules[schedule_id]
             except KeyError:
                 # The schedule has been deleted
+                del self._deferred_starts[schedule_id]
                 if not schedule_execution.task_processes:
                     del self._schedule_executions[schedule_id]
                 continue
 
             if schedule.enabled is False:
+                # Queued again by enable_schedule
+                del self._deferred_starts[schedule_id]
                 continue
 
             if schedule.exclusive and schedule_execution.task_processes:
+                # Queued again when the task terminates
+                del self._deferred_starts[schedule_id]
                 continue
 
-            # next_start_time is None when repeat is None until the
-            # task completes, at which time schedule_execution is removed
-            next_start_time = schedule_execution.next_start_time
-            if not next_start_time and not schedule_execution.start_now:
-                if not schedule_execution.task_processes:
-                    del self._schedule_executions[schedule_id]
+            # Deferred starts waiting for a task to terminate are checked again by _wait_for_task_completion
+            reason = self._check_task_limits(schedule)
+            if reason is None:
+                reason = await self._check_resources(schedule)
+                retry_admission = retry_admission or reason is not None
+                if self._deferred_starts.get(schedule_id) is not deferred_start:
+                    continue
+            if reason is not None:
+                if reason != deferred_start.reason:
+                    self._logger.info("Start of schedule '%s' deferred: %s", schedule.name, reason)
+                deferred_start.reason = reason
                 continue
 
-            if next_start_time and not schedule_execution.start_now:
-                now = self.current_time if self.current_time else time.time()
-                right_time = now >= next_start_time
-            else:
-                right_time = False
+            del self._deferred_starts[schedule_id]
 
-            if right_time or schedule_execution.start_now:
-                # Start a task
+            # Start a task
+            if schedule_execution.start_now:
+                # Manual start - don't change next_start_time
+                pass
+            elif schedule.exclusive:
+                # Exclusive tasks won't start again until they terminate
+                # Or the schedule doesn't repeat
+                pass
+            else:
+                # _schedule_next_task alters next_start_time
+                self._schedule_next_task(schedule)
+
+            await self._start_task(schedule)
+
+            started = self.current_time if self.current_time else time.time()
+            for timing in self._get_task_timings(schedule):
+                if deferred_start.start_time:
+                    # Not started manually
+                    timing.lateness.add(started - deferred_start.start_time)
+                timing.queue_wait.add(started - deferred_start.due_time)
+
+            # Queued manual execution is ignored when it was
+            # already time to run the task. The task doesn't
+            # start twice even when nonexclusive.
+            # The choice to put this after "await" above was
+            # deliberate. The above "await" could have allowed
+            # queue_task() to run. The following line
+            # will undo that because, after all, the task started.
+            schedule_execution.start_now = False
 
-                if not right_time:
-                    # Manual start - don't change next_start_time
-                    pass
-                elif schedule.exclusive:
-                    # Exclusive tasks won't start again until they terminate
-                    # Or the schedule doesn't repeat
-                    next_start_time = None
-                else:
-                    # _schedule_next_task alters next_start_time
-                    self._schedule_next_task(schedule)
-                    next_start_time = schedule_execution.next_start_time
+        if self._paused:
+            return None
 
-                await self._start_task(schedule)
+        # Discards the entries no longer valid to find the earliest start time
+        while self._schedule_queue and not self._is_queue_entry_valid(self._schedule_queue[0][0],
+                                                                       self._schedule_queue[0][2]):
+            heapq.heappop(self._schedule_queue)
 
-                # Queued manual execution is ignored when it was
-                # already time to run the task. The task doesn't
-                # start twice even when nonexclusive.
-                # The choice to put this after "await" above was
-                # deliberate. The above "await" could have allowed
-                # queue_task() to run. The following line
-                # will undo that because, after all, the task started.
-                schedule_execution.start_now = False
+        next_start_time = self._schedule_queue[0][0] if self._schedule_queue else None
+        if retry_admission:
+            retry_time = now + self._ADMISSION_RETRY_SECONDS
+            next_start_time = retry_time if next_start_time is None else min(next_start_time, retry_time)
+        return next_start_time
 
-            # Keep track of the earliest next_start_time
-            if next_start_time and (earliest_start_time is None or
-                                            earliest_start_time > next_start_time):
-                earliest_start_time = next_start_time
+    def _get_process_admission(self, process_name):
+        """Returns the priority and the maximum number of running tasks, None if unlimited, of a process"""
+        return self._process_admission.get(
+            process_name, (self._PRIORITY_CLASSES[self._DEFAULT_PRIORITY_CLASS], None))
 
-        return earliest_start_time
+    def _get_schedule_priority(self, schedule_id):
+        try:
+            process_name = self._schedules[schedule_id].process_name
+        except KeyError:
+            process_name = None
+        return self._get_process_admission(process_name)[0]
+
+    def _get_task_timings(self, schedule):
+        """Returns the TaskTiming of the process of a schedule and the one of the schedule, if it still exists"""
+        process_timing = self._process_timings.get(schedule.process_name)
+        if process_timing is None:
+            process_timing = TaskTiming()
+            process_timing.process_name = schedule.process_name
+            self._process_timings[schedule.process_name] = process_timing
+
+        if schedule.id not in self._schedules:
+            # Deleted, its timing too
+            return [process_timing]
+
+        schedule_timing = self._schedule_timings.get(schedule.id)
+        if schedule_timing is None:
+            schedule_timing = TaskTiming()
+            schedule_timing.schedule_id = schedule.id
+            self._schedule_timings[schedule.id] = schedule_timing
+        schedule_timing.schedule_name = schedule.name
+        schedule_timing.process_name = schedule.process_name
+
+        return [process_timing, schedule_timing]
+
+    def _check_task_limits(self, schedule):
+        """Returns why a task for the schedule can not start until a running task terminates, None if it can start"""
+        if len(self._task_processes) >= self._max_running_tasks:
+            return "maximum number of running tasks reached"
+
+        max_running = self._get_process_admission(schedule.process_name)[1]
+        if max_running is not None:
+            running = sum(1 for task_process in self._task_processes.values()
+                          if task_process.schedule.process_name == schedule.process_name)
+            if running >= max_running:
+                return "maximum number of running tasks of process '{}' reached".format(schedule.process_name)
+        return None
+
+    async def _check_resources(self, schedule):
+        """Returns why a task for the schedule can not start because of the host load or of the
+        storage latency, None if it can start
+
+        The services, started by STARTUP schedules, and the tasks of the high priority class always start, a busy
+        host must not stop the ingest.
+        """
+        if schedule.type == Schedule.Type.STARTUP:
+            return None
+        if self._get_process_admission(schedule.process_name)[0] == self._PRIORITY_CLASSES["high"]:
+            return None
+
+        if self._max_load_average:
+            load_average = os.getloadavg()[0] / (os.cpu_count() or 1)
+            if load_average > self._max_load_average:
+                return "load average per CPU {:.2f} above {}".format(load_average, self._max_load_average)
+
+        if self._max_storage_latency:
+            latency = await self._get_storage_latency()
+            if latency is None:
+                return "storage not responding"
+            if latency > self._max_storage_latency:
+                return "storage latency {:.0f} ms above {:.0f} ms".format(latency * 1000,
+                                                                         self._max_storage_latency * 1000)
+        return None
+
+    async def _get_storage_latency(self):
+        """Returns the time taken by a minimal query of the tasks table, None if the query failed
+
+        The measure is reused for _STORAGE_PROBE_SECONDS.
+        """
+        if self._storage_latency_time is None or \
+                time.time() - self._storage_latency_time >= self._STORAGE_PROBE_SECONDS:
+            query_payload = PayloadBuilder().SELECT("id").LIMIT(1).payload()
+            begin = time.time()
+            try:
+                await self._storage_async.query_tbl_with_payload("tasks", query_payload)
+                self._storage_latency = time.time() - begin
+            except Exception:
+                self._logger.exception('Query failed: %s', query_payload)
+                self._storage_latency = None
+            self._storage_latency_time = time.time()
+        return self._storage_latency
 
     async def _scheduler_loop(self):
         """Main loop for the scheduler"""
@@ -527,6 +923,11 @@ class Scheduler(object):
 
         schedule_execution.next_start_time = time.mktime(dt.timetuple())
 
+    def _schedule_next_cron_task(self, schedule, schedule_execution, after):
+        """Sets the next start time of a CRON schedule to its first fire time later than after, an epoch time"""
+        next_dt = schedule.cron.next_fire_time(datetime.datetime.fromtimestamp(after))
+        schedule_execution.next_start_time = time.mktime(next_dt.timetuple())
+
     def _schedule_next_task(self, schedule) -> None:
         """Computes the next time to start a task for a schedule.
 
@@ -543,7 +944,7 @@ class Scheduler(object):
         schedule_execution = self._schedule_executions[schedule.id]
         advance_seconds = schedule.repeat_seconds
 
-        if self._paused or advance_seconds is None:
+        if self._paused or (advance_seconds is None and schedule.type != Schedule.Type.CRON):
             schedule_execution.next_start_time = None
             self._logger.info(
                 "Tasks will no longer execute for schedule '%s'", schedule.name)
@@ -557,6 +958,17 @@ class Scheduler(object):
             # Or the schedule was modified after the task started (AVOID_ALTER_NEXT_START)
             return
 
+        if schedule.type == Schedule.Type.CRON:
+            # Fire times passed while an exclusive task was running are skipped
+            after = now if schedule_execution.next_start_time is None else max(
+                now, schedule_execution.next_start_time)
+            self._schedule_next_cron_task(schedule, schedule_execution, after)
+            self._logger.info(
+                "Scheduled task for schedule '%s' to start at %s", schedule.name,
+                datetime.datetime.fromtimestamp(schedule_execution.next_start_time))
+            self._queue_schedule(schedule.id, schedule_execution)
+            return
+
         if advance_seconds:
             advance_seconds *= max([1, math.ceil(
                 (now - schedule_execution.next_start_time) / advance_seconds)])
@@ -583,6 +995,8 @@ class Scheduler(object):
                 "Scheduled task for schedule '%s' to start at %s", schedule.name,
                 datetime.datetime.fromtimestamp(schedule_execution.next_start_time))
 
+            self._queue_schedule(schedule.id, schedule_execution)
+
     def _schedule_first_task(self, schedule, current_time):
         """Determines the time when a task for a schedule will start.
 
@@ -628,9 +1042,13 @@ class Scheduler(object):
                 schedule,
                 schedule_execution,
                 datetime.datetime.fromtimestamp(current_time))
+        elif schedule.type == Schedule.Type.CRON:
+            self._schedule_next_cron_task(schedule, schedule_execution, current_time)
         elif schedule.type == Schedule.Type.STARTUP:
             schedule_execution.next_start_time = current_time
 
+        self._queue_schedule(schedule.id, schedule_execution)
+
         if self._logger.isEnabledFor(logging.INFO):
             self._logger.info(
                 "Scheduled task for schedule '%s' to start at %s", schedule.name,
@@ -666,6 +1084,14 @@ class Scheduler(object):
 
                 schedule_id = uuid.UUID(row.get('id'))
 
+                cron = None
+                if row.get('schedule_type') == Schedule.Type.CRON:
+                    try:
+                        cron = CronExpression(row.get('schedule_cron'))
+                    except ValueError:
+                        self._logger.exception("Schedule '%s' is not loaded", row.get('schedule_name'))
+                        continue
+
                 schedule = self._ScheduleRow(
                     id=schedule_id,
                     name=row.get('schedule_name'),
@@ -676,7 +1102,8 @@ class Scheduler(object):
                     repeat_seconds=repeat_seconds,
                     exclusive=True if row.get('exclusive') == 't' else False,
                     enabled=True if row.get('enabled') == 't' else False,
-                    process_name=row.get('process_name'))
+                    process_name=row.get('process_name'),
+                    cron=cron)
 
                 self._schedules[schedule_id] = schedule
                 self._schedule_first_task(schedule, self._start_time)
@@ -722,6 +1149,31 @@ class Scheduler(object):
                 "type": "integer",
                 "default": str(self._DEFAULT_MAX_COMPLETED_TASK_AGE_DAYS)
             },
+            "process_admission": {
+                "description": "Priority class (high, normal or low) and maximum number of running tasks "
+                               "(max_running) of the scheduled processes. Tasks of a higher class start first, "
+                               "the ones of the high class regardless of the host load and the storage latency",
+                "type": "JSON",
+                "default": json.dumps(self._DEFAULT_PROCESS_ADMISSION)
+            },
+            "max_load_average": {
+                "description": "Tasks, except the ones of the high priority class, are deferred while the "
+                               "1 minute load average per CPU is above this value, 0 to disable the check",
+                "type": "float",
+                "default": "0"
+            },
+            "max_storage_latency_ms": {
+                "description": "Tasks, except the ones of the high priority class, are deferred while the "
+                               "storage latency in milliseconds is above this value, 0 to disable the check",
+                "type": "integer",
+                "default": "0"
+            },
+            "prefork_processes": {
+                "description": "Comma separated names of the scheduled processes, written in Python, started by "
+                               "forking a pre-loaded interpreter instead of running their script",
+                "type": "string",
+                "default": ""
+            },
         }
 
         cfg_manager = ConfigurationManager(self._storage_async)
@@ -731,6 +1183,31 @@ class Scheduler(object):
         self._max_running_tasks = int(config['max_running_tasks']['value'])
         self._max_completed_task_age = datetime.timedelta(
             seconds=int(config['max_completed_task_age_days']['value']) * self._DAY_SECONDS)
+        self._process_admission = self._parse_process_admission(config['process_admission']['value'])
+        self._max_load_average = float(config['max_load_average']['value'])
+        self._max_storage_latency = int(config['max_storage_latency_ms']['value']) / 1000
+        self._prefork_processes = set(
+            name.strip() for name in config['prefork_processes']['value'].split(",") if name.strip())
+
+    def _parse_process_admission(self, value):
+        """Returns the dictionary of process name to (priority, maximum number of running tasks or None)"""
+        process_admission = dict()
+        try:
+            entries = value if isinstance(value, dict) else json.loads(value)
+        except ValueError:
+            self._logger.error("Invalid process_admission, it is ignored: %s", value)
+            return process_admission
+
+        for process_name, entry in entries.items():
+            priority = entry.get("priority", self._DEFAULT_PRIORITY_CLASS)
+            if priority not in self._PRIORITY_CLASSES:
+                self._logger.error("Invalid priority class '%s' of process '%s', valid: %s",
+                                   priority, process_name, list(self._PRIORITY_CLASSES.keys()))
+                priority = self._DEFAULT_PRIORITY_CLASS
+            max_running = entry.get("max_running")
+            process_admission[process_name] = (self._PRIORITY_CLASSES[priority],
+                                               None if max_running is None else int(max_running))
+        return process_admission
 
     async def start(self):
         """Starts the scheduler
@@ -780,6 +1257,7 @@ class Scheduler(object):
         await self._read_config()
         await self._mark_tasks_interrupted()
         await self._read_storage()
+        self._setup_prefork_runner()
 
         self._ready = True
 
@@ -843,12 +1321,7 @@ class Scheduler(object):
                     task_process.process.pid,
                     self._process_scripts[schedule.process_name])
                 try:
-                    # We need to terminate the child processes because now all tasks are started vide a script and
-                    # this creates two unix processes. Scheduler can store pid of the parent shell script process only
-                    # and on termination of the task, both the script shell process and actual task process need to
-                    # be stopped.
-                    self._terminate_child_processes(task_process.process.pid)
-                    task_process.process.terminate()
+                    self._terminate_task_process(task_process.process)
                 except ProcessLookupError:
                     pass  # Process has terminated
 
@@ -858,6 +1331,8 @@ class Scheduler(object):
                 break
             await asyncio.sleep(1)
 
+        await self._flush_task_rows()
+
         if self._task_processes:
             # Before throwing timeout error, just check if there are still any tasks pending for cancellation
             task_count = 0
@@ -871,7 +1346,12 @@ class Scheduler(object):
             if task_count != 0:
                 raise TimeoutError("Timeout Error: Could not stop scheduler as {} tasks are pending".format(task_count))
 
+        if self._prefork_runner is not None:
+            await self._prefork_runner.stop()
+            self._prefork_runner = None
+
         self._schedule_executions = None
+        self._deferred_starts = None
         self._task_processes = None
         self._schedules = None
         self._process_scripts = None
@@ -915,6 +1395,9 @@ class Scheduler(object):
             schedule = IntervalSchedule()
         elif schedule_type == Schedule.Type.MANUAL:
             schedule = ManualSchedule()
+        elif schedule_type == Schedule.Type.CRON:
+            schedule = CronSchedule()
+            schedule.cron = schedule_row.cron.expression
         else:
             raise ValueError("Unknown schedule type {}", schedule_type)
 
@@ -1019,6 +1502,11 @@ class Scheduler(object):
             day = None
             schedule_time = None
 
+        cron = None
+        if isinstance(schedule, CronSchedule):
+            # Raises ValueError
+            cron = CronExpression(schedule.cron)
+
         prev_schedule_row = None
 
         if schedule.schedule_id is None:
@@ -1040,7 +1528,8 @@ class Scheduler(object):
                      schedule_time=str(schedule_time) if schedule_time else '00:00:00',
                      exclusive='t' if schedule.exclusive else 'f',
                      enabled='t' if schedule.enabled else 'f',
-                     process_name=schedule.process_name) \
+                     process_name=schedule.process_name,
+                     schedule_cron=cron.expression if cron else '') \
                 .WHERE(['id', '=', str(schedule.schedule_id)]) \
                 .payload()
             try:
@@ -1064,7 +1553,8 @@ class Scheduler(object):
                         schedule_time=str(schedule_time) if schedule_time else '00:00:00',
                         exclusive='t' if schedule.exclusive else 'f',
                         enabled='t' if schedule.enabled else 'f',
-                        process_name=schedule.process_name) \
+                        process_name=schedule.process_name,
+                        schedule_cron=cron.expression if cron else '') \
                 .payload()
             try:
                 self._logger.debug('Database command: %s', insert_payload)
@@ -1094,7 +1584,8 @@ class Scheduler(object):
             repeat_seconds=repeat_seconds,
             exclusive=schedule.exclusive,
             enabled=schedule.enabled,
-            process_name=schedule.process_name)
+            process_name=schedule.process_name,
+            cron=cron)
 
         self._schedules[schedule.schedule_id] = schedule_row
 
@@ -1112,8 +1603,9 @@ class Scheduler(object):
                 self._logger.exception('Select failed: %s', select_payload)
 
         # Did the schedule change in a way that will affect task scheduling?
-        if schedule.schedule_type in [Schedule.Type.INTERVAL, Schedule.Type.TIMED] and (
+        if schedule.schedule_type in [Schedule.Type.INTERVAL, Schedule.Type.TIMED, Schedule.Type.CRON] and (
                                 is_new_schedule or
+                                    prev_schedule_row.cron != schedule_row.cron or
                                     prev_schedule_row.time != schedule_row.time or
                                 prev_schedule_row.day != schedule_row.day or
                             prev_schedule_row.repeat_seconds != schedule_row.repeat_seconds or
@@ -1247,12 +1739,7 @@ class Scheduler(object):
             else: # else it is a Task e.g. North tasks
                 # Terminate process
                 try:
-                    # We need to terminate the child processes because now all tasks are started vide a script and
-                    # this creates two unix processes. Scheduler can store pid of the parent shell script process only
-                    # and on termination of the task, both the script shell process and actual task process need to
-                    # be stopped.
-                    self._terminate_child_processes(task_process.process.pid)
-                    task_process.process.terminate()
+                    self._terminate_task_process(task_process.process)
                 except ProcessLookupError:
                     pass  # Process has terminated
                 self._logger.info(
@@ -1361,6 +1848,7 @@ class Scheduler(object):
             self._schedule_executions[schedule_row.id] = schedule_execution
 
         schedule_execution.start_now = True
+        self._queue_schedule(schedule_id, schedule_execution)
 
         self._logger.info("Queued schedule '%s' for execution", schedule_row.name)
         self._resume_check_schedules()
@@ -1389,6 +1877,7 @@ class Scheduler(object):
             raise ScheduleNotFoundError(schedule_id)
 
         del self._schedules[schedule_id]
+        self._schedule_timings.pop(schedule_id, None)
 
         # TODO: Inspect race conditions with _set_first
         delete_payload = PayloadBuilder() \
@@ -1429,8 +1918,55 @@ class Scheduler(object):
 
         return tasks
 
+    async def get_task_timings(self):
+        """Retrieves the timing of the tasks started since the Scheduler started
+
+        Returns:
+            A tuple of the list of TaskTiming of the schedules and the list of TaskTiming of the
+            scheduled processes, both sorted by name
+        """
+        if not self._ready:
+            raise NotReadyError()
+
+        return (sorted(self._schedule_timings.values(), key=lambda timing: timing.schedule_name),
+                sorted(self._process_timings.values(), key=lambda timing: timing.process_name))
+
+    async def get_deferred_tasks(self) -> List[DeferredTask]:
+        """Retrieves the tasks due to start that have not been admitted yet
+
+        Returns:
+            A list of DeferredTask objects, in the order they will be admitted
+        """
+        if not self._ready:
+            raise NotReadyError()
+
+        priority_names = {value: name for name, value in self._PRIORITY_CLASSES.items()}
+        tasks = []
+        for schedule_id, deferred_start in sorted(self._deferred_starts.items(),
+                                                  key=lambda item: self._get_schedule_priority(item[0])):
+            try:
+                schedule = self._schedules[schedule_id]
+            except KeyError:
+                continue
+            if deferred_start.reason is None:
+                # Not checked yet
+                continue
+            task = DeferredTask()
+            task.schedule_id = schedule_id
+            task.schedule_name = schedule.name
+            task.process_name = schedule.process_name
+            task.priority = priority_names[self._get_process_admission(schedule.process_name)[0]]
+            task.due_time = datetime.datetime.fromtimestamp(deferred_start.due_time)
+            task.reason = deferred_start.reason
+            tasks.append(task)
+
+        return tasks
+
     async def get_task(self, task_id: uuid.UUID) -> Task:
         """Retrieves a task given its id"""
+        # Tasks just started or terminated are written first
+        await self._flush_task_rows()
+
         query_payload = PayloadBuilder().SELECT("id", "process_name", "state", "start_time", "end_time", "reason", "exit_code")\
             .ALIAS("return", ("start_time", 'start_time'), ("end_time", 'end_time'))\
             .FORMAT("return", ("start_time", "YYYY-MM-DD HH24:MI:SS.MS"), ("end_time", "YYYY-MM-DD HH24:MI:SS.MS"))\
@@ -1486,6 +2022,9 @@ class Scheduler(object):
         query_payload = PayloadBuilder(chain_payload).payload()
         tasks = []
 
+        # Tasks just started or terminated are written first
+        await self._flush_task_rows()
+
         try:
             self._logger.debug('Database command: %s', query_payload)
             res = await self._storage_async.query_tbl_with_payload("tasks", query_payload)
@@ -1541,26 +2080,43 @@ class Scheduler(object):
             self._process_scripts[schedule.process_name])
 
         try:
-            # We need to terminate the child processes because now all tasks are started vide a script and
-            # this creates two unix processes. Scheduler can store pid of the parent shell script process only
-            # and on termination of the task, both the script shell process and actual task process need to
-            # be stopped.
-            self._terminate_child_processes(task_process.process.pid)
-            task_process.process.terminate()
+            self._terminate_task_process(task_process.process)
         except ProcessLookupError:
             pass  # Process has terminated
 
         if task_process.future.cancel() is True:
             await self._wait_for_task_completion(task_process)
 
+    def _terminate_task_process(self, process):
+        """Sends SIGTERM to a task and to the processes it started
+
+        Tasks are started by a script, hence two unix processes, and the Scheduler has the pid of the
+        script only. Every task runs in its own process group, created when it starts, so the group
+        is signalled. A task not leading a group, e.g. it has not created it yet, and its children
+        are signalled one by one.
+
+        Raises:
+            ProcessLookupError: The task has terminated
+        """
+        if process.returncode is not None:
+            # The pid could be already reused
+            raise ProcessLookupError()
+        try:
+            if os.getpgid(process.pid) == process.pid:
+                os.killpg(process.pid, signal.SIGTERM)
+                return
+        except ProcessLookupError:
+            # Terminated, not reaped yet
+            return
+        self._terminate_child_processes(process.pid)
+        process.terminate()
+
     def _terminate_child_processes(self, parent_id):
-        ps_command = subprocess.Popen("ps -o pid --ppid {} --noheaders".format(parent_id), shell=True,
-                                      stdout=subprocess.PIPE)
-        ps_output, err = ps_command.communicate()
-        pids = ps_output.decode().strip().split("\n")
-        for pid_str in pids:
-            if pid_str.strip():
-                os.kill(int(pid_str.strip()), signal.SIGTERM)
+        for pid in host.get_child_pids(parent_id):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
 
     def extract_day_time_from_interval(self, str_interval):
         if 'days' in str_interval:
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Timing of the tasks started by the Scheduler, kept in histograms of fixed size"""
+
+import collections
+
+from foglamp.common import metrics
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+__all__ = ('BUCKET_BOUNDS', 'Histogram', 'TaskTiming')
+
+BUCKET_BOUNDS = (0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 1800, 3600, 7200, 21600, 86400)
+"""Upper bounds of the buckets, in seconds, the last bucket has no upper bound"""
+
+
+class Histogram(metrics.Histogram):
+    """Counts of durations, in seconds, by bucket of the durations of the tasks"""
+
+    __slots__ = []
+
+    def __init__(self):
+        super().__init__(BUCKET_BOUNDS)
+
+
+class TaskTiming(object):
+    """Timing of the tasks of a schedule or of a process"""
+
+    __slots__ = ['schedule_id', 'schedule_name', 'process_name', 'lateness', 'queue_wait', 'duration', 'exit_codes']
+
+    def __init__(self):
+        self.schedule_id = None
+        """None for the timing of a process"""
+        self.schedule_name = None
+        self.process_name = None
+        self.lateness = Histogram()
+        """From the time the task should have started to when it started"""
+        self.queue_wait = Histogram()
+        """From the time the task was found due to when it was admitted, see Scheduler._check_task_limits"""
+        self.duration = Histogram()
+        """From the start to the end of the task"""
+        self.exit_codes = collections.Counter()
+        """Count of the tasks by exit code, negative for the tasks killed by a signal"""
+
+    def merge(self, other):
+        self.lateness.merge(other.lateness)
+        self.queue_wait.merge(other.queue_wait)
+        self.duration.merge(other.duration)
+        self.exit_codes.update(other.exit_codes)
+
+    def toDict(self):
+        return {
+            "lateness": self.lateness.toDict(),
+            "queueWait": self.queue_wait.toDict(),
+            "duration": self.duration.toDict(),
+            "exitCodes": {str(code): count for code, count in sorted(self.exit_codes.items())}
+        }
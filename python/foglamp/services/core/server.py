@@ -29,6 +29,7 @@ from foglamp.common.storage_client.storage_client import ReadingsStorageClientAs
 
 from foglamp.services.core import routes as admin_routes
 from foglamp.services.core.api import configuration as conf_api
+from foglamp.services.core.api import common as common_api
 from foglamp.services.common.microservice_management import routes as management_routes
 
 from foglamp.common.service_record import ServiceRecord
@@ -169,6 +170,46 @@ class Server:
             'description': 'Number of days after which passwords must be changed',
             'type': 'integer',
             'default': '0'
+        },
+        'pingSnapshotInterval': {
+            'description': 'Number of seconds between refreshes of the statistics, health and host details'
+                           ' returned by ping',
+            'type': 'integer',
+            'default': '5'
+        },
+        'maxRequests': {
+            'description': 'Number of the requests handled at once, other than the heavy requests and the readings'
+                           ' exports',
+            'type': 'integer',
+            'default': '32'
+        },
+        'maxHeavyRequests': {
+            'description': 'Number of the requests for readings, statistics history, audit or syslog handled at once,'
+                           ' other than the readings exports',
+            'type': 'integer',
+            'default': '4'
+        },
+        'maxExports': {
+            'description': 'Number of the readings exports streamed at once',
+            'type': 'integer',
+            'default': '2'
+        },
+        'requestRate': {
+            'description': 'Requests per minute allowed to a client address, other than the heavy requests'
+                           ' and the readings exports, 0 for no limit',
+            'type': 'integer',
+            'default': '1200'
+        },
+        'heavyRequestRate': {
+            'description': 'Requests for readings, statistics history, audit or syslog per minute allowed to a'
+                           ' client address, other than the readings exports, 0 for no limit',
+            'type': 'integer',
+            'default': '120'
+        },
+        'exportRate': {
+            'description': 'Readings exports per minute allowed to a client address, 0 for no limit',
+            'type': 'integer',
+            'default': '6'
         }
     }
 
@@ -199,6 +240,9 @@ class Server:
     _asset_tracker = None
     """ Asset tracker """
 
+    _ping_snapshot_task = None
+    """ Task refreshing the snapshot returned by ping """
+
     service_app, service_server, service_server_handler = None, None, None
     core_app, core_server, core_server_handler = None, None, None
 
@@ -309,6 +353,17 @@ class Server:
                 _logger.error("error in retrieving authentication info")
                 raise
 
+            try:
+                middleware.set_admission_limits(
+                    {'light': int(config['maxRequests']['value']),
+                     'heavy': int(config['maxHeavyRequests']['value']),
+                     'export': int(config['maxExports']['value'])},
+                    {'light': int(config['requestRate']['value']),
+                     'heavy': int(config['heavyRequestRate']['value']),
+                     'export': int(config['exportRate']['value'])})
+            except (KeyError, ValueError) as ex:
+                _logger.error("error in retrieving the admission limits, the defaults are used: %s", str(ex))
+
         except Exception as ex:
             _logger.exception(str(ex))
             raise
@@ -346,9 +401,13 @@ class Server:
 
         :rtype: web.Application
         """
-        app = web.Application(middlewares=[middleware.error_middleware, middleware.auth_middleware])
+        app = web.Application(middlewares=[middleware.metrics_middleware, middleware.error_middleware,
+                                           middleware.admission_middleware, middleware.compression_middleware,
+                                           middleware.auth_middleware, middleware.etag_middleware])
         if not auth_required:
-            app = web.Application(middlewares=[middleware.error_middleware, middleware.optional_auth_middleware])
+            app = web.Application(middlewares=[middleware.metrics_middleware, middleware.error_middleware,
+                                               middleware.admission_middleware, middleware.compression_middleware,
+                                               middleware.optional_auth_middleware, middleware.etag_middleware])
         admin_routes.setup(app)
         return app
 
@@ -593,6 +652,7 @@ class Server:
             loop.run_until_complete(cls._start_service_monitor())
 
             loop.run_until_complete(cls.rest_api_config())
+            cls._ping_snapshot_task = asyncio.ensure_future(common_api.refresh_ping_snapshot_periodically())
             cls.service_app = cls._make_app(auth_required=cls.is_auth_required)
             # ssl context
             ssl_ctx = None
@@ -696,6 +756,9 @@ class Server:
 
     @classmethod
     async def stop_rest_server(cls):
+        if cls._ping_snapshot_task is not None:
+            cls._ping_snapshot_task.cancel()
+            cls._ping_snapshot_task = None
         # Delete all user tokens
         await User.Objects.delete_all_user_tokens()
         cls.service_server.close()
@@ -19,6 +19,7 @@ import fnmatch
 import subprocess
 from foglamp.services.core.connect import *
 from foglamp.common import logger
+from foglamp.common import host
 from foglamp.services.core.api.service import get_service_records
 
 __author__ = "Amarendra K Sinha"
@@ -100,7 +101,7 @@ class SupportBuilder:
         # The foglamp entries from the syslog file
         temp_file = self._interim_file_path + "/" + "syslog-{}".format(file_spec)
         try:
-            subprocess.call("grep '{}' {} > {}".format("FogLAMP", _SYSLOG_FILE, temp_file), shell=True)
+            self._filter_syslog("FogLAMP", temp_file)
         except OSError as ex:
             raise RuntimeError("Error in creating {}. Error-{}".format(temp_file, str(ex)))
         pyz.add(temp_file, arcname=basename(temp_file))
@@ -109,11 +110,18 @@ class SupportBuilder:
         # The contents of the syslog file that relate to the database layer (postgres)
         temp_file = self._interim_file_path + "/" + "syslogStorage-{}".format(file_spec)
         try:
-            subprocess.call("grep '{}' {} > {}".format("FogLAMP Storage", _SYSLOG_FILE, temp_file), shell=True)
+            self._filter_syslog("FogLAMP Storage", temp_file)
         except OSError as ex:
             raise RuntimeError("Error in creating {}. Error-{}".format(temp_file, str(ex)))
         pyz.add(temp_file, arcname=basename(temp_file))
 
+    @staticmethod
+    def _filter_syslog(text, out_file):
+        # The lines of the syslog file having text, as grep does
+        with open(_SYSLOG_FILE, 'rb') as syslog, open(out_file, 'wb') as out:
+            needle = text.encode()
+            out.writelines(line for line in syslog if needle in line)
+
     async def add_table_configuration(self, pyz, file_spec):
         # The contents of the configuration table from the storage layer
         temp_file = self._interim_file_path + "/" + "configuration-{}".format(file_spec)
@@ -150,13 +158,15 @@ class SupportBuilder:
         # Details of machine resources, memory size, amount of available memory, storage size and amount of free storage
         temp_file = self._interim_file_path + "/" + "machine-{}".format(file_spec)
         total, used, free = shutil.disk_usage("/")
-        memory = subprocess.Popen('free -h', shell=True, stdout=subprocess.PIPE).stdout.readlines()[1].split()[1:]
+        memory = host.get_memory_info()
+        # As free computes them, the cache includes the reclaimable slab
+        cache = memory.get('Buffers', 0) + memory.get('Cached', 0) + memory.get('SReclaimable', 0)
         data = {
             "about": "Machine resources",
             "platform": sys.platform,
-            "totalMemory": memory[0].decode(),
-            "usedMemory": memory[1].decode(),
-            "freeMemory": memory[2].decode(),
+            "totalMemory": _human_size(memory['MemTotal']),
+            "usedMemory": _human_size(memory['MemTotal'] - memory['MemFree'] - cache),
+            "freeMemory": _human_size(memory['MemFree']),
             "totalDiskSpace_MB": int(total / (1024 * 1024)),
             "usedDiskSpace_MB": int(used / (1024 * 1024)),
             "freeDiskSpace_MB": int(free / (1024 * 1024)),
@@ -166,10 +176,20 @@ class SupportBuilder:
     def add_psinfo(self, pyz, file_spec):
         # A PS listing of al the python applications running on the machine
         temp_file = self._interim_file_path + "/" + "psinfo-{}".format(file_spec)
-        a = subprocess.Popen(
-            'ps -eaf | grep python3', shell=True, stdout=subprocess.PIPE).stdout.readlines()[:-2]  # remove ps command
-        c = [b.decode() for b in a]  # Since "a" contains return value in bytes, convert it to string
+        # The lines of ps -eaf having python3, without a shell and grep
+        ps = subprocess.run(['ps', '-eaf'], stdout=subprocess.PIPE, check=False)
         data = {
-            "runningPythonProcesses": c
+            "runningPythonProcesses": [line.decode() + '\n' for line in ps.stdout.splitlines() if b'python3' in line]
         }
         self.write_to_tar(pyz, temp_file, data)
+
+
+def _human_size(kilobytes):
+    """ A size in kB as free -h shows it, e.g. 7.7G, 15G or 512M """
+    size = kilobytes * 1024
+    for unit in 'KMGTP':
+        size /= 1024
+        for text in ("{:.1f}{}".format(size, unit), "{:d}{}".format(int(size), unit)):
+            if len(text) <= 4:
+                return text
+    return "{:d}P".format(int(size))
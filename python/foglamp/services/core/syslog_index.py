@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Index of the FogLAMP lines of the syslog
+
+The byte offsets of the lines of FogLAMP and of its storage are recorded by source and level, the new lines are
+indexed as the syslog grows. A page of lines is read by seeking to their offsets and the counts are the sizes of the
+index, instead of searching the whole syslog for every request.
+
+The index is built again when the syslog is rotated or truncated.
+"""
+
+import os
+import re
+import threading
+from array import array
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+SOURCES = ('foglamp', 'storage')
+
+LEVELS = (None, 'warning', 'error')
+"""None for the lines of all the levels, warning for the warning and error lines"""
+
+_SOURCE_PATTERNS = {'foglamp': re.compile(rb'(FogLAMP|FogLAMP Storage)\['),
+                    'storage': re.compile(rb'FogLAMP Storage\[')}
+
+_LEVEL_PATTERNS = {'warning': re.compile(rb'(error|warning)', re.IGNORECASE),
+                   'error': re.compile(rb'error', re.IGNORECASE)}
+
+
+class SyslogIndex(object):
+    """The offsets of the FogLAMP lines of a syslog file, shared by the requests of the core"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, inode):
+        self._inode = inode
+        # Offset following the last complete line indexed
+        self._position = 0
+        self._offsets = {(source, level): array('Q') for source in SOURCES for level in LEVELS}
+
+    def _update(self, f):
+        """Indexes the lines of the open syslog f written since the last update"""
+        stat = os.fstat(f.fileno())
+        if stat.st_ino != self._inode or stat.st_size < self._position:
+            # Rotated or truncated
+            self._reset(stat.st_ino)
+        if stat.st_size == self._position:
+            return
+
+        f.seek(self._position)
+        position = self._position
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Being written, indexed by the next update
+                break
+            for source in SOURCES:
+                if _SOURCE_PATTERNS[source].search(line) is None:
+                    continue
+                self._offsets[(source, None)].append(position)
+                for level, pattern in _LEVEL_PATTERNS.items():
+                    if pattern.search(line) is not None:
+                        self._offsets[(source, level)].append(position)
+            position += len(line)
+        self._position = position
+
+    def entries(self, source, level, offset, limit):
+        """Returns (lines, count), the page of the lines of source and level, oldest first, ending offset lines
+        before the last one and the count of all the lines of source and level
+
+        Args:
+            source: one of SOURCES
+            level: one of LEVELS
+            offset: number of the latest lines not returned
+            limit: maximum number of lines returned
+
+        Raises:
+            OSError: the syslog can not be read
+        """
+        with self._lock:
+            with open(self.path, 'rb') as f:
+                self._update(f)
+                offsets = self._offsets[(source, level)]
+                count = len(offsets)
+                end = max(0, count - offset)
+                lines = []
+                for position in offsets[max(0, end - limit):end]:
+                    f.seek(position)
+                    lines.append(f.readline().decode(errors='replace'))
+        return lines, count
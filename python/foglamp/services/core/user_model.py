@@ -7,7 +7,13 @@
 
 """ FogLAMP user entity class with CRUD operations to Storage layer
 
+The verified tokens, the users and the role ids are cached for AUTH_CACHE_TTL_SECONDS so that an authenticated
+request does not need a round trip to Storage. The extensions of the token expiry are written at most once every
+TOKEN_EXPIRY_WRITE_SECONDS for a token, the last one of a period is written by a deferred flush.
 """
+import asyncio
+import collections
+import time
 import uuid
 import hashlib
 
@@ -30,6 +36,11 @@ JWT_ALGORITHM = 'HS256'
 JWT_EXP_DELTA_SECONDS = 30*60  # 30 minutes
 ERROR_MSG = 'Something went wrong'
 USED_PASSWORD_HISTORY_COUNT = 3
+AUTH_CACHE_TTL_SECONDS = 60
+TOKEN_EXPIRY_WRITE_SECONDS = 30
+TOKEN_CACHE_SIZE = 1000
+
+_CachedToken = collections.namedtuple('_CachedToken', ['uid', 'verified_at'])
 
 
 class User:
@@ -72,6 +83,64 @@ class User:
 
     class Objects:
 
+        _token_cache = dict()
+        """token -> _CachedToken, the tokens found in user_logins and verified"""
+
+        _user_cache = dict()
+        """str(uid) -> (user, cached at)"""
+
+        _role_ids_cache = dict()
+        """role name -> (rows, cached at)"""
+
+        _expiry_written_at = dict()
+        """token -> when its expiry was last written"""
+
+        _pending_expiry = dict()
+        """token -> expiry to write by _flush_token_expiry"""
+
+        _expiry_flush_task = None
+
+        @classmethod
+        def clear_cache(cls):
+            cls._token_cache.clear()
+            cls._user_cache.clear()
+            cls._role_ids_cache.clear()
+            cls._expiry_written_at.clear()
+            cls._pending_expiry.clear()
+
+        @classmethod
+        def _evict_token(cls, token):
+            cls._token_cache.pop(token, None)
+            cls._expiry_written_at.pop(token, None)
+            cls._pending_expiry.pop(token, None)
+
+        @classmethod
+        def _evict_user(cls, user_id):
+            cls._user_cache.pop(str(user_id), None)
+            for token, cached in list(cls._token_cache.items()):
+                if str(cached.uid) == str(user_id):
+                    cls._evict_token(token)
+
+        @classmethod
+        def _cache_token(cls, token, uid):
+            now = time.monotonic()
+            if len(cls._token_cache) >= TOKEN_CACHE_SIZE:
+                for cached_token, cached in list(cls._token_cache.items()):
+                    if now - cached.verified_at >= AUTH_CACHE_TTL_SECONDS:
+                        del cls._token_cache[cached_token]
+                if len(cls._token_cache) >= TOKEN_CACHE_SIZE:
+                    cls._token_cache.clear()
+                cls._prune_expiry_written_at(now)
+            cls._token_cache[token] = _CachedToken(uid, now)
+
+        @classmethod
+        def _prune_expiry_written_at(cls, now):
+            """Drops the tokens whose expiry was written more than TOKEN_EXPIRY_WRITE_SECONDS ago, the next
+            extension of their expiry is written at once anyway"""
+            for token, written_at in list(cls._expiry_written_at.items()):
+                if now - written_at >= TOKEN_EXPIRY_WRITE_SECONDS and token not in cls._pending_expiry:
+                    del cls._expiry_written_at[token]
+
         @classmethod
         async def get_roles(cls):
             storage_client = connect.get_storage_async()
@@ -80,9 +149,14 @@ class User:
 
         @classmethod
         async def get_role_id_by_name(cls, name):
+            cached = cls._role_ids_cache.get(name)
+            if cached is not None and time.monotonic() - cached[1] < AUTH_CACHE_TTL_SECONDS:
+                return cached[0]
+
             storage_client = connect.get_storage_async()
             payload = PayloadBuilder().SELECT("id").WHERE(['name', '=', name]).payload()
             result = await storage_client.query_tbl_with_payload('roles', payload)
+            cls._role_ids_cache[name] = (result["rows"], time.monotonic())
             return result["rows"]
 
         @classmethod
@@ -130,6 +204,7 @@ class User:
 
                 payload = PayloadBuilder().SET(enabled="f").WHERE(['id', '=', user_id]).AND_WHERE(['enabled', '=', 't']).payload()
                 result = await storage_client.update_tbl("users", payload)
+                cls._evict_user(user_id)
             except StorageServerError as ex:
                 if ex.error["retryable"]:
                     pass  # retry INSERT
@@ -167,6 +242,7 @@ class User:
                 payload = PayloadBuilder().SET(**kwargs).WHERE(['id', '=', user_id]).AND_WHERE(
                     ['enabled', '=', 't']).payload()
                 result = await storage_client.update_tbl("users", payload)
+                cls._evict_user(user_id)
                 if result['rows_affected']:
                     # FIXME: FOGL-1226 active session delete only in case of role_id and password updation
 
@@ -225,6 +301,13 @@ class User:
 
         @classmethod
         async def get(cls, uid=None, username=None):
+            # Only the lookups by id, as done for every authenticated request, are cached
+            cacheable = uid is not None and username is None
+            if cacheable:
+                cached = cls._user_cache.get(str(uid))
+                if cached is not None and time.monotonic() - cached[1] < AUTH_CACHE_TTL_SECONDS:
+                    return cached[0]
+
             users = await cls.filter(uid=uid, username=username)
             if len(users) == 0:
                 msg = ''
@@ -236,15 +319,52 @@ class User:
                     msg = "User with id:<{}> and name:<{}> does not exist".format(uid, username)
 
                 raise User.DoesNotExist(msg)
+            if cacheable:
+                cls._user_cache[str(uid)] = (users[0], time.monotonic())
             return users[0]
 
         @classmethod
         async def refresh_token_expiry(cls, token):
-            storage_client = connect.get_storage_async()
+            """Extends the expiry of a token
+
+            The expiry is written at once when it was not written in the last TOKEN_EXPIRY_WRITE_SECONDS, else it is
+            left to _flush_token_expiry which writes the last expiry of every token at the end of the period.
+            """
             exp = datetime.now() + timedelta(seconds=JWT_EXP_DELTA_SECONDS)
+            written_at = cls._expiry_written_at.get(token)
+            if written_at is not None and time.monotonic() - written_at < TOKEN_EXPIRY_WRITE_SECONDS:
+                cls._pending_expiry[token] = exp
+                if cls._expiry_flush_task is None:
+                    cls._expiry_flush_task = asyncio.ensure_future(cls._flush_token_expiry())
+                return
+
+            cls._pending_expiry.pop(token, None)
+            cls._expiry_written_at[token] = time.monotonic()
+            await cls._write_token_expiry(token, exp)
+
+        @classmethod
+        async def _write_token_expiry(cls, token, exp):
+            storage_client = connect.get_storage_async()
             payload = PayloadBuilder().SET(token_expiration=str(exp)).WHERE(['token', '=', token]).payload()
             await storage_client.update_tbl("user_logins", payload)
 
+        @classmethod
+        async def _flush_token_expiry(cls):
+            try:
+                await asyncio.sleep(TOKEN_EXPIRY_WRITE_SECONDS)
+                pending = cls._pending_expiry
+                cls._pending_expiry = dict()
+                now = time.monotonic()
+                cls._prune_expiry_written_at(now)
+                for token in pending:
+                    cls._expiry_written_at[token] = now
+                await asyncio.gather(*[cls._write_token_expiry(token, exp) for token, exp in pending.items()],
+                                     return_exceptions=True)
+            finally:
+                cls._expiry_flush_task = None
+                if cls._pending_expiry:
+                    cls._expiry_flush_task = asyncio.ensure_future(cls._flush_token_expiry())
+
         @classmethod
         async def validate_token(cls, token):
             """ check existence and validity of token
@@ -253,6 +373,10 @@ class User:
             :param token:
             :return:
             """
+            cached = cls._token_cache.get(token)
+            if cached is not None and time.monotonic() - cached.verified_at < AUTH_CACHE_TTL_SECONDS:
+                return cached.uid
+
             storage_client = connect.get_storage_async()
             payload = PayloadBuilder().SELECT("token_expiration") \
                 .ALIAS("return", ("token_expiration", 'token_expiration')) \
@@ -278,6 +402,7 @@ class User:
             # as we want to refresh token on each successful request
             # and extend it to keep session alive
             user_payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={'verify_exp': False})
+            cls._cache_token(token, user_payload["uid"])
             return user_payload["uid"]
 
         @classmethod
@@ -349,6 +474,7 @@ class User:
 
         @classmethod
         async def delete_user_tokens(cls, user_id):
+            cls._evict_user(user_id)
             storage_client = connect.get_storage_async()
             payload = PayloadBuilder().WHERE(['user_id', '=', user_id]).payload()
             try:
@@ -362,6 +488,7 @@ class User:
 
         @classmethod
         async def delete_token(cls, token):
+            cls._evict_token(token)
             storage_client = connect.get_storage_async()
             payload = PayloadBuilder().WHERE(['token', '=', token]).payload()
             try:
@@ -375,6 +502,7 @@ class User:
 
         @classmethod
         async def delete_all_user_tokens(cls):
+            cls.clear_cache()
             storage_client = connect.get_storage_async()
             await storage_client.delete_from_tbl("user_logins")
 
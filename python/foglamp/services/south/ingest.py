@@ -14,6 +14,7 @@ from typing import List, Union
 import json
 import copy
 from foglamp.common import logger
+from foglamp.common import metrics
 from foglamp.common import statistics
 from foglamp.common.storage_client.exceptions import StorageServerError
 
@@ -25,6 +26,13 @@ __version__ = "${VERSION}"
 _LOGGER = logger.setup(__name__)  # type: logging.Logger
 _MAX_ATTEMPTS = 2
 
+_READINGS = metrics.REGISTRY.counter('foglamp_ingest_readings_total', 'Readings inserted in the storage')
+
+_DISCARDED_READINGS = metrics.REGISTRY.counter('foglamp_ingest_readings_discarded_total', 'Readings discarded')
+
+_QUEUED_READINGS = metrics.REGISTRY.gauge('foglamp_ingest_readings_queued',
+                                          'Readings buffered in memory, waiting to be inserted in the storage')
+
 # _LOGGER = logger.setup(__name__, level=logging.DEBUG)  # type: logging.Logger
 # _LOGGER = logger.setup(__name__, destination=logger.CONSOLE, level=logging.DEBUG)
 
@@ -238,6 +246,7 @@ class Ingest(object):
 
         cls._insert_readings_task = asyncio.ensure_future(cls._insert_readings())
         cls._readings_lists_not_full = asyncio.Event()
+        _QUEUED_READINGS.set_function(lambda: sum(len(readings_list) for readings_list in cls._readings_lists or []))
 
         cls._stop = False
         cls._started = True
@@ -275,6 +284,7 @@ class Ingest(object):
     def increment_discarded_readings(cls):
         """Increments the number of discarded sensor readings"""
         cls._discarded_readings_stats += 1
+        _DISCARDED_READINGS.inc()
 
     @classmethod
     async def _insert_readings(cls):
@@ -350,6 +360,7 @@ class Ingest(object):
                         # insert_end_time = time.time()
                         # _LOGGER.debug('Inserted %s records in time %s', batch_size, insert_end_time - insert_start_time)
                         cls._readings_stats += batch_size
+                        _READINGS.inc(batch_size)
                         for reading_item in payload['readings']:
                             # Increment the count of received readings to be used for statistics update
                             if reading_item['asset_code'].upper() in cls._sensor_stats:
@@ -369,6 +380,7 @@ class Ingest(object):
                             _LOGGER.error("%s, %s", err_response["source"], err_response["message"])
                             batch_size = len(readings_list)
                             cls._discarded_readings_stats += batch_size
+                            _DISCARDED_READINGS.inc(batch_size)
                     # _LOGGER.debug('End insert: Queue index: %s Batch size: %s', list_index, batch_size)
                     break
                 except Exception as ex:
@@ -381,6 +393,7 @@ class Ingest(object):
                         # Stopping. Discard the entire list upon failure.
                         batch_size = len(readings_list)
                         cls._discarded_readings_stats += batch_size
+                        _DISCARDED_READINGS.inc(batch_size)
                         _LOGGER.warning('Insert failed: Queue index: %s Batch size: %s', list_index, batch_size)
                         break
 
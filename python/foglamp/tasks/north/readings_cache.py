@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+""" Shared cache of the blocks of readings fetched and converted by the north Sending Processes.
+
+Every north stream runs its own Sending Process, so streams sending the same readings to different destinations
+fetch and convert the same reading ids independently. The cache stores the converted blocks in a directory shared
+by all the Sending Processes, in shared memory when available, so the Storage layer is read and the conversion is
+executed once per block instead of once per stream.
+
+Blocks are aligned on reading ids, block n of size s covers the ids from n * s + 1 to (n + 1) * s, so that streams
+at different positions share the same blocks. Only complete blocks are cached, a block is complete when the Storage
+layer holds readings beyond its end. The number of cached blocks is bounded, the least recently used ones are
+removed first.
+
+A block is also keyed on the read_key of its first reading, as the reading ids are used again after the Storage
+layer is reset or restored, a block of the previous readings is then never returned.
+"""
+
+import json
+import os
+import uuid
+
+from foglamp.common import logger
+from foglamp.common.common import _FOGLAMP_ROOT, _FOGLAMP_DATA
+
+__author__ = "Stefano Simonelli"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_LOGGER = logger.setup(__name__)
+
+_SHARED_MEMORY_DIR = "/dev/shm"
+_CACHE_SUB_DIR = "foglamp/north_readings_cache"
+
+
+def default_cache_dir():
+    """ Returns the directory of the cache, shared memory is used if available"""
+    if os.path.isdir(_SHARED_MEMORY_DIR) and os.access(_SHARED_MEMORY_DIR, os.W_OK):
+        return os.path.join(_SHARED_MEMORY_DIR, _CACHE_SUB_DIR)
+    data_dir = _FOGLAMP_DATA if _FOGLAMP_DATA else _FOGLAMP_ROOT + "/data"
+    return os.path.join(os.path.expanduser(data_dir), "tmp", _CACHE_SUB_DIR)
+
+
+class ReadingsBlockCache(object):
+    """ Bounded cache of converted blocks of readings, shared among the north Sending Processes """
+
+    def __init__(self, block_size, max_blocks, cache_dir=None):
+        """
+        Args:
+            block_size: number of reading ids covered by a block
+            max_blocks: maximum number of blocks kept in the cache, for all the block sizes
+            cache_dir: directory shared by the Sending Processes
+        """
+        self._block_size = block_size
+        self._max_blocks = max_blocks
+        self._cache_dir = default_cache_dir() if cache_dir is None else cache_dir
+        os.makedirs(self._cache_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def block_size(self):
+        return self._block_size
+
+    def block_range(self, reading_id):
+        """ Returns the first and the last reading id of the block containing reading_id"""
+        block_idx = (reading_id - 1) // self._block_size
+        return block_idx * self._block_size + 1, (block_idx + 1) * self._block_size
+
+    def _block_file(self, first_id, read_key):
+        return os.path.join(self._cache_dir, "{}_{}_{}.json".format(self._block_size, first_id, read_key))
+
+    def get(self, first_id, read_key):
+        """ Returns the converted rows of the block starting at first_id, None if the block is not cached
+
+        Args:
+            first_id: first reading id of the block
+            read_key: read_key of the first reading of the Storage layer from first_id
+        """
+        file_name = self._block_file(first_id, read_key)
+        try:
+            with open(file_name, "r") as block_file:
+                rows = json.load(block_file)
+            # Tracks the usage for the removal of the least recently used blocks
+            os.utime(file_name)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return rows
+
+    def put(self, first_id, read_key, rows):
+        """ Stores the converted rows of a complete block, the file is replaced atomically as several
+        Sending Processes could store the same block at the same time
+        """
+        if self._max_blocks <= 0:
+            return
+        file_name = self._block_file(first_id, read_key)
+        tmp_file_name = "{}.{}.tmp".format(file_name, uuid.uuid4().hex)
+        try:
+            with open(tmp_file_name, "w") as block_file:
+                json.dump(rows, block_file)
+            os.replace(tmp_file_name, file_name)
+        except OSError as ex:
+            _LOGGER.warning("Unable to cache the block of readings starting at |%s| - error details |%s|",
+                            first_id, str(ex))
+            try:
+                os.remove(tmp_file_name)
+            except OSError:
+                pass
+            return
+        self._evict()
+
+    def _evict(self):
+        """ Removes the least recently used blocks exceeding the maximum number of blocks"""
+        try:
+            entries = [entry for entry in os.scandir(self._cache_dir) if entry.name.endswith(".json")]
+        except OSError:
+            return
+        if len(entries) <= self._max_blocks:
+            return
+        by_usage = []
+        for entry in entries:
+            try:
+                by_usage.append((entry.stat().st_mtime, entry.path))
+            except OSError:
+                # Already removed by another Sending Process
+                pass
+        by_usage.sort()
+        for _, path in by_usage[:len(by_usage) - self._max_blocks]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -26,6 +26,8 @@ import datetime
 import signal
 import json
 import uuid
+import collections
+import concurrent.futures
 
 import foglamp.plugins.north.common.common as plugin_common
 from foglamp.common.parser import Parser
@@ -36,6 +38,9 @@ from foglamp.common.jqfilter import JQFilter
 from foglamp.common.audit_logger import AuditLogger
 from foglamp.common.process import FoglampProcess
 from foglamp.common import logger
+from foglamp.common import metrics
+from foglamp.tasks.north.readings_cache import ReadingsBlockCache
+from foglamp.tasks.north.stream_position import StreamPositionJournal
 
 __author__ = "Stefano Simonelli, Massimiliano Pinto, Mark Riddoch, Amarendra K Sinha"
 __copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
@@ -51,6 +56,11 @@ _MESSAGES_LIST = {
     "i000003": _MODULE_NAME + " disabled.",
     "i000004": "no data will be sent, the stream id is disabled - stream id |{0}|",
     "i000005": "plugin undefined, execution terminated",
+    "i000006": "backfill mode started - readings to send |{0}| - target reading id |{1}|",
+    "i000007": "backfill mode completed, normal streaming resumed - last reading id |{0}|",
+    "i000008": "backfill progress - position |{0}| - target |{1}| - pending |{2}| - readings/sec |{3:.1f}| "
+               "- eta seconds |{4}|",
+    "i000009": "position recovered from the local journal - position |{0}| - position in the Storage Layer |{1}|",
     # Warning / Error messages
     "e000000": "general error",
     "e000001": "cannot start the logger - error details |{0}|",
@@ -88,11 +98,24 @@ _MESSAGES_LIST = {
     "e000031": "unable to convert in memory data structure related to the readings data "
                "- error details |{0}| - row |{1}|",
     "e000032": "asset code not defined - row |{0}|",
+    "e000033": "cannot evaluate the readings backlog - error details |{0}|",
+    "e000034": "cannot use the shared readings cache, the readings are fetched directly - error details |{0}|",
+    "e000035": "cannot use the local journal of the position reached - error details |{0}|",
+    "e000036": "cannot update the reached position, it will be retried - error details |{0}|",
 
 }
 """ Messages used for Information, Warning and Error notice """
 
 _LOGGER = logger.setup(__name__)
+
+_SENT_READINGS = metrics.REGISTRY.counter('foglamp_north_readings_sent_total', 'Rows sent by the north plugin')
+
+_SEND_ERRORS = metrics.REGISTRY.counter('foglamp_north_send_errors_total', 'Blocks the north plugin failed to send')
+
+_SEND_DURATION = metrics.REGISTRY.histogram('foglamp_north_send_duration_seconds',
+                                            'Time of the north plugin to send a block of rows')
+""" The sending process is a task without a management API, the metrics of a run are logged when it completes"""
+
 _event_loop = ""
 _log_performance = False
 """ Enable/Disable performance logging, enabled using a command line parameter"""
@@ -151,6 +174,38 @@ def apply_date_format(in_data):
     return timestamp
 
 
+def apply_date_format_block(timestamps):
+    """ Block level version of apply_date_format, normalizes the timestamps of a whole block of data in one pass.
+    The timestamps of a block retrieved from the Storage layer usually share the same layout, in this case
+    the layout of the first one is evaluated and the same slicing/padding is applied to all of them,
+    otherwise every timestamp is evaluated by apply_date_format.
+    Args:
+        the list of date time strings to format
+    Returns:
+        the list of the newly formatted datetime strings, in the same order
+    """
+    if len(timestamps) == 0:
+        return []
+    first = timestamps[0]
+    length = len(first)
+    if length >= 19 and len(set(map(len, timestamps))) == 1:
+        # Identifies the position of the timezone (+XY:WZ or +XY), if any
+        if first[-6] in "+-":
+            zone_index = length - 6
+        elif first[-3] in "+-":
+            zone_index = length - 3
+        else:
+            zone_index = -1
+        if zone_index == -1:
+            if all(ts[-6] not in "+-" and ts[-3] not in "+-" for ts in timestamps):
+                # Same padding for all the timestamps, e.g. .000000+00
+                suffix = apply_date_format(first)[length:]
+                return [ts + suffix for ts in timestamps]
+        elif all(ts[zone_index] in "+-" for ts in timestamps):
+            return [ts[:zone_index] + "+00" for ts in timestamps]
+    return [apply_date_format(ts) for ts in timestamps]
+
+
 def _performance_log(func):
     """ Logs information for performance measurement """
 
@@ -201,7 +256,10 @@ class SendingProcess(FoglampProcess):
     TASK_SLEEP_MAX_INCREMENTS = 7
     """ Maximum number of increments for the sleep handling, the amount of time is doubled at every sleep """
     TASK_SEND_UPDATE_POSITION_MAX = 10
-    """ the position is updated after the specified numbers of interactions of the sending task """
+    """ the position is updated after the specified numbers of interactions of the sending task,
+    used when checkpointInterval is 0 """
+    BACKFILL_PROGRESS_INTERVAL = 30
+    """ Minimum number of seconds between two publications of the backfill progress """
     _NORTH_PATH = "foglamp.plugins.north."
     """Filesystem path where the norths reside"""
     _PLUGIN_TYPE = "north"
@@ -242,6 +300,48 @@ class SendingProcess(FoglampProcess):
             "type": "integer",
             "default": "10",
             "order": "12"
+        },
+        "backfillThreshold": {
+            "description": "Number of readings still to send above which the backfill mode is used to catch up, "
+                           "0 disables the backfill mode",
+            "type": "integer",
+            "default": "10000",
+            "order": "20"
+        },
+        "backfillSegments": {
+            "description": "Number of blocks of blockSize readings fetched concurrently in backfill mode",
+            "type": "integer",
+            "default": "4",
+            "order": "21"
+        },
+        "backfillWorkers": {
+            "description": "Number of processes used to transform the readings in backfill mode, "
+                           "0 transforms them in the sending process",
+            "type": "integer",
+            "default": "2",
+            "order": "22"
+        },
+        "readingsCacheBlocks": {
+            "description": "Number of blocks of readings kept in the cache shared by the north streams "
+                           "sending readings, 0 disables the cache",
+            "type": "integer",
+            "default": "0",
+            "order": "23"
+        },
+        "checkpointInterval": {
+            "description": "Maximum time in seconds between two updates of the position reached in the Storage "
+                           "layer, the position is stored in a local journal after every block sent, "
+                           "0 disables the journal and updates the position every few blocks sent",
+            "type": "integer",
+            "default": "5",
+            "order": "24"
+        },
+        "checkpointReadings": {
+            "description": "Number of rows sent after which the position reached is updated in the Storage layer "
+                           "without waiting for checkpointInterval",
+            "type": "integer",
+            "default": "10000",
+            "order": "25"
         }
     }
 
@@ -256,6 +356,12 @@ class SendingProcess(FoglampProcess):
             'blockSize': int(self._CONFIG_DEFAULT['blockSize']['default']),
             'sleepInterval': float(self._CONFIG_DEFAULT['sleepInterval']['default']),
             'memory_buffer_size': int(self._CONFIG_DEFAULT['memory_buffer_size']['default']),
+            'backfillThreshold': int(self._CONFIG_DEFAULT['backfillThreshold']['default']),
+            'backfillSegments': int(self._CONFIG_DEFAULT['backfillSegments']['default']),
+            'backfillWorkers': int(self._CONFIG_DEFAULT['backfillWorkers']['default']),
+            'readingsCacheBlocks': int(self._CONFIG_DEFAULT['readingsCacheBlocks']['default']),
+            'checkpointInterval': float(self._CONFIG_DEFAULT['checkpointInterval']['default']),
+            'checkpointReadings': int(self._CONFIG_DEFAULT['checkpointReadings']['default']),
         }
         self._config_from_manager = ""
         self._module_template = self._NORTH_PATH + "empty." + "empty"
@@ -292,6 +398,19 @@ class SendingProcess(FoglampProcess):
         self._memory_buffer_send_idx = 0
         """" Used to to managed the in memory buffer for the fetch/send operations """
         self._event_loop = asyncio.get_event_loop() if loop is None else loop
+        self._backfill = None
+        """" Status of the backfill mode, None when the process is streaming normally """
+        self._backfill_executor = None
+        """" Pool of processes used to transform the readings in backfill mode """
+        self._readings_cache = None
+        """" Cache of the converted blocks of readings shared with the other north streams """
+        self._position_journal = None
+        """" Local journal of the position reached """
+        self._checkpoint = None
+        """" Position sent and not yet updated in the Storage layer, None when the journal is not used """
+        self._task_checkpoint_run = True
+        self._task_checkpoint_task_id = None
+        """" Used to manage the updates of the position in the Storage layer """
 
     @staticmethod
     def _signal_handler(_signal_num, _stack_frame):
@@ -336,6 +455,100 @@ class SendingProcess(FoglampProcess):
         await self._last_object_id_update(update_last_object_id)
         await self._update_statistics(tot_num_sent)
         await self._audit.information(self._AUDIT_CODE, {"sentRows": tot_num_sent})
+        if self._backfill is not None:
+            await self._backfill_progress(update_last_object_id, tot_num_sent)
+
+    async def _backfill_progress(self, position, num_sent):
+        """ Publishes the catch-up progress and the estimated time to complete the backfill"""
+        self._backfill['sent'] += num_sent
+        now = time.time()
+        if now - self._backfill['published'] < self.BACKFILL_PROGRESS_INTERVAL and \
+                position < self._backfill['target']:
+            return
+        self._backfill['published'] = now
+        elapsed = now - self._backfill['start_time']
+        rate = self._backfill['sent'] / elapsed if elapsed > 0 else 0.0
+        pending = max(self._backfill['target'] - position, 0)
+        eta = int(pending / rate) if rate > 0 else None
+        SendingProcess._logger.info(_MESSAGES_LIST["i000008"].format(position, self._backfill['target'],
+                                                                     pending, rate, eta))
+        await self._audit.information(self._AUDIT_CODE, {"backfill": {"position": position,
+                                                                      "target": self._backfill['target'],
+                                                                      "pending": pending,
+                                                                      "rate": round(rate, 1),
+                                                                      "eta": eta}})
+
+    async def _checkpoint_setup(self):
+        """ Enables the local journal of the position reached, recovering the position journaled if the process
+        terminated before updating the Storage layer"""
+        if self._config.get('checkpointInterval', 0) <= 0:
+            return
+        try:
+            self._position_journal = StreamPositionJournal(self._stream_id, self._name)
+            journaled = self._position_journal.read()
+        except Exception as _ex:
+            SendingProcess._logger.warning(_MESSAGES_LIST["e000035"].format(str(_ex)))
+            self._position_journal = None
+            return
+        position = await self._last_object_id_read()
+        if journaled is not None:
+            journal_position, journal_sent, journal_checkpoint = journaled
+            # Uses the journal only if the position was not changed from outside after the last update
+            if journal_checkpoint == position and journal_position > position:
+                SendingProcess._logger.info(_MESSAGES_LIST["i000009"].format(journal_position, position))
+                await self._update_position_reached(journal_position, journal_sent)
+                position = journal_position
+        self._checkpoint = {'position': position, 'sent': 0, 'checkpoint': position, 'event': asyncio.Event(),
+                            'lock': asyncio.Lock()}
+
+    async def _checkpoint_journal(self):
+        """ Writes the position reached into the local journal, in a thread as the file is synced, one write
+        at a time so that the journal is never older than the position"""
+        async with self._checkpoint['lock']:
+            try:
+                await self._event_loop.run_in_executor(None, self._position_journal.write,
+                                                       self._checkpoint['position'], self._checkpoint['sent'],
+                                                       self._checkpoint['checkpoint'])
+            except OSError as _ex:
+                SendingProcess._logger.warning(_MESSAGES_LIST["e000035"].format(str(_ex)))
+
+    async def _checkpoint_sent(self, position, num_sent):
+        """ Journals the position reached, the update of the Storage layer is anticipated if enough rows
+        have been sent"""
+        self._checkpoint['position'] = position
+        self._checkpoint['sent'] += num_sent
+        await self._checkpoint_journal()
+        if self._checkpoint['sent'] >= self._config['checkpointReadings']:
+            self._checkpoint['event'].set()
+
+    async def _checkpoint_update(self):
+        """ Updates the Storage layer with the position journaled, the update is retried at the next checkpoint
+        in case of an error"""
+        position = self._checkpoint['position']
+        sent = self._checkpoint['sent']
+        if position == self._checkpoint['checkpoint'] and sent == 0:
+            return
+        # Rows sent during the update are accounted at the next checkpoint
+        self._checkpoint['sent'] -= sent
+        try:
+            await self._update_position_reached(position, sent)
+        except Exception as _ex:
+            self._checkpoint['sent'] += sent
+            SendingProcess._logger.error(_MESSAGES_LIST["e000036"].format(str(_ex)))
+            return
+        self._checkpoint['checkpoint'] = position
+        await self._checkpoint_journal()
+
+    async def _task_checkpoint(self):
+        """ Updates the position reached in the Storage layer every checkpointInterval seconds, or earlier
+        if checkpointReadings rows have been sent"""
+        while self._task_checkpoint_run:
+            try:
+                await asyncio.wait_for(self._checkpoint['event'].wait(), self._config['checkpointInterval'])
+            except asyncio.TimeoutError:
+                pass
+            self._checkpoint['event'].clear()
+            await self._checkpoint_update()
 
     async def _task_send_data(self):
         """ Sends the data from the in memory structure to the destination using the loaded plugin"""
@@ -356,11 +569,14 @@ class SendingProcess(FoglampProcess):
                     new_last_object_id = None
                     num_sent = 0
                     if self._memory_buffer[self._memory_buffer_send_idx] is not None:  # if there are data to send
+                        send_start = time.monotonic()
                         try:
                             data_sent, new_last_object_id, num_sent = \
                                 await self._plugin.plugin_send(self._plugin_handle,
                                                                self._memory_buffer[self._memory_buffer_send_idx], self._stream_id)
+                            _SEND_DURATION.add(time.monotonic() - send_start)
                         except Exception as ex:
+                            _SEND_ERRORS.inc()
                             _message = _MESSAGES_LIST["e000021"].format(ex)
                             SendingProcess._logger.error(_message)
                             await self._audit.failure(self._AUDIT_CODE, {"error - on _task_send_data": _message})
@@ -369,6 +585,7 @@ class SendingProcess(FoglampProcess):
                             await asyncio.sleep(sleep_time)
 
                         if data_sent:
+                            _SENT_READINGS.inc(num_sent)
                             # asset tracker checking
                             for _reads in self._memory_buffer[self._memory_buffer_send_idx]:
                                 payload = {"asset": _reads['asset_code'], "event": "Egress", "service": self._name,
@@ -378,9 +595,12 @@ class SendingProcess(FoglampProcess):
                                         payload)
                                     self._tracked_assets.append(payload)
 
-                            db_update = True
-                            update_last_object_id = new_last_object_id
-                            tot_num_sent = tot_num_sent + num_sent
+                            if self._checkpoint is not None:
+                                await self._checkpoint_sent(new_last_object_id, num_sent)
+                            else:
+                                db_update = True
+                                update_last_object_id = new_last_object_id
+                                tot_num_sent = tot_num_sent + num_sent
                             self._memory_buffer[self._memory_buffer_send_idx] = None
                             self._memory_buffer_send_idx += 1
                             self._task_send_data_sem.release()
@@ -426,10 +646,17 @@ class SendingProcess(FoglampProcess):
 
     @staticmethod
     def _transform_in_memory_data_statistics(raw_data):
+        try:
+            # Adds timezone UTC to the whole block in one pass
+            timestamps = apply_date_format_block([row['ts'] for row in raw_data])
+        except Exception:
+            # Malformed rows are identified and skipped by the row by row handling
+            timestamps = None
+
         converted_data = []
-        for row in raw_data:
+        for idx, row in enumerate(raw_data):
             try:
-                timestamp = apply_date_format(row['ts'])  # Adds timezone UTC
+                timestamp = apply_date_format(row['ts']) if timestamps is None else timestamps[idx]
                 asset_code = row['key'].strip()
 
                 # Skips row having undefined asset_code
@@ -478,8 +705,15 @@ class SendingProcess(FoglampProcess):
             so these rows will generate an exception and will be skipped.
         """
 
+        try:
+            # Adds timezone UTC to the whole block in one pass
+            timestamps = apply_date_format_block([row['user_ts'] for row in raw_data])
+        except Exception:
+            # Malformed rows are identified and skipped by the row by row handling
+            timestamps = None
+
         converted_data = []
-        for row in raw_data:
+        for idx, row in enumerate(raw_data):
 
             try:
 
@@ -493,7 +727,7 @@ class SendingProcess(FoglampProcess):
                     for key in list(payload.keys()):
                         value = payload[key]
                         payload[key] = plugin_common.convert_to_type(value)
-                    timestamp = apply_date_format(row['user_ts'])  # Adds timezone UTC
+                    timestamp = apply_date_format(row['user_ts']) if timestamps is None else timestamps[idx]
                     new_row = {
                         'id': row['id'],
                         'asset_code': asset_code,
@@ -515,10 +749,13 @@ class SendingProcess(FoglampProcess):
         raw_data = None
         converted_data = []
         try:
-            # Loads data, +1 as > is needed
-            readings = await self._readings.fetch(last_object_id + 1, self._config['blockSize'])
-            raw_data = readings['rows']
-            converted_data = self._transform_in_memory_data_readings(raw_data)
+            if self._readings_cache is not None:
+                converted_data = await self._load_data_into_memory_readings_cached(last_object_id)
+            else:
+                # Loads data, +1 as > is needed
+                readings = await self._readings.fetch(last_object_id + 1, self._config['blockSize'])
+                raw_data = readings['rows']
+                converted_data = self._transform_in_memory_data_readings(raw_data)
         except aiohttp.client_exceptions.ClientPayloadError as _ex:
             SendingProcess._logger.warning(_MESSAGES_LIST["e000009"].format(str(_ex)))
         except Exception as _ex:
@@ -526,6 +763,62 @@ class SendingProcess(FoglampProcess):
             raise
         return converted_data
 
+    async def _load_data_into_memory_readings_cached(self, last_object_id):
+        """ Loads the readings following last_object_id up to the end of their block of the shared cache,
+        blocks without readings to send are skipped if complete"""
+        while True:
+            first_id, last_id = self._readings_cache.block_range(last_object_id + 1)
+            rows, is_complete = await self._fetch_readings_block(first_id, last_id)
+            converted_data = [row for row in rows if row['id'] > last_object_id]
+            if converted_data or not is_complete:
+                return converted_data
+            last_object_id = last_id
+
+    async def _fetch_readings_block(self, first_id, last_id):
+        """ Retrieves the converted readings of a block of the shared cache, from the cache if available
+        otherwise from the Storage Layer, storing the block into the cache when it is complete.
+
+        Returns:
+            rows: the converted readings having id between first_id and last_id
+            is_complete: True if no more readings will be added to the block
+        """
+        # The read_key of the first reading identifies the block, the reading ids are used again after a reset or
+        # a restore of the Storage Layer
+        first = await self._readings.fetch(first_id, 1)
+        if not first['rows']:
+            return [], False
+        read_key = first['rows'][0]['read_key']
+        rows = self._readings_cache.get(first_id, read_key)
+        if rows is not None:
+            return rows, True
+        readings = await self._readings.fetch(first_id, self._readings_cache.block_size)
+        raw_data = readings['rows']
+        # The block is complete when the Storage Layer holds readings up to or beyond its end
+        is_complete = len(raw_data) > 0 and raw_data[-1]['id'] >= last_id
+        raw_data = [row for row in raw_data if row['id'] <= last_id]
+        rows = await self._transform_readings_block(raw_data) if raw_data else []
+        if is_complete:
+            self._readings_cache.put(first_id, read_key, rows)
+        return rows, is_complete
+
+    async def _transform_readings_block(self, raw_data):
+        """ Transforms a block of readings, using the pool of processes of the backfill mode if available"""
+        if self._backfill_executor is None:
+            return self._transform_in_memory_data_readings(raw_data)
+        return await self._event_loop.run_in_executor(self._backfill_executor,
+                                                      SendingProcess._transform_in_memory_data_readings,
+                                                      raw_data)
+
+    def _readings_cache_setup(self):
+        """ Creates the cache shared with the other north streams, if enabled"""
+        if self._config.get('source') != 'readings' or self._config['readingsCacheBlocks'] <= 0:
+            return
+        try:
+            self._readings_cache = ReadingsBlockCache(self._config['blockSize'], self._config['readingsCacheBlocks'])
+        except Exception as _ex:
+            SendingProcess._logger.warning(_MESSAGES_LIST["e000034"].format(str(_ex)))
+            self._readings_cache = None
+
     async def _load_data_into_memory(self, last_object_id):
         """ Identifies the data source requested and call the appropriate handler"""
         try:
@@ -541,6 +834,91 @@ class SendingProcess(FoglampProcess):
             raise
         return data_to_send
 
+    async def _last_reading_id_read(self):
+        """ Retrieves the id of the most recent reading available in the Storage Layer"""
+        try:
+            payload = payload_builder.PayloadBuilder() \
+                .AGGREGATE(["max", "id"]) \
+                .ALIAS("aggregate", ("id", "max", "max_id")) \
+                .payload()
+            readings = await self._readings.query(payload)
+            rows = readings['rows']
+            max_id = rows[0]['max_id'] if len(rows) > 0 else None
+        except Exception as _ex:
+            SendingProcess._logger.error(_MESSAGES_LIST["e000033"].format(str(_ex)))
+            raise
+        return 0 if max_id is None else int(max_id)
+
+    async def _backfill_evaluate(self, last_object_id):
+        """ Enables the backfill mode when the readings still to send exceed the configured threshold,
+        disables it, resuming the normal streaming, when the backlog has been caught up
+        """
+        threshold = self._config.get('backfillThreshold', 0)
+        if threshold <= 0 or self._config.get('source') != 'readings':
+            return False
+        last_reading_id = await self._last_reading_id_read()
+        backlog = last_reading_id - last_object_id
+        if backlog > threshold:
+            if self._backfill is None:
+                SendingProcess._logger.info(_MESSAGES_LIST["i000006"].format(backlog, last_reading_id))
+                now = time.time()
+                self._backfill = {'target': last_reading_id, 'sent': 0, 'start_time': now, 'published': now}
+                if self._config['backfillWorkers'] > 0 and self._backfill_executor is None:
+                    self._backfill_executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self._config['backfillWorkers'])
+            else:
+                self._backfill['target'] = last_reading_id
+            return True
+        if self._backfill is not None:
+            SendingProcess._logger.info(_MESSAGES_LIST["i000007"].format(last_object_id))
+            self._backfill = None
+            self._backfill_executor_shutdown()
+        return False
+
+    def _backfill_executor_shutdown(self):
+        """ Releases the pool of processes used in backfill mode"""
+        if self._backfill_executor is not None:
+            self._backfill_executor.shutdown(wait=False)
+            self._backfill_executor = None
+
+    async def _load_data_into_memory_backfill(self, last_object_id):
+        """ Splits the next part of the backlog in segments of blockSize reading ids, fetches and transforms them
+        concurrently, the transformation is executed by the pool of processes if configured.
+        The segments are aligned to the blocks of the shared readings cache, when it is enabled.
+
+        Returns:
+            blocks: the converted blocks of data, in reading id order, empty segments are skipped
+            last_id: last reading id covered by the segments
+        """
+        block_size = self._config['blockSize']
+        target = self._backfill['target']
+        segments = []
+        start = last_object_id + 1
+        while len(segments) < self._config['backfillSegments'] and start <= target:
+            if self._readings_cache is not None:
+                end = min(self._readings_cache.block_range(start)[1] + 1, target + 1)
+            else:
+                end = min(start + block_size, target + 1)
+            segments.append((start, end))
+            start = end
+
+        async def load_segment(segment_start, segment_end):
+            if self._readings_cache is not None:
+                rows, _ = await self._fetch_readings_block(*self._readings_cache.block_range(segment_start))
+                return [row for row in rows if segment_start <= row['id'] < segment_end]
+            readings = await self._readings.fetch(segment_start, block_size)
+            # The segment is bounded by reading id, rows beyond it belong to the next segment
+            raw_data = [row for row in readings['rows'] if row['id'] < segment_end]
+            if not raw_data:
+                return []
+            return await self._transform_readings_block(raw_data)
+        try:
+            blocks = await asyncio.gather(*[load_segment(s, e) for s, e in segments])
+        except Exception as _ex:
+            SendingProcess._logger.error(_MESSAGES_LIST["e000009"].format(str(_ex)))
+            raise
+        return [block for block in blocks if block], segments[-1][1] - 1 if segments else last_object_id
+
     async def _last_object_id_read(self):
         """ Retrieves the starting point for the send operation"""
         try:
@@ -565,13 +943,31 @@ class SendingProcess(FoglampProcess):
             self._memory_buffer_fetch_idx = 0
             sleep_time = self.TASK_FETCH_SLEEP
             sleep_num_increments = 1
+            # Blocks already loaded in backfill mode, waiting for space in the in memory buffer
+            prefetched = collections.deque()
+            backfill_check = True
             while self._task_fetch_data_run:
                 slept = False
                 if self._memory_buffer_fetch_idx < self._config['memory_buffer_size']:
                     # Checks if there is enough space to load a new block of data
                     if self._memory_buffer[self._memory_buffer_fetch_idx] is None:
                         try:
-                            data_to_send = await self._load_data_into_memory(last_object_id)
+                            if not prefetched and (backfill_check or self._backfill is not None):
+                                # The backlog is evaluated again only when the backfill target has been reached
+                                if self._backfill is None or last_object_id >= self._backfill['target']:
+                                    await self._backfill_evaluate(last_object_id)
+                                    backfill_check = False
+                                if self._backfill is not None:
+                                    blocks, last_object_id = await self._load_data_into_memory_backfill(last_object_id)
+                                    prefetched.extend(blocks)
+                            if prefetched:
+                                data_to_send = prefetched.popleft()
+                                is_prefetched = True
+                            else:
+                                data_to_send = await self._load_data_into_memory(last_object_id)
+                                is_prefetched = False
+                                # A full block suggests that a backlog is building up
+                                backfill_check = len(data_to_send) >= self._config.get('blockSize', 0)
                         except Exception as ex:
                             _message = _MESSAGES_LIST["e000028"].format(ex)
                             SendingProcess._logger.error(_message)
@@ -595,8 +991,9 @@ class SendingProcess(FoglampProcess):
                                 del data_to_send_4
                             # Loads the block of data into the in memory buffer
                             self._memory_buffer[self._memory_buffer_fetch_idx] = data_to_send
-                            last_position = len(data_to_send) - 1
-                            last_object_id = data_to_send[last_position]['id']
+                            if not is_prefetched:
+                                last_position = len(data_to_send) - 1
+                                last_object_id = data_to_send[last_position]['id']
                             self._memory_buffer_fetch_idx += 1
                             self._task_fetch_data_sem.release()
                             self.performance_track("task _task_fetch_data")
@@ -625,6 +1022,8 @@ class SendingProcess(FoglampProcess):
     async def send_data(self):
         """ Handles the sending of the data to the destination using the configured plugin for a defined amount of time"""
 
+        await self._checkpoint_setup()
+
         # Prepares the in memory buffer for the fetch/send operations
         self._memory_buffer = [None for _ in range(self._config['memory_buffer_size'])]
         self._task_fetch_data_sem = asyncio.Semaphore(0)
@@ -633,6 +1032,9 @@ class SendingProcess(FoglampProcess):
         self._task_send_data_task_id = asyncio.ensure_future(self._task_send_data())
         self._task_fetch_data_run = True
         self._task_send_data_run = True
+        if self._checkpoint is not None:
+            self._task_checkpoint_run = True
+            self._task_checkpoint_task_id = asyncio.ensure_future(self._task_checkpoint())
 
         try:
             start_time = time.time()
@@ -663,6 +1065,17 @@ class SendingProcess(FoglampProcess):
             await self._task_send_data_task_id
         except Exception as ex:
             SendingProcess._logger.error(_MESSAGES_LIST["e000029"].format(ex))
+        finally:
+            if self._task_checkpoint_task_id is not None:
+                # Updates the Storage layer with the last position reached
+                self._task_checkpoint_run = False
+                self._checkpoint['event'].set()
+                await self._task_checkpoint_task_id
+                await self._checkpoint_update()
+            self._backfill_executor_shutdown()
+            if self._readings_cache is not None:
+                SendingProcess._logger.debug("{0} - readings cache - hits {1} - misses {2}".format(
+                    "send_data", self._readings_cache.hits, self._readings_cache.misses))
 
     async def _get_stream_id(self, config_stream_id):
         async def get_rows_from_stream_id(stream_id):
@@ -848,6 +1261,18 @@ class SendingProcess(FoglampProcess):
                 self._config['plugin'] = _config_from_manager['plugin']['value']
 
             self._config['memory_buffer_size'] = int(_config_from_manager['memory_buffer_size']['value'])
+
+            if 'backfillThreshold' in _config_from_manager:
+                self._config['backfillThreshold'] = int(_config_from_manager['backfillThreshold']['value'])
+                self._config['backfillSegments'] = max(int(_config_from_manager['backfillSegments']['value']), 1)
+                self._config['backfillWorkers'] = int(_config_from_manager['backfillWorkers']['value'])
+
+            if 'readingsCacheBlocks' in _config_from_manager:
+                self._config['readingsCacheBlocks'] = int(_config_from_manager['readingsCacheBlocks']['value'])
+
+            if 'checkpointInterval' in _config_from_manager:
+                self._config['checkpointInterval'] = float(_config_from_manager['checkpointInterval']['value'])
+                self._config['checkpointReadings'] = int(_config_from_manager['checkpointReadings']['value'])
             _config_from_manager['_CONFIG_CATEGORY_NAME'] = cat_name
 
             if 'stream_id' in _config_from_manager:
@@ -919,6 +1344,7 @@ class SendingProcess(FoglampProcess):
                             data['log_performance'] = self._log_performance
                             data.update({'sending_process_instance': self})
                             self._plugin_handle = self._plugin.plugin_init(data)
+                            self._readings_cache_setup()
                         except Exception as e:
                             _message = _MESSAGES_LIST["e000018"].format(self._config['plugin'])
                             SendingProcess._logger.error(_message)
@@ -976,12 +1402,21 @@ class SendingProcess(FoglampProcess):
                 if is_started:
                     await self.send_data()
                 self.stop()
+                self._log_metrics()
                 SendingProcess._logger.info("Execution completed.")
                 sys.exit(0)
             except (ValueError, Exception) as ex:
                 SendingProcess._logger.exception(_MESSAGES_LIST["e000002"].format(str(ex)))
                 sys.exit(1)
 
+    @staticmethod
+    def _log_metrics():
+        """ Logs the metrics of the run, see _SEND_DURATION"""
+        duration = _SEND_DURATION.labels()
+        SendingProcess._logger.info("Sent %s rows in %s blocks, %s blocks failed, send time p50 %s p95 %s max %.3f s",
+                                    _SENT_READINGS.labels().value, duration.count, _SEND_ERRORS.labels().value,
+                                    duration.percentile(50), duration.percentile(95), duration.max)
+
     def stop(self):
         """ Terminates the sending process and the related plugin"""
         try:
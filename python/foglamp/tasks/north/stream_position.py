@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+""" Local journal of the position reached by a north stream.
+
+The Sending Process writes the position into the journal after every block of data sent and updates the streams
+table of the Storage layer only from time to time, so a crash of the process loses at most the updates of the
+Storage layer not the position. At the restart the position in the journal is used if the Storage layer still holds
+the position of the last update done by the process, otherwise the position has been changed from outside,
+e.g. to resend the data, and the one in the Storage layer is used.
+"""
+
+import json
+import os
+
+from foglamp.common.common import _FOGLAMP_ROOT, _FOGLAMP_DATA
+
+__author__ = "Stefano Simonelli"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_JOURNAL_SUB_DIR = "var/north"
+
+
+def default_journal_dir():
+    """ Returns the directory of the journals, it should survive a restart of the system"""
+    data_dir = _FOGLAMP_DATA if _FOGLAMP_DATA else _FOGLAMP_ROOT + "/data"
+    return os.path.join(os.path.expanduser(data_dir), _JOURNAL_SUB_DIR)
+
+
+class StreamPositionJournal(object):
+    """ Write ahead file holding the position reached by a stream """
+
+    def __init__(self, stream_id, name, journal_dir=None):
+        """
+        Args:
+            stream_id: id of the stream in the streams table
+            name: name of the Sending Process, guards against a stream id reused by a different process
+            journal_dir: directory of the journals
+        """
+        self._stream_id = stream_id
+        self._name = name
+        journal_dir = default_journal_dir() if journal_dir is None else journal_dir
+        os.makedirs(journal_dir, exist_ok=True)
+        self._file_name = os.path.join(journal_dir, "stream_{}.json".format(stream_id))
+
+    def read(self):
+        """ Returns the journaled position, None if not available
+
+        Returns:
+            position: last position sent
+            sent: number of rows sent not yet accounted in the Storage layer
+            checkpoint: position stored in the Storage layer by the last update done by the process
+        """
+        try:
+            with open(self._file_name, "r") as journal_file:
+                entry = json.load(journal_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get('stream_id') != self._stream_id or entry.get('name') != self._name:
+            return None
+        return entry['position'], entry['sent'], entry['checkpoint']
+
+    def write(self, position, sent, checkpoint):
+        """ Stores the position, the file is synced and replaced atomically to survive a crash"""
+        tmp_file_name = self._file_name + ".tmp"
+        with open(tmp_file_name, "w") as journal_file:
+            json.dump({"stream_id": self._stream_id, "name": self._name, "position": position, "sent": sent,
+                       "checkpoint": checkpoint}, journal_file)
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+        os.replace(tmp_file_name, self._file_name)
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Asset rollup process starter"""
+
+import asyncio
+from foglamp.tasks.rollup.rollup import AssetRollup
+from foglamp.common import logger
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+if __name__ == '__main__':
+    _logger = logger.setup("AssetRollup")
+    asset_rollup_process = AssetRollup()
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(asset_rollup_process.run())
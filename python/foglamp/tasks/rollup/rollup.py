@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Asset rollup task
+
+Rolls up the readings into the asset_rollups table: the min, max, sum and count of every datapoint of every asset
+by minute and hour, see foglamp.common.rollup.
+
+Every run rolls up, for each period, the complete buckets following the last bucket rolled up for the period, and
+rolls up again the older buckets that received readings since the last run, e.g. from a south plugin forwarding
+the readings it stored while disconnected. A marker row of the period, with an empty asset code and datapoint, keeps
+the start of the last bucket rolled up and, in its count, the id of the last reading stored when it was rolled up.
+A bucket is complete _LAG_SECONDS after its end. The markers are not moved when an asset fails, the next run rolls
+up the same buckets again. The rollups older than _RETENTION_SECONDS of their period, or than the age of the readings
+kept by the purge task, are removed.
+"""
+
+from datetime import datetime, timedelta
+
+from foglamp.common import logger
+from foglamp.common import rollup
+from foglamp.common.configuration_manager import ConfigurationManager
+from foglamp.common.process import FoglampProcess
+from foglamp.common.storage_client.exceptions import StorageServerError
+from foglamp.common.storage_client.payload_builder import PayloadBuilder
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_LAG_SECONDS = 10
+"""Time after the end of a bucket the readings it holds are expected to be stored, and after its timestamp a reading
+is expected to be committed"""
+
+_MAX_BUCKETS = 3600
+"""Maximum number of buckets of a period rolled up by a run, a backlog is caught up by the next runs"""
+
+_RETENTION_SECONDS = {60: 31 * 24 * 60 * 60, 3600: None}
+"""Age of the oldest rollups kept by period, None to keep them as long as the readings"""
+
+_PURGE_CATEGORY = 'PURGE_READ'
+"""Configuration category of the purge of the readings"""
+
+_OPERATIONS = ('min', 'max', 'sum', 'count')
+
+_MARKER = ''
+"""Asset code and datapoint of the rows keeping the last bucket and the last reading rolled up of every period"""
+
+
+class AssetRollup(FoglampProcess):
+
+    _logger = None
+
+    def __init__(self):
+        super().__init__()
+        self._logger = logger.setup("AssetRollup")
+
+    async def _get_rolled_up(self, period):
+        """Returns the end of the last bucket rolled up for period and the id of the last reading stored then,
+        None, None if none is"""
+        payload = PayloadBuilder().SELECT(("bucket_ts", "count")).ALIAS("return", ("bucket_ts", "bucket_ts")) \
+            .FORMAT("return", ("bucket_ts", rollup.BUCKET_FORMATS[1])).WHERE(["asset_code", "=", _MARKER]) \
+            .AND_WHERE(["period", "=", period]).payload()
+        results = await self._storage_async.query_tbl_with_payload(rollup.TABLE, payload)
+        if not results['rows']:
+            return None, None
+        row = results['rows'][0]
+        return rollup.parse_bucket(row['bucket_ts'], 1) + timedelta(seconds=period), int(row['count'])
+
+    async def _set_rolled_up(self, period, end, last_id):
+        bucket_ts = (end - timedelta(seconds=period)).strftime(rollup.TIMESTAMP_FORMAT)
+        payload = PayloadBuilder().SET(bucket_ts=bucket_ts, count=last_id).WHERE(["asset_code", "=", _MARKER]) \
+            .AND_WHERE(["period", "=", period]).payload()
+        result = await self._storage_async.update_tbl(rollup.TABLE, payload)
+        if result['rows_affected'] == 0:
+            payload = PayloadBuilder().INSERT(asset_code=_MARKER, datapoint=_MARKER, period=period,
+                                              bucket_ts=bucket_ts, count=last_id).payload()
+            await self._storage_async.insert_into_tbl(rollup.TABLE, payload)
+
+    async def _get_last_id(self, stored_before, last_id):
+        """Returns the id of the last reading stored before stored_before, last_id if none is stored after it"""
+        _where = PayloadBuilder().WHERE(["ts", "<", stored_before.strftime(rollup.TIMESTAMP_FORMAT)]).chain_payload()
+        if last_id is not None:
+            _where = PayloadBuilder(_where).AND_WHERE(["id", ">", last_id]).chain_payload()
+        payload = PayloadBuilder(_where).AGGREGATE(["max", "id"]).ALIAS("aggregate", ("id", "max", "id")).payload()
+        results = await self._readings_storage_async.query(payload)
+        if not results['rows'] or results['rows'][0]['id'] is None:
+            return last_id
+        return int(results['rows'][0]['id'])
+
+    async def _get_assets(self, start, end):
+        """Returns the codes of the assets having readings between start and end, with the id of their latest one"""
+        payload = PayloadBuilder().AGGREGATE(["max", "id"]).ALIAS("aggregate", ("id", "max", "id")) \
+            .WHERE(["user_ts", ">=", start.strftime(rollup.TIMESTAMP_FORMAT)]) \
+            .AND_WHERE(["user_ts", "<", end.strftime(rollup.TIMESTAMP_FORMAT)]).GROUP_BY("asset_code").payload()
+        results = await self._readings_storage_async.query(payload)
+        return {row['asset_code']: int(row['id']) for row in results['rows']}
+
+    async def _get_late(self, period, rolled_up_id, last_id, start):
+        """Returns the readings stored after rolled_up_id, up to last_id, older than start: the codes of their assets
+        with the id of their latest one and the ranges of the buckets of period they fall in, contiguous ones merged"""
+        _where = PayloadBuilder().WHERE(["id", ">", rolled_up_id]).AND_WHERE(["id", "<=", last_id]) \
+            .AND_WHERE(["user_ts", "<", start.strftime(rollup.TIMESTAMP_FORMAT)]).chain_payload()
+        payload = PayloadBuilder(_where).AGGREGATE(["max", "id"]).ALIAS("aggregate", ("id", "max", "id")) \
+            .GROUP_BY("asset_code").payload()
+        results = await self._readings_storage_async.query(payload)
+        assets = {row['asset_code']: int(row['id']) for row in results['rows']}
+        if not assets:
+            return assets, []
+
+        payload = PayloadBuilder(_where).AGGREGATE(["count", "*"]).ALIAS("aggregate", ("*", "count", "count")) \
+            .GROUP_BY("user_ts").ALIAS("group", ("user_ts", "bucket")) \
+            .FORMAT("group", ("user_ts", rollup.BUCKET_FORMATS[period])).payload()
+        results = await self._readings_storage_async.query(payload)
+        ranges = []
+        for bucket_start in sorted(rollup.parse_bucket(row['bucket'], period) for row in results['rows']):
+            if ranges and ranges[-1][1] == bucket_start:
+                ranges[-1] = (ranges[-1][0], bucket_start + timedelta(seconds=period))
+            else:
+                ranges.append((bucket_start, bucket_start + timedelta(seconds=period)))
+        return assets, ranges
+
+    async def _get_reading_keys(self, ids):
+        """Returns the asset codes of the readings of ids with the keys of their numeric values, read by a single
+        query, the assets without any are left out as the aggregates of the storage are computed on floats"""
+        if not ids:
+            return dict()
+        builder = PayloadBuilder().SELECT(("asset_code", "reading")).WHERE(["id", "=", ids[0]])
+        for reading_id in ids[1:]:
+            builder = builder.OR_WHERE(["id", "=", reading_id])
+        results = await self._readings_storage_async.query(builder.payload())
+
+        assets = dict()
+        for row in results['rows']:
+            reading_keys = [key for key, value in row['reading'].items()
+                            if isinstance(value, (int, float)) and not isinstance(value, bool)]
+            if reading_keys:
+                assets[row['asset_code']] = reading_keys
+        return assets
+
+    async def _roll_up_asset(self, asset_code, reading_keys, period, start, end):
+        """Rolls up the readings of an asset between start and end, replacing the rollups written there before,
+        returns the number of rollups written"""
+        aggregates = []
+        aliases = []
+        for idx, reading in enumerate(reading_keys):
+            for operation in _OPERATIONS:
+                aggregates.append([operation, ["reading", reading]])
+                aliases.append((["reading", reading], operation, "{}_{}".format(operation, idx)))
+        payload = PayloadBuilder().AGGREGATE(tuple(aggregates)).ALIAS('aggregate', *aliases) \
+            .WHERE(["asset_code", "=", asset_code]) \
+            .AND_WHERE(["user_ts", ">=", start.strftime(rollup.TIMESTAMP_FORMAT)]) \
+            .AND_WHERE(["user_ts", "<", end.strftime(rollup.TIMESTAMP_FORMAT)]) \
+            .GROUP_BY("user_ts").ALIAS("group", ("user_ts", "bucket")) \
+            .FORMAT("group", ("user_ts", rollup.BUCKET_FORMATS[period])).payload()
+        results = await self._readings_storage_async.query(payload)
+
+        payload = PayloadBuilder().WHERE(["asset_code", "=", asset_code]).AND_WHERE(["period", "=", period]) \
+            .AND_WHERE(["bucket_ts", ">=", start.strftime(rollup.TIMESTAMP_FORMAT)]) \
+            .AND_WHERE(["bucket_ts", "<", end.strftime(rollup.TIMESTAMP_FORMAT)]).payload()
+        await self._storage_async.delete_from_tbl(rollup.TABLE, payload)
+
+        written = 0
+        for row in results['rows']:
+            bucket_ts = rollup.parse_bucket(row['bucket'], period).strftime(rollup.TIMESTAMP_FORMAT)
+            for idx, reading in enumerate(reading_keys):
+                count = int(row["count_{}".format(idx)] or 0)
+                if count == 0:
+                    continue
+                payload = PayloadBuilder().INSERT(asset_code=asset_code, datapoint=reading, period=period,
+                                                  bucket_ts=bucket_ts,
+                                                  min_value=float(row["min_{}".format(idx)]),
+                                                  max_value=float(row["max_{}".format(idx)]),
+                                                  sum_value=float(row["sum_{}".format(idx)]),
+                                                  count=count).payload()
+                await self._storage_async.insert_into_tbl(rollup.TABLE, payload)
+                written += 1
+        return written
+
+    async def _get_purge_age(self):
+        """Returns the age in seconds of the readings kept by the purge task, None if they are not purged by age"""
+        item = await ConfigurationManager(self._storage_async).get_category_item(_PURGE_CATEGORY, 'age')
+        try:
+            age = int(item['value']) if item is not None else 0
+        except ValueError:
+            age = 0
+        return age * 60 * 60 if age > 0 else None
+
+    async def _purge(self, period, retention):
+        if retention is None:
+            return
+        payload = PayloadBuilder().WHERE(["period", "=", period]).AND_WHERE(["asset_code", "!=", _MARKER]) \
+            .AND_WHERE(["bucket_ts", "older", retention]).payload()
+        await self._storage_async.delete_from_tbl(rollup.TABLE, payload)
+
+    async def run(self):
+        now = datetime.now()
+        purge_age = await self._get_purge_age()
+        for period in rollup.ROLLED_UP_PERIODS:
+            retention = _RETENTION_SECONDS[period]
+            if purge_age is not None:
+                retention = purge_age if retention is None else min(retention, purge_age)
+            end = rollup.floor_time(now - timedelta(seconds=_LAG_SECONDS), period)
+            start, rolled_up_id = await self._get_rolled_up(period)
+            if start is None:
+                start = end - timedelta(seconds=period * _MAX_BUCKETS)
+            oldest = None
+            if retention is not None:
+                oldest = rollup.ceil_time(now - timedelta(seconds=retention), period)
+                start = max(start, oldest)
+            end = max(start, min(end, start + timedelta(seconds=period * _MAX_BUCKETS)))
+            last_id = await self._get_last_id(now - timedelta(seconds=_LAG_SECONDS), rolled_up_id)
+
+            assets = await self._get_assets(start, end) if start < end else dict()
+            work = [(asset_code, start, end) for asset_code in assets]
+            if rolled_up_id is not None and last_id is not None and last_id > rolled_up_id:
+                late_assets, late_ranges = await self._get_late(period, rolled_up_id, last_id, start)
+                work.extend((asset_code, late_start, late_end) for late_start, late_end in late_ranges
+                            if oldest is None or late_end > oldest for asset_code in late_assets)
+                for asset_code, reading_id in late_assets.items():
+                    assets[asset_code] = max(reading_id, assets.get(asset_code, reading_id))
+            reading_keys = await self._get_reading_keys(list(assets.values()))
+
+            written = 0
+            failed = False
+            for asset_code, work_start, work_end in work:
+                if asset_code not in reading_keys:
+                    continue
+                try:
+                    written += await self._roll_up_asset(asset_code, reading_keys[asset_code], period, work_start,
+                                                         work_end)
+                except StorageServerError as ex:
+                    # E.g. a datapoint numeric in the latest reading only, the other assets are rolled up and the
+                    # markers are kept for the next run to roll up the buckets again
+                    self._logger.error("Rollup of %s from %s to %s failed: %s", asset_code, work_start, work_end,
+                                       ex.error)
+                    failed = True
+            if not failed:
+                await self._set_rolled_up(period, end, 0 if last_id is None else last_id)
+            self._logger.info("%d rollups of %d seconds written up to %s", written, period, end)
+            await self._purge(period, retention)
@@ -0,0 +1,2 @@
+DELETE FROM foglamp.schedules WHERE schedule_type = 5;
+ALTER TABLE foglamp.schedules DROP COLUMN schedule_cron;
@@ -0,0 +1,3 @@
+DELETE FROM foglamp.schedules WHERE process_name = 'asset rollup';
+DELETE FROM foglamp.scheduled_processes WHERE name = 'asset rollup';
+DROP TABLE IF EXISTS foglamp.asset_rollups;
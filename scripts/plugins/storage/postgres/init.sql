@@ -468,6 +468,24 @@ CREATE INDEX statistics_history_ix2
 CREATE INDEX statistics_history_ix3
     ON foglamp.statistics_history (history_ts);
 
+-- Asset rollups
+-- The min, max, sum and count of every datapoint of the readings of every asset by period of 60 and 3600 seconds,
+-- written by the asset rollup task. The row with an empty asset_code of a period keeps its last bucket rolled up
+-- and, in count, the id of the last reading stored then.
+CREATE TABLE foglamp.asset_rollups (
+       asset_code  character varying(50)       NOT NULL,                  -- The asset code of the readings
+       datapoint   character varying(255)      NOT NULL,                  -- The key of the datapoint in the readings
+       period      integer                     NOT NULL,                  -- The length of the bucket, in seconds
+       bucket_ts   timestamp(6) with time zone NOT NULL,                  -- The start of the bucket
+       min_value   double precision,
+       max_value   double precision,
+       sum_value   double precision,
+       count       bigint                      NOT NULL DEFAULT 0,        -- The number of readings in the bucket
+       CONSTRAINT asset_rollups_pkey PRIMARY KEY (asset_code, datapoint, period, bucket_ts) );
+
+CREATE INDEX asset_rollups_ix1
+    ON foglamp.asset_rollups (period, bucket_ts);
+
 -- Resources table
 -- A resource and be anything that is available or can be done in FogLAMP. Examples:
 -- - Access to assets
@@ -667,12 +685,14 @@ CREATE TABLE foglamp.schedules (
              schedule_name     character varying(255) NOT NULL, -- schedule name
              schedule_type     smallint               NOT NULL, -- 1 = startup,  2 = timed
                                                                 -- 3 = interval, 4 = manual
+                                                                -- 5 = cron
              schedule_interval interval,                        -- Repeat interval
              schedule_time     time,                            -- Start time
              schedule_day      smallint,                        -- ISO day 1 = Monday, 7 = Sunday
              exclusive         boolean not null default true,   -- true = Only one task can run
                                                                 -- at any given time
              enabled           boolean not null default false,  -- false = A given schedule is disabled by default
+             schedule_cron     character varying(255) not null default '', -- Cron expression of cron schedules
   CONSTRAINT schedules_pkey PRIMARY KEY  ( id ),
   CONSTRAINT schedules_fk1  FOREIGN KEY  ( process_name )
   REFERENCES foglamp.scheduled_processes ( name ) MATCH SIMPLE
@@ -829,6 +849,7 @@ INSERT INTO foglamp.statistics ( key, description, value, previous_value )
 --
 INSERT INTO foglamp.scheduled_processes ( name, script ) VALUES ( 'purge',               '["tasks/purge"]'      );
 INSERT INTO foglamp.scheduled_processes ( name, script ) VALUES ( 'stats collector',     '["tasks/statistics"]' );
+INSERT INTO foglamp.scheduled_processes ( name, script ) VALUES ( 'asset rollup',        '["tasks/rollup"]'     );
 INSERT INTO foglamp.scheduled_processes ( name, script ) VALUES ( 'FogLAMPUpdater',      '["tasks/update"]'     );
 INSERT INTO foglamp.scheduled_processes ( name, script ) VALUES ( 'certificate checker', '["tasks/check_certs"]' );
 
@@ -874,6 +895,19 @@ INSERT INTO foglamp.schedules ( id, schedule_name, process_name, schedule_type,
               );
 
 
+-- Asset rollup
+INSERT INTO foglamp.schedules ( id, schedule_name, process_name, schedule_type,
+                                schedule_time, schedule_interval, exclusive, enabled )
+       VALUES ( '2dd4466a-cb3e-11f1-b002-02fc00000001', -- id
+                'asset rollup',                         -- schedule_name
+                'asset rollup',                         -- process_name
+                3,                                      -- schedule_type (interval)
+                NULL,                                   -- schedule_time
+                '00:05:00',                             -- schedule_interval
+                true,                                   -- exclusive
+                false                                   -- enabled
+              );
+
 -- Check for expired certificates
 INSERT INTO foglamp.schedules ( id, schedule_name, process_name, schedule_type,
                                 schedule_time, schedule_interval, exclusive, enabled )
@@ -0,0 +1 @@
+ALTER TABLE foglamp.schedules ADD COLUMN schedule_cron character varying(255) NOT NULL DEFAULT '';
@@ -0,0 +1,40 @@
+DELETE FROM foglamp.schedules WHERE schedule_type = 5;
+
+-- SQLite cannot drop a column, the table is created again without schedule_cron
+BEGIN TRANSACTION;
+DROP TABLE IF EXISTS foglamp.schedules_old;
+ALTER TABLE foglamp.schedules RENAME TO schedules_old;
+
+CREATE TABLE foglamp.schedules (
+             id                uuid                   NOT NULL, -- PK
+             process_name      character varying(255) NOT NULL, -- FK process name
+             schedule_name     character varying(255) NOT NULL, -- schedule name
+             schedule_type     INTEGER                NOT NULL, -- 1 = startup,  2 = timed
+                                                                -- 3 = interval, 4 = manual
+             schedule_interval INTEGER,                         -- Repeat interval
+             schedule_time     INTEGER,                         -- Start time
+             schedule_day      INTEGER,                         -- ISO day 1 = Monday, 7 = Sunday
+             exclusive         boolean NOT NULL DEFAULT 't',    -- true = Only one task can run
+                                                                -- at any given time
+             enabled           boolean NOT NULL DEFAULT 'f',    -- false = A given schedule is disabled by default
+  CONSTRAINT schedules_pkey PRIMARY KEY  ( id ),
+  CONSTRAINT schedules_fk1  FOREIGN KEY  ( process_name )
+  REFERENCES scheduled_processes ( name ) MATCH SIMPLE
+             ON UPDATE NO ACTION
+             ON DELETE NO ACTION );
+
+INSERT INTO foglamp.schedules
+        SELECT
+            id,
+            process_name,
+            schedule_name,
+            schedule_type,
+            schedule_interval,
+            schedule_time,
+            schedule_day,
+            exclusive,
+            enabled
+        FROM foglamp.schedules_old;
+
+DROP TABLE foglamp.schedules_old;
+COMMIT;
@@ -0,0 +1,32 @@
+-- Asset rollups
+-- The min, max, sum and count of every datapoint of the readings of every asset by period of 60 and 3600 seconds,
+-- written by the asset rollup task. The row with an empty asset_code of a period keeps its last bucket rolled up
+-- and, in count, the id of the last reading stored then.
+CREATE TABLE foglamp.asset_rollups (
+       asset_code  character varying(50)       NOT NULL,                  -- The asset code of the readings
+       datapoint   character varying(255)      NOT NULL,                  -- The key of the datapoint in the readings
+       period      INTEGER                     NOT NULL,                  -- The length of the bucket, in seconds
+       bucket_ts   DATETIME                    NOT NULL,                  -- The start of the bucket
+       min_value   DOUBLE PRECISION,
+       max_value   DOUBLE PRECISION,
+       sum_value   DOUBLE PRECISION,
+       count       INTEGER                     NOT NULL DEFAULT 0,        -- The number of readings in the bucket
+       CONSTRAINT asset_rollups_pkey PRIMARY KEY (asset_code, datapoint, period, bucket_ts) );
+
+CREATE INDEX asset_rollups_ix1
+    ON asset_rollups (period, bucket_ts);
+
+INSERT INTO foglamp.scheduled_processes ( name, script ) VALUES ( 'asset rollup', '["tasks/rollup"]' );
+
+-- Asset rollup
+INSERT INTO foglamp.schedules ( id, schedule_name, process_name, schedule_type,
+                                schedule_time, schedule_interval, exclusive, enabled )
+       VALUES ( '2dd4466a-cb3e-11f1-b002-02fc00000001', -- id
+                'asset rollup',                         -- schedule_name
+                'asset rollup',                         -- process_name
+                3,                                      -- schedule_type (interval)
+                NULL,                                   -- schedule_time
+                '00:05:00',                             -- schedule_interval
+                't',                                   -- exclusive
+                'f'                                    -- enabled
+              );
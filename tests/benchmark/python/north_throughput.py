@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+""" Deterministic throughput benchmark of the north Sending Process.
+
+The Sending Process and the OMF north plugin (pi_server or ocs) run unchanged, the benchmark replaces only the
+services around them:
+
+    - the Storage layer, by an in memory store holding a generated and seeded set of readings
+    - the Configuration Manager, by an in memory one returning the default values of the configuration
+    - the PI Connector Relay / OCS, by a local OMF stand-in endpoint having configurable latency and error rates
+
+The run ends when all the readings have been sent, the benchmark reports:
+
+    - readings/sec and bytes/sec sent to the OMF endpoint
+    - CPU time per reading used by the Sending Process and by the plugin, the stand-in endpoint excluded
+    - p50/p99 latency of the plugin_send calls
+
+Results can be saved to a JSON file, keyed by scenario, and compared with a previously saved baseline:
+
+    PYTHONPATH=python python3 tests/benchmark/python/north_throughput.py --save baseline.json
+    PYTHONPATH=python python3 tests/benchmark/python/north_throughput.py --baseline baseline.json
+
+the exit code is 1 if a measure of the scenario is worse than the baseline by more than --tolerance percent.
+"""
+
+import argparse
+import asyncio
+import copy
+import importlib
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from foglamp.common.audit_logger import AuditLogger
+from foglamp.common.process import FoglampProcess
+from foglamp.common.storage_client.storage_client import StorageClientAsync, ReadingsStorageClientAsync
+from foglamp.tasks.north import sending_process as module_sp
+from foglamp.tasks.north import stream_position
+from foglamp.tasks.north.sending_process import SendingProcess
+
+from omf_stand_in import OMFStandInServer
+
+__author__ = "Stefano Simonelli"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+_ASSETS = ["fogbench/temperature", "fogbench/humidity", "fogbench/pressure", "fogbench/luxometer"]
+
+_CONFIG_OVERRIDES = {
+    "duration": "3600",
+    "sleepInterval": "0.05",
+    "OMFRetrySleepTime": "0",
+    # The shared cache would make the results depend on the previous runs
+    "readingsCacheBlocks": "0",
+    "backfillThreshold": "0",
+}
+""" Configuration values used by the benchmark in place of the default ones, --set can change them """
+
+_LOWER_IS_BETTER = {"readings_sec": False, "bytes_sec": False, "cpu_us_reading": True, "p99_send_ms": True}
+""" Measures compared with the baseline """
+
+
+class InMemoryStorage(StorageClientAsync):
+    """ Tables of the Storage layer used by the Sending Process, the OMF plugins and the audit/statistics """
+
+    def __init__(self):
+        # The connection to the Storage service is not needed
+        self.tables = {}
+
+    def reset(self):
+        self.tables = {}
+
+    @staticmethod
+    def _matches(row, where):
+        while where is not None:
+            if where['condition'] != '=' or row.get(where['column']) != where['value']:
+                return False
+            where = where.get('and')
+        return True
+
+    def _rows(self, tbl_name, where):
+        return [row for row in self.tables.get(tbl_name, []) if self._matches(row, where)]
+
+    async def query_tbl(self, tbl_name, query=None):
+        where = None
+        if query is not None:
+            column, value = query.split("=")
+            where = {"column": column, "condition": "=", "value": int(value) if value.isdigit() else value}
+        return {"rows": copy.deepcopy(self._rows(tbl_name, where))}
+
+    async def query_tbl_with_payload(self, tbl_name, query_payload):
+        query = json.loads(query_payload)
+        rows = self._rows(tbl_name, query.get('where'))
+        if 'limit' in query:
+            rows = rows[:query['limit']]
+        return {"rows": copy.deepcopy(rows), "count": len(rows)}
+
+    async def insert_into_tbl(self, tbl_name, data):
+        row = json.loads(data)
+        table = self.tables.setdefault(tbl_name, [])
+        if tbl_name == "streams":
+            row.setdefault('id', len(table) + 1)
+            row.update({'active': 't', 'last_object': 0})
+        elif tbl_name == "statistics":
+            row['value'] = 0
+        table.append(row)
+        return {"response": "inserted", "rows_affected": 1}
+
+    async def update_tbl(self, tbl_name, data):
+        update = json.loads(data)
+        rows = self._rows(tbl_name, update.get('where'))
+        for row in rows:
+            row.update(update.get('values', {}))
+            for expression in update.get('expressions', []):
+                row[expression['column']] = row.get(expression['column'], 0) + expression['value']
+        return {"response": "updated", "rows_affected": len(rows)}
+
+    async def delete_from_tbl(self, tbl_name, condition=None):
+        where = json.loads(condition).get('where') if condition else None
+        rows = self._rows(tbl_name, where)
+        self.tables[tbl_name] = [row for row in self.tables.get(tbl_name, []) if row not in rows]
+        return {"response": "deleted", "rows_affected": len(rows)}
+
+
+class InMemoryReadings(ReadingsStorageClientAsync):
+    """ Readings table holding a deterministic set of generated readings """
+
+    def __init__(self, num_readings, seed):
+        _random = random.Random(seed)
+        self.rows = []
+        for _id in range(1, num_readings + 1):
+            self.rows.append({
+                "id": _id,
+                "asset_code": _ASSETS[_id % len(_ASSETS)],
+                "read_key": "{:08x}-4182-11e8-842f-0ed5f89f718b".format(_id),
+                "reading": {"value": round(_random.uniform(-50.0, 50.0), 3), "sequence": _id},
+                "user_ts": "2018-05-28 16:{:02d}:{:02d}.{:06d}+00".format((_id // 60) % 60, _id % 60,
+                                                                         _random.randrange(1000000))
+            })
+
+    async def fetch(self, reading_id, count):
+        first = max(reading_id, 1) - 1
+        return {"rows": copy.deepcopy(self.rows[first:first + count]), "count": count}
+
+    async def query(self, query_payload):
+        return {"rows": [{"max_id": self.rows[-1]['id'] if self.rows else None}], "count": 1}
+
+
+class ManagementClientStandIn(object):
+    """ Configuration Manager and asset tracker of the Core microservice """
+
+    def __init__(self, overrides):
+        self._overrides = overrides
+        self._categories = {}
+
+    def create_configuration_category(self, category_data):
+        category = json.loads(category_data)
+        items = self._categories.setdefault(category['key'], {})
+        for name, item in category['value'].items():
+            if name not in items:
+                items[name] = dict(item, value=self._overrides.get(name, item['default']))
+
+    def get_configuration_category(self, category_name=None):
+        return copy.deepcopy(self._categories[category_name])
+
+    def create_asset_tracker_event(self, asset_event):
+        pass
+
+
+class TimedPlugin(object):
+    """ Wraps the north plugin measuring the plugin_send calls """
+
+    def __init__(self, plugin, last_id):
+        self._plugin = plugin
+        self._last_id = last_id
+        self.latencies = []
+        self.num_sent = 0
+        self.completed = asyncio.Event()
+
+    def __getattr__(self, name):
+        return getattr(self._plugin, name)
+
+    async def plugin_send(self, data, raw_data, stream_id):
+        start = time.perf_counter()
+        try:
+            is_data_sent, new_position, num_sent = await self._plugin.plugin_send(data, raw_data, stream_id)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+        if is_data_sent:
+            self.num_sent += num_sent
+            if new_position >= self._last_id:
+                self.completed.set()
+        return is_data_sent, new_position, num_sent
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def _cpu_time():
+    usage_self = resource.getrusage(resource.RUSAGE_SELF)
+    usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage_self.ru_utime + usage_self.ru_stime + usage_children.ru_utime + usage_children.ru_stime
+
+
+async def run_scenario(args, storage):
+    """ Sends all the readings to the stand-in endpoint, returns the measures """
+    stand_in = OMFStandInServer(latency=args.latency, error_rate=args.error_rate,
+                                not_blocking_error_rate=args.not_blocking_rate, seed=args.seed)
+    url = await stand_in.start()
+
+    overrides = dict(_CONFIG_OVERRIDES, URL=url, plugin=args.plugin, blockSize=str(args.block_size))
+    overrides.update(args.set)
+
+    storage.reset()
+    readings = InMemoryReadings(args.readings, args.seed)
+
+    with patch.object(FoglampProcess, '__init__', return_value=None):
+        sp = SendingProcess(asyncio.get_event_loop())
+    sp._name = "north_benchmark"
+    sp._core_microservice_management_client = ManagementClientStandIn(overrides)
+    # Creates the category of the north task as done by the REST API adding the task
+    plugin = importlib.import_module("{}{}.{}".format(SendingProcess._NORTH_PATH, args.plugin, args.plugin))
+    sp._core_microservice_management_client.create_configuration_category(json.dumps({
+        "key": sp._name, "description": "North benchmark", "value": plugin.plugin_info()['config']}))
+    sp._storage_async = storage
+    sp._readings = readings
+    sp._audit = AuditLogger(storage)
+    sp._log_performance = False
+    sp._debug_level = 0
+    SendingProcess._stop_execution = False
+
+    try:
+        if not await sp._start():
+            raise RuntimeError("the Sending Process is not enabled")
+        timed_plugin = TimedPlugin(sp._plugin, args.readings)
+        sp._plugin = timed_plugin
+
+        async def wait_completion():
+            try:
+                await asyncio.wait_for(timed_plugin.completed.wait(), args.timeout)
+            finally:
+                SendingProcess._stop_execution = True
+
+        cpu_start = _cpu_time()
+        start = time.perf_counter()
+        completion = asyncio.ensure_future(wait_completion())
+        # The journal of the position reached is not left in the FogLAMP data directory
+        with tempfile.TemporaryDirectory() as journal_dir:
+            with patch.object(stream_position, 'default_journal_dir', return_value=journal_dir):
+                await sp.send_data()
+        elapsed = time.perf_counter() - start
+        cpu = _cpu_time() - cpu_start - stand_in.cpu_time
+        completed = completion.done() and not completion.cancelled() and completion.exception() is None
+        if not completion.done():
+            completion.cancel()
+        sp.stop()
+    finally:
+        SendingProcess._stop_execution = False
+        await stand_in.stop()
+
+    if not completed:
+        raise RuntimeError("not all the readings have been sent within {} seconds, sent {}".format(
+            args.timeout, timed_plugin.num_sent))
+
+    return {
+        "readings": timed_plugin.num_sent,
+        "elapsed_sec": round(elapsed, 3),
+        "readings_sec": round(timed_plugin.num_sent / elapsed, 1),
+        "bytes_sec": round(stand_in.bytes_received / elapsed, 1),
+        "cpu_us_reading": round(cpu / timed_plugin.num_sent * 1e6, 2),
+        "p50_send_ms": round(_percentile(timed_plugin.latencies, 50) * 1e3, 3),
+        "p99_send_ms": round(_percentile(timed_plugin.latencies, 99) * 1e3, 3),
+        "send_calls": len(timed_plugin.latencies),
+        "omf_requests": stand_in.requests,
+        "omf_errors": stand_in.errors,
+        "omf_not_blocking_errors": stand_in.not_blocking_errors,
+    }
+
+
+def scenario_name(args):
+    name = "{}-readings{}-block{}-latency{}-errors{}-notblocking{}-seed{}".format(
+        args.plugin, args.readings, args.block_size, args.latency, args.error_rate, args.not_blocking_rate, args.seed)
+    for key in sorted(args.set):
+        name += "-{}{}".format(key, args.set[key])
+    return name
+
+
+def compare(result, baseline, tolerance):
+    """ Prints the change of every measure with respect to the baseline, returns the list of regressions """
+    regressions = []
+    for measure, lower_is_better in sorted(_LOWER_IS_BETTER.items()):
+        if not baseline.get(measure):
+            continue
+        change = (result[measure] - baseline[measure]) / baseline[measure] * 100
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        print("  {:<16} {:>12} -> {:>12} {:>+8.1f}%{}".format(measure, baseline[measure], result[measure], change,
+                                                              "  REGRESSION" if worse else ""))
+        if worse:
+            regressions.append(measure)
+    return regressions
+
+
+def _load_results(file_name):
+    if not os.path.exists(file_name):
+        return {}
+    with open(file_name, "r") as results_file:
+        return json.load(results_file)
+
+
+def _config_value(item):
+    key, separator, value = item.partition("=")
+    if not separator:
+        raise argparse.ArgumentTypeError("expected KEY=VALUE, got {}".format(item))
+    return key, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="North Sending Process throughput benchmark")
+    parser.add_argument("--plugin", choices=["pi_server", "ocs"], default="pi_server", help="north plugin to use")
+    parser.add_argument("--readings", type=int, default=20000, help="number of readings to send")
+    parser.add_argument("--block-size", type=int, default=500, help="blockSize of the Sending Process")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of the OMF endpoint, in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="fraction of the OMF requests answered with a blocking error")
+    parser.add_argument("--not-blocking-rate", type=float, default=0.0,
+                        help="fraction of the OMF requests answered with a not blocking error")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the readings and of the OMF answers")
+    parser.add_argument("--set", type=_config_value, action="append", default=[], metavar="KEY=VALUE",
+                        help="configuration value of the Sending Process or of the plugin, can be repeated")
+    parser.add_argument("--timeout", type=float, default=600, help="maximum duration of the run, in seconds")
+    parser.add_argument("--save", metavar="FILE", help="stores the results into FILE, keyed by scenario")
+    parser.add_argument("--baseline", metavar="FILE", help="compares the results with the ones stored in FILE")
+    parser.add_argument("--tolerance", type=float, default=10.0,
+                        help="change, in percent, above which a measure is considered a regression")
+    args = parser.parse_args()
+    args.set = dict(args.set)
+
+    # Only the errors are relevant during the measures
+    logging.disable(logging.WARNING)
+    # The plugins log through syslog, it could be not available
+    logging.raiseExceptions = False
+    module_sp._log_performance = False
+
+    loop = asyncio.get_event_loop()
+    result = loop.run_until_complete(run_scenario(args, InMemoryStorage()))
+
+    name = scenario_name(args)
+    print(name)
+    for measure, value in sorted(result.items()):
+        print("  {:<24} {}".format(measure, value))
+
+    exit_code = 0
+    if args.baseline:
+        baseline = _load_results(args.baseline).get(name)
+        if baseline is None:
+            print("scenario not available in the baseline {}".format(args.baseline))
+        else:
+            print("compared with {}".format(args.baseline))
+            if compare(result, baseline, args.tolerance):
+                exit_code = 1
+
+    if args.save:
+        results = _load_results(args.save)
+        results[name] = result
+        with open(args.save, "w") as results_file:
+            json.dump(results, results_file, indent=4, sort_keys=True)
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+""" Microbenchmark of the timestamp normalization of a block of readings.
+
+Compares the row by row normalization (apply_date_format followed by the OMF slicing) with the block level one
+(apply_date_format_block followed by omf_timestamps) for blocks having an uniform and a mixed timestamp format.
+
+Usage:
+    PYTHONPATH=python python3 tests/benchmark/python/north_timestamps.py [--block-size N] [--repeat N]
+"""
+
+import argparse
+import timeit
+
+from foglamp.tasks.north.sending_process import apply_date_format, apply_date_format_block
+from foglamp.plugins.north.pi_server.pi_server import omf_timestamps
+
+__author__ = "Stefano Simonelli"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def _blocks(block_size):
+    """ Generates the blocks of timestamps to normalize, as returned by the Storage layer """
+    return {
+        "sqlite": ["2018-05-28 16:56:55.{:06d}".format(i) for i in range(block_size)],
+        "postgres": ["2018-05-28 16:56:55.{:06d}+00".format(i) for i in range(block_size)],
+        "timezone": ["2018-05-28 16:56:55.{:06d}+02:00".format(i) for i in range(block_size)],
+        "mixed": ["2018-05-28 16:56:55.{}".format(i) for i in range(block_size)],
+    }
+
+
+def _row_by_row(timestamps):
+    normalized = [apply_date_format(ts) for ts in timestamps]
+    return [ts[0:10] + "T" + ts[11:23] + "Z" for ts in normalized]
+
+
+def _block_level(timestamps):
+    return omf_timestamps(apply_date_format_block(timestamps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="North timestamp normalization microbenchmark")
+    parser.add_argument("--block-size", type=int, default=5000, help="number of readings in a block")
+    parser.add_argument("--repeat", type=int, default=200, help="number of blocks normalized for each measure")
+    args = parser.parse_args()
+
+    print("{:<10} {:>14} {:>14} {:>8}".format("layout", "row (us/rdg)", "block (us/rdg)", "speedup"))
+    for name, timestamps in _blocks(args.block_size).items():
+        readings = args.block_size * args.repeat
+        row = min(timeit.repeat(lambda: _row_by_row(timestamps), number=args.repeat, repeat=3))
+        block = min(timeit.repeat(lambda: _block_level(timestamps), number=args.repeat, repeat=3))
+        print("{:<10} {:>14.3f} {:>14.3f} {:>7.2f}x".format(name,
+                                                            row / readings * 1e6,
+                                                            block / readings * 1e6,
+                                                            row / block))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+""" Local, in process, stand-in of an OMF endpoint (PI Connector Relay / OCS) used by the north benchmarks.
+
+The stand-in accepts every OMF message, it simulates the latency of the destination and answers with an error
+or a not blocking error according to the configured rates. The random sequence is seeded, so runs having the same
+configuration receive the same sequence of answers.
+"""
+
+import asyncio
+import random
+import time
+
+from aiohttp import web
+
+__author__ = "Stefano Simonelli"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+NOT_BLOCKING_ERROR = (400, "Invalid value type for the property")
+""" Status code and message handled as not blocking by the OMF north plugins """
+
+
+class OMFStandInServer(object):
+    """ OMF stand-in endpoint """
+
+    def __init__(self, latency=0.0, error_rate=0.0, not_blocking_error_rate=0.0, seed=0,
+                 not_blocking_error=NOT_BLOCKING_ERROR):
+        """
+        Args:
+            latency: seconds waited before answering each request
+            error_rate: fraction of the requests answered with a blocking error, 500
+            not_blocking_error_rate: fraction of the requests answered with not_blocking_error
+            seed: seed of the random sequence used to choose the answers
+            not_blocking_error: (status code, message) used for the not blocking errors
+        """
+        self._latency = latency
+        self._error_rate = error_rate
+        self._not_blocking_error_rate = not_blocking_error_rate
+        self._not_blocking_error = not_blocking_error
+        self._random = random.Random(seed)
+        self._runner = None
+        self.url = None
+        self.requests = 0
+        self.bytes_received = 0
+        self.messages = {}
+        self.errors = 0
+        self.not_blocking_errors = 0
+        self.cpu_time = 0.0
+        """ CPU time spent handling the requests, to be excluded by the measures of the client """
+
+    async def start(self, host="127.0.0.1", port=0):
+        app = web.Application()
+        app.router.add_route('POST', '/{tail:.*}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        # Retrieves the port assigned by the OS
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = "http://{}:{}/ingress/messages".format(host, port)
+        return self.url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request):
+        cpu_start = time.process_time()
+        body = await request.read()
+        self.requests += 1
+        self.bytes_received += len(body)
+        message_type = request.headers.get('messagetype', '')
+        self.messages[message_type] = self.messages.get(message_type, 0) + 1
+        draw = self._random.random()
+        self.cpu_time += time.process_time() - cpu_start
+
+        if self._latency > 0:
+            await asyncio.sleep(self._latency)
+
+        if draw < self._error_rate:
+            self.errors += 1
+            return web.Response(status=500, text="OMF stand-in error")
+        if draw < self._error_rate + self._not_blocking_error_rate:
+            self.not_blocking_errors += 1
+            return web.Response(status=self._not_blocking_error[0], text=self._not_blocking_error[1])
+        return web.Response(status=204)
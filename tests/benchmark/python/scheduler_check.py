@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+""" Benchmark of the wake-ups of the Scheduler loop with thousands of schedules.
+
+Synthetic interval schedules, having seeded repeat times, are loaded into the Scheduler and the time is advanced
+one second at a time using the current_time hook of the Scheduler. At every step Scheduler._check_schedules is
+called twice: the first call starts the schedules due, the second one measures a wake-up without schedules due,
+as it happens when a task terminates. Tasks are not started, Scheduler._start_task is replaced by a counter.
+
+Usage:
+    PYTHONPATH=python python3 tests/benchmark/python/scheduler_check.py [--schedules N [N ...]] [--seconds N]
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import random
+import time
+import uuid
+
+from foglamp.services.core.scheduler.entities import Schedule
+from foglamp.services.core.scheduler.scheduler import Scheduler
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+def _scheduler(num_schedules, start_time, seed):
+    """ Returns a Scheduler loaded with num_schedules interval schedules """
+    scheduler = Scheduler()
+    scheduler._max_running_tasks = num_schedules + 1
+    scheduler._start_time = start_time
+    scheduler.current_time = start_time
+    scheduler.tasks_started = 0
+
+    async def start_task(schedule):
+        scheduler.tasks_started += 1
+
+    scheduler._start_task = start_task
+
+    _random = random.Random(seed)
+    for idx in range(num_schedules):
+        repeat_seconds = _random.randint(5, 3600)
+        schedule = Scheduler._ScheduleRow(id=uuid.UUID(int=_random.getrandbits(128)),
+                                          name="schedule {}".format(idx),
+                                          type=Schedule.Type.INTERVAL,
+                                          time=None,
+                                          day=None,
+                                          repeat=datetime.timedelta(seconds=repeat_seconds),
+                                          repeat_seconds=repeat_seconds,
+                                          exclusive=False,
+                                          enabled=True,
+                                          process_name="benchmark")
+        scheduler._schedules[schedule.id] = schedule
+        scheduler._schedule_first_task(schedule, start_time)
+    return scheduler
+
+
+async def _run(num_schedules, seconds, seed):
+    start_time = time.time()
+    scheduler = _scheduler(num_schedules, start_time, seed)
+    due_elapsed = 0.0
+    idle_elapsed = 0.0
+    for step in range(1, seconds + 1):
+        scheduler.current_time = start_time + step
+
+        begin = time.perf_counter()
+        await scheduler._check_schedules()
+        due_elapsed += time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        await scheduler._check_schedules()
+        idle_elapsed += time.perf_counter() - begin
+    return scheduler.tasks_started, due_elapsed / seconds, idle_elapsed / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler wake-up benchmark")
+    parser.add_argument("--schedules", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="numbers of schedules to measure")
+    parser.add_argument("--seconds", type=int, default=3600, help="simulated seconds, one wake-up per second")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the repeat times of the schedules")
+    args = parser.parse_args()
+
+    # The Scheduler logs every schedule change
+    logging.disable(logging.WARNING)
+
+    loop = asyncio.get_event_loop()
+    print("{:>10} {:>12} {:>18} {:>18}".format("schedules", "tasks", "due wake-up (us)", "idle wake-up (us)"))
+    for num_schedules in args.schedules:
+        tasks_started, due, idle = loop.run_until_complete(_run(num_schedules, args.seconds, args.seed))
+        print("{:>10} {:>12} {:>18.1f} {:>18.1f}".format(num_schedules, tasks_started, due * 1e6, idle * 1e6))
+
+
+if __name__ == "__main__":
+    main()
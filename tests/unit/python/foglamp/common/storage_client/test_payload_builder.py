@@ -70,6 +70,12 @@ class TestPayloadBuilderRead:
         res = PayloadBuilder().SELECT(test_input).ALIAS('return', ('name', 'my_name'), ('id', 'my_id')).payload()
         assert expected == json.loads(res)
 
+    def test_select_payload_with_alias_by_json_property(self):
+        res = PayloadBuilder().SELECT((["values", "rate"], ["values", "temp"])).ALIAS(
+            'return', (['values', 'rate'], 'rate'), (['values', 'temp'], 'temp')).payload()
+        assert {"return": [{"json": {"column": "values", "properties": "rate"}, "alias": "rate"},
+                           {"json": {"column": "values", "properties": "temp"}, "alias": "temp"}]} == json.loads(res)
+
     @pytest.mark.parametrize("test_input, expected", [
         ("test", _payload("data/payload_from1.json")),
         ("test, test2", _payload("data/payload_from2.json"))
@@ -225,6 +231,12 @@ class TestPayloadBuilderRead:
                                                            ('values', 'avg', 'Average')).payload()
         assert expected == json.loads(res)
 
+    def test_aggregate_payload_with_alias_by_json_property(self):
+        res = PayloadBuilder().AGGREGATE((["min", ["values", "rate"]], ["min", ["values", "temp"]])).ALIAS(
+            'aggregate', (['values', 'rate'], 'min', 'min_rate'), (['values', 'temp'], 'min', 'min_temp')).payload()
+        assert {"aggregate": [{"operation": "min", "json": {"column": "values", "properties": "rate"}, "alias": "min_rate"},
+                              {"operation": "min", "json": {"column": "values", "properties": "temp"}, "alias": "min_temp"}]} == json.loads(res)
+
     @pytest.mark.parametrize("test_input, expected", [
         (("user_ts",), _payload("data/payload_timebucket4.json")),
         (("user_ts", "5"), _payload("data/payload_timebucket1.json")),
@@ -98,6 +98,14 @@ class TestConfigurationManager:
         assert 'callback' in c_mgr._registered_interests['name']
         assert 1 == len(c_mgr._registered_interests)
 
+    def test_changed(self, reset_singleton):
+        storage_client_mock = MagicMock(spec=StorageClientAsync)
+        c_mgr = ConfigurationManager(storage_client_mock)
+        assert 0 == c_mgr.version
+        c_mgr.changed()
+        # The version is shared by all the configuration managers
+        assert 1 == ConfigurationManager(storage_client_mock).version
+
     def test_unregister_interest_no_category_name(self, reset_singleton):
         storage_client_mock = MagicMock(spec=StorageClientAsync)
         c_mgr = ConfigurationManager(storage_client_mock)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from unittest.mock import patch
+
+from foglamp.common import host
+
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.fixture
+def children():
+    processes = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"]) for _ in range(2)]
+    yield sorted(process.pid for process in processes)
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("common", "host")
+class TestHost:
+
+    def test_get_child_pids(self, children):
+        assert children == sorted(host.get_child_pids(os.getpid()))
+        assert os.getpid() == host.get_parent_pid(children[0])
+
+    def test_get_child_pids_without_children_file(self, children):
+        read = host._read
+
+        def read_without_children(path):
+            if path.endswith('/children'):
+                raise FileNotFoundError(path)
+            return read(path)
+
+        with patch.object(host, '_read', side_effect=read_without_children):
+            assert children == sorted(host.get_child_pids(os.getpid()))
+
+    def test_get_child_pids_no_process(self):
+        assert [] == host.get_child_pids(2 ** 22 + 1)
+        with pytest.raises(ProcessLookupError):
+            host.get_parent_pid(2 ** 22 + 1)
+
+    def test_get_processes(self, children):
+        processes = host.get_processes("time.sleep(30)")
+        assert children == [pid for pid, ppid, cmdline in processes]
+        assert all(os.getpid() == ppid for pid, ppid, cmdline in processes)
+        assert "{} -c import time; time.sleep(30)".format(sys.executable) == processes[0][2]
+
+    def test_get_memory_info(self):
+        memory = host.get_memory_info()
+        assert 0 < memory['MemFree'] <= memory['MemTotal']
+
+    def test_get_host_facts(self):
+        with patch.object(host, '_host_facts', None):
+            with patch.object(host, '_get_ip_addresses', return_value=['192.168.1.10']) as patch_addresses:
+                with patch.object(host.socket, 'gethostname', return_value='gateway'):
+                    assert ('gateway', ['192.168.1.10']) == host.get_host_facts()
+                    assert ('gateway', ['192.168.1.10']) == host.get_host_facts()
+                    assert 1 == patch_addresses.call_count
+
+                    # Read again when expired
+                    with patch.object(host, '_host_facts_time', host._host_facts_time - host._HOST_FACTS_TTL_SECONDS):
+                        host.get_host_facts()
+                    assert 2 == patch_addresses.call_count
+
+                    # Read again when the network changes
+                    with patch.object(host, '_get_network_fingerprint', return_value=[[(1, 'lo'), (2, 'eth1')]]):
+                        host.get_host_facts()
+                        assert 3 == patch_addresses.call_count
+                        host.get_host_facts()
+                        assert 3 == patch_addresses.call_count
+
+    def test_get_ip_addresses(self):
+        """The addresses are the ones of hostname -I"""
+        try:
+            result = subprocess.run(['hostname', '-I'], stdout=subprocess.PIPE)
+        except FileNotFoundError:
+            pytest.skip("hostname not available")
+        assert result.stdout.decode().split() == host._get_ip_addresses()
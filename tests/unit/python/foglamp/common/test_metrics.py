@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+from aiohttp import web
+import pytest
+
+from foglamp.common import metrics
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("common", "metrics")
+class TestMetrics:
+
+    def test_histogram(self):
+        histogram = metrics.Histogram((0.1, 1))
+        for seconds in [0.05, 0.5, 0.5, 3]:
+            histogram.add(seconds)
+        assert [(0.1, 1), (1, 3), ("+Inf", 4)] == histogram.cumulative_counts()
+        assert 1 == histogram.percentile(50)
+
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.counter('requests_total', 'Requests', ('route', 'status'))
+        counter.labels('/foglamp/ping', '200').inc()
+        counter.labels('/foglamp/ping', '200').inc(2)
+        counter.labels('/a"b\\', '500').inc()
+        registry.gauge('queued', 'Queued').set_function(lambda: 7)
+        histogram = registry.histogram('duration_seconds', 'Duration', bounds=(0.1, 1))
+        histogram.add(0.5)
+        histogram.add(0.25)
+
+        assert ('# HELP requests_total Requests\n'
+                '# TYPE requests_total counter\n'
+                'requests_total{route="/foglamp/ping",status="200"} 3\n'
+                'requests_total{route="/a\\"b\\\\",status="500"} 1\n'
+                '# HELP queued Queued\n'
+                '# TYPE queued gauge\n'
+                'queued 7\n'
+                '# HELP duration_seconds Duration\n'
+                '# TYPE duration_seconds histogram\n'
+                'duration_seconds_bucket{le="0.1"} 0\n'
+                'duration_seconds_bucket{le="1"} 2\n'
+                'duration_seconds_bucket{le="+Inf"} 2\n'
+                'duration_seconds_sum 0.75\n'
+                'duration_seconds_count 2\n') == registry.render()
+
+    def test_gauge_function_failing(self):
+        registry = metrics.Registry()
+        registry.gauge('queued', 'Queued').set_function(lambda: 1 / 0)
+        assert '# HELP queued Queued\n# TYPE queued gauge\n' == registry.render()
+
+    def test_register(self):
+        registry = metrics.Registry()
+        counter = registry.counter('requests_total', 'Requests', ('route',))
+        assert counter is registry.counter('requests_total', 'Requests', ('route',))
+        with pytest.raises(ValueError):
+            registry.gauge('requests_total', 'Requests')
+        with pytest.raises(ValueError):
+            counter.labels('/foglamp/ping', '200')
+
+    async def test_timed(self):
+        histogram = metrics.Histogram()
+        errors = metrics.Counter('errors_total', 'Errors').labels()
+
+        @metrics.timed(histogram, errors)
+        async def operation(fail):
+            if fail:
+                raise ValueError
+            return 'done'
+
+        assert 'done' == await operation(False)
+        with pytest.raises(ValueError):
+            await operation(True)
+        assert 2 == histogram.count
+        assert 1 == errors.value
+
+    async def test_get_metrics(self, test_client, loop):
+        app = web.Application(loop=loop)
+        app.router.add_route('GET', '/foglamp/metrics', metrics.get_metrics)
+        client = await test_client(app)
+        resp = await client.get('/foglamp/metrics')
+        assert 200 == resp.status
+        assert resp.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE foglamp_event_loop_lag_seconds histogram' in await resp.text()
+        assert metrics._loop_lag_task is not None
+        metrics._loop_lag_task.cancel()
@@ -10,6 +10,7 @@ import copy
 from unittest.mock import MagicMock, patch
 import pytest
 
+from foglamp.common import plugin_discovery
 from foglamp.common.plugin_discovery import PluginDiscovery, _logger
 from foglamp.services.core.api import utils
 
@@ -144,7 +145,7 @@ class TestPluginDiscovery:
             yield TestPluginDiscovery.mock_c_south_folders
 
         mock_get_folders = mocker.patch.object(PluginDiscovery, "get_plugin_folders", return_value=next(mock_folders()))
-        mock_get_c_folders = mocker.patch.object(utils, "find_c_plugin_libs", return_value=next(mock_c_folders()))
+        mock_get_c_folders = mocker.patch.object(PluginDiscovery, "_find_c_plugin_libs", return_value=next(mock_c_folders()))
         mock_get_plugin_config = mocker.patch.object(PluginDiscovery, "get_plugin_config", side_effect=TestPluginDiscovery.mock_plugins_config)
         mock_get_c_plugin_config = mocker.patch.object(utils, "get_plugin_info", side_effect=TestPluginDiscovery.mock_c_plugins_config)
 
@@ -169,7 +170,7 @@ class TestPluginDiscovery:
 
         mock_get_folders = mocker.patch.object(PluginDiscovery, "get_plugin_folders", return_value=next(mock_folders()))
         mock_get_plugin_config = mocker.patch.object(PluginDiscovery, "get_plugin_config", side_effect=TestPluginDiscovery.mock_plugins_north_config)
-        mock_get_c_folders = mocker.patch.object(utils, "find_c_plugin_libs", return_value=next(mock_c_folders()))
+        mock_get_c_folders = mocker.patch.object(PluginDiscovery, "_find_c_plugin_libs", return_value=next(mock_c_folders()))
         mock_get_c_plugin_config = mocker.patch.object(utils, "get_plugin_info", side_effect=TestPluginDiscovery.mock_c_plugins_north_config)
 
         plugins = PluginDiscovery.get_plugins_installed("north")
@@ -193,7 +194,7 @@ class TestPluginDiscovery:
 
         mock_get_folders = mocker.patch.object(PluginDiscovery, "get_plugin_folders", return_value=next(mock_folders()))
         mock_get_plugin_config = mocker.patch.object(PluginDiscovery, "get_plugin_config", side_effect=TestPluginDiscovery.mock_plugins_south_config)
-        mock_get_c_folders = mocker.patch.object(utils, "find_c_plugin_libs", return_value=next(mock_c_folders()))
+        mock_get_c_folders = mocker.patch.object(PluginDiscovery, "_find_c_plugin_libs", return_value=next(mock_c_folders()))
         mock_get_c_plugin_config = mocker.patch.object(utils, "get_plugin_info", side_effect=TestPluginDiscovery.mock_c_plugins_south_config)
 
         plugins = PluginDiscovery.get_plugins_installed("south")
@@ -267,7 +268,7 @@ class TestPluginDiscovery:
     ])
     def test_bad_fetch_c_south_plugin_installed(self, info, exc_count):
         with patch.object(_logger, "exception") as patch_log_exc:
-            with patch.object(utils, "find_c_plugin_libs", return_value=["Random"]) as patch_plugin_lib:
+            with patch.object(PluginDiscovery, "_find_c_plugin_libs", return_value=["Random"]) as patch_plugin_lib:
                 with patch.object(utils, "get_plugin_info",  return_value=info) as patch_plugin_info:
                     PluginDiscovery.fetch_c_plugins_installed("south")
                 patch_plugin_info.assert_called_once_with('Random')
@@ -281,7 +282,7 @@ class TestPluginDiscovery:
     ])
     def test_bad_fetch_c_north_plugin_installed(self, info, exc_count):
         with patch.object(_logger, "exception") as patch_log_exc:
-            with patch.object(utils, "find_c_plugin_libs", return_value=["PI_Server"]) as patch_plugin_lib:
+            with patch.object(PluginDiscovery, "_find_c_plugin_libs", return_value=["PI_Server"]) as patch_plugin_lib:
                 with patch.object(utils, "get_plugin_info", return_value=info) as patch_plugin_info:
                     PluginDiscovery.fetch_c_plugins_installed("north")
                 patch_plugin_info.assert_called_once_with('PI_Server')
@@ -319,3 +320,79 @@ class TestPluginDiscovery:
         assert 1 == patch_log_exc.call_count
         args, kwargs = patch_log_exc.call_args
         assert msg in args[0]
+
+    @pytest.fixture
+    def clear_cache(self):
+        plugin_discovery._plugin_configs.clear()
+        plugin_discovery._c_plugin_configs.clear()
+        plugin_discovery._c_plugin_libs.clear()
+        plugin_discovery._c_plugin_names.clear()
+        plugin_discovery._c_plugin_dirs.clear()
+        yield
+        plugin_discovery._plugin_configs.clear()
+        plugin_discovery._c_plugin_configs.clear()
+        plugin_discovery._c_plugin_libs.clear()
+        plugin_discovery._c_plugin_names.clear()
+        plugin_discovery._c_plugin_dirs.clear()
+
+    def test_fetch_plugins_installed_cached(self, tmpdir, clear_cache):
+        plugin_dir = tmpdir.mkdir("python").mkdir("foglamp").mkdir("plugins").mkdir("south").mkdir("modbus")
+        module = plugin_dir.join("modbus.py")
+        module.write("")
+        config = TestPluginDiscovery.mock_plugins_south_config[0]
+        with patch.object(utils, "_FOGLAMP_ROOT", str(tmpdir)):
+            with patch.object(PluginDiscovery, "get_plugin_config", return_value=config) as patch_get_plugin_config:
+                assert [config] == PluginDiscovery.fetch_plugins_installed("south")
+                assert [config] == PluginDiscovery.fetch_plugins_installed("south")
+                assert 1 == patch_get_plugin_config.call_count
+
+                # A changed plugin is loaded again
+                module.write("# changed")
+                module.setmtime(module.mtime() + 10)
+                assert [config] == PluginDiscovery.fetch_plugins_installed("south")
+                assert 2 == patch_get_plugin_config.call_count
+
+    def test_fetch_c_plugins_installed_cached(self, tmpdir, clear_cache):
+        libs = tmpdir.mkdir("plugins").mkdir("south")
+        libs.join("libdummy.so").write("")
+        libs.join("librandom.so").write("")
+        info = {"version": "1.0.0", "config": {"plugin": {"description": "C plugin"}}}
+        with patch.object(utils, "_FOGLAMP_ROOT", str(tmpdir)):
+            with patch.object(utils, "get_plugin_info", return_value=info) as patch_plugin_info:
+                expected = [{'name': name, 'type': 'south', 'description': 'C plugin', 'version': '1.0.0'}
+                            for name in ["dummy", "random"]]
+                assert expected == sorted(PluginDiscovery.fetch_c_plugins_installed("south"), key=lambda c: c['name'])
+                assert expected == sorted(PluginDiscovery.fetch_c_plugins_installed("south"), key=lambda c: c['name'])
+                assert 2 == patch_plugin_info.call_count
+
+                lib = libs.join("librandom.so")
+                lib.write("changed")
+                assert expected == sorted(PluginDiscovery.fetch_c_plugins_installed("south"), key=lambda c: c['name'])
+                assert 3 == patch_plugin_info.call_count
+                patch_plugin_info.assert_called_with("random")
+
+    def test_find_c_plugin_libs_cached(self, tmpdir, clear_cache):
+        south = tmpdir.mkdir("plugins").mkdir("south")
+        south.mkdir("dummy").join("libdummy.so").write("")
+        tmpdir.join("plugins").mkdir("north")
+        with patch.object(utils, "_FOGLAMP_ROOT", str(tmpdir)):
+            with patch.object(utils, "find_c_plugins", wraps=utils.find_c_plugins) as patch_find:
+                assert ["dummy"] == PluginDiscovery._find_c_plugin_libs("south")
+                assert [] == PluginDiscovery._find_c_plugin_libs("north")
+                assert ["dummy"] == PluginDiscovery._find_c_plugin_libs("south")
+                # The C plugins of every type are found in one walk
+                assert 1 == patch_find.call_count
+                assert str(south.join("dummy", "libdummy.so")) == plugin_discovery._c_plugin_libs["dummy"]
+
+                # A new plugin changes the modification time of its directory, the tree is walked again
+                south.mkdir("random").join("librandom.so").write("")
+                south.setmtime(south.mtime() + 10)
+                assert ["dummy", "random"] == sorted(PluginDiscovery._find_c_plugin_libs("south"))
+                assert 2 == patch_find.call_count
+
+                # A moved library is found again by the walk
+                south.join("dummy", "libdummy.so").move(south.join("random", "libdummy.so"))
+                south.join("dummy").setmtime(south.join("dummy").mtime() + 10)
+                assert ["dummy", "random"] == sorted(PluginDiscovery._find_c_plugin_libs("south"))
+                assert 3 == patch_find.call_count
+                assert str(south.join("random", "libdummy.so")) == plugin_discovery._c_plugin_libs["dummy"]
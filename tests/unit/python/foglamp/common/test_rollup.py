@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+import pytest
+
+from foglamp.common import rollup
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("common", "rollup")
+class TestRollup:
+
+    @pytest.mark.parametrize("period, floor, ceil", [
+        (1, datetime(2018, 9, 10, 10, 30, 25), datetime(2018, 9, 10, 10, 30, 26)),
+        (60, datetime(2018, 9, 10, 10, 30), datetime(2018, 9, 10, 10, 31)),
+        (3600, datetime(2018, 9, 10, 10), datetime(2018, 9, 10, 11))
+    ])
+    def test_floor_ceil_time(self, period, floor, ceil):
+        assert floor == rollup.floor_time(datetime(2018, 9, 10, 10, 30, 25, 500), period)
+        assert ceil == rollup.ceil_time(datetime(2018, 9, 10, 10, 30, 25, 500), period)
+        assert floor == rollup.ceil_time(floor, period)
+
+    def test_parse_bucket(self):
+        assert datetime(2018, 9, 10, 10) == rollup.parse_bucket('2018-09-10 10', 3600)
+        assert datetime(2018, 9, 10, 10, 30, 25) == rollup.parse_bucket('2018-09-10 10:30:25', 1)
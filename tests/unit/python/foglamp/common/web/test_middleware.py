@@ -7,6 +7,9 @@
 
 """ Test foglamp/common/web/middleware.py """
 
+import asyncio
+from unittest.mock import patch
+
 from aiohttp import web
 import pytest
 import json
@@ -99,3 +102,230 @@ class TestMiddleware:
         assert "OK" == resp.reason
         txt = await resp.text()
         assert {'key': 'Okay'} == json.loads(txt)
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("common", "web")
+class TestCachingMiddleware:
+
+    @pytest.fixture
+    def versions(self):
+        return {'version': 1, 'calls': 0}
+
+    @pytest.fixture
+    def client(self, loop, test_client, versions):
+        async def small(request):
+            return web.json_response({"key": "Okay"})
+
+        async def large(request):
+            return web.json_response({"key": "Okay" * 1000})
+
+        @middleware.versioned(lambda: versions['version'])
+        async def versioned(request):
+            versions['calls'] += 1
+            return web.json_response({"version": versions['version']})
+
+        async def get_version():
+            return versions['version']
+
+        @middleware.versioned(get_version)
+        async def versioned_async(request):
+            versions['calls'] += 1
+            return web.json_response({"version": versions['version']})
+
+        app = web.Application(loop=loop, middlewares=[middleware.error_middleware, middleware.compression_middleware,
+                                                      middleware.etag_middleware])
+        app.router.add_route('GET', '/small', small)
+        app.router.add_route('GET', '/large', large)
+        app.router.add_route('GET', '/versioned', versioned)
+        app.router.add_route('GET', '/versioned_async', versioned_async)
+        return loop.run_until_complete(test_client(app))
+
+    @pytest.mark.parametrize("url, accept_encoding, content_encoding", [
+        ('/large', 'gzip', 'gzip'),
+        ('/large', 'gzip, deflate', 'deflate'),
+        ('/large', 'identity', None),
+        ('/small', 'gzip', None)
+    ])
+    async def test_compression(self, client, url, accept_encoding, content_encoding):
+        resp = await client.get(url, headers={'Accept-Encoding': accept_encoding})
+        assert 200 == resp.status
+        assert content_encoding == resp.headers.get('Content-Encoding')
+        assert 'Okay' in (await resp.json())['key']
+
+    async def test_etag(self, client):
+        resp = await client.get('/small')
+        assert 200 == resp.status
+        etag = resp.headers['ETag']
+
+        resp = await client.get('/small', headers={'If-None-Match': etag})
+        assert 304 == resp.status
+        assert etag == resp.headers['ETag']
+
+        resp = await client.get('/small', headers={'If-None-Match': 'W/"other"'})
+        assert 200 == resp.status
+
+    async def test_etag_large(self, client):
+        with patch.object(middleware, '_ETAG_MAX_BYTES', 1024):
+            resp = await client.get('/large')
+            assert 200 == resp.status
+            assert 'ETag' not in resp.headers
+
+    @pytest.mark.parametrize("url", ['/versioned', '/versioned_async'])
+    async def test_versioned(self, client, versions, url):
+        resp = await client.get(url)
+        assert 200 == resp.status
+        etag = resp.headers['ETag']
+        assert 1 == versions['calls']
+
+        # The handler is not called while the version does not change
+        resp = await client.get(url, headers={'If-None-Match': etag})
+        assert 304 == resp.status
+        assert 1 == versions['calls']
+
+        versions['version'] = 2
+        resp = await client.get(url, headers={'If-None-Match': etag})
+        assert 200 == resp.status
+        assert {"version": 2} == await resp.json()
+        assert etag != resp.headers['ETag']
+        assert 2 == versions['calls']
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("common", "web")
+class TestAdmissionMiddleware:
+
+    @pytest.fixture(autouse=True)
+    def clear_admission(self):
+        middleware._admission_semaphores.clear()
+        middleware._token_buckets.clear()
+        yield
+        middleware._admission_semaphores.clear()
+        middleware._token_buckets.clear()
+
+    @pytest.fixture
+    def released(self):
+        return dict()
+
+    @pytest.fixture
+    def client(self, loop, test_client, released):
+        async def heavy(request):
+            await released['event'].wait()
+            return web.json_response({"key": "heavy"})
+
+        async def light(request):
+            return web.json_response({"key": "light"})
+
+        app = web.Application(loop=loop, middlewares=[middleware.error_middleware, middleware.admission_middleware])
+        app.router.add_route('GET', '/foglamp/asset', heavy)
+        app.router.add_route('GET', '/foglamp/asset/{asset_code}/export', heavy)
+        app.router.add_route('GET', '/foglamp/ping', light)
+        return loop.run_until_complete(test_client(app))
+
+    async def test_rate_limit(self, client):
+        with patch.dict(middleware._RATE_LIMITS, {'light': (0.5, 2)}):
+            for _ in range(2):
+                resp = await client.get('/foglamp/ping')
+                assert 200 == resp.status
+            resp = await client.get('/foglamp/ping')
+            assert 429 == resp.status
+            assert '2' == resp.headers['Retry-After']
+
+            # A new Authorization header is not a new bucket
+            resp = await client.get('/foglamp/ping', headers={'Authorization': 'token'})
+            assert 429 == resp.status
+
+    def test_token_buckets_bounded(self):
+        with patch.object(middleware, '_MAX_CLIENTS', 2):
+            for client in ['a', 'b', 'a', 'c']:
+                assert 0 == middleware._take_token(client, 'light')
+        # The least recently seen client is removed
+        assert [('a', 'light'), ('c', 'light')] == list(middleware._token_buckets)
+
+    @pytest.mark.parametrize("path, route_class", [
+        ('/foglamp/asset', 'heavy'),
+        ('/foglamp/asset/sinusoid', 'heavy'),
+        ('/foglamp/asset/sinusoid/export', 'export'),
+        ('/foglamp/audit', 'heavy'),
+        ('/foglamp/audit/logcode', 'light'),
+        ('/foglamp/audit/severity', 'light'),
+        ('/foglamp/syslog', 'heavy'),
+        ('/foglamp/statistics', 'light'),
+        ('/foglamp/ping', 'light')
+    ])
+    def test_route_class(self, path, route_class):
+        assert route_class == middleware._route_class(path)
+
+    async def test_concurrency_limit(self, client, released):
+        released['event'] = asyncio.Event()
+        with patch.dict(middleware._MAX_CONCURRENT_REQUESTS, {'heavy': 1}):
+            with patch.object(middleware, '_QUEUE_TIMEOUT_SECONDS', 0.1):
+                first = asyncio.ensure_future(client.get('/foglamp/asset'))
+                await asyncio.sleep(0.05)
+
+                resp = await client.get('/foglamp/asset')
+                assert 503 == resp.status
+                assert 'Retry-After' in resp.headers
+
+                # The management requests are not starved by the heavy ones
+                resp = await client.get('/foglamp/ping')
+                assert 200 == resp.status
+
+                # Nor are the other heavy requests by the exports
+                export = asyncio.ensure_future(client.get('/foglamp/asset/sinusoid/export'))
+                await asyncio.sleep(0.05)
+                assert 0 == middleware._admission_semaphores['heavy']._value
+                assert 1 == middleware._admission_semaphores['export']._value
+
+                released['event'].set()
+                resp = await first
+                assert 200 == resp.status
+                resp = await export
+                assert 200 == resp.status
+                assert 1 == middleware._admission_semaphores['heavy']._value
+
+    def test_set_admission_limits(self):
+        with patch.dict(middleware._MAX_CONCURRENT_REQUESTS), patch.dict(middleware._RATE_LIMITS):
+            middleware._take_token('a', 'light')
+            middleware.set_admission_limits({'light': 16, 'heavy': 8, 'export': 0}, {'light': 600, 'heavy': 0})
+            assert {'export': 1, 'heavy': 8, 'light': 16} == middleware._MAX_CONCURRENT_REQUESTS
+            assert {'export': (0.1, 6), 'heavy': None, 'light': (10, 50)} == middleware._RATE_LIMITS
+            assert 0 == len(middleware._token_buckets)
+
+            # No limit, no bucket
+            for _ in range(100):
+                assert 0 == middleware._take_token('a', 'heavy')
+            assert 0 == len(middleware._token_buckets)
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("common", "web")
+class TestMetricsMiddleware:
+
+    @pytest.fixture
+    def client(self, loop, test_client):
+        async def schedule(request):
+            if request.match_info['schedule_id'] == 'missing':
+                raise web.HTTPNotFound()
+            return web.json_response({"key": "Okay"})
+
+        app = web.Application(loop=loop, middlewares=[middleware.metrics_middleware, middleware.error_middleware])
+        app.router.add_route('GET', '/foglamp/schedule/{schedule_id}', schedule)
+        return loop.run_until_complete(test_client(app))
+
+    async def test_metrics(self, client):
+        route = '/foglamp/schedule/{schedule_id}'
+        ok = middleware._REQUESTS.labels(route, 'GET', '200')
+        not_found = middleware._REQUESTS.labels(route, 'GET', '404')
+        unmatched = middleware._REQUESTS.labels('unmatched', 'GET', '404')
+        duration = middleware._REQUEST_DURATION.labels(route, 'GET')
+        counts = (ok.value, not_found.value, unmatched.value, duration.count)
+
+        assert 200 == (await client.get('/foglamp/schedule/1')).status
+        assert 200 == (await client.get('/foglamp/schedule/2')).status
+        assert 404 == (await client.get('/foglamp/schedule/missing')).status
+        assert 404 == (await client.get('/foglamp/nothing')).status
+
+        # The requests of a route are counted together whatever the values of its path
+        assert (counts[0] + 2, counts[1] + 1, counts[2] + 1, counts[3] + 3) == (
+            ok.value, not_found.value, unmatched.value, duration.count)
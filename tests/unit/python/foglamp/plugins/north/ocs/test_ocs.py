@@ -101,6 +101,7 @@ class TestOCS:
                 'sending_process_instance': MagicMock(spec=SendingProcess),
                 "formatNumber": {"value": "float64"},
                 "formatInteger": {"value": "int64"},
+                "notBlockingErrors": {"value": json.dumps([{'id': 400, 'message': 'Invalid value type'}])},
 
         }
 
@@ -124,6 +125,7 @@ class TestOCS:
 
         # Check conversion from String to Dict
         assert isinstance(config['StaticData'], dict)
+        assert config['notBlockingErrors'] == [{'id': 400, 'message': 'Invalid value type'}]
 
     @pytest.mark.parametrize("data", [
 
@@ -405,6 +405,28 @@ class TestOMF:
         pi_server._logger = MagicMock()
         pi_server.plugin_reconfigure()
 
+    @pytest.mark.parametrize(
+        "p_timestamps, "
+        "expected_timestamps",
+        [
+            # Fast path - all the timestamps share the complete format
+            (
+                ["2018-04-20 09:38:50.163164+00", "2018-04-20 09:38:51.000000+00"],
+                ["2018-04-20T09:38:50.163Z", "2018-04-20T09:38:51.000Z"]
+            ),
+            # Timestamps having a different format
+            (
+                ["2018-04-20 09:38:50.163164+00", "2018-04-20 09:38:50.84+00", "2018-04-20 09:38:50+00"],
+                ["2018-04-20T09:38:50.163Z", "2018-04-20T09:38:50.840Z", "2018-04-20T09:38:50.000Z"]
+            ),
+            ([], []),
+        ]
+    )
+    def test_omf_timestamps(self, p_timestamps, expected_timestamps):
+        """ Tests the block level conversion of the timestamps to the OMF format """
+
+        assert pi_server.omf_timestamps(p_timestamps) == expected_timestamps
+
 
 class TestPIServerNorthPlugin:
     """Unit tests related to PIServerNorthPlugin, methods used internally to the plugin"""
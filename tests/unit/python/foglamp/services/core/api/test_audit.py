@@ -24,6 +24,17 @@ __license__ = "Apache 2.0"
 __version__ = "${VERSION}"
 
 
+def _with_version(q_result):
+    """ Answers the query of the version of the audit trail, then the queries of the handler with q_result """
+    @asyncio.coroutine
+    def q_version(*args):
+        if args[0] == 'log' and {"aggregate": {"operation": "max", "column": "id", "alias": "max_id"}} == \
+                json.loads(args[1]):
+            return {"rows": [{"max_id": 2}]}
+        return (yield from q_result(*args))
+    return q_version
+
+
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "audit")
 class TestAudit:
@@ -35,6 +46,10 @@ class TestAudit:
         routes.setup(app)
         return loop.run_until_complete(test_client(app))
 
+    @pytest.fixture(autouse=True)
+    def clear_total_count_cache(self):
+        audit._total_count_cache.clear()
+
     @pytest.fixture()
     def get_log_codes(self):
         return {"rows": [{"code": "PURGE", "description": "Data Purging Process"},
@@ -98,13 +113,13 @@ class TestAudit:
             log_code_patch.assert_called_once_with('log_codes')
 
     @pytest.mark.parametrize("request_params, payload", [
-        ('', {"return": ["code", "level", "log", {"column": "ts", "format": "YYYY-MM-DD HH24:MI:SS.MS", "alias": "timestamp"}], "where": {"column": "1", "condition": "=", "value": 1}, "sort": {"column": "ts", "direction": "desc"}, "limit": 20}),
-        ('?source=PURGE', {'return': ['code', 'level', 'log', {'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'column': 'ts', 'alias': 'timestamp'}], 'where': {'value': 1, 'and': {'value': 'PURGE', 'column': 'code', 'condition': '='}, 'column': '1', 'condition': '='}, 'sort': {'direction': 'desc', 'column': 'ts'}, 'limit': 20}),
-        ('?skip=1', {'where': {'value': 1, 'column': '1', 'condition': '='}, 'limit': 20, 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'skip': 1, 'sort': {'direction': 'desc', 'column': 'ts'}}),
-        ('?severity=failure', {'where': {'and': {'value': 1, 'column': 'level', 'condition': '='}, 'value': 1, 'column': '1', 'condition': '='}, 'limit': 20, 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'sort': {'direction': 'desc', 'column': 'ts'}}),
-        ('?severity=FAILURE&limit=1', {'limit': 1, 'sort': {'direction': 'desc', 'column': 'ts'}, 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'where': {'value': 1, 'condition': '=', 'and': {'value': 1, 'condition': '=', 'column': 'level'}, 'column': '1'}}),
-        ('?severity=INFORMATION&limit=1&skip=1', {'limit': 1, 'sort': {'direction': 'desc', 'column': 'ts'}, 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'skip': 1, 'where': {'value': 1, 'condition': '=', 'and': {'value': 4, 'condition': '=', 'column': 'level'}, 'column': '1'}}),
-        ('?source=&severity=&limit=&skip=', {'limit': 20, 'sort': {'direction': 'desc', 'column': 'ts'}, 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'where': {'value': 1, 'condition': '=', 'column': '1'}})
+        ('', {"return": ["code", "level", "log", {"column": "ts", "format": "YYYY-MM-DD HH24:MI:SS.MS", "alias": "timestamp"}], "where": {"column": "1", "condition": "=", "value": 1}, "sort": [{"column": "ts", "direction": "desc"}, {"column": "id", "direction": "desc"}], "limit": 20}),
+        ('?source=PURGE', {'return': ['code', 'level', 'log', {'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'column': 'ts', 'alias': 'timestamp'}], 'where': {'value': 1, 'and': {'value': 'PURGE', 'column': 'code', 'condition': '='}, 'column': '1', 'condition': '='}, 'sort': [{'column': 'ts', 'direction': 'desc'}, {'column': 'id', 'direction': 'desc'}], 'limit': 20}),
+        ('?skip=1', {'where': {'value': 1, 'column': '1', 'condition': '='}, 'limit': 20, 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'skip': 1, 'sort': [{'column': 'ts', 'direction': 'desc'}, {'column': 'id', 'direction': 'desc'}]}),
+        ('?severity=failure', {'where': {'and': {'value': 1, 'column': 'level', 'condition': '='}, 'value': 1, 'column': '1', 'condition': '='}, 'limit': 20, 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'sort': [{'column': 'ts', 'direction': 'desc'}, {'column': 'id', 'direction': 'desc'}]}),
+        ('?severity=FAILURE&limit=1', {'limit': 1, 'sort': [{'column': 'ts', 'direction': 'desc'}, {'column': 'id', 'direction': 'desc'}], 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'where': {'value': 1, 'condition': '=', 'and': {'value': 1, 'condition': '=', 'column': 'level'}, 'column': '1'}}),
+        ('?severity=INFORMATION&limit=1&skip=1', {'limit': 1, 'sort': [{'column': 'ts', 'direction': 'desc'}, {'column': 'id', 'direction': 'desc'}], 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'skip': 1, 'where': {'value': 1, 'condition': '=', 'and': {'value': 4, 'condition': '=', 'column': 'level'}, 'column': '1'}}),
+        ('?source=&severity=&limit=&skip=', {'limit': 20, 'sort': [{'column': 'ts', 'direction': 'desc'}, {'column': 'id', 'direction': 'desc'}], 'return': ['code', 'level', 'log', {'column': 'ts', 'format': 'YYYY-MM-DD HH24:MI:SS.MS', 'alias': 'timestamp'}], 'where': {'value': 1, 'condition': '=', 'column': '1'}})
     ])
     async def test_get_audit_with_params(self, client, request_params, payload, get_log_codes, loop):
         storage_client_mock = MagicMock(StorageClientAsync)
@@ -114,7 +129,7 @@ class TestAudit:
                               "code": "PURGE", "level": "4", "id": 2,
                               "timestamp": "2018-01-30 18:39:48.796263", 'count': 1}]}
         @asyncio.coroutine
-        def async_mock():
+        def async_mock(*args):
             return response
 
         @asyncio.coroutine
@@ -123,7 +138,7 @@ class TestAudit:
 
         with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
             with patch.object(storage_client_mock, 'query_tbl', return_value=asyncio.ensure_future(async_mock_log(), loop=loop)):
-                with patch.object(storage_client_mock, 'query_tbl_with_payload', return_value=asyncio.ensure_future(async_mock(), loop=loop)) as log_code_patch:
+                with patch.object(storage_client_mock, 'query_tbl_with_payload', side_effect=_with_version(async_mock)) as log_code_patch:
                     resp = await client.get('/foglamp/audit{}'.format(request_params))
                     assert 200 == resp.status
                     result = await resp.text()
@@ -135,6 +150,66 @@ class TestAudit:
                 p = json.loads(args[1])
                 assert payload == p
 
+    async def test_get_audit_pages(self, client, loop):
+        storage_client_mock = MagicMock(StorageClientAsync)
+        rows = [{"log": {"rowsRemoved": 0}, "code": "PURGE", "level": "4", "timestamp": "2018-01-30 18:39:48.796"},
+                {"log": {"rowsRemoved": 0}, "code": "PURGE", "level": "4", "timestamp": "2018-01-30 18:38:48.796"}]
+
+        @asyncio.coroutine
+        def q_result(*args):
+            payload = json.loads(args[1])
+            if 'aggregate' in payload:
+                return {"rows": [{"count": 3}]}
+            return {"rows": rows if 'skip' not in payload else rows[1:]}
+
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            with patch.object(storage_client_mock, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
+                resp = await client.get('/foglamp/audit?limit=2')
+                assert 200 == resp.status
+                json_response = json.loads(await resp.text())
+                assert 3 == json_response['totalCount']
+                assert 2 == len(json_response['audit'])
+
+                resp = await client.get('/foglamp/audit?limit=2&cursor={}'.format(json_response['next']))
+                assert 200 == resp.status
+                json_response = json.loads(await resp.text())
+                assert 3 == json_response['totalCount']
+                assert 1 == len(json_response['audit'])
+                assert 'next' not in json_response
+
+            # The total count is reused by the second page
+            assert 5 == query_patch.call_count
+            args, kwargs = query_patch.call_args
+            assert {"return": ["code", "level", "log",
+                               {"column": "ts", "format": "YYYY-MM-DD HH24:MI:SS.MS", "alias": "timestamp"}],
+                    "where": {"column": "1", "condition": "=", "value": 1,
+                              "and": {"column": "ts", "condition": "<", "value": "2018-01-30 18:38:48.797"}},
+                    "sort": [{"column": "ts", "direction": "desc"}, {"column": "id", "direction": "desc"}],
+                    "limit": 2, "skip": 1} == json.loads(args[1])
+
+    async def test_get_audit_not_modified(self, client):
+        storage_client_mock = MagicMock(StorageClientAsync)
+
+        @asyncio.coroutine
+        def q_result(*args):
+            payload = json.loads(args[1])
+            if 'aggregate' in payload:
+                return {"rows": [{"count": 1}]}
+            return {"rows": [{"log": {"rowsRemoved": 0}, "code": "PURGE", "level": "4",
+                              "timestamp": "2018-01-30 18:39:48.796"}]}
+
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            with patch.object(storage_client_mock, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
+                resp = await client.get('/foglamp/audit')
+                assert 200 == resp.status
+                etag = resp.headers['ETag']
+                assert 3 == query_patch.call_count
+
+                # Revalidated with the id of the newest entry only
+                resp = await client.get('/foglamp/audit', headers={'If-None-Match': etag})
+                assert 304 == resp.status
+                assert 4 == query_patch.call_count
+
     @pytest.mark.parametrize("request_params, response_code, response_message", [
         ('?source=BLA', 400, "BLA is not a valid source"),
         ('?source=1234', 400, "1234 is not a valid source"),
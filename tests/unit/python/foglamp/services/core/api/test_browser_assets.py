@@ -7,6 +7,7 @@
 
 import asyncio
 import json
+from datetime import datetime
 from unittest.mock import MagicMock, patch
 
 from aiohttp import web
@@ -15,7 +16,7 @@ import pytest
 
 from foglamp.services.core.api import browser
 from foglamp.services.core import connect
-from foglamp.common.storage_client.storage_client import ReadingsStorageClientAsync
+from foglamp.common.storage_client.storage_client import ReadingsStorageClientAsync, StorageClientAsync
 
 __author__ = "Ashish Jabble"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -30,8 +31,8 @@ URLS = ['foglamp/asset',
         '/foglamp/asset/fogbench%2fhumidity/temperature/series']
 
 PAYLOADS = ['{"aggregate": {"column": "*", "alias": "count", "operation": "count"}, "group": "asset_code"}',
-            '{"return": ["reading", {"format": "YYYY-MM-DD HH24:MI:SS.MS", "column": "user_ts", "alias": "timestamp"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}',
-            '{"return": [{"format": "YYYY-MM-DD HH24:MI:SS.MS", "column": "user_ts", "alias": "timestamp"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}',
+            '{"return": ["reading", {"format": "YYYY-MM-DD HH24:MI:SS.MS", "column": "user_ts", "alias": "timestamp"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}]}',
+            '{"return": [{"format": "YYYY-MM-DD HH24:MI:SS.MS", "column": "user_ts", "alias": "timestamp"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}]}',
             '{"aggregate": [{"operation": "min", "alias": "min", "json": {"properties": "temperature", "column": "reading"}}, {"operation": "max", "alias": "max", "json": {"properties": "temperature", "column": "reading"}}, {"operation": "avg", "alias": "average", "json": {"properties": "temperature", "column": "reading"}}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}}',
             '{"aggregate": [{"operation": "min", "alias": "min", "json": {"properties": "temperature", "column": "reading"}}, {"operation": "max", "alias": "max", "json": {"properties": "temperature", "column": "reading"}}, {"operation": "avg", "alias": "average", "json": {"properties": "temperature", "column": "reading"}}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "group": {"format": "YYYY-MM-DD HH24:MI:SS", "column": "user_ts", "alias": "timestamp"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}'
             ]
@@ -59,6 +60,23 @@ def mock_coro(*args, **kwargs):
 class TestBrowserAssets:
     """Browser Assets"""
 
+    @pytest.fixture(autouse=True)
+    def clear_asset_keys_cache(self):
+        browser._asset_keys_cache.clear()
+        browser._asset_counts_cache.clear()
+        yield
+        browser._asset_keys_cache.clear()
+        browser._asset_counts_cache.clear()
+
+    @pytest.fixture(autouse=True)
+    def no_rollups(self):
+        """The sensors are not rolled up unless a test patches the storage client"""
+        storage_client_mock = MagicMock(StorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            with patch.object(storage_client_mock, 'query_tbl_with_payload',
+                              side_effect=lambda *args: mock_coro({'count': 0, 'rows': []})) as query_tbl_patch:
+                yield query_tbl_patch
+
     @pytest.fixture
     async def app(self):
         app = web.Application()
@@ -70,7 +88,7 @@ class TestBrowserAssets:
         return loop.run_until_complete(test_client(app))
 
     def test_routes_count(self, app):
-        assert 6 == len(app.router.resources())
+        assert 7 == len(app.router.resources())
 
     def test_routes_info(self, app):
         for index, route in enumerate(app.router.routes()):
@@ -91,16 +109,21 @@ class TestBrowserAssets:
                 assert "/foglamp/asset/{asset_code}/summary" == res_info["formatter"]
                 assert str(route.handler).startswith("<function asset_all_readings_summary")
             elif index == 3:
+                assert "GET" == route.method
+                assert type(route.resource) is DynamicResource
+                assert "/foglamp/asset/{asset_code}/export" == res_info["formatter"]
+                assert str(route.handler).startswith("<function asset_export")
+            elif index == 4:
                 assert "GET" == route.method
                 assert type(route.resource) is DynamicResource
                 assert "/foglamp/asset/{asset_code}/{reading}" == res_info["formatter"]
                 assert str(route.handler).startswith("<function asset_reading")
-            elif index == 4:
+            elif index == 5:
                 assert "GET" == route.method
                 assert type(route.resource) is DynamicResource
                 assert "/foglamp/asset/{asset_code}/{reading}/summary" == res_info["formatter"]
                 assert str(route.handler).startswith("<function asset_summary")
-            elif index == 5:
+            elif index == 6:
                 assert "GET" == route.method
                 assert type(route.resource) is DynamicResource
                 assert "/foglamp/asset/{asset_code}/{reading}/series" == res_info["formatter"]
@@ -154,7 +177,7 @@ class TestBrowserAssets:
         ('hours', '{"aggregate": [{"alias": "min", "operation": "min", "json": {"properties": "temperature", "column": "reading"}}, {"alias": "max", "operation": "max", "json": {"properties": "temperature", "column": "reading"}}, {"alias": "average", "operation": "avg", "json": {"properties": "temperature", "column": "reading"}}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "group": {"alias": "timestamp", "format": "YYYY-MM-DD HH24", "column": "user_ts"}, "limit": 20, "sort": {"column": "user_ts", "direction": "desc"}}',
          {'count': 1, 'rows': [{'min': '9', 'average': '9', 'max': '9', 'timestamp': '2018-02-19 17'}]})
     ])
-    async def test_asset_averages_with_valid_group_name(self, client, group_name, payload, result):
+    async def test_asset_averages_with_valid_group_name(self, client, no_rollups, group_name, payload, result):
         readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
         with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
             with patch.object(readings_storage_client_mock, 'query', return_value=mock_coro(result)) as query_patch:
@@ -167,6 +190,8 @@ class TestBrowserAssets:
             args, kwargs = query_patch.call_args
             assert json.loads(payload) == json.loads(args[0])
             query_patch.assert_called_once_with(args[0])
+        # The seconds are not rolled up
+        assert (0 if group_name == 'seconds' else 1) == no_rollups.call_count
 
     @pytest.mark.parametrize("request_param, response_message", [
         ('?group=BLA', "BLA is not a valid group"),
@@ -180,7 +205,9 @@ class TestBrowserAssets:
         ('?minutes=invalid', "Time must be a positive integer"),
         ('?minutes=-1', "Time must be a positive integer"),
         ('?hours=invalid', "Time must be a positive integer"),
-        ('?hours=-1', "Time must be a positive integer")
+        ('?hours=-1', "Time must be a positive integer"),
+        ('?points=invalid', "Points must be a positive integer"),
+        ('?points=0', "Points must be a positive integer")
     ])
     async def test_request_params_with_bad_data(self, client, request_param, response_message):
         resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature/series{}'.format(request_param))
@@ -188,9 +215,9 @@ class TestBrowserAssets:
         assert response_message == resp.reason
 
     @pytest.mark.parametrize("request_params, payload", [
-        ('?limit=5', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 5, "sort": {"column": "user_ts", "direction": "desc"}}'),
-        ('?skip=1', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "skip": 1, "sort": {"column": "user_ts", "direction": "desc"}}'),
-        ('?limit=5&skip=1', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 5, "skip": 1, "sort": {"column": "user_ts", "direction": "desc"}}'),
+        ('?limit=5', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 5, "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}]}'),
+        ('?skip=1', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 20, "skip": 1, "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}]}'),
+        ('?limit=5&skip=1', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"}, "limit": 5, "skip": 1, "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}]}'),
         ('?seconds=3600', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity", "and": {"column": "user_ts", "condition": "newer", "value": 3600}}, "sort": {"column": "user_ts", "direction": "desc"}}'),
         ('?minutes=20', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity", "and": {"column": "user_ts", "condition": "newer", "value": 1200}}, "sort": {"column": "user_ts", "direction": "desc"}}'),
         ('?hours=3', '{"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity", "and": {"column": "user_ts", "condition": "newer", "value": 10800}}, "sort": {"column": "user_ts", "direction": "desc"}}'),
@@ -213,6 +240,153 @@ class TestBrowserAssets:
             assert json.loads(payload) == json.loads(args[0])
             query_patch.assert_called_once_with(args[0])
 
+    async def test_asset_counts_cached(self, client):
+        result = {'count': 1, 'rows': [{'count': 10, 'asset_code': 'TI sensorTag/luxometer'}]}
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', return_value=mock_coro(result)) as query_patch:
+                for _ in range(2):
+                    resp = await client.get('foglamp/asset')
+                    assert 200 == resp.status
+                    assert [{'count': 10, 'assetCode': 'TI sensorTag/luxometer'}] == json.loads(await resp.text())
+                assert [{'count': 10, 'asset_code': 'TI sensorTag/luxometer'}] == await browser.get_asset_counts()
+            args, kwargs = query_patch.call_args
+            assert json.loads(PAYLOADS[0]) == json.loads(args[0])
+            assert 1 == query_patch.call_count
+
+    async def test_asset_reading_pages(self, client):
+        rows = [{'timestamp': '2018-09-10 10:30:25.123', 'temperature': 22},
+                {'timestamp': '2018-09-10 10:30:25.120', 'temperature': 21},
+                {'timestamp': '2018-09-10 10:30:25.120', 'temperature': 20}]
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', side_effect=[
+                    mock_coro({'count': 3, 'rows': rows}), mock_coro({'count': 1, 'rows': rows[2:]})]) as query_patch:
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature?limit=3')
+                assert 200 == resp.status
+                assert rows == json.loads(await resp.text())
+                cursor = resp.headers['Next-Cursor']
+
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature?limit=3&cursor={}'.format(cursor))
+                assert 200 == resp.status
+                assert rows[2:] == json.loads(await resp.text())
+                assert 'Next-Cursor' not in resp.headers
+            args, kwargs = query_patch.call_args
+            assert {"return": [{"alias": "timestamp", "column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"},
+                               {"json": {"properties": "temperature", "column": "reading"}, "alias": "temperature"}],
+                    "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                              "and": {"column": "user_ts", "condition": "<", "value": "2018-09-10 10:30:25.121"}},
+                    "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}],
+                    "limit": 3, "skip": 2} == json.loads(args[0])
+
+    async def test_asset_reading_points(self, client):
+        rows = [{'timestamp': '2018-09-10 10:30:25.{:03}'.format(999 - i), 'temperature': value}
+                for i, value in enumerate([20, 21, 35, 20, 21, 20, 5, 21, 20, 22])]
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', return_value=mock_coro({'count': 10, 'rows': rows})):
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature?seconds=60&points=4')
+                assert 200 == resp.status
+                # The first and last readings, the peak and the trough
+                assert [rows[0], rows[2], rows[6], rows[9]] == json.loads(await resp.text())
+
+    async def test_asset_averages_points(self, client):
+        rows = [{'min': 1, 'max': 3, 'average': 2, 'timestamp': '2018-09-10 10:00:03'},
+                {'min': 0, 'max': 9, 'average': 4, 'timestamp': '2018-09-10 10:00:02'},
+                {'min': 2, 'max': 2, 'average': 2, 'timestamp': '2018-09-10 10:00:01'},
+                {'min': None, 'max': None, 'average': None, 'timestamp': '2018-09-10 10:00:00'}]
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', return_value=mock_coro({'count': 4, 'rows': rows})):
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature/series?seconds=60&points=2')
+                assert 200 == resp.status
+                assert [{'min': 0, 'max': 9, 'average': 3.0, 'timestamp': '2018-09-10 10:00:02'},
+                        {'min': 2, 'max': 2, 'average': 2.0, 'timestamp': '2018-09-10 10:00:00'}] == json.loads(await resp.text())
+
+    @pytest.mark.parametrize("request_params, response_message", [
+        ('?cursor=bla', "Cursor is not valid"),
+        ('?cursor=WyIyMDE4LTA5LTEwIiwgMV0=', "Cursor is not valid"),
+        ('?skip=1&cursor=WyIyMDE4LTA5LTEwIDEwOjMwOjI1LjEyMCIsIDJd', "Skip and cursor can not be combined")
+    ])
+    async def test_bad_cursor(self, client, request_params, response_message):
+        resp = await client.get('foglamp/asset/fogbench%2Fhumidity{}'.format(request_params))
+        assert 400 == resp.status
+        assert response_message == resp.reason
+
+    async def test_asset_export(self, client):
+        rows = [{'timestamp': '2018-09-10 10:30:25.123', 'reading': {'temperature': 22}},
+                {'timestamp': '2018-09-10 10:30:25.120', 'reading': {'temperature': 21}},
+                {'timestamp': '2018-09-10 10:30:25.120', 'reading': {'temperature': 20}}]
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(browser, '_EXPORT_BATCH_SIZE', 2):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                with patch.object(readings_storage_client_mock, 'query', side_effect=[
+                        mock_coro({'count': 2, 'rows': rows[:2]}), mock_coro({'count': 1, 'rows': rows[2:]})]) \
+                        as query_patch:
+                    resp = await client.get('foglamp/asset/fogbench%2Fhumidity/export?start=2018-09-10 10:00:00')
+                    assert 200 == resp.status
+                    assert 'application/x-ndjson' == resp.content_type
+                    assert rows == [json.loads(line) for line in (await resp.text()).splitlines()]
+        assert 2 == query_patch.call_count
+        args, kwargs = query_patch.call_args
+        assert {"return": ["reading", {"column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS", "alias": "timestamp"}],
+                "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                          "and": {"column": "user_ts", "condition": ">=", "value": "2018-09-10 10:00:00",
+                                  "and": {"column": "user_ts", "condition": "<", "value": "2018-09-10 10:30:25.121"}}},
+                "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}],
+                "limit": 2, "skip": 1} == json.loads(args[0])
+
+    async def test_asset_export_interrupted(self, client):
+        rows = [{'timestamp': '2018-09-10 10:30:25.123', 'reading': {'temperature': 22}},
+                {'timestamp': '2018-09-10 10:30:25.120', 'reading': {'temperature': 21}}]
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(browser, '_EXPORT_BATCH_SIZE', 2):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                with patch.object(readings_storage_client_mock, 'query', side_effect=[
+                        mock_coro({'count': 2, 'rows': rows}), Exception('Storage down')]):
+                    with patch.object(browser._logger, 'error') as log_error:
+                        resp = await client.get('foglamp/asset/fogbench%2Fhumidity/export')
+                        assert 200 == resp.status
+                        lines = [json.loads(line) for line in (await resp.text()).splitlines()]
+        assert rows == lines[:2]
+        assert 3 == len(lines)
+        assert ['next'] == list(lines[2])
+        log_error.assert_called_once_with('Export of %s interrupted after %d readings: %s', 'fogbench/humidity', 2,
+                                          'Storage down')
+
+    async def test_asset_export_csv_limit(self, client):
+        rows = [{'timestamp': '2018-09-10 10:30:25.123', 'temperature': 22, 'humidity': 50},
+                {'timestamp': '2018-09-10 10:30:25.120', 'temperature': 21, 'humidity': None}]
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', return_value=mock_coro({'count': 2, 'rows': rows})) \
+                    as query_patch:
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/export?format=csv&datapoints=temperature,humidity&limit=2')
+                assert 200 == resp.status
+                assert 'text/csv' == resp.content_type
+                lines = (await resp.text()).splitlines()
+        assert ['timestamp,temperature,humidity', '2018-09-10 10:30:25.123,22,50', '2018-09-10 10:30:25.120,21,'] == lines[:3]
+        assert lines[3].startswith('# next=')
+        assert 4 == len(lines)
+        args, kwargs = query_patch.call_args
+        assert {"return": [{"column": "user_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS", "alias": "timestamp"},
+                           {"json": {"column": "reading", "properties": "temperature"}, "alias": "temperature"},
+                           {"json": {"column": "reading", "properties": "humidity"}, "alias": "humidity"}],
+                "where": {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"},
+                "sort": [{"column": "user_ts", "direction": "desc"}, {"column": "id", "direction": "desc"}],
+                "limit": 2} == json.loads(args[0])
+
+    @pytest.mark.parametrize("request_params, response_message", [
+        ('?format=xml', "Format must be one of ndjson, csv"),
+        ('?start=yesterday', "Start must be a timestamp YYYY-MM-DD HH:MM:SS[.fff]"),
+        ('?end=2018-09-10', "End must be a timestamp YYYY-MM-DD HH:MM:SS[.fff]"),
+        ('?limit=-1', "Limit must be a positive integer")
+    ])
+    async def test_asset_export_bad_request(self, client, request_params, response_message):
+        resp = await client.get('foglamp/asset/fogbench%2Fhumidity/export{}'.format(request_params))
+        assert 400 == resp.status
+        assert response_message == resp.reason
+
     async def test_asset_all_readings_summary_when_no_asset_code_found(self, client):
         readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
         with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
@@ -220,36 +394,180 @@ class TestBrowserAssets:
                 resp = await client.get('foglamp/asset/fogbench_humidity/summary')
                 assert 404 == resp.status
                 assert 'fogbench_humidity asset_code not found' == resp.reason
-            query_patch.assert_called_once_with('{"return": ["reading"], "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"}}')
+            query_patch.assert_called_once_with('{"return": ["reading"], "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"}, "sort": {"column": "user_ts", "direction": "desc"}, "limit": 1}')
 
     async def test_asset_all_readings_summary(self, client):
-        @asyncio.coroutine
-        def q_result(*args):
-            if payload1 == args[0]:
-                return {'rows': [{'reading': {'humidity': 20}}], 'count': 1}
-            if payload2 == args[0]:
-                return {'count': 1, 'rows': [{'min': 13.0, 'max': 83.0, 'average': 33.5}]}
-
         payload1 = {"return": ["reading"],
-                    "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"}}
+                    "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"},
+                    "sort": {"column": "user_ts", "direction": "desc"}, "limit": 1}
         payload2 = {
-            "aggregate": [{"operation": "min", "json": {"properties": "humidity", "column": "reading"}, "alias": "min"},
-                          {"operation": "max", "json": {"properties": "humidity", "column": "reading"}, "alias": "max"},
-                          {"operation": "avg", "json": {"properties": "humidity", "column": "reading"},
-                           "alias": "average"}],
+            "aggregate": [{"operation": "min", "json": {"properties": "humidity", "column": "reading"}, "alias": "min_0"},
+                          {"operation": "max", "json": {"properties": "humidity", "column": "reading"}, "alias": "max_0"},
+                          {"operation": "avg", "json": {"properties": "humidity", "column": "reading"}, "alias": "average_0"},
+                          {"operation": "min", "json": {"properties": "temperature", "column": "reading"}, "alias": "min_1"},
+                          {"operation": "max", "json": {"properties": "temperature", "column": "reading"}, "alias": "max_1"},
+                          {"operation": "avg", "json": {"properties": "temperature", "column": "reading"}, "alias": "average_1"}],
             "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"}, "limit": 20}
 
+        @asyncio.coroutine
+        def q_result(*args):
+            if payload1 == json.loads(args[0]):
+                return {'rows': [{'reading': {'humidity': 20, 'temperature': 30}}], 'count': 1}
+            if payload2 == json.loads(args[0]):
+                return {'count': 1, 'rows': [{'min_0': 13.0, 'max_0': 83.0, 'average_0': 33.5,
+                                              'min_1': 10.0, 'max_1': 40.0, 'average_1': 25.0}]}
+
         readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
         with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
-            with patch.object(readings_storage_client_mock, 'query', side_effect=[q_result(payload1), q_result(payload2)]) as patch_query:
+            with patch.object(readings_storage_client_mock, 'query', side_effect=q_result) as patch_query:
                 resp = await client.get('foglamp/asset/fogbench_humidity/summary')
                 assert 200 == resp.status
                 r = await resp.text()
                 json_response = json.loads(r)
-                assert [{'humidity': {'average': 33.5, 'max': 83.0, 'min': 13.0}}] == json_response
-            assert 2 == patch_query.call_count
-            args0, kwargs0 = patch_query.call_args_list[0]
-            args1, kwargs1 = patch_query.call_args_list[1]
-            assert '{"return": ["reading"], "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"}}' in args0
-            # FIXME: ordering issue and add tests for datetimeunits request param
-            # assert '{"aggregate": [{"operation": "min", "json": {"column": "reading", "properties": "humidity"}, "alias": "min"}, {"operation": "max", "json": {"column": "reading", "properties": "humidity"}, "alias": "max"}, {"operation": "avg", "json": {"column": "reading", "properties": "humidity"}, "alias": "average"}], "where": {"column": "asset_code", "condition": "=", "value": "fogbench_humidity"}, "limit": 20}' in args1
+                assert [{'humidity': {'average': 33.5, 'max': 83.0, 'min': 13.0}},
+                        {'temperature': {'average': 25.0, 'max': 40.0, 'min': 10.0}}] == json_response
+                assert 2 == patch_query.call_count
+                assert payload1 == json.loads(patch_query.call_args_list[0][0][0])
+                assert payload2 == json.loads(patch_query.call_args_list[1][0][0])
+
+                # The keys are read once
+                resp = await client.get('foglamp/asset/fogbench_humidity/summary')
+                assert 200 == resp.status
+                assert 3 == patch_query.call_count
+                assert payload2 == json.loads(patch_query.call_args_list[2][0][0])
+
+    async def test_asset_averages_with_rollups(self, client, no_rollups):
+        rollups = [{'timestamp': '2018-09-10 10:00', 'min_value': 1.0, 'max_value': 3.0, 'sum_value': 4.0, 'count': 2},
+                   {'timestamp': '2018-09-10 09:59', 'min_value': 5.0, 'max_value': 5.0, 'sum_value': 5.0, 'count': 1}]
+
+        @asyncio.coroutine
+        def q_rollups(table, payload):
+            assert 'asset_rollups' == table
+            if 'sum_value' not in payload:
+                return {'count': 1, 'rows': [{'bucket_ts': '2018-09-10 10:00:00'}]}
+            return {'count': 2, 'rows': rollups}
+
+        no_rollups.side_effect = q_rollups
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        raw = {'count': 1, 'rows': [{'min': '7', 'max': '9', 'average': '8', 'timestamp': '2018-09-10 10:01'}]}
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', return_value=mock_coro(raw)) as query_patch:
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature/series?limit=2&group=minutes')
+                assert 200 == resp.status
+                json_response = json.loads(await resp.text())
+                assert [raw['rows'][0], {'min': 1.0, 'max': 3.0, 'average': 2.0, 'timestamp': '2018-09-10 10:00'}] == json_response
+        args, kwargs = query_patch.call_args
+        assert {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                "and": {"column": "user_ts", "condition": ">=", "value": "2018-09-10 10:01:00"}} == json.loads(args[0])['where']
+        assert 2 == no_rollups.call_count
+        args, kwargs = no_rollups.call_args
+        payload = json.loads(args[1])
+        assert 1 == payload['limit']
+        assert {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                "and": {"column": "datapoint", "condition": "=", "value": "temperature",
+                        "and": {"column": "period", "condition": "=", "value": 60}}} == payload['where']
+
+    async def test_asset_averages_with_rollups_window(self, client, no_rollups):
+        rollups = [{'timestamp': '2018-09-10 09:00:00', 'min_value': 1.0, 'max_value': 3.0, 'sum_value': 4.0, 'count': 2}]
+
+        @asyncio.coroutine
+        def q_rollups(table, payload):
+            payload = json.loads(payload)
+            if 'sum_value' in json.dumps(payload['return']):
+                return {'count': 1, 'rows': rollups}
+            # The first rollup, then the last one
+            bucket_ts = '2018-09-10 09:00:00' if payload['sort']['direction'] == 'asc' else '2018-09-10 10:00:00'
+            return {'count': 1, 'rows': [{'bucket_ts': bucket_ts}]}
+
+        @asyncio.coroutine
+        def q_readings(payload):
+            condition = json.loads(payload)['where']['and']['condition']
+            timestamp = '2018-09-10 10:00:01' if condition == '>=' else '2018-09-10 08:59:59'
+            return {'count': 1, 'rows': [{'min': '7', 'max': '9', 'average': '8', 'timestamp': timestamp}]}
+
+        no_rollups.side_effect = q_rollups
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', side_effect=q_readings) as query_patch:
+                with patch.object(browser, 'datetime', MagicMock(now=MagicMock(return_value=datetime(2018, 9, 10, 10, 30)))):
+                    resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature/series?hours=48&group=minutes')
+                assert 200 == resp.status
+                json_response = json.loads(await resp.text())
+        # The readings older than the first rollup are read too
+        assert ['2018-09-10 10:00:01', '2018-09-10 09:00:00', '2018-09-10 08:59:59'] == [
+            row['timestamp'] for row in json_response]
+        args, kwargs = query_patch.call_args
+        assert {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                "and": {"column": "user_ts", "condition": "<", "value": "2018-09-10 09:00:00",
+                        "and": {"column": "user_ts", "condition": "newer", "value": 172800}}} == json.loads(args[0])['where']
+        assert 3 == no_rollups.call_count
+
+    async def test_asset_summary_with_rollups(self, client, no_rollups):
+        @asyncio.coroutine
+        def q_rollups(table, payload):
+            payload = json.loads(payload)
+            if 'aggregate' in payload:
+                return {'count': 1, 'rows': [{'min': 1.0, 'max': 5.0, 'sum': 30.0, 'count': 10}]}
+            # The first rollup, then the last one
+            bucket_ts = '2018-09-10 08:00:00' if payload['sort']['direction'] == 'asc' else '2018-09-10 09:00:00'
+            return {'count': 1, 'rows': [{'bucket_ts': bucket_ts}]}
+
+        @asyncio.coroutine
+        def q_readings(payload):
+            if 'return' in json.loads(payload):
+                return {'count': 1, 'rows': [{'timestamp': '2018-09-10 08:30:00'}]}
+            return {'count': 1, 'rows': [{'min': '0', 'max': '4', 'average': '2', 'count': '5'}]}
+
+        no_rollups.side_effect = q_rollups
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', side_effect=q_readings) as query_patch:
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature/summary')
+                assert 200 == resp.status
+                json_response = json.loads(await resp.text())
+                assert {'temperature': {'min': 0.0, 'max': 5.0, 'average': 50.0 / 20}} == json_response
+        # The hours rolled up older than the oldest reading are left out, the readings since the last hour rolled up
+        # and the ones older than the first hour summarised are read
+        assert 3 == query_patch.call_count
+        assert {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                "and": {"column": "user_ts", "condition": ">=", "value": "2018-09-10 10:00:00"}} == \
+            json.loads(query_patch.call_args_list[1][0][0])['where']
+        assert {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                "and": {"column": "user_ts", "condition": "<", "value": "2018-09-10 09:00:00"}} == \
+            json.loads(query_patch.call_args_list[2][0][0])['where']
+        assert 3 == no_rollups.call_count
+        args, kwargs = no_rollups.call_args
+        assert {"column": "asset_code", "condition": "=", "value": "fogbench/humidity",
+                "and": {"column": "datapoint", "condition": "=", "value": "temperature",
+                        "and": {"column": "period", "condition": "=", "value": 3600,
+                                "and": {"column": "bucket_ts", "condition": ">=", "value": "2018-09-10 09:00:00"}}}} == \
+            json.loads(args[1])['where']
+
+    async def test_asset_summary_with_rollups_purged(self, client, no_rollups):
+        @asyncio.coroutine
+        def q_rollups(table, payload):
+            payload = json.loads(payload)
+            assert 'aggregate' not in payload
+            # The first rollup, then the last one
+            bucket_ts = '2018-09-10 08:00:00' if payload['sort']['direction'] == 'asc' else '2018-09-10 09:00:00'
+            return {'count': 1, 'rows': [{'bucket_ts': bucket_ts}]}
+
+        @asyncio.coroutine
+        def q_readings(payload):
+            if 'return' in json.loads(payload):
+                return {'count': 1, 'rows': [{'timestamp': '2018-09-10 09:20:00'}]}
+            return {'count': 1, 'rows': [{'min': '0', 'max': '4', 'average': '2'}]}
+
+        no_rollups.side_effect = q_rollups
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+            with patch.object(readings_storage_client_mock, 'query', side_effect=q_readings) as query_patch:
+                resp = await client.get('foglamp/asset/fogbench%2Fhumidity/temperature/summary')
+                assert 200 == resp.status
+                json_response = json.loads(await resp.text())
+                assert {'temperature': {'min': '0', 'max': '4', 'average': '2'}} == json_response
+        # No complete hour rolled up is still in the readings, they are summarised as without rollups
+        assert 2 == query_patch.call_count
+        assert {"column": "asset_code", "condition": "=", "value": "fogbench/humidity"} == \
+            json.loads(query_patch.call_args[0][0])['where']
+        assert 2 == no_rollups.call_count
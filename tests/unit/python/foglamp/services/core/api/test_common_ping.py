@@ -26,6 +26,7 @@ from aiohttp import web
 
 from foglamp.services.core import routes
 from foglamp.services.core import connect
+from foglamp.services.core.api import common
 from foglamp.services.core.api.common import _logger
 from foglamp.common.web import middleware
 from foglamp.common.storage_client.storage_client import StorageClientAsync
@@ -46,6 +47,13 @@ def ssl_ctx(certs_path):
     return ssl_ctx
 
 
+@pytest.fixture(autouse=True)
+def clear_ping_snapshot():
+    common._ping_snapshot.clear()
+    yield
+    common._ping_snapshot.clear()
+
+
 @pytest.fixture
 def get_machine_detail():
     host_name = socket.gethostname()
@@ -58,7 +66,7 @@ def get_machine_detail():
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_http_allow_ping_true(test_server, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
     result = {"rows": [
         {"value": 1, "key": "PURGED", "description": "blah6"},
         {"value": 2, "key": "READINGS", "description": "blah1"},
@@ -113,7 +121,7 @@ async def test_ping_http_allow_ping_true(test_server, test_client, loop, get_mac
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_http_allow_ping_false(test_server, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
 
     @asyncio.coroutine
     def mock_coro(*args, **kwargs):
@@ -167,7 +175,7 @@ async def test_ping_http_allow_ping_false(test_server, test_client, loop, get_ma
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_http_auth_required_allow_ping_true(test_server, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
     result = {"rows": [
                 {"value": 1, "key": "PURGED", "description": "blah6"},
                 {"value": 2, "key": "READINGS", "description": "blah1"},
@@ -222,7 +230,7 @@ async def test_ping_http_auth_required_allow_ping_true(test_server, test_client,
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_http_auth_required_allow_ping_false(test_server, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
     result = {"rows": [
         {"value": 1, "key": "PURGED", "description": "blah6"},
         {"value": 2, "key": "READINGS", "description": "blah1"},
@@ -268,7 +276,7 @@ async def test_ping_http_auth_required_allow_ping_false(test_server, test_client
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_https_allow_ping_true(test_server, ssl_ctx, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
     result = {"rows": [
                 {"value": 1, "key": "PURGED", "description": "blah6"},
                 {"value": 2, "key": "READINGS", "description": "blah1"},
@@ -334,7 +342,7 @@ async def test_ping_https_allow_ping_true(test_server, ssl_ctx, test_client, loo
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_https_allow_ping_false(test_server, ssl_ctx, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
     result = {"rows": [
         {"value": 1, "key": "PURGED", "description": "blah6"},
         {"value": 2, "key": "READINGS", "description": "blah1"},
@@ -396,7 +404,7 @@ async def test_ping_https_allow_ping_false(test_server, ssl_ctx, test_client, lo
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_https_auth_required_allow_ping_true(test_server, ssl_ctx, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
     result = {"rows": [
                 {"value": 1, "key": "PURGED", "description": "blah6"},
                 {"value": 2, "key": "READINGS", "description": "blah1"},
@@ -464,7 +472,7 @@ async def test_ping_https_auth_required_allow_ping_true(test_server, ssl_ctx, te
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "common")
 async def test_ping_https_auth_required_allow_ping_false(test_server, ssl_ctx, test_client, loop, get_machine_detail):
-    payload = '{"return": ["key", "description", "value"], "sort": {"column": "key", "direction": "asc"}}'
+    payload = '{"return": ["key", "value"]}'
 
     @asyncio.coroutine
     def mock_coro(*args, **kwargs):
@@ -557,3 +565,31 @@ async def test_restart_http(test_server, test_client, loop):
         assert "FogLAMP restart has been scheduled." == content_dict["message"]
     logger_info.assert_called_once_with('Executing controlled shutdown and start')
 
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("api", "common")
+async def test_refresh_ping_snapshot(loop):
+    config = {'allowPing': {'value': 'false'}, 'pingSnapshotInterval': {'value': '30'}}
+    result = {"rows": [{"value": 2, "key": "READINGS"}, {"value": 1, "key": "PURGED"}]}
+
+    @asyncio.coroutine
+    def mock_config(*args, **kwargs):
+        return config
+
+    @asyncio.coroutine
+    def mock_stats(*args, **kwargs):
+        return result
+
+    mock_storage_client_async = MagicMock(StorageClientAsync)
+    with patch.object(connect, 'get_storage_async', return_value=mock_storage_client_async):
+        with patch.object(ConfigurationManager, 'get_category_all_items', return_value=mock_config()) as patch_config:
+            with patch.object(mock_storage_client_async, 'query_tbl_with_payload',
+                              return_value=mock_stats()) as query_patch:
+                with patch.object(common.host, 'get_host_facts', return_value=('foglamp', ['10.0.0.1'])):
+                    assert 30 == await common.refresh_ping_snapshot()
+            args, kwargs = query_patch.call_args
+            assert 'statistics' == args[0]
+        patch_config.assert_called_once_with('rest_api')
+    assert {'allowPing': False, 'dataRead': 2, 'dataSent': 0, 'dataPurged': 1, 'hostName': 'foglamp',
+            'ipAddresses': ['10.0.0.1'], 'health': 'green'} == common._ping_snapshot
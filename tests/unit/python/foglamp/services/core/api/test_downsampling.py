@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import pytest
+
+from foglamp.services.core.api import downsampling
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("api", "downsampling")
+class TestDownsampling:
+
+    @pytest.mark.parametrize("points, expected", [
+        (1, [0]),
+        (2, [0, 5]),
+        (3, [0, 2, 5]),
+        (6, [0, 1, 2, 3, 4, 5]),
+        (10, [0, 1, 2, 3, 4, 5])
+    ])
+    def test_lttb(self, points, expected):
+        rows = [{'v': value} for value in [1, 1, 8, 1, 1, 1]]
+        assert [rows[i] for i in expected] == downsampling.lttb(rows, points, 'v')
+
+    def test_lttb_not_numeric(self):
+        rows = [{'v': 1}, {'v': None}, {}, {'v': 'on'}, {'v': 7}, {'v': 1}]
+        assert [rows[0], rows[4], rows[5]] == downsampling.lttb(rows, 3, 'v')
+
+    def test_lttb_by_key(self):
+        rows = [{'key': 'B', 'value': 1, 'ts': 3}, {'key': 'A', 'value': 1, 'ts': 3},
+                {'key': 'B', 'value': 2, 'ts': 2}, {'key': 'A', 'value': 1, 'ts': 2},
+                {'key': 'B', 'value': 3, 'ts': 1}, {'key': 'A', 'value': 1, 'ts': 1}]
+        assert [rows[1], rows[5], rows[0], rows[4]] == downsampling.lttb_by_key(rows, 'key', 'value', 2)
+
+    def test_merge_buckets(self):
+        rows = [{'min': 1, 'max': 3, 'average': 2, 'timestamp': '10:00:02'},
+                {'min': 0, 'max': 9, 'average': 4, 'timestamp': '10:00:01'},
+                {'min': 2, 'max': 2, 'average': 2, 'timestamp': '10:00:00'}]
+        assert rows == downsampling.merge_buckets(rows, 3)
+        assert [{'min': 0, 'max': 9, 'average': 8 / 3, 'timestamp': '10:00:00'}] == downsampling.merge_buckets(rows, 1)
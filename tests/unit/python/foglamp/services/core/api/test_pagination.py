@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import pytest
+
+from foglamp.services.core.api import pagination
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("api", "pagination")
+class TestPagination:
+
+    @pytest.mark.parametrize("timestamp, end", [
+        ('2018-09-10 10:30:25.123', '2018-09-10 10:30:25.124'),
+        ('2018-09-10 10:30:25.999', '2018-09-10 10:30:26.000'),
+        ('2018-09-10 10:30:25.123456', '2018-09-10 10:30:25.123457')
+    ])
+    def test_conditions(self, timestamp, end):
+        assert ['user_ts', '<', end] == pagination.conditions(pagination.Cursor(timestamp, 1), 'user_ts')
+
+    def test_next_cursor(self):
+        rows = [{'ts': '2018-09-10 10:30:25.123'}, {'ts': '2018-09-10 10:30:25.123'}]
+        assert pagination.next_cursor(rows, 'ts', 3) is None
+        assert pagination.next_cursor([{'ts': None}], 'ts', 1) is None
+
+        # The rows of the timestamp returned by the previous pages are counted
+        token = pagination.next_cursor(rows, 'ts', 2, pagination.Cursor('2018-09-10 10:30:25.123', 3))
+        cursor = pagination._decode(token)
+        assert pagination.Cursor('2018-09-10 10:30:25.123', 5) == cursor
@@ -18,8 +18,10 @@ from foglamp.services.core import connect
 from foglamp.common.storage_client.storage_client import StorageClientAsync
 from foglamp.services.core import server
 from foglamp.services.core.scheduler.scheduler import Scheduler
-from foglamp.services.core.scheduler.entities import ScheduledProcess, Task, IntervalSchedule, TimedSchedule, StartUpSchedule, ManualSchedule
+from foglamp.services.core.scheduler.entities import ScheduledProcess, Task, IntervalSchedule, TimedSchedule, StartUpSchedule, ManualSchedule, \
+    CronSchedule, DeferredTask
 from foglamp.services.core.scheduler.exceptions import *
+from foglamp.services.core.scheduler.timing import TaskTiming
 
 __author__ = "Vaibhav Singhal"
 __copyright__ = "Copyright (c) 2017 OSIsoft, LLC"
@@ -277,6 +279,10 @@ class TestSchedules:
         ({"type": 4, "name": "foo", "process_name": "bar"},
          {'schedule': {'day': None, 'enabled': True, 'repeat': 0, 'id': '{}'.format(_random_uuid),
                        'type': 'MANUAL', 'name': 'foo', 'exclusive': True, 'processName': 'bar', 'time': 0}}),
+        ({"type": 5, "cron": "*/5 6-18 * * mon-fri", "name": "foo", "process_name": "bar"},
+         {'schedule': {'day': None, 'enabled': True, 'repeat': 0, 'id': '{}'.format(_random_uuid),
+                       'type': 'CRON', 'cron': '*/5 6-18 * * mon-fri', 'name': 'foo', 'exclusive': True,
+                       'processName': 'bar', 'time': 0}}),
         ])
     async def test_post_schedule(self, client, request_data, expected_response):
         async def mock_coro():
@@ -298,6 +304,12 @@ class TestSchedules:
                 schedule.repeat = timedelta(seconds=15)
                 schedule.time = None
                 schedule.day = None
+            elif _type == 5:
+                schedule = CronSchedule()
+                schedule.cron = "*/5 6-18 * * mon-fri"
+                schedule.repeat = None
+                schedule.time = None
+                schedule.day = None
             else:
                 schedule = ManualSchedule()
                 schedule.repeat = None
@@ -345,6 +357,12 @@ class TestSchedules:
         ({"type": 2, "day": 5, "time": -1, "name": "sch1", "process_name": "p1"}, 400,
          "Errors in request: Time must be an integer and in range 0-86399. 1",
          {'rows': [{'name': 'bla'}], 'count': 1}),
+        ({"type": 5, "name": "sch1", "process_name": "p1"}, 400,
+         "Errors in request: Cron expression cannot be empty for CRON schedule. 1",
+         {'rows': [{'name': 'bla'}], 'count': 1}),
+        ({"type": 5, "cron": "0 25 * * *", "name": "sch1", "process_name": "p1"}, 400,
+         "Errors in request: Cron expression error: Hour 25 out of range 0-23 1",
+         {'rows': [{'name': 'bla'}], 'count': 1}),
         ({"type": 200}, 400,
          "Errors in request: Schedule type error: 200,Schedule name and Process name cannot be empty. 2",
          {'rows': [{'name': 'bla'}], 'count': 1}),
@@ -503,7 +521,8 @@ class TestSchedules:
         assert {'scheduleType': [{'name': 'STARTUP', 'index': 1},
                                  {'name': 'TIMED', 'index': 2},
                                  {'name': 'INTERVAL', 'index': 3},
-                                 {'name': 'MANUAL', 'index': 4}]} == json_response
+                                 {'name': 'MANUAL', 'index': 4},
+                                 {'name': 'CRON', 'index': 5}]} == json_response
 
 
 class TestTasks:
@@ -621,6 +640,38 @@ class TestTasks:
                     assert 404 == resp.status
                     assert "No Tasks found" == resp.reason
 
+    async def test_get_tasks_pages(self, client):
+        async def patch_get_tasks():
+            tasks = []
+            for start_time in ('2018-09-10 10:30:25.123', '2018-09-10 10:30:25.120'):
+                task = Task()
+                task.task_id = self._random_uuid
+                task.state = Task.State.COMPLETE
+                task.start_time = start_time
+                task.process_name = "bla"
+                task.end_time = None
+                task.exit_code = 0
+                task.reason = None
+                tasks.append(task)
+            return tasks
+
+        async def patch_no_tasks():
+            return []
+
+        with patch.object(server.Server.scheduler, 'get_tasks', side_effect=[patch_get_tasks(), patch_no_tasks()]) \
+                as get_tasks_patch:
+            resp = await client.get('/foglamp/task?limit=2')
+            assert 200 == resp.status
+            json_response = json.loads(await resp.text())
+            assert 2 == len(json_response['tasks'])
+
+            resp = await client.get('/foglamp/task?limit=2&cursor={}'.format(json_response['next']))
+            assert 200 == resp.status
+            assert {'tasks': []} == json.loads(await resp.text())
+        get_tasks_patch.assert_called_with(where=None, and_where=["start_time", "<", "2018-09-10 10:30:25.121"],
+                                           limit=2, offset=1,
+                                           sort=(["start_time", "desc"], ["id", "desc"]))
+
     @pytest.mark.parametrize("request_params", ['', '?name=bla'])
     async def test_get_tasks_latest(self, client, request_params):
         storage_client_mock = MagicMock(StorageClientAsync)
@@ -647,6 +698,53 @@ class TestTasks:
                 assert 404 == resp.status
                 assert "No Tasks found" == resp.reason
 
+    async def test_get_tasks_deferred(self, client):
+        task = DeferredTask()
+        task.schedule_id = self._random_uuid
+        task.schedule_name = "purge"
+        task.process_name = "purge"
+        task.priority = "low"
+        task.due_time = datetime(2018, 4, 17, 14, 31, 59)
+        task.reason = "maximum number of running tasks of process 'purge' reached"
+
+        with patch.object(server.Server.scheduler, 'get_deferred_tasks', return_value=mock_coro_response([task])):
+            resp = await client.get('/foglamp/task/deferred')
+            assert 200 == resp.status
+            result = await resp.text()
+            json_response = json.loads(result)
+            assert {'tasks': [{'scheduleId': str(self._random_uuid), 'scheduleName': 'purge', 'name': 'purge',
+                               'priority': 'low', 'dueTime': '2018-04-17 14:31:59',
+                               'reason': "maximum number of running tasks of process 'purge' reached"}]
+                    } == json_response
+
+    async def test_get_tasks_timing(self, client):
+        schedule_timing = TaskTiming()
+        schedule_timing.schedule_id = self._random_uuid
+        schedule_timing.schedule_name = "purge"
+        schedule_timing.process_name = "purge"
+        schedule_timing.duration.add(0.3)
+        schedule_timing.exit_codes[0] += 1
+        process_timing = TaskTiming()
+        process_timing.process_name = "purge"
+        process_timing.merge(schedule_timing)
+
+        with patch.object(server.Server.scheduler, 'get_task_timings',
+                          return_value=mock_coro_response(([schedule_timing], [process_timing]))):
+            resp = await client.get('/foglamp/task/timing')
+            assert 200 == resp.status
+            result = await resp.text()
+            json_response = json.loads(result)
+            schedule, process = json_response['schedules'][0], json_response['processes'][0]
+            assert {'scheduleId': str(self._random_uuid), 'scheduleName': 'purge', 'name': 'purge'}.items() <= \
+                schedule.items()
+            assert 'purge' == process['name']
+            for timing in (schedule, process):
+                assert {'0': 1} == timing['exitCodes']
+                assert 0 == timing['lateness']['count']
+                assert (1, 0.3, 0.3) == (timing['duration']['count'], timing['duration']['sum'],
+                                         timing['duration']['p99'])
+                assert {'le': '+Inf', 'count': 1} == timing['duration']['buckets'][-1]
+
     async def test_cancel_task(self, client):
         async def mock_coro():
             return "some valid values"
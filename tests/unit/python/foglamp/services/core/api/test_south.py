@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+
+import asyncio
+import json
+from unittest.mock import MagicMock, patch
+
+from aiohttp import web
+import pytest
+
+from foglamp.services.core import routes
+from foglamp.services.core import connect
+from foglamp.services.core.api import browser
+from foglamp.services.core.service_registry.service_registry import ServiceRegistry
+from foglamp.common.configuration_manager import ConfigurationManager
+from foglamp.common.storage_client.storage_client import StorageClientAsync, ReadingsStorageClientAsync
+
+__author__ = "Praveen Garg"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@asyncio.coroutine
+def mock_coro(*args, **kwargs):
+    if len(args) > 0:
+        return args[0]
+    else:
+        return ""
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("api", "south")
+class TestSouth:
+    def setup_method(self):
+        ServiceRegistry._registry = list()
+        browser._asset_counts_cache.clear()
+
+    def teardown_method(self):
+        ServiceRegistry._registry = list()
+        browser._asset_counts_cache.clear()
+
+    @pytest.fixture
+    def client(self, loop, test_client):
+        app = web.Application(loop=loop)
+        # fill the routes table
+        routes.setup(app)
+        return loop.run_until_complete(test_client(app))
+
+    async def test_get_south_services(self, client):
+        with patch.object(ServiceRegistry._logger, 'info'):
+            ServiceRegistry.register('sinusoid', 'Southbound', 'localhost', 40001, 40002, 'http')
+
+        tracked = {'rows': [{'asset': 'sinusoid', 'service': 'sinusoid'},
+                            {'asset': 'sinusoid', 'service': 'sinusoid'},
+                            {'asset': 'random', 'service': 'random'},
+                            {'asset': 'unread', 'service': 'random'}]}
+        counts = {'count': 2, 'rows': [{'asset_code': 'sinusoid', 'count': 10}, {'asset_code': 'random', 'count': 5}]}
+        storage_client_mock = MagicMock(StorageClientAsync)
+        readings_storage_client_mock = MagicMock(ReadingsStorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=storage_client_mock):
+            with patch.object(connect, 'get_readings_async', return_value=readings_storage_client_mock):
+                with patch.object(ConfigurationManager, 'get_category_child',
+                                  return_value=mock_coro([{'key': 'sinusoid'}, {'key': 'random'}])):
+                    with patch.object(storage_client_mock, 'query_tbl_with_payload', return_value=mock_coro(tracked)) \
+                            as tracker_patch:
+                        with patch.object(readings_storage_client_mock, 'query', return_value=mock_coro(counts)) \
+                                as query_patch:
+                            resp = await client.get('/foglamp/south')
+                            assert 200 == resp.status
+                            json_response = json.loads(await resp.text())
+        assert {'services': [
+            {'name': 'sinusoid', 'address': 'localhost', 'management_port': 40002, 'service_port': 40001,
+             'protocol': 'http', 'status': 'running', 'assets': [{'count': 10, 'asset': 'sinusoid'}]},
+            {'name': 'random', 'address': '', 'management_port': '', 'service_port': '', 'protocol': '', 'status': '',
+             'assets': [{'count': 5, 'asset': 'random'}]}]} == json_response
+        tracker_patch.assert_called_once_with('asset_tracker', '{"return": ["asset", "service"]}')
+        query_patch.assert_called_once_with(
+            '{"aggregate": {"operation": "count", "column": "*", "alias": "count"}, "group": "asset_code"}')
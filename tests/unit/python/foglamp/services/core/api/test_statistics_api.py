@@ -22,6 +22,18 @@ __license__ = "Apache 2.0"
 __version__ = "${VERSION}"
 
 
+def _with_version(q_result):
+    """ Answers the query of the version of the statistics history, then the queries of the handler with q_result """
+    @asyncio.coroutine
+    def q_version(*args):
+        if args[0] == 'statistics_history' and 'aggregate' in json.loads(args[1]):
+            assert {"aggregate": {"operation": "max", "column": "history_ts", "alias": "max_history_ts"}} == \
+                json.loads(args[1])
+            return {"rows": [{"max_history_ts": "2018-02-20 13:16:24.321589"}]}
+        return (yield from q_result(*args))
+    return q_version
+
+
 @pytest.allure.feature("unit")
 @pytest.allure.story("api", "statistics")
 class TestStatistics:
@@ -122,13 +134,13 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history")
             assert 200 == resp.status
             r = await resp.text()
             assert output == json.loads(r)
         assert query_patch.called
-        assert 2 == query_patch.call_count
+        assert 3 == query_patch.call_count
 
     @pytest.mark.parametrize("param, time_unit_payload", [
         ("?minutes=30", {"return": [{"column": "history_ts", "alias": "history_ts", "format": "YYYY-MM-DD HH24:MI:SS.MS"}, "key", "value"],
@@ -180,13 +192,13 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history{}".format(param))
             assert 200 == resp.status
             r = await resp.text()
             assert output == json.loads(r)
         assert query_patch.called
-        assert 2 == query_patch.call_count
+        assert 3 == query_patch.call_count
 
     @pytest.mark.parametrize("param", [
         "?minutes=-1"
@@ -206,12 +218,12 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history{}".format(param))
             assert 400 == resp.status
             assert 'Time unit must be a positive integer' == resp.reason
         assert query_patch.called
-        assert 1 == query_patch.call_count
+        assert 2 == query_patch.call_count
 
     async def test_get_statistics_history_limit(self, client):
         output = {"interval": 60, 'statistics': [{"READINGS": 1, "BUFFERED": 10, "history_ts": "2018-02-20 13:16:24.321589"},
@@ -247,13 +259,13 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history?limit=1")
             assert 200 == resp.status
             r = await resp.text()
             assert output == json.loads(r)
         assert query_patch.called
-        assert 3 == query_patch.call_count
+        assert 4 == query_patch.call_count
 
     @pytest.mark.parametrize("request_limit", [-1, 'blah'])
     async def test_get_statistics_history_bad_limit(self, client, request_limit):
@@ -261,15 +273,51 @@ class TestStatistics:
         result = {"rows": [{"schedule_interval": "00:01:00"}]}
 
         @asyncio.coroutine
-        def mock_coro():
+        def mock_coro(*args):
             return result
 
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', return_value=mock_coro()):
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(mock_coro)):
                 resp = await client.get("/foglamp/statistics/history?limit={}".format(request_limit))
             assert 400 == resp.status
             assert "Limit must be a positive integer" == resp.reason
 
+    async def test_get_statistics_history_points(self, client):
+        output = {"interval": 60, 'statistics': [{"READINGS": 1, "BUFFERED": 10, "history_ts": "2018-02-20 13:17:09.321589"},
+                                                 {"READINGS": 9, "BUFFERED": 10, "history_ts": "2018-02-20 13:16:54.321589"},
+                                                 {"READINGS": 2, "BUFFERED": 10, "history_ts": "2018-02-20 13:16:24.321589"}]}
+
+        @asyncio.coroutine
+        def q_result(*args):
+            table = args[0]
+
+            if table == 'statistics_history':
+                rows = []
+                for ts, value in [("13:17:09", 1), ("13:16:54", 9), ("13:16:39", 0), ("13:16:24", 2)]:
+                    rows.append({"key": "READINGS", "value": value, "history_ts": "2018-02-20 {}.321589".format(ts)})
+                    rows.append({"key": "BUFFERED", "value": 10, "history_ts": "2018-02-20 {}.321589".format(ts)})
+                return {"rows": rows}
+
+            if table == 'schedules':
+                return {"rows": [{"schedule_interval": "00:01:00"}]}
+
+        mock_async_storage_client = MagicMock(StorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)):
+                resp = await client.get("/foglamp/statistics/history?points=3")
+            assert 200 == resp.status
+            r = await resp.text()
+            assert output == json.loads(r)
+
+    @pytest.mark.parametrize("request_points", [0, -1, 'blah'])
+    async def test_get_statistics_history_bad_points(self, client, request_points):
+        mock_async_storage_client = MagicMock(StorageClientAsync)
+        with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(None)):
+                resp = await client.get("/foglamp/statistics/history?points={}".format(request_points))
+        assert 400 == resp.status
+        assert "Points must be a positive integer" == resp.reason
+
     async def test_get_statistics_history_no_stats_collector(self, client):
         p1 = {"return": ["schedule_interval"],
               "where": {"column": "process_name", "condition": "=", "value": "stats collector"}}
@@ -285,13 +333,13 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history")
             assert 404 == resp.status
             assert 'No stats collector schedule found' == resp.reason
 
         assert query_patch.called
-        assert 1 == query_patch.call_count
+        assert 2 == query_patch.call_count
 
     async def test_get_statistics_history_server_exception(self, client):
         p1 = {"return": ["history_ts", "key", "value"]}
@@ -313,13 +361,13 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history")
             assert 500 == resp.status
             assert "Internal Server Error" == resp.reason
 
         assert query_patch.called
-        assert 2 == query_patch.call_count
+        assert 3 == query_patch.call_count
 
     async def test_get_statistics_history_by_key(self, client):
         output = {"interval": 15, 'statistics': [{"READINGS": 1, "history_ts": "2018-02-20 13:16:24.321589"}, {"READINGS": 0, "history_ts": "2018-02-20 13:16:09.321589"}]}
@@ -347,13 +395,13 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history?key=READINGS")
             assert 200 == resp.status
             r = await resp.text()
             assert output == json.loads(r)
         assert query_patch.called
-        assert 2 == query_patch.call_count
+        assert 3 == query_patch.call_count
 
     async def test_get_statistics_history_by_key_with_limit(self, client):
         output = {"interval": 15, 'statistics': [{"READINGS": 1, "history_ts": "2018-02-20 13:16:24.321589"}]}
@@ -375,13 +423,13 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history?key=READINGS&limit=1")
             assert 200 == resp.status
             r = await resp.text()
             assert output == json.loads(r)
         assert query_patch.called
-        assert 2 == query_patch.call_count
+        assert 3 == query_patch.call_count
 
     async def test_get_statistics_history_with_bad_key(self, client):
         output = {"interval": 15, 'statistics': [{}]}
@@ -411,10 +459,10 @@ class TestStatistics:
 
         mock_async_storage_client = MagicMock(StorageClientAsync)
         with patch.object(connect, 'get_storage_async', return_value=mock_async_storage_client):
-            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=q_result) as query_patch:
+            with patch.object(mock_async_storage_client, 'query_tbl_with_payload', side_effect=_with_version(q_result)) as query_patch:
                 resp = await client.get("/foglamp/statistics/history?key=blah")
             assert 200 == resp.status
             r = await resp.text()
             assert output == json.loads(r)
         assert query_patch.called
-        assert 2 == query_patch.call_count
+        assert 3 == query_patch.call_count
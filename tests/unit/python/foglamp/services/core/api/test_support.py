@@ -15,6 +15,8 @@ import pytest
 from foglamp.services.core import routes
 from foglamp.services.core.api import support
 from foglamp.services.core.support import *
+from foglamp.services.core.support import _human_size
+from foglamp.services.core.syslog_index import SyslogIndex
 
 __author__ = "Ashish Jabble"
 __copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
@@ -56,6 +58,17 @@ class TestBundleSupport:
                 assert expected_content == jdict
             mockwalk.assert_called_once_with(path)
 
+    @pytest.mark.parametrize("kilobytes, expected", [
+        (900, "900K"),
+        (5000, "4.9M"),
+        (524288, "512M"),
+        (8049852, "7.7G"),
+        (16252928, "15G")
+    ])
+    def test_human_size(self, kilobytes, expected):
+        # The memory sizes of the machine resources are the ones of free -h
+        assert expected == _human_size(kilobytes)
+
     async def test_get_support_bundle_by_name(self, client, support_bundles_dir_path):
         gz_filepath = Mock()
         gz_filepath.open = mock_open()
@@ -132,97 +145,64 @@ class TestBundleSupport:
                 assert 500 == resp.status
                 assert "Support bundle could not be created. blah" == resp.reason
 
-    async def test_get_syslog_entries_all_ok(self, client):
-        def mock_syslog():
-            return """
-        echo "Mar 19 14:00:53 nerd51-ThinkPad FogLAMP[18809] INFO: server: foglamp.services.core.server: start core
-        Mar 19 14:00:53 nerd51-ThinkPad FogLAMP[18809] INFO: server: foglamp.services.core.server: Management API started on http://0.0.0.0:38311
-        Mar 19 14:00:53 nerd51-ThinkPad FogLAMP[18809] INFO: server: foglamp.services.core.server: start storage, from directory /home/asinha/Development/FogLAMP/scripts
-        Mar 19 14:00:54 nerd51-ThinkPad FogLAMP[18809] INFO: service_registry: foglamp.services.core.service_registry.service_registry: Registered service instance id=479a90ec-0d1d-4845-b2c5-f1d9ce72ac8e: <FogLAMP Storage, type=Storage, protocol=http, address=localhost, service port=33395, management port=45952, status=1>
-        Mar 19 14:00:58 nerd51-ThinkPad FogLAMP[18809] INFO: server: foglamp.services.core.server: start scheduler
-        Mar 19 14:00:58 nerd51-ThinkPad FogLAMP Storage[18809]: Registered configuration category STORAGE, registration id 3db674a7-9569-4950-a328-1204834fba7e
-        Mar 19 14:00:58 nerd51-ThinkPad FogLAMP[18809] INFO: scheduler: foglamp.services.core.scheduler.scheduler: Starting Scheduler: Management port received is 38311
-        Mar 19 14:00:58 nerd51-ThinkPad FogLAMP[18809] INFO: scheduler: foglamp.services.core.scheduler.scheduler: Scheduled task for schedule 'purge' to start at 2018-03-19 15:00:58.912532
-        Mar 19 14:00:58 nerd51-ThinkPad FogLAMP[18809] INFO: scheduler: foglamp.services.core.scheduler.scheduler: Scheduled task for schedule 'stats collection' to start at 2018-03-19 14:01:13.912532
-        Mar 19 14:00:58 nerd51-ThinkPad FogLAMP[18809] INFO: scheduler: foglamp.services.core.scheduler.scheduler: Scheduled task for schedule 'certificate checker' to start at 2018-03-19 15:05:00"
-        """
-
-        with patch.object(support, "__GET_SYSLOG_CMD_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_TOTAL_MATCHED_LINES", """echo "10" """):
-                resp = await client.get('/foglamp/syslog')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 10 == jdict['count']
-                assert 'INFO' in jdict['logs'][0]
-                assert 'FogLAMP' in jdict['logs'][0]
-                assert 'FogLAMP Storage' in jdict['logs'][5]
-
-    async def test_get_syslog_entries_all_with_level_error(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 13:31:41 nerd-034 FogLAMP[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation"
-            """
-
-        with patch.object(support, "__GET_SYSLOG_CMD_WITH_ERROR_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_ERROR_MATCHED_LINES", """echo "1" """):
-                resp = await client.get('/foglamp/syslog?level=error')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 1 == jdict['count']
-                assert 'ERROR' in jdict['logs'][0]
-
-    async def test_get_syslog_entries_all_with_level_warning(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 14:31:36 nerd-034 FogLAMP Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
-            Sep 12 17:42:23 nerd-034 FogLAMP[16637] WARNING: server: foglamp.services.core.server: A FogLAMP PID file has been found: [/home/foglamp/Development/FogLAMP/data/var/run/foglamp.core.pid] found, ignoring it."
-            """
-        with patch.object(support, "__GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_WARNING_MATCHED_LINES", """echo "2" """):
-                resp = await client.get('/foglamp/syslog?level=warning')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 2 == jdict['count']
-                assert 'error' in jdict['logs'][0]
-                assert 'WARNING' in jdict['logs'][1]
-
-    async def test_get_syslog_entries_from_storage(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 14:31:41 nerd-034 FogLAMP Storage[8874]: Starting service...
-            Sep 12 14:46:36 nerd-034 FogLAMP Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
-            Sep 12 14:56:41 nerd-034 FogLAMP Storage[8979]: warning No directory found"
-            """
-        with patch.object(support, "__GET_SYSLOG_CMD_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_TOTAL_MATCHED_LINES", """echo "3" """):
-                resp = await client.get('/foglamp/syslog?source=Storage')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 3 == jdict['count']
-                assert 'FogLAMP Storage' in jdict['logs'][0]
-                assert 'error' in jdict['logs'][1]
-                assert 'warning' in jdict['logs'][2]
-
-    async def test_get_syslog_entries_from_storage_with_level_warning(self, client):
-        def mock_syslog():
-            return """
-            echo "Sep 12 14:31:36 nerd-034 FogLAMP Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
-            Sep 12 14:46:41 nerd-034 FogLAMP Storage[8979]: warning No directory found"
-            """
-        with patch.object(support, "__GET_SYSLOG_CMD_WITH_WARNING_TEMPLATE", mock_syslog()):
-            with patch.object(support, "__GET_SYSLOG_WARNING_MATCHED_LINES", """echo "3" """):
-                resp = await client.get('/foglamp/syslog?source=storage&level=warning')
-                res = await resp.text()
-                jdict = json.loads(res)
-                assert 200 == resp.status
-                assert 3 == jdict['count']
-                assert 'FogLAMP Storage' in jdict['logs'][0]
-                assert 'error' in jdict['logs'][0]
-                assert 'warning' in jdict['logs'][1]
+    @pytest.fixture
+    def syslog(self, tmpdir):
+        syslog = tmpdir.join('syslog')
+        syslog.write("""Mar 19 14:00:53 nerd51-ThinkPad FogLAMP[18809] INFO: server: foglamp.services.core.server: start core
+Mar 19 14:00:53 nerd51-ThinkPad kernel: [ 1223.514171] usb 1-1: new high-speed USB device number 2
+Mar 19 14:00:54 nerd51-ThinkPad FogLAMP[18809] INFO: server: foglamp.services.core.server: start storage
+Sep 12 14:31:36 nerd-034 FogLAMP Storage[8683]: SQLite3 storage plugin raising error: UNIQUE constraint failed: readings.read_key
+Sep 12 14:31:41 nerd-034 FogLAMP[9241] ERROR: sending_process: sending_process_PI: cannot complete the sending operation
+Sep 12 14:56:41 nerd-034 FogLAMP Storage[8979]: warning No directory found
+Sep 12 17:42:23 nerd-034 FogLAMP[16637] WARNING: server: foglamp.services.core.server: A FogLAMP PID file has been found
+Sep 12 17:42:24 nerd-034 FogLAMP[16637] INFO: scheduler: foglamp.services.core.scheduler.scheduler: Starting Scheduler
+""")
+        with patch.object(support, "_SYSLOG_FILE", str(syslog)):
+            yield syslog
+
+    @pytest.mark.parametrize("query, expected_count, expected_logs", [
+        ('', 7, ['start core', 'start storage', 'raising error', 'cannot complete', 'No directory found',
+                 'PID file', 'Starting Scheduler']),
+        ('?level=error', 2, ['raising error', 'cannot complete']),
+        ('?level=warning', 4, ['raising error', 'cannot complete', 'No directory found', 'PID file']),
+        ('?level=info', 7, ['start core', 'start storage', 'raising error', 'cannot complete', 'No directory found',
+                            'PID file', 'Starting Scheduler']),
+        ('?source=Storage', 2, ['raising error', 'No directory found']),
+        ('?source=storage&level=error', 1, ['raising error']),
+        ('?limit=2', 7, ['PID file', 'Starting Scheduler']),
+        ('?limit=2&offset=2', 7, ['cannot complete', 'No directory found']),
+        ('?limit=5&offset=4', 7, ['start core', 'start storage', 'raising error']),
+        ('?offset=7', 7, []),
+        ('?limit=0', 7, [])
+    ])
+    async def test_get_syslog_entries(self, client, syslog, query, expected_count, expected_logs):
+        resp = await client.get('/foglamp/syslog{}'.format(query))
+        assert 200 == resp.status
+        res = await resp.text()
+        jdict = json.loads(res)
+        assert expected_count == jdict['count']
+        assert len(expected_logs) == len(jdict['logs'])
+        for expected, log in zip(expected_logs, jdict['logs']):
+            assert expected in log
+            assert log.endswith('\n')
+
+    async def test_get_syslog_entries_appended_and_rotated(self, client, syslog):
+        resp = await client.get('/foglamp/syslog?source=storage')
+        assert 2 == json.loads(await resp.text())['count']
+
+        syslog.write("Sep 12 17:43:01 nerd-034 FogLAMP Storage[8979]: Storage shutdown\n"
+                     "Sep 12 17:43:02 nerd-034 FogLAMP Storage[8979]: partially writ", mode='a')
+        resp = await client.get('/foglamp/syslog?source=storage&limit=1')
+        jdict = json.loads(await resp.text())
+        assert 3 == jdict['count']
+        assert 'Storage shutdown' in jdict['logs'][0]
+
+        syslog.rename(syslog.dirpath('syslog.1'))
+        syslog.write("Sep 13 06:25:01 nerd-034 FogLAMP Storage[8979]: rotated\n")
+        resp = await client.get('/foglamp/syslog?source=storage')
+        jdict = json.loads(await resp.text())
+        assert 1 == jdict['count']
+        assert 'rotated' in jdict['logs'][0]
 
     @pytest.mark.parametrize("param, message", [
         ("__DEFAULT_LIMIT", "Limit must be a positive integer"),
@@ -235,8 +215,8 @@ class TestBundleSupport:
             assert 400 == resp.status
             assert message == resp.reason
 
-    async def test_get_syslog_entries_cmd_exception(self, client):
-        with patch.object(subprocess, "Popen", side_effect=Exception):
+    async def test_get_syslog_entries_read_exception(self, client):
+        with patch.object(SyslogIndex, "entries", side_effect=Exception):
             resp = await client.get('/foglamp/syslog')
             assert 500 == resp.status
             assert 'Internal Server Error' == resp.reason
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import datetime
+
+import pytest
+from foglamp.services.core.scheduler.cron import CronExpression
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("scheduler")
+class TestCronExpression:
+
+    @pytest.mark.parametrize("expression, after, expected", [
+        ("* * * * *", datetime.datetime(2018, 7, 13, 10, 15, 30), datetime.datetime(2018, 7, 13, 10, 16)),
+        ("*/5 6-18 * * mon-fri", datetime.datetime(2018, 7, 13, 18, 55), datetime.datetime(2018, 7, 16, 6, 0)),
+        ("5/20 * * * *", datetime.datetime(2018, 7, 13, 10, 25), datetime.datetime(2018, 7, 13, 10, 45)),
+        ("30 2 * * sat,sun", datetime.datetime(2018, 7, 13, 10, 0), datetime.datetime(2018, 7, 14, 2, 30)),
+        ("0 0 1 jan-mar/2 *", datetime.datetime(2018, 1, 1, 0, 0), datetime.datetime(2018, 3, 1, 0, 0)),
+        ("0 0 29 2 *", datetime.datetime(2018, 7, 13), datetime.datetime(2020, 2, 29)),
+        ("0 12 * * 7", datetime.datetime(2018, 7, 13), datetime.datetime(2018, 7, 15, 12, 0)),
+        # Day of month or day of week when both are restricted
+        ("0 0 13 * 5", datetime.datetime(2018, 7, 13, 0, 0), datetime.datetime(2018, 7, 20, 0, 0)),
+        ("0 0 13 * 5", datetime.datetime(2018, 7, 27, 0, 0), datetime.datetime(2018, 8, 3, 0, 0)),
+        ("@daily", datetime.datetime(2018, 12, 31, 23, 59), datetime.datetime(2019, 1, 1, 0, 0)),
+        ("@hourly", datetime.datetime(2018, 7, 13, 10, 0), datetime.datetime(2018, 7, 13, 11, 0)),
+    ])
+    def test_next_fire_time(self, expression, after, expected):
+        assert expected == CronExpression(expression).next_fire_time(after)
+
+    @pytest.mark.parametrize("expression, message", [
+        ("* * * *", "A cron expression has 5 fields"),
+        ("60 * * * *", "Minute 60 out of range 0-59"),
+        ("* * 0 * *", "Day of month 0 out of range 1-31"),
+        ("* * * foo *", "Invalid month 'foo'"),
+        ("*/0 * * * *", "Invalid step '0' in minute"),
+        ("* 10-5 * * *", "Invalid range '10-5' in hour"),
+        ("0 0 31 feb *", "never fires"),
+        (None, "must be a string"),
+    ])
+    def test_invalid_expression(self, expression, message):
+        with pytest.raises(ValueError) as excinfo:
+            CronExpression(expression)
+        assert message in str(excinfo.value)
+
+    def test_expression(self):
+        cron = CronExpression("  */5   6-18 * *  MON-FRI ")
+        assert "*/5 6-18 * * MON-FRI" == str(cron)
+        assert CronExpression("*/5 6-18 * * MON-FRI") == cron
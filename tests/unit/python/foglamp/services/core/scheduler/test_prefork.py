@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import asyncio
+import os
+import signal
+
+import pytest
+from foglamp.services.core.scheduler.prefork import PreforkRunner, PreforkedProcess
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+_TASK_MODULE = """
+import sys
+
+if __name__ == "__main__":
+    if sys.argv[1] == "--sleep":
+        import time
+        time.sleep(60)
+    with open(sys.argv[2], "w") as output:
+        output.write(" ".join(sys.argv[1:]))
+    sys.exit(int(sys.argv[1]))
+"""
+
+
+@pytest.fixture
+def task_module(tmpdir, monkeypatch):
+    tmpdir.join("prefork_test_task.py").write(_TASK_MODULE)
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join([str(tmpdir), os.environ.get("PYTHONPATH", "")]))
+    return "prefork_test_task"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("scheduler")
+class TestPrefork:
+
+    @pytest.mark.asyncio
+    async def test_run(self, task_module, tmpdir):
+        runner = PreforkRunner([task_module])
+        try:
+            output_file = str(tmpdir.join("output"))
+            process = await runner.run(task_module, ["3", output_file])
+            assert isinstance(process, PreforkedProcess)
+            assert 3 == await asyncio.wait_for(process.wait(), 10)
+            assert 3 == process.returncode
+            with open(output_file) as output:
+                assert "3 {}".format(output_file) == output.read()
+
+            # The runner forks again from the same process
+            runner_pid = runner._process.pid
+            process = await runner.run(task_module, ["0", output_file])
+            assert 0 == await asyncio.wait_for(process.wait(), 10)
+            assert runner_pid == runner._process.pid
+        finally:
+            await runner.stop()
+        assert runner.running is False
+
+    @pytest.mark.asyncio
+    async def test_terminate(self, task_module):
+        runner = PreforkRunner([task_module])
+        try:
+            process = await runner.run(task_module, ["--sleep"])
+            process.terminate()
+            assert -signal.SIGTERM == await asyncio.wait_for(process.wait(), 10)
+            with pytest.raises(ProcessLookupError):
+                process.terminate()
+        finally:
+            await runner.stop()
+
+    @pytest.mark.asyncio
+    async def test_runner_terminated(self, task_module):
+        runner = PreforkRunner([task_module])
+        await runner.start()
+        runner._process.kill()
+        await runner._process.wait()
+        await asyncio.wait_for(runner._reply_task, 10)
+        assert runner.running is False
+
+        # The runner is started again by the next request
+        process = await runner.run(task_module, ["--sleep"])
+        assert runner.running is True
+        process.kill()
+        assert -signal.SIGKILL == await asyncio.wait_for(process.wait(), 10)
+        await runner.stop()
@@ -9,12 +9,16 @@ import datetime
 import uuid
 import time
 import json
+import os
+import signal
 from unittest.mock import MagicMock, call
 
 import copy
 import pytest
 from foglamp.services.core.scheduler.scheduler import Scheduler, AuditLogger, ConfigurationManager
 from foglamp.services.core.scheduler.entities import *
+from foglamp.services.core.scheduler.cron import CronExpression
+from foglamp.common import host
 from foglamp.services.core.scheduler.exceptions import *
 from foglamp.common.storage_client.storage_client import StorageClientAsync
 
@@ -119,6 +123,7 @@ class TestScheduler:
         mock_task_processes = dict()
         mock_task_process.process = await asyncio.create_subprocess_exec("sleep", ".1")
         mock_task_process.schedule = mock_schedule
+        mock_task_process.start_time = time.time()
         mock_task_id = uuid.uuid4()
         mock_task_process.task_id = mock_task_id
         mock_task_processes[mock_task_process.task_id] = mock_task_process
@@ -144,6 +149,12 @@ class TestScheduler:
         assert 0 == len(scheduler._schedule_executions[mock_schedule.id].task_processes)
         args, kwargs = log_info.call_args_list[0]
         assert 'OMF to PI north' in args
+        # The duration and the exit code are recorded for the schedule and for the process
+        schedule_timings, process_timings = scheduler._schedule_timings, scheduler._process_timings
+        for timing in (schedule_timings[mock_schedule.id], process_timings["North Readings to PI"]):
+            assert 1 == timing.duration.count
+            assert .1 <= timing.duration.max < 10
+            assert {0: 1} == timing.exit_codes
         assert 'North Readings to PI' in args
 
     @pytest.mark.asyncio
@@ -201,6 +212,63 @@ class TestScheduler:
         assert 'OMF to PI north' in args
         assert 'North Readings to PI' in args
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("runner_fails", [False, True])
+    async def test__start_task_prefork(self, mocker, runner_fails):
+        # GIVEN
+        scheduler = Scheduler()
+        scheduler._storage = MockStorage(core_management_host=None, core_management_port=None)
+        scheduler._storage_async = MockStorageAsync(core_management_host=None, core_management_port=None)
+        mocker.patch.object(scheduler._logger, "info")
+        log_exception = mocker.patch.object(scheduler._logger, "exception")
+        mocker.patch.object(scheduler, '_schedule_first_task')
+        await scheduler._get_schedules()
+
+        schedule = scheduler._ScheduleRow(
+            id=uuid.UUID("2b614d26-760f-11e7-b5a5-be2e44b06b34"),
+            process_name="North Readings to PI",
+            name="OMF to PI north",
+            type=Schedule.Type.INTERVAL,
+            repeat=datetime.timedelta(seconds=30),
+            repeat_seconds=30,
+            time=None,
+            day=None,
+            exclusive=True,
+            enabled=True)
+
+        mocker.patch.object(scheduler, '_ready', True)
+        mocker.patch.object(scheduler, '_resume_check_schedules')
+        await scheduler.queue_task(schedule.id)
+
+        scheduler._process_scripts = {"North Readings to PI": ["tasks/north", "--stream_id", "1"]}
+        scheduler._prefork_processes = {"North Readings to PI"}
+        scheduler._setup_prefork_runner()
+        assert ["foglamp.tasks.north.sending_process"] == scheduler._prefork_runner._modules
+
+        @asyncio.coroutine
+        def mock_run(module, args):
+            if runner_fails:
+                raise EnvironmentError("Task runner terminated")
+            return (yield from mock_process())
+
+        run = mocker.patch.object(scheduler._prefork_runner, 'run', side_effect=mock_run)
+        exec_process = mocker.patch.object(asyncio, 'create_subprocess_exec',
+                                           return_value=asyncio.ensure_future(mock_process()))
+        mocker.patch.object(asyncio, 'ensure_future', return_value=asyncio.ensure_future(mock_task()))
+        mocker.patch.object(scheduler, '_wait_for_task_completion')
+
+        # WHEN
+        await scheduler._start_task(schedule)
+
+        # THEN
+        assert 1 == len(scheduler._schedule_executions[schedule.id].task_processes)
+        run.assert_called_once_with("foglamp.tasks.north.sending_process",
+                                    ["--stream_id", "1", "--port=None", "--address=127.0.0.1",
+                                     "--name=OMF to PI north"])
+        # The script is run only if the task runner fails
+        assert (1 if runner_fails else 0) == exec_process.call_count
+        assert (1 if runner_fails else 0) == log_exception.call_count
+
     @pytest.mark.asyncio
     async def test_purge_tasks(self, mocker):
         # TODO: Mandatory - Add negative tests for full code coverage
@@ -218,6 +286,90 @@ class TestScheduler:
         assert scheduler._purge_tasks_task is None
         assert scheduler._last_task_purge_time is not None
 
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("time_budget, expected_deleted, expected_deletes, expected_completed", [
+        (10, 1100, 3, True),
+        (0, 500, 1, False),
+    ])
+    async def test_purge_tasks_chunks(self, mocker, time_budget, expected_deleted, expected_deletes,
+                                      expected_completed):
+        # GIVEN
+        scheduler = Scheduler()
+        scheduler._storage_async = MockStorageAsync(core_management_host=None, core_management_port=None)
+        mocker.patch.multiple(scheduler, _ready=True, _paused=False, _PURGE_TASKS_TIME_BUDGET_SECONDS=time_budget)
+        mocker.patch.object(scheduler, '_max_completed_task_age', datetime.timedelta(days=30))
+        log_info = mocker.patch.object(scheduler._logger, "info")
+        rows = 1100
+        deletes = []
+
+        @asyncio.coroutine
+        def mock_query(table_name, query_payload):
+            # The start time of the last row of a full chunk
+            if rows >= Scheduler._DELETE_TASKS_LIMIT:
+                return {"count": 1, "rows": [{"start_time": "2018-01-01 00:00:00.{:06d}".format(rows)}]}
+            return {"count": 0, "rows": []}
+
+        @asyncio.coroutine
+        def mock_delete(table_name, condition=None):
+            nonlocal rows
+            deletes.append(json.loads(condition))
+            deleted = min(rows, Scheduler._DELETE_TASKS_LIMIT)
+            rows -= deleted
+            return {"response": "deleted", "rows_affected": deleted}
+
+        mocker.patch.object(scheduler._storage_async, 'query_tbl_with_payload', side_effect=mock_query)
+        mocker.patch.object(scheduler._storage_async, 'delete_from_tbl', side_effect=mock_delete)
+
+        # WHEN
+        rows_deleted = await scheduler.purge_tasks()
+
+        # THEN
+        assert expected_deleted == rows_deleted
+        assert expected_deletes == len(deletes)
+        assert "<=" == deletes[0]["where"]["and"]["condition"]
+        if expected_completed:
+            # The remaining rows, less than a chunk, are deleted by age
+            assert "<" == deletes[-1]["where"]["and"]["condition"]
+            assert time.time() - scheduler._last_task_purge_time < 10
+        else:
+            # Resumes earlier than the usual purge frequency
+            assert time.time() - scheduler._last_task_purge_time > (Scheduler._PURGE_TASKS_FREQUENCY_SECONDS -
+                                                                    Scheduler._PURGE_TASKS_RETRY_SECONDS - 10)
+        assert expected_deleted == log_info.call_args[0][1]
+
+    @pytest.mark.asyncio
+    async def test__queue_task_row(self, mocker):
+        # GIVEN
+        scheduler = Scheduler()
+        scheduler._storage_async = MockStorageAsync(core_management_host=None, core_management_port=None)
+        insert = mocker.patch.object(scheduler._storage_async, 'insert_into_tbl',
+                                     return_value=asyncio.ensure_future(mock_task()))
+        update = mocker.patch.object(scheduler._storage_async, 'update_tbl',
+                                     return_value=asyncio.ensure_future(mock_task()))
+        task_id = uuid.uuid4()
+
+        # WHEN
+        # A task terminated before its row is written
+        scheduler._queue_task_row(task_id, dict(id=str(task_id), state=int(Task.State.RUNNING)), insert=True)
+        scheduler._queue_task_row(task_id, dict(state=int(Task.State.COMPLETE), exit_code=0))
+        await scheduler._flush_task_rows()
+
+        # THEN
+        assert scheduler._task_rows_task is None
+        assert 1 == insert.call_count
+        assert 0 == update.call_count
+        assert {"id": str(task_id), "state": int(Task.State.COMPLETE), "exit_code": 0} == \
+            json.loads(insert.call_args[0][1])
+
+        # WHEN
+        # The row is updated once inserted
+        scheduler._queue_task_row(task_id, dict(reason="none"))
+        await scheduler._flush_task_rows()
+
+        # THEN
+        assert 1 == insert.call_count
+        assert 1 == update.call_count
+
     @pytest.mark.asyncio
     async def test__check_purge_tasks(self, mocker):
         # TODO: Mandatory - Add negative tests for full code coverage
@@ -263,6 +415,158 @@ class TestScheduler:
         assert 'COAP listener south' in args1
         assert 'OMF to PI north' in args2
 
+    @pytest.mark.asyncio
+    async def test__check_schedules_queue(self, mocker):
+        # GIVEN
+        scheduler = Scheduler()
+        mocker.patch.object(scheduler._logger, "info")
+        current_time = time.time()
+        mocker.patch.multiple(scheduler, _max_running_tasks=10, _start_time=current_time, current_time=current_time)
+        started = []
+
+        async def mock_start_task(schedule):
+            started.append(schedule.name)
+
+        mocker.patch.object(scheduler, '_start_task', side_effect=mock_start_task)
+
+        schedule_ids = []
+        for offset in [0, 10, 20]:
+            schedule = scheduler._ScheduleRow(
+                id=uuid.uuid4(),
+                process_name="purge",
+                name="schedule {}".format(offset),
+                type=Schedule.Type.INTERVAL,
+                repeat=datetime.timedelta(seconds=3600),
+                repeat_seconds=3600,
+                time=None,
+                day=None,
+                exclusive=True,
+                enabled=True)
+            scheduler._schedules[schedule.id] = schedule
+            schedule_execution = scheduler._ScheduleExecution()
+            schedule_execution.next_start_time = current_time + offset
+            scheduler._schedule_executions[schedule.id] = schedule_execution
+            scheduler._queue_schedule(schedule.id, schedule_execution)
+            schedule_ids.append(schedule.id)
+
+        # The previous entry of a rescheduled schedule is discarded
+        scheduler._schedule_executions[schedule_ids[1]].next_start_time = current_time + 30
+        scheduler._queue_schedule(schedule_ids[1], scheduler._schedule_executions[schedule_ids[1]])
+
+        # WHEN
+        earliest_start_time = await scheduler._check_schedules()
+
+        # THEN
+        assert ["schedule 0"] == started
+        assert current_time + 20 == earliest_start_time
+
+        # WHEN
+        scheduler.current_time = current_time + 25
+        earliest_start_time = await scheduler._check_schedules()
+
+        # THEN
+        assert ["schedule 0", "schedule 20"] == started
+        assert current_time + 30 == earliest_start_time
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("schedule_type, reason", [
+        (Schedule.Type.STARTUP, None),
+        (Schedule.Type.INTERVAL, "load average per CPU 4.00 above 0.5")
+    ])
+    async def test__check_resources_startup(self, mocker, schedule_type, reason):
+        # GIVEN
+        scheduler = Scheduler()
+        mocker.patch.multiple(scheduler, _max_load_average=0.5, _max_storage_latency=0)
+        scheduler._process_admission = scheduler._parse_process_admission(
+            json.dumps(Scheduler._DEFAULT_PROCESS_ADMISSION))
+        mocker.patch.object(os, 'cpu_count', return_value=1)
+        mocker.patch.object(os, 'getloadavg', return_value=(4.0, 4.0, 4.0))
+        schedule = scheduler._ScheduleRow(
+            id=uuid.uuid4(), process_name="south", name="OPC-UA", type=schedule_type,
+            repeat=datetime.timedelta(seconds=3600), repeat_seconds=3600, time=None, day=None, exclusive=True,
+            enabled=True)
+
+        # THEN
+        # The services are started whatever the load
+        assert reason == await scheduler._check_resources(schedule)
+
+    @pytest.mark.asyncio
+    async def test__check_schedules_admission(self, mocker):
+        # GIVEN
+        scheduler = Scheduler()
+        mocker.patch.object(scheduler._logger, "info")
+        current_time = time.time()
+        mocker.patch.multiple(scheduler, _max_running_tasks=10, _start_time=current_time, current_time=current_time,
+                              _ready=True, _max_load_average=0.5, _max_storage_latency=0)
+        scheduler._process_admission = scheduler._parse_process_admission(
+            json.dumps(Scheduler._DEFAULT_PROCESS_ADMISSION))
+        mocker.patch.object(os, 'cpu_count', return_value=1)
+        started = []
+
+        async def mock_start_task(schedule):
+            started.append(schedule.name)
+            task_process = scheduler._TaskProcess()
+            task_process.schedule = schedule
+            scheduler._task_processes[uuid.uuid4()] = task_process
+
+        mocker.patch.object(scheduler, '_start_task', side_effect=mock_start_task)
+
+        for offset, (name, process_name) in enumerate([("purge a", "purge"), ("purge b", "purge"),
+                                                       ("north", "North Readings to PI"),
+                                                       ("stats", "stats collector")]):
+            schedule = scheduler._ScheduleRow(
+                id=uuid.uuid4(),
+                process_name=process_name,
+                name=name,
+                type=Schedule.Type.INTERVAL,
+                repeat=datetime.timedelta(seconds=3600),
+                repeat_seconds=3600,
+                time=None,
+                day=None,
+                exclusive=True,
+                enabled=True)
+            scheduler._schedules[schedule.id] = schedule
+            schedule_execution = scheduler._ScheduleExecution()
+            schedule_execution.next_start_time = current_time - 10 + offset
+            scheduler._schedule_executions[schedule.id] = schedule_execution
+            scheduler._queue_schedule(schedule.id, schedule_execution)
+
+        # WHEN
+        mocker.patch.object(os, 'getloadavg', return_value=(4.0, 4.0, 4.0))
+        next_time = await scheduler._check_schedules()
+
+        # THEN
+        # Only the high priority class is admitted above the maximum load
+        assert ["stats"] == started
+        assert current_time + Scheduler._ADMISSION_RETRY_SECONDS == next_time
+        deferred_tasks = await scheduler.get_deferred_tasks()
+        assert ["north", "purge a", "purge b"] == [task.schedule_name for task in deferred_tasks]
+        assert ["normal", "low", "low"] == [task.priority for task in deferred_tasks]
+        assert deferred_tasks[0].reason.startswith("load average per CPU 4.00")
+
+        # WHEN
+        mocker.patch.object(os, 'getloadavg', return_value=(0.1, 0.1, 0.1))
+        scheduler.current_time = current_time + 5
+        next_time = await scheduler._check_schedules()
+
+        # THEN
+        # Higher priority classes first, one purge task at a time
+        assert ["stats", "north", "purge a"] == started
+        assert next_time is None
+        deferred_tasks = await scheduler.get_deferred_tasks()
+        assert ["purge b"] == [task.schedule_name for task in deferred_tasks]
+        assert "maximum number of running tasks of process 'purge' reached" == deferred_tasks[0].reason
+
+        # stats was due 7 seconds before the first check and started at once
+        # purge a was due 10 seconds before the first check and waited 5 seconds, until the second one
+        schedule_timings, process_timings = await scheduler.get_task_timings()
+        assert ["north", "purge a", "stats"] == [timing.schedule_name for timing in schedule_timings]
+        assert ["North Readings to PI", "purge", "stats collector"] == [timing.process_name
+                                                                        for timing in process_timings]
+        stats_timing, purge_timing = schedule_timings[2], schedule_timings[1]
+        assert (1, 7, 0) == (stats_timing.lateness.count, stats_timing.lateness.max, stats_timing.queue_wait.max)
+        assert (1, 15, 5) == (purge_timing.lateness.count, purge_timing.lateness.max, purge_timing.queue_wait.max)
+
     @pytest.mark.asyncio
     @pytest.mark.skip("_scheduler_loop() not suitable for unit testing. Will be tested during System tests.")
     async def test__scheduler_loop(self, mocker):
@@ -377,6 +681,52 @@ class TestScheduler:
         # "stat collector" appears twice in this list.
         assert 'stats collection' in args3
 
+    @pytest.mark.asyncio
+    async def test__schedule_cron_task(self, mocker):
+        # GIVEN
+        scheduler = Scheduler()
+        mocker.patch.object(scheduler._logger, "info")
+        current_time = time.mktime(datetime.datetime(2018, 7, 13, 18, 52, 10).timetuple())
+        mocker.patch.object(time, 'time', return_value=current_time)
+
+        schedule_id = uuid.uuid4()
+        schedule = scheduler._ScheduleRow(
+            id=schedule_id,
+            name='Test Schedule',
+            type=Schedule.Type.CRON,
+            day=None,
+            time=None,
+            repeat=None,
+            repeat_seconds=None,
+            exclusive=False,
+            enabled=True,
+            process_name='TestProcess',
+            cron=CronExpression('*/5 6-18 * * mon-fri'))
+        scheduler._schedules[schedule_id] = schedule
+
+        # WHEN
+        scheduler._schedule_first_task(schedule, current_time)
+
+        # THEN
+        sch_execution = scheduler._schedule_executions[schedule_id]
+        assert datetime.datetime(2018, 7, 13, 18, 55) == datetime.datetime.fromtimestamp(sch_execution.next_start_time)
+        assert (sch_execution.next_start_time, 0, schedule_id) == scheduler._schedule_queue[0]
+
+        # WHEN
+        # The next fire time follows the last one, Friday 18:55 is followed by Monday 6:00
+        scheduler._schedule_next_task(schedule)
+
+        # THEN
+        assert datetime.datetime(2018, 7, 16, 6, 0) == datetime.datetime.fromtimestamp(sch_execution.next_start_time)
+
+        # WHEN
+        # Fire times passed while the scheduler was busy are skipped
+        time.time.return_value = time.mktime(datetime.datetime(2018, 7, 16, 7, 3).timetuple())
+        scheduler._schedule_next_task(schedule)
+
+        # THEN
+        assert datetime.datetime(2018, 7, 16, 7, 5) == datetime.datetime.fromtimestamp(sch_execution.next_start_time)
+
     @pytest.mark.asyncio
     async def test__get_process_scripts(self, mocker):
         # GIVEN
@@ -494,6 +844,31 @@ class TestScheduler:
                         "default": str(Scheduler._DEFAULT_MAX_COMPLETED_TASK_AGE_DAYS),
                         "value": str(Scheduler._DEFAULT_MAX_COMPLETED_TASK_AGE_DAYS)
                     },
+                    "process_admission": {
+                        "description": "Priority class and maximum number of running tasks of the processes",
+                        "type": "JSON",
+                        "default": json.dumps(Scheduler._DEFAULT_PROCESS_ADMISSION),
+                        "value": json.dumps({"purge": {"priority": "low", "max_running": 1}})
+                    },
+                    "max_load_average": {
+                        "description": "Maximum load average per CPU",
+                        "type": "float",
+                        "default": "0",
+                        "value": "1.5"
+                    },
+                    "max_storage_latency_ms": {
+                        "description": "Maximum storage latency in milliseconds",
+                        "type": "integer",
+                        "default": "0",
+                        "value": "250"
+                    },
+                    "prefork_processes": {
+                        "description": "Comma separated names of the scheduled processes, written in Python, "
+                                       "started by forking a pre-loaded interpreter instead of running their script",
+                        "type": "string",
+                        "default": "",
+                        "value": "purge, stats collector"
+                    },
             }
         # GIVEN
         scheduler = Scheduler()
@@ -512,6 +887,10 @@ class TestScheduler:
         assert 1 == get_cat.call_count
         assert scheduler._max_running_tasks is not None
         assert scheduler._max_completed_task_age is not None
+        assert {"purge", "stats collector"} == scheduler._prefork_processes
+        assert {"purge": (2, 1)} == scheduler._process_admission
+        assert 1.5 == scheduler._max_load_average
+        assert 0.25 == scheduler._max_storage_latency
 
     @pytest.mark.asyncio
     async def test_start(self, mocker):
@@ -1417,6 +1796,39 @@ class TestScheduler:
     async def test__terminate_child_processes(self, mocker):
         pass
 
+    @pytest.mark.parametrize("new_session", [True, False])
+    @pytest.mark.asyncio
+    async def test__terminate_task_process(self, new_session):
+        # GIVEN
+        # A script starting the task process, as the scripts of the tasks do
+        scheduler = Scheduler()
+        process = await asyncio.create_subprocess_exec("sh", "-c", "sleep 30 & wait", start_new_session=new_session)
+        for _ in range(100):
+            child_pids = host.get_child_pids(process.pid)
+            if child_pids:
+                break
+            await asyncio.sleep(.05)
+        assert 1 == len(child_pids)
+
+        # WHEN
+        scheduler._terminate_task_process(process)
+
+        # THEN
+        # Both the script and the task process are terminated
+        assert -signal.SIGTERM == await asyncio.wait_for(process.wait(), 10)
+        for _ in range(100):
+            try:
+                if host._stat_fields(child_pids[0])[0] == 'Z':
+                    break
+            except FileNotFoundError:
+                break
+            await asyncio.sleep(.05)
+        else:
+            pytest.fail("The task process is running")
+
+        with pytest.raises(ProcessLookupError):
+            scheduler._terminate_task_process(process)
+
 class MockStorage(StorageClientAsync):
     def __init__(self, core_management_host=None, core_management_port=None):
         super().__init__(core_management_host, core_management_port)
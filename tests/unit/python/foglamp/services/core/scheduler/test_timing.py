@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import pytest
+from foglamp.services.core.scheduler.timing import Histogram, TaskTiming
+
+__author__ = "Terris Linenbach"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("scheduler")
+class TestTiming:
+
+    def test_histogram(self):
+        histogram = Histogram()
+        assert histogram.percentile(50) is None
+
+        for seconds in [0.005] * 90 + [3] * 9 + [100000, -1]:
+            histogram.add(seconds)
+
+        assert 101 == histogram.count
+        assert 100000 == histogram.max
+        assert 0.01 == histogram.percentile(50)
+        assert 5 == histogram.percentile(95)
+        # Beyond the last bound
+        assert 100000 == histogram.percentile(100)
+
+        histogram_dict = histogram.toDict()
+        assert {"le": 0.01, "count": 91} == histogram_dict["buckets"][0]
+        assert {"le": 5, "count": 100} == histogram_dict["buckets"][6]
+        assert {"le": "+Inf", "count": 101} == histogram_dict["buckets"][-1]
+        # The size is fixed
+        assert len(histogram.counts) == len(histogram_dict["buckets"])
+
+    def test_task_timing_merge(self):
+        timing = TaskTiming()
+        timing.duration.add(2)
+        timing.exit_codes[-15] += 1
+        other = TaskTiming()
+        other.duration.add(20)
+        other.lateness.add(1)
+        other.exit_codes[0] += 2
+
+        timing.merge(other)
+
+        assert (2, 22, 20) == (timing.duration.count, timing.duration.sum, timing.duration.max)
+        assert 1 == timing.lateness.count
+        assert {"-15": 1, "0": 2} == timing.toDict()["exitCodes"]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import pytest
+
+from foglamp.services.core.syslog_index import SyslogIndex
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("services", "core")
+class TestSyslogIndex:
+
+    def test_entries_indexed_incrementally(self, tmpdir):
+        syslog = tmpdir.join('syslog')
+        syslog.write("Sep 12 14:31:36 nerd-034 FogLAMP[8683] INFO: server: one\n"
+                     "Sep 12 14:31:37 nerd-034 cron[101]: FogLAMP not matched\n")
+        index = SyslogIndex(str(syslog))
+        assert (["Sep 12 14:31:36 nerd-034 FogLAMP[8683] INFO: server: one\n"], 1) == index.entries(
+            'foglamp', None, 0, 20)
+
+        syslog.write("Sep 12 14:31:38 nerd-034 FogLAMP Storage[8683]: Error two\n", mode='a')
+        assert 2 == index.entries('foglamp', None, 0, 20)[1]
+        assert (["Sep 12 14:31:38 nerd-034 FogLAMP Storage[8683]: Error two\n"], 1) == index.entries(
+            'storage', 'error', 0, 20)
+        assert ([], 1) == index.entries('storage', None, 5, 20)
+
+    def test_entries_truncated(self, tmpdir):
+        syslog = tmpdir.join('syslog')
+        syslog.write("Sep 12 14:31:36 nerd-034 FogLAMP[8683] WARNING: server: one\n"
+                     "Sep 12 14:31:37 nerd-034 FogLAMP[8683] WARNING: server: two\n")
+        index = SyslogIndex(str(syslog))
+        assert 2 == index.entries('foglamp', 'warning', 0, 20)[1]
+
+        syslog.write("Sep 12 14:31:38 nerd-034 FogLAMP[8683] INFO: three\n")
+        assert ([], 0) == index.entries('foglamp', 'warning', 0, 20)
+        assert (["Sep 12 14:31:38 nerd-034 FogLAMP[8683] INFO: three\n"], 1) == index.entries(
+            'foglamp', None, 0, 20)
+
+    def test_entries_no_syslog(self, tmpdir):
+        with pytest.raises(FileNotFoundError):
+            SyslogIndex(str(tmpdir.join('syslog'))).entries('foglamp', None, 0, 20)
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+""" Unit tests for the shared readings cache of the north Sending Process """
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import os
+
+import pytest
+
+from foglamp.tasks.north.readings_cache import ReadingsBlockCache
+
+__author__ = "Stefano Simonelli"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+_READ_KEY = "ef6e1368-4182-11e8-842f-0ed5f89f718b"
+
+
+def _rows(first_id, last_id):
+    return [{"id": _id,
+             "asset_code": "test_asset_code",
+             "read_key": _READ_KEY,
+             "reading": {"humidity": _id},
+             "user_ts": "2018-04-16 16:32:55.000000+00"} for _id in range(first_id, last_id + 1)]
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("tasks", "north")
+class TestReadingsBlockCache:
+
+    @pytest.mark.parametrize("reading_id, expected_range", [
+        (1, (1, 10)),
+        (10, (1, 10)),
+        (11, (11, 20)),
+        (25, (21, 30)),
+    ])
+    def test_block_range(self, tmpdir, reading_id, expected_range):
+        cache = ReadingsBlockCache(10, 5, str(tmpdir))
+        assert expected_range == cache.block_range(reading_id)
+
+    def test_get_put(self, tmpdir):
+        cache = ReadingsBlockCache(10, 5, str(tmpdir))
+        assert cache.get(1, _READ_KEY) is None
+
+        cache.put(1, _READ_KEY, _rows(1, 10))
+
+        assert _rows(1, 10) == cache.get(1, _READ_KEY)
+        assert 1 == cache.hits
+        assert 1 == cache.misses
+
+    def test_storage_reset(self, tmpdir):
+        cache = ReadingsBlockCache(10, 5, str(tmpdir))
+        cache.put(1, _READ_KEY, _rows(1, 10))
+
+        # The reading ids of a Storage layer reset or restored are the ones of other readings
+        assert cache.get(1, "5b3be500-ff95-41ae-b5a4-cc99d08bef40") is None
+
+    def test_shared_among_instances(self, tmpdir):
+        ReadingsBlockCache(10, 5, str(tmpdir)).put(11, _READ_KEY, _rows(11, 20))
+
+        assert _rows(11, 20) == ReadingsBlockCache(10, 5, str(tmpdir)).get(11, _READ_KEY)
+        # Blocks having a different size are not shared
+        assert ReadingsBlockCache(5, 5, str(tmpdir)).get(11, _READ_KEY) is None
+
+    def test_bounded(self, tmpdir):
+        cache = ReadingsBlockCache(10, 2, str(tmpdir))
+        for first_id in [1, 11, 21]:
+            cache.put(first_id, _READ_KEY, _rows(first_id, first_id + 9))
+            # Guarantees a different modification time to every block
+            os.utime(os.path.join(str(tmpdir), "10_{}_{}.json".format(first_id, _READ_KEY)), (first_id, first_id))
+
+        cache.put(31, _READ_KEY, _rows(31, 40))
+
+        assert 2 == len(os.listdir(str(tmpdir)))
+        assert cache.get(1, _READ_KEY) is None
+        assert cache.get(11, _READ_KEY) is None
+        assert _rows(31, 40) == cache.get(31, _READ_KEY)
+
+    def test_disabled(self, tmpdir):
+        cache = ReadingsBlockCache(10, 0, str(tmpdir))
+        cache.put(1, _READ_KEY, _rows(1, 10))
+
+        assert cache.get(1, _READ_KEY) is None
+        assert [] == os.listdir(str(tmpdir))
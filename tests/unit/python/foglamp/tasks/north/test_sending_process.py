@@ -18,6 +18,9 @@ import foglamp.tasks.north.sending_process as sp_module
 from foglamp.common.audit_logger import AuditLogger
 from foglamp.common.storage_client.storage_client import StorageClientAsync, ReadingsStorageClientAsync
 from foglamp.tasks.north.sending_process import SendingProcess
+from foglamp.tasks.north.readings_cache import ReadingsBlockCache
+from foglamp.tasks.north import stream_position
+from foglamp.tasks.north.stream_position import StreamPositionJournal
 from foglamp.common.process import FoglampProcess, SilentArgParse, ArgumentParserError
 from foglamp.common.microservice_management_client.microservice_management_client import MicroserviceManagementClient
 
@@ -111,6 +114,33 @@ async def test_apply_date_format(p_data, expected_data):
     assert expected_data == sp_module.apply_date_format(p_data)
 
 
+@pytest.mark.parametrize(
+    "p_data, "
+    "expected_data",
+    [
+        # Fast path - all the timestamps share the same layout
+        (["2018-05-28 16:56:55", "2018-05-28 16:56:56"],
+         ["2018-05-28 16:56:55.000000+00", "2018-05-28 16:56:56.000000+00"]),
+        (["2018-05-28 13:42:28.84", "2018-05-28 13:42:28.85"],
+         ["2018-05-28 13:42:28.840000+00", "2018-05-28 13:42:28.850000+00"]),
+        (["2018-03-22 17:17:17.166347+00:00", "2018-03-22 17:17:17.166348-02:00"],
+         ["2018-03-22 17:17:17.166347+00", "2018-03-22 17:17:17.166348+00"]),
+        (["2018-03-22 17:17:17.166347+00", "2018-03-22 17:17:17.166348-00"],
+         ["2018-03-22 17:17:17.166347+00", "2018-03-22 17:17:17.166348+00"]),
+
+        # Timestamps having different layouts
+        (["2018-05-28 16:56:55", "2018-05-28 13:42:28.84", "2018-03-22 17:17:17.166347+02:00"],
+         ["2018-05-28 16:56:55.000000+00", "2018-05-28 13:42:28.840000+00", "2018-03-22 17:17:17.166347+00"]),
+        (["2018-05-28 13:42:28.84+00", "2018-05-28 13:42:28.8400"],
+         ["2018-05-28 13:42:28.84+00", "2018-05-28 13:42:28.840000+00"]),
+        ([], []),
+    ]
+)
+async def test_apply_date_format_block(p_data, expected_data):
+
+    assert expected_data == sp_module.apply_date_format_block(p_data)
+
+
 @pytest.mark.parametrize(
     "p_parameter, "
     "expected_param_mgt_name, "
@@ -2218,6 +2248,208 @@ class TestSendingProcess:
         mock__update_statistics.assert_called_with(100)
         mock_audit_information.assert_called_with(SendingProcess._AUDIT_CODE, {"sentRows": 100})
 
+    @pytest.mark.parametrize(
+        "p_last_object_id, "
+        "p_max_id, "
+        "p_threshold, "
+        "expected_backfill",
+        [
+            (0, 100, 10, True),
+            (95, 100, 10, False),
+            (0, 100, 0, False),
+            (0, 0, 10, False),
+        ]
+    )
+    async def test_backfill_evaluate(self, fixture_sp, p_last_object_id, p_max_id, p_threshold, expected_backfill):
+        """ Unit tests - _backfill_evaluate - backfill mode enabled only above the threshold """
+
+        fixture_sp._config['source'] = 'readings'
+        fixture_sp._config['backfillThreshold'] = p_threshold
+        fixture_sp._config['backfillWorkers'] = 0
+
+        with patch.object(fixture_sp, '_last_reading_id_read', return_value=mock_coro(p_max_id)):
+            result = await fixture_sp._backfill_evaluate(p_last_object_id)
+
+        assert result == expected_backfill
+        assert (fixture_sp._backfill is not None) == expected_backfill
+        if expected_backfill:
+            assert fixture_sp._backfill['target'] == p_max_id
+
+    async def test_backfill_evaluate_completed(self, fixture_sp):
+        """ Unit tests - _backfill_evaluate - normal streaming resumes once the backlog is caught up """
+
+        fixture_sp._config['source'] = 'readings'
+        fixture_sp._config['backfillThreshold'] = 10
+        fixture_sp._config['backfillWorkers'] = 0
+        fixture_sp._backfill = {'target': 100, 'sent': 100, 'start_time': 0, 'published': 0}
+
+        with patch.object(fixture_sp, '_last_reading_id_read', return_value=mock_coro(105)):
+            result = await fixture_sp._backfill_evaluate(100)
+
+        assert result is False
+        assert fixture_sp._backfill is None
+
+    async def test_load_data_into_memory_backfill(self, fixture_sp):
+        """ Unit tests - _load_data_into_memory_backfill - segments are fetched concurrently and returned in order """
+
+        rows = [{"id": _id,
+                 "asset_code": "test_asset_code",
+                 "read_key": "ef6e1368-4182-11e8-842f-0ed5f89f718b",
+                 "reading": {"humidity": _id},
+                 "user_ts": "2018-04-16 16:32:55.000000+00"} for _id in [1, 2, 3, 6, 7, 10]]
+
+        async def mock_fetch(reading_id, count):
+            return {"rows": [row for row in rows if row['id'] >= reading_id][:count]}
+
+        fixture_sp._config['blockSize'] = 3
+        fixture_sp._config['backfillSegments'] = 3
+        fixture_sp._backfill = {'target': 10, 'sent': 0, 'start_time': 0, 'published': 0}
+        fixture_sp._readings = MagicMock(spec=ReadingsStorageClientAsync)
+        fixture_sp._readings.fetch = mock_fetch
+
+        blocks, last_id = await fixture_sp._load_data_into_memory_backfill(0)
+
+        # Segments: ids 1-3, 4-6, 7-9
+        assert [[row['id'] for row in block] for block in blocks] == [[1, 2, 3], [6], [7]]
+        assert last_id == 9
+
+        blocks, last_id = await fixture_sp._load_data_into_memory_backfill(9)
+
+        # The last segment is bounded by the backfill target
+        assert [[row['id'] for row in block] for block in blocks] == [[10]]
+        assert last_id == 10
+
+    async def test_load_data_into_memory_readings_cached(self, fixture_sp, tmpdir):
+        """ Unit tests - _load_data_into_memory_readings - complete blocks are shared through the readings cache """
+
+        rows = [{"id": _id,
+                 "asset_code": "test_asset_code",
+                 "read_key": "ef6e1368-4182-11e8-842f-0ed5f89f718b",
+                 "reading": {"humidity": _id},
+                 "user_ts": "2018-04-16 16:32:55.000000+00"} for _id in [1, 2, 3, 4, 5, 20]]
+        fetched = []
+
+        async def mock_fetch(reading_id, count):
+            fetched.append((reading_id, count))
+            return {"rows": [dict(row) for row in rows if row['id'] >= reading_id][:count]}
+
+        fixture_sp._config['source'] = 'readings'
+        fixture_sp._config['blockSize'] = 3
+        fixture_sp._readings = MagicMock(spec=ReadingsStorageClientAsync)
+        fixture_sp._readings.fetch = mock_fetch
+        fixture_sp._readings_cache = ReadingsBlockCache(3, 10, str(tmpdir))
+
+        # Loads up to the end of the block containing the position
+        generated_rows = await fixture_sp._load_data_into_memory_readings(1)
+        assert [row['id'] for row in generated_rows] == [2, 3]
+
+        # Complete blocks without readings to send are skipped
+        generated_rows = await fixture_sp._load_data_into_memory_readings(5)
+        assert [row['id'] for row in generated_rows] == [20]
+        # The first reading of a block identifies it, then the block is fetched
+        assert fetched == [(1, 1), (1, 3), (4, 1), (4, 3), (7, 1), (7, 3), (10, 1), (10, 3), (13, 1), (13, 3),
+                           (16, 1), (16, 3), (19, 1), (19, 3)]
+
+        # A second stream reads the complete blocks from the cache
+        del fetched[:]
+        generated_rows = await fixture_sp._load_data_into_memory_readings(0)
+        assert [row['id'] for row in generated_rows] == [1, 2, 3]
+        assert fetched == [(1, 1)]
+
+        # The Storage layer is reset, the reading ids are the ones of other readings
+        rows[0]['read_key'] = "5b3be500-ff95-41ae-b5a4-cc99d08bef40"
+        rows[0]['reading'] = {"humidity": 100}
+        del fetched[:]
+        generated_rows = await fixture_sp._load_data_into_memory_readings(0)
+        assert [row['reading'] for row in generated_rows][0] == {"humidity": 100}
+        assert fetched == [(1, 1), (1, 3)]
+
+    @pytest.mark.parametrize(
+        "p_journaled, "
+        "p_storage_position, "
+        "expected_position, "
+        "expected_update",
+        [
+            # No journal available
+            (None, 10, 10, None),
+            # Terminated before updating the Storage layer
+            ((25, 15, 10), 10, 25, (25, 15)),
+            # Storage layer already updated
+            ((25, 0, 25), 25, 25, None),
+            # Position changed from outside, e.g. to resend the data
+            ((25, 15, 10), 5, 5, None),
+        ]
+    )
+    async def test_checkpoint_setup(self, fixture_sp, tmpdir, p_journaled, p_storage_position, expected_position,
+                                    expected_update):
+        """ Unit tests - _checkpoint_setup - the journaled position is used only if the Storage layer was not
+        changed from outside """
+
+        fixture_sp._name = "sname"
+        fixture_sp._config['checkpointInterval'] = 5
+        if p_journaled is not None:
+            StreamPositionJournal(STREAM_ID, "sname", str(tmpdir)).write(*p_journaled)
+
+        with patch.object(stream_position, 'default_journal_dir', return_value=str(tmpdir)):
+            with patch.object(fixture_sp, '_last_object_id_read', return_value=mock_coro(p_storage_position)):
+                with patch.object(fixture_sp, '_update_position_reached',
+                                  return_value=mock_async_call()) as patched_update_position_reached:
+                    await fixture_sp._checkpoint_setup()
+
+        assert fixture_sp._checkpoint['position'] == expected_position
+        assert fixture_sp._checkpoint['checkpoint'] == expected_position
+        if expected_update is None:
+            assert not patched_update_position_reached.called
+        else:
+            patched_update_position_reached.assert_called_with(*expected_update)
+
+    async def test_checkpoint_setup_disabled(self, fixture_sp):
+        """ Unit tests - _checkpoint_setup - the position is updated every few blocks if checkpointInterval is 0 """
+
+        fixture_sp._config['checkpointInterval'] = 0
+
+        await fixture_sp._checkpoint_setup()
+
+        assert fixture_sp._checkpoint is None
+        assert fixture_sp._position_journal is None
+
+    async def test_checkpoint_update(self, fixture_sp, tmpdir):
+        """ Unit tests - _checkpoint_sent/_checkpoint_update - every block is journaled, the Storage layer is
+        updated when enough rows are sent and the update is retried after an error """
+
+        journal = StreamPositionJournal(STREAM_ID, "sname", str(tmpdir))
+        fixture_sp._position_journal = journal
+        fixture_sp._config['checkpointReadings'] = 100
+        fixture_sp._checkpoint = {'position': 10, 'sent': 0, 'checkpoint': 10, 'event': asyncio.Event(),
+                                  'lock': asyncio.Lock()}
+
+        await fixture_sp._checkpoint_sent(20, 60)
+        assert journal.read() == (20, 60, 10)
+        assert not fixture_sp._checkpoint['event'].is_set()
+
+        await fixture_sp._checkpoint_sent(30, 60)
+        assert journal.read() == (30, 120, 10)
+        assert fixture_sp._checkpoint['event'].is_set()
+
+        async def mock_update_error(position, num_sent):
+            raise RuntimeError("Storage layer not available")
+
+        with patch.object(fixture_sp, '_update_position_reached', side_effect=mock_update_error):
+            await fixture_sp._checkpoint_update()
+        assert fixture_sp._checkpoint['sent'] == 120
+        assert journal.read() == (30, 120, 10)
+
+        with patch.object(fixture_sp, '_update_position_reached',
+                          return_value=mock_async_call()) as patched_update_position_reached:
+            await fixture_sp._checkpoint_update()
+        patched_update_position_reached.assert_called_with(30, 120)
+        assert journal.read() == (30, 0, 30)
+
+        # Nothing to update
+        with patch.object(fixture_sp, '_update_position_reached') as patched_update_position_reached:
+            await fixture_sp._checkpoint_update()
+        assert not patched_update_position_reached.called
+
     @pytest.mark.parametrize("plugin_file, plugin_type, plugin_name", [
         ("empty",      "north", "Empty North Plugin"),
         ("pi_server",  "north", "PI Server North"),
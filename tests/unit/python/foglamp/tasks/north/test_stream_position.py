@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+""" Unit tests for the local journal of the position reached by a north stream """
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+import os
+
+import pytest
+
+from foglamp.tasks.north.stream_position import StreamPositionJournal
+
+__author__ = "Stefano Simonelli"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("tasks", "north")
+class TestStreamPositionJournal:
+
+    def test_write_read(self, tmpdir):
+        journal = StreamPositionJournal(1, "North Readings to PI", str(tmpdir))
+        assert journal.read() is None
+
+        journal.write(100, 20, 80)
+        journal.write(120, 40, 80)
+
+        assert (120, 40, 80) == journal.read()
+        assert ["stream_1.json"] == os.listdir(str(tmpdir))
+
+    def test_shared_among_instances(self, tmpdir):
+        StreamPositionJournal(1, "North Readings to PI", str(tmpdir)).write(100, 20, 80)
+
+        assert (100, 20, 80) == StreamPositionJournal(1, "North Readings to PI", str(tmpdir)).read()
+
+    def test_other_process(self, tmpdir):
+        """ A stream id reused by a different Sending Process ignores the journal """
+        StreamPositionJournal(1, "North Readings to PI", str(tmpdir)).write(100, 20, 80)
+
+        assert StreamPositionJournal(1, "North Readings to OCS", str(tmpdir)).read() is None
+        assert StreamPositionJournal(2, "North Readings to PI", str(tmpdir)).read() is None
+
+    def test_corrupted(self, tmpdir):
+        with open(os.path.join(str(tmpdir), "stream_1.json"), "w") as journal_file:
+            journal_file.write('{"stream_id": 1, "na')
+
+        assert StreamPositionJournal(1, "North Readings to PI", str(tmpdir)).read() is None
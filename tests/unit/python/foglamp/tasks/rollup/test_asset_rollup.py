@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+
+# FOGLAMP_BEGIN
+# See: http://foglamp.readthedocs.io/
+# FOGLAMP_END
+
+"""Test tasks/rollup/rollup.py"""
+
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+import pytest
+
+from foglamp.common import logger
+from foglamp.common.configuration_manager import ConfigurationManager
+from foglamp.common.process import FoglampProcess
+from foglamp.common.storage_client.exceptions import StorageServerError
+from foglamp.common.storage_client.storage_client import StorageClientAsync, ReadingsStorageClientAsync
+from foglamp.tasks.rollup import rollup
+from foglamp.tasks.rollup.rollup import AssetRollup
+
+__author__ = "Ashish Jabble"
+__copyright__ = "Copyright (c) 2018 OSIsoft, LLC"
+__license__ = "Apache 2.0"
+__version__ = "${VERSION}"
+
+
+pytestmark = pytest.mark.asyncio
+
+
+@asyncio.coroutine
+def mock_coro(*args, **kwargs):
+    if len(args) > 0:
+        return args[0]
+    else:
+        return ""
+
+
+@pytest.fixture
+def asset_rollup():
+    with patch.object(FoglampProcess, '__init__'):
+        with patch.object(logger, "setup"):
+            task = AssetRollup()
+    task._storage_async = MagicMock(spec=StorageClientAsync)
+    task._readings_storage_async = MagicMock(spec=ReadingsStorageClientAsync)
+    return task
+
+
+@pytest.allure.feature("unit")
+@pytest.allure.story("tasks", "rollup")
+class TestAssetRollup:
+
+    async def test_init(self):
+        with patch.object(FoglampProcess, "__init__") as mock_process:
+            with patch.object(logger, "setup") as log:
+                task = AssetRollup()
+                assert isinstance(task, AssetRollup)
+            log.assert_called_once_with("AssetRollup")
+        mock_process.assert_called_once_with()
+
+    async def test_roll_up_asset(self, asset_rollup):
+        rows = {'count': 2, 'rows': [
+            {'bucket': '2018-09-10 10:01', 'min_0': '1', 'max_0': '3', 'sum_0': '4', 'count_0': '2',
+             'min_1': None, 'max_1': None, 'sum_1': None, 'count_1': '0'},
+            {'bucket': '2018-09-10 10:00', 'min_0': '5', 'max_0': '5', 'sum_0': '5', 'count_0': '1',
+             'min_1': '20', 'max_1': '20', 'sum_1': '20', 'count_1': '1'}]}
+        with patch.object(asset_rollup._readings_storage_async, 'query', return_value=mock_coro(rows)) as query_patch:
+            with patch.object(asset_rollup._storage_async, 'delete_from_tbl', return_value=mock_coro(None)) \
+                    as delete_patch:
+                with patch.object(asset_rollup._storage_async, 'insert_into_tbl',
+                                  side_effect=lambda *args: mock_coro(None)) as insert_patch:
+                    written = await asset_rollup._roll_up_asset('sinusoid', ['sinusoid', 'cosinusoid'], 60,
+                                                                datetime(2018, 9, 10, 10, 0),
+                                                                datetime(2018, 9, 10, 10, 2))
+        assert 3 == written
+
+        payload = json.loads(query_patch.call_args[0][0])
+        assert 8 == len(payload['aggregate'])
+        assert {"operation": "count", "json": {"column": "reading", "properties": "cosinusoid"},
+                "alias": "count_1"} == payload['aggregate'][7]
+        assert {"column": "asset_code", "condition": "=", "value": "sinusoid",
+                "and": {"column": "user_ts", "condition": ">=", "value": "2018-09-10 10:00:00",
+                        "and": {"column": "user_ts", "condition": "<", "value": "2018-09-10 10:02:00"}}} == payload['where']
+        assert {"column": "user_ts", "alias": "bucket", "format": "YYYY-MM-DD HH24:MI"} == payload['group']
+
+        # The rollups written before in the buckets are replaced
+        args, kwargs = delete_patch.call_args
+        assert 'asset_rollups' == args[0]
+        assert {"column": "asset_code", "condition": "=", "value": "sinusoid",
+                "and": {"column": "period", "condition": "=", "value": 60,
+                        "and": {"column": "bucket_ts", "condition": ">=", "value": "2018-09-10 10:00:00",
+                                "and": {"column": "bucket_ts", "condition": "<", "value": "2018-09-10 10:02:00"}}}} == \
+            json.loads(args[1])['where']
+
+        assert 3 == insert_patch.call_count
+        args, kwargs = insert_patch.call_args_list[0]
+        assert 'asset_rollups' == args[0]
+        assert {"asset_code": "sinusoid", "datapoint": "sinusoid", "period": 60, "bucket_ts": "2018-09-10 10:01:00",
+                "min_value": 1.0, "max_value": 3.0, "sum_value": 4.0, "count": 2} == json.loads(args[1])
+        args, kwargs = insert_patch.call_args_list[2]
+        assert {"asset_code": "sinusoid", "datapoint": "cosinusoid", "period": 60, "bucket_ts": "2018-09-10 10:00:00",
+                "min_value": 20.0, "max_value": 20.0, "sum_value": 20.0, "count": 1} == json.loads(args[1])
+
+    async def test_run(self, asset_rollup):
+        asset_rollup._get_purge_age = MagicMock(return_value=mock_coro(None))
+        now = datetime(2018, 9, 10, 10, 30, 25, 500)
+        rolled_up = {60: (datetime(2018, 9, 10, 10, 29), 100), 3600: (None, None)}
+
+        with patch.object(rollup, 'datetime', MagicMock(now=MagicMock(return_value=now))):
+            with patch.object(asset_rollup, '_get_rolled_up', side_effect=lambda period: mock_coro(rolled_up[period])):
+                with patch.object(asset_rollup, '_get_last_id', side_effect=lambda *args: mock_coro(100)) as last_id_patch:
+                    with patch.object(asset_rollup, '_get_assets', side_effect=lambda start, end: mock_coro({'sinusoid': 100})) as assets_patch:
+                        with patch.object(asset_rollup, '_get_late') as late_patch:
+                            with patch.object(asset_rollup, '_get_reading_keys', side_effect=lambda ids: mock_coro({'sinusoid': ['sinusoid']})):
+                                with patch.object(asset_rollup, '_roll_up_asset', side_effect=lambda *args: mock_coro(1)) as roll_up_patch:
+                                    with patch.object(asset_rollup, '_set_rolled_up', side_effect=lambda *args: mock_coro(None)) as set_patch:
+                                        with patch.object(asset_rollup, '_purge', side_effect=lambda *args: mock_coro(None)) as purge_patch:
+                                            await asset_rollup.run()
+
+        # The minute completed 10 seconds ago, the hours of the last 3600 hours
+        assert [(datetime(2018, 9, 10, 10, 30, 15, 500), 100), (datetime(2018, 9, 10, 10, 30, 15, 500), None)] == [
+            c[0] for c in last_id_patch.call_args_list]
+        assert [(datetime(2018, 9, 10, 10, 29), datetime(2018, 9, 10, 10, 30)),
+                (datetime(2018, 4, 13, 10, 0), datetime(2018, 9, 10, 10, 0))] == [
+                   c[0] for c in assets_patch.call_args_list]
+        # No reading was stored since the last run
+        assert not late_patch.called
+        assert [('sinusoid', ['sinusoid'], 60, datetime(2018, 9, 10, 10, 29), datetime(2018, 9, 10, 10, 30)),
+                ('sinusoid', ['sinusoid'], 3600, datetime(2018, 4, 13, 10, 0), datetime(2018, 9, 10, 10, 0))] == [
+                   c[0] for c in roll_up_patch.call_args_list]
+        assert [(60, datetime(2018, 9, 10, 10, 30), 100), (3600, datetime(2018, 9, 10, 10, 0), 100)] == [
+            c[0] for c in set_patch.call_args_list]
+        assert [(60, 31 * 24 * 60 * 60), (3600, None)] == [c[0] for c in purge_patch.call_args_list]
+
+    async def test_run_purge_age(self, asset_rollup):
+        now = datetime(2018, 9, 10, 10, 30, 25, 500)
+        asset_rollup._get_purge_age = MagicMock(return_value=mock_coro(72 * 60 * 60))
+
+        with patch.object(rollup, 'datetime', MagicMock(now=MagicMock(return_value=now))):
+            with patch.object(asset_rollup, '_get_rolled_up', side_effect=lambda period: mock_coro((None, None))):
+                with patch.object(asset_rollup, '_get_last_id', side_effect=lambda *args: mock_coro(None)):
+                    with patch.object(asset_rollup, '_get_assets', side_effect=lambda start, end: mock_coro({})) as assets_patch:
+                        with patch.object(asset_rollup, '_get_reading_keys', side_effect=lambda ids: mock_coro({})):
+                            with patch.object(asset_rollup, '_set_rolled_up', side_effect=lambda *args: mock_coro(None)) as set_patch:
+                                with patch.object(asset_rollup, '_purge', side_effect=lambda *args: mock_coro(None)) as purge_patch:
+                                    await asset_rollup.run()
+
+        # The rollups are not kept longer than the readings
+        assert [(datetime(2018, 9, 7, 22, 30), datetime(2018, 9, 10, 10, 30)),
+                (datetime(2018, 9, 7, 11, 0), datetime(2018, 9, 10, 10, 0))] == [
+                   c[0] for c in assets_patch.call_args_list]
+        assert [(60, datetime(2018, 9, 10, 10, 30), 0), (3600, datetime(2018, 9, 10, 10, 0), 0)] == [
+            c[0] for c in set_patch.call_args_list]
+        assert [(60, 72 * 60 * 60), (3600, 72 * 60 * 60)] == [c[0] for c in purge_patch.call_args_list]
+
+    @pytest.mark.parametrize("item, expected", [
+        ({'value': '72'}, 72 * 60 * 60),
+        ({'value': '0'}, None),
+        ({'value': 'bla'}, None),
+        (None, None)
+    ])
+    async def test_get_purge_age(self, asset_rollup, item, expected):
+        with patch.object(ConfigurationManager, 'get_category_item', return_value=mock_coro(item)) as item_patch:
+            assert expected == await asset_rollup._get_purge_age()
+        item_patch.assert_called_once_with('PURGE_READ', 'age')
+
+    async def test_run_late(self, asset_rollup):
+        asset_rollup._get_purge_age = MagicMock(return_value=mock_coro(None))
+        now = datetime(2018, 9, 10, 10, 30, 25, 500)
+        rolled_up = {60: (datetime(2018, 9, 10, 10, 30), 100), 3600: (datetime(2018, 9, 10, 10, 0), 100)}
+        late_ranges = {60: [(datetime(2018, 9, 10, 8, 0), datetime(2018, 9, 10, 8, 2))],
+                       3600: [(datetime(2018, 9, 10, 8, 0), datetime(2018, 9, 10, 9, 0))]}
+
+        with patch.object(rollup, 'datetime', MagicMock(now=MagicMock(return_value=now))):
+            with patch.object(asset_rollup, '_get_rolled_up', side_effect=lambda period: mock_coro(rolled_up[period])):
+                with patch.object(asset_rollup, '_get_last_id', side_effect=lambda *args: mock_coro(110)):
+                    with patch.object(asset_rollup, '_get_assets') as assets_patch:
+                        with patch.object(asset_rollup, '_get_late', side_effect=lambda period, *args: mock_coro(
+                                ({'pump': 110}, late_ranges[period]))) as late_patch:
+                            with patch.object(asset_rollup, '_get_reading_keys', side_effect=lambda ids: mock_coro({'pump': ['flow']})) as keys_patch:
+                                with patch.object(asset_rollup, '_roll_up_asset', side_effect=lambda *args: mock_coro(1)) as roll_up_patch:
+                                    with patch.object(asset_rollup, '_set_rolled_up', side_effect=lambda *args: mock_coro(None)) as set_patch:
+                                        with patch.object(asset_rollup, '_purge', side_effect=lambda *args: mock_coro(None)):
+                                            await asset_rollup.run()
+
+        # No bucket completed since the last run, the buckets of the readings stored late are rolled up again
+        assert not assets_patch.called
+        assert [(60, 100, 110, datetime(2018, 9, 10, 10, 30)), (3600, 100, 110, datetime(2018, 9, 10, 10, 0))] == [
+            c[0] for c in late_patch.call_args_list]
+        assert [([110],), ([110],)] == [c[0] for c in keys_patch.call_args_list]
+        assert [('pump', ['flow'], 60, datetime(2018, 9, 10, 8, 0), datetime(2018, 9, 10, 8, 2)),
+                ('pump', ['flow'], 3600, datetime(2018, 9, 10, 8, 0), datetime(2018, 9, 10, 9, 0))] == [
+                   c[0] for c in roll_up_patch.call_args_list]
+        assert [(60, datetime(2018, 9, 10, 10, 30), 110), (3600, datetime(2018, 9, 10, 10, 0), 110)] == [
+            c[0] for c in set_patch.call_args_list]
+
+    async def test_run_asset_failing(self, asset_rollup):
+        asset_rollup._get_purge_age = MagicMock(return_value=mock_coro(None))
+        now = datetime(2018, 9, 10, 10, 30, 25, 500)
+        rolled_up = {60: (datetime(2018, 9, 10, 10, 29), 100), 3600: (datetime(2018, 9, 10, 10, 0), 100)}
+
+        def roll_up(asset_code, *args):
+            if asset_code == 'door':
+                raise StorageServerError(400, 'storage', {'message': 'invalid input syntax for type double'})
+            return mock_coro(1)
+
+        with patch.object(rollup, 'datetime', MagicMock(now=MagicMock(return_value=now))):
+            with patch.object(asset_rollup, '_get_rolled_up', side_effect=lambda period: mock_coro(rolled_up[period])):
+                with patch.object(asset_rollup, '_get_last_id', side_effect=lambda *args: mock_coro(110)):
+                    with patch.object(asset_rollup, '_get_assets', side_effect=lambda start, end: mock_coro(
+                            {'door': 105, 'sinusoid': 110})):
+                        with patch.object(asset_rollup, '_get_late', side_effect=lambda *args: mock_coro(({}, []))):
+                            with patch.object(asset_rollup, '_get_reading_keys', side_effect=lambda ids: mock_coro(
+                                    {'door': ['status'], 'sinusoid': ['sinusoid']})):
+                                with patch.object(asset_rollup, '_roll_up_asset', side_effect=roll_up) as roll_up_patch:
+                                    with patch.object(asset_rollup, '_set_rolled_up', side_effect=lambda *args: mock_coro(None)) as set_patch:
+                                        with patch.object(asset_rollup, '_purge', side_effect=lambda *args: mock_coro(None)):
+                                            await asset_rollup.run()
+
+        # The asset failing does not stop the rollups of the others, the minute is rolled up again by the next run
+        assert ['door', 'sinusoid'] == [c[0][0] for c in roll_up_patch.call_args_list]
+        assert [(3600, datetime(2018, 9, 10, 10, 0), 110)] == [c[0] for c in set_patch.call_args_list]
+        asset_rollup._logger.error.assert_called_once()
+
+    async def test_get_assets(self, asset_rollup):
+        latest_ids = {'rows': [{'asset_code': 'sinusoid', 'id': 12}, {'asset_code': 'door', 'id': '9'}]}
+        with patch.object(asset_rollup._readings_storage_async, 'query', return_value=mock_coro(latest_ids)) \
+                as query_patch:
+            assets = await asset_rollup._get_assets(datetime(2018, 9, 10, 10, 0), datetime(2018, 9, 10, 10, 2))
+        assert {'sinusoid': 12, 'door': 9} == assets
+        payload = json.loads(query_patch.call_args[0][0])
+        assert {"operation": "max", "column": "id", "alias": "id"} == payload['aggregate']
+        assert "asset_code" == payload['group']
+
+    async def test_get_reading_keys(self, asset_rollup):
+        latest = {'rows': [{'asset_code': 'sinusoid', 'reading': {'sinusoid': 0.5, 'count': 3, 'status': 'ok', 'on': True}},
+                           {'asset_code': 'door', 'reading': {'status': 'open'}}]}
+        with patch.object(asset_rollup._readings_storage_async, 'query', return_value=mock_coro(latest)) as query_patch:
+            assets = await asset_rollup._get_reading_keys([12, 9])
+        assert {'sinusoid': ['sinusoid', 'count']} == assets
+
+        # The keys of all the assets are read by a single query
+        payload = json.loads(query_patch.call_args[0][0])
+        assert {"column": "id", "condition": "=", "value": 12,
+                "or": {"column": "id", "condition": "=", "value": 9}} == payload['where']
+
+    async def test_get_reading_keys_none(self, asset_rollup):
+        with patch.object(asset_rollup._readings_storage_async, 'query') as query_patch:
+            assert {} == await asset_rollup._get_reading_keys([])
+        assert not query_patch.called
+
+    @pytest.mark.parametrize("last_id, rows, expected", [
+        (None, [{'id': 42}], 42),
+        (40, [{'id': '42'}], 42),
+        (40, [{'id': None}], 40),
+        (None, [{'id': None}], None)
+    ])
+    async def test_get_last_id(self, asset_rollup, last_id, rows, expected):
+        with patch.object(asset_rollup._readings_storage_async, 'query',
+                          return_value=mock_coro({'count': 1, 'rows': rows})) as query_patch:
+            assert expected == await asset_rollup._get_last_id(datetime(2018, 9, 10, 10, 30, 15), last_id)
+        where = json.loads(query_patch.call_args[0][0])['where']
+        assert {"column": "ts", "condition": "<", "value": "2018-09-10 10:30:15"} == {
+            key: where[key] for key in ('column', 'condition', 'value')}
+        assert (last_id is not None) == ('and' in where)
+
+    async def test_get_late(self, asset_rollup):
+        buckets = {'count': 3, 'rows': [{'bucket': '2018-09-10 08:01', 'count': 2}, {'bucket': '2018-09-10 08:00', 'count': 1},
+                                        {'bucket': '2018-09-10 09:15', 'count': 1}]}
+        with patch.object(asset_rollup._readings_storage_async, 'query', side_effect=[
+                mock_coro({'count': 1, 'rows': [{'asset_code': 'pump', 'id': 110}]}), mock_coro(buckets)]) as query_patch:
+            assets, ranges = await asset_rollup._get_late(60, 100, 110, datetime(2018, 9, 10, 10, 30))
+        assert {'pump': 110} == assets
+        # Contiguous buckets are merged
+        assert [(datetime(2018, 9, 10, 8, 0), datetime(2018, 9, 10, 8, 2)),
+                (datetime(2018, 9, 10, 9, 15), datetime(2018, 9, 10, 9, 16))] == ranges
+        payload = json.loads(query_patch.call_args[0][0])
+        assert {"column": "id", "condition": ">", "value": 100,
+                "and": {"column": "id", "condition": "<=", "value": 110,
+                        "and": {"column": "user_ts", "condition": "<", "value": "2018-09-10 10:30:00"}}} == payload['where']
+        assert {"column": "user_ts", "alias": "bucket", "format": "YYYY-MM-DD HH24:MI"} == payload['group']
+
+    async def test_get_late_none(self, asset_rollup):
+        with patch.object(asset_rollup._readings_storage_async, 'query',
+                          return_value=mock_coro({'count': 0, 'rows': []})) as query_patch:
+            assert ({}, []) == await asset_rollup._get_late(60, 100, 110, datetime(2018, 9, 10, 10, 30))
+        assert 1 == query_patch.call_count
+
+    @pytest.mark.parametrize("rows_affected, inserted", [(1, 0), (0, 1)])
+    async def test_set_rolled_up(self, asset_rollup, rows_affected, inserted):
+        with patch.object(asset_rollup._storage_async, 'update_tbl',
+                          return_value=mock_coro({'rows_affected': rows_affected})) as update_patch:
+            with patch.object(asset_rollup._storage_async, 'insert_into_tbl', return_value=mock_coro(None)) as insert_patch:
+                await asset_rollup._set_rolled_up(60, datetime(2018, 9, 10, 10, 30), 110)
+        args, kwargs = update_patch.call_args
+        assert {"values": {"bucket_ts": "2018-09-10 10:29:00", "count": 110},
+                "where": {"column": "asset_code", "condition": "=", "value": "",
+                          "and": {"column": "period", "condition": "=", "value": 60}}} == json.loads(args[1])
+        assert inserted == insert_patch.call_count
+
+    async def test_get_rolled_up(self, asset_rollup):
+        with patch.object(asset_rollup._storage_async, 'query_tbl_with_payload', return_value=mock_coro(
+                {'count': 1, 'rows': [{'bucket_ts': '2018-09-10 10:29:00', 'count': 110}]})):
+            assert (datetime(2018, 9, 10, 10, 30), 110) == await asset_rollup._get_rolled_up(60)
+        with patch.object(asset_rollup._storage_async, 'query_tbl_with_payload',
+                          return_value=mock_coro({'count': 0, 'rows': []})):
+            assert (None, None) == await asset_rollup._get_rolled_up(60)
+
+    @pytest.mark.parametrize("retention, deleted", [(None, 0), (3600, 1)])
+    async def test_purge(self, asset_rollup, retention, deleted):
+        with patch.object(asset_rollup._storage_async, 'delete_from_tbl', return_value=mock_coro(None)) as delete_patch:
+            await asset_rollup._purge(3600, retention)
+        assert deleted == delete_patch.call_count
+        if deleted:
+            assert {"column": "period", "condition": "=", "value": 3600,
+                    "and": {"column": "asset_code", "condition": "!=", "value": "",
+                            "and": {"column": "bucket_ts", "condition": "older", "value": 3600}}} == \
+                json.loads(delete_patch.call_args[0][1])['where']